@@ -0,0 +1,145 @@
+"""외부 의존성(QuestDB 등)용 서킷 브레이커.
+
+상태:
+  closed     정상. 호출을 그대로 보내고, 연속 실패가 failure_threshold에 도달하면 open
+  open       차단. 호출은 즉시 거절되어 호출자가 폴백 경로를 탄다 (요청 지연에 타임아웃이 붙지 않음)
+  half_open  백그라운드 프로브가 복구 여부를 확인하는 중. 요청은 계속 거절
+
+- 시작 상태는 open(아직 확인 전)이며, 첫 allow()/start() 때 백그라운드 프로브 스레드를 띄운다.
+  import나 서버 기동이 연결 타임아웃을 기다리지 않는다.
+- 프로브는 open 상태에서 probe_interval초마다 돌고, 성공하면 closed로 복귀한다.
+- 상태 전이와 실패 횟수는 stats()로 노출된다.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], None],
+        failure_threshold: int = 3,
+        probe_interval: float = 10.0,
+        autostart: bool = True,
+    ) -> None:
+        self.name = name
+        self._probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_interval = probe_interval
+        self.autostart = autostart
+        self.state = OPEN
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self.transitions: deque = deque(maxlen=20)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._resolved = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- 상태 전이 ----------
+    def _transition(self, new_state: str, reason: str) -> None:
+        """_lock을 잡은 상태에서 호출."""
+        if new_state == self.state:
+            return
+        old_state, self.state = self.state, new_state
+        self.transitions.append({"from": old_state, "to": new_state, "at": time.time(), "reason": reason})
+        if new_state == CLOSED:
+            print(f"✅ {self.name} 연결 성공 (circuit closed)")
+        elif new_state == OPEN and old_state == CLOSED:
+            print(f"⚠️  {self.name} 연결 실패, 폴백 경로로 전환 (circuit open): {reason}")
+            self._wake.set()  # 프로브 스레드가 복구 확인을 시작하도록 깨움
+        elif new_state == OPEN and not self._resolved.is_set():
+            print(f"⚠️  {self.name} 연결 실패, 폴백 경로로 시작: {reason}")
+
+    def allow(self) -> bool:
+        """이번 호출을 보낼지 여부. closed일 때만 True."""
+        if self.autostart:
+            self.start()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.total_successes += 1
+            self.consecutive_failures = 0
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+            if self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._transition(OPEN, self.last_error)
+
+    # ---------- 프로브 ----------
+    def probe_now(self) -> bool:
+        """프로브를 동기적으로 한 번 실행하고 결과에 따라 상태를 바꾼다."""
+        with self._lock:
+            if self.state != CLOSED:
+                self._transition(HALF_OPEN, "probe")
+        try:
+            self._probe()
+        except Exception as e:
+            with self._lock:
+                self.total_failures += 1
+                self.last_error = str(e)
+                self._transition(OPEN, self.last_error)
+            ok = False
+        else:
+            with self._lock:
+                self.consecutive_failures = 0
+                self._transition(CLOSED, "probe succeeded")
+            ok = True
+        self._resolved.set()
+        return ok
+
+    def _run(self) -> None:
+        while True:
+            if self.state != CLOSED:
+                self.probe_now()
+            # closed면 open 전이(_wake)까지, open이면 probe_interval만큼 대기
+            self._wake.wait(timeout=None if self.state == CLOSED else self.probe_interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """백그라운드 프로브 스레드를 (한 번만) 시작한다."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-probe", daemon=True)
+                self._thread.start()
+
+    def wait_ready(self, timeout: float) -> bool:
+        """첫 프로브 결과를 최대 timeout초 기다린 뒤 closed 여부를 반환 (배치 작업/CLI용)."""
+        self.start()
+        self._resolved.wait(timeout)
+        return self.state == CLOSED
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "probed": self._resolved.is_set(),
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "total_successes": self.total_successes,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+                "transitions": list(self.transitions),
+            }
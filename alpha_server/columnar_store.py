@@ -0,0 +1,515 @@
+"""QuestDB 미사용 시의 컬럼형 파일 저장소 (CSV 폴백 대체).
+
+디렉터리 구조 (시장/연도 파티션):
+  <root>/<market>/<year>/timestamp.i8   int64 나노초 타임스탬프
+  <root>/<market>/<year>/open.f8 ...    float64 컬럼 (open/high/low/close/volume)
+  <root>/<market>/<year>/index.json     {"rows": 커밋된 행 수, "tickers": {티커: [[시작, 끝), ...]], "gen": 세대}
+  (정리(compact)할 때마다 새 세대 파일 close.<gen>.f8 ...에 쓰고 색인의 gen을 올린다. 0세대는 접미사 없음)
+
+- 쓰기는 컬럼 파일 끝에 이어 붙이고, 그 다음 index.json을 원자적으로 교체한다.
+  (중간에 죽으면 커밋되지 않은 꼬리 행은 다음 쓰기 때 잘라낸다)
+  쓰기는 파티션별 잠금 파일(.lock, fcntl)을 잡고 디스크의 index.json을 다시 읽은 뒤 진행하므로,
+  다른 프로세스가 커밋한 행을 낡은 색인 기준으로 잘라내지 않는다. 잘라내는 위치는 커밋된 행 수
+  (8바이트 레코드 경계)뿐이고, 컬럼 파일이 색인보다 짧으면 쓰기를 거부한다.
+- 읽기용 색인 캐시는 check_interval초마다 index.json의 (mtime_ns, 크기)를 다시 확인해, 다른
+  프로세스가 쓴 파티션을 다시 읽는다 (새 시장/연도 디렉터리도 이때 찾는다).
+- 티커 전체 재저장(write)과 겹친 구간 교체(append(replace=True))는 새 행을 먼저 이어 붙이고, 파티션마다
+  색인 교체 한 번으로 기존 구간을 새 구간으로 바꾼다 (읽기는 교체 전 또는 후만 보고 티커가 비는 순간이 없다).
+- 그렇게 생긴 죽은 행이 파티션 행의 compact_ratio를 넘으면 그 파티션을 바로 정리한다. 정리는 새 세대 파일에
+  쓰고 색인을 교체하므로 읽기와 겹쳐도 되며, 낡은 색인으로 읽는 중일 수 있는 직전 세대 파일은 다음 정리 때 지운다.
+- 읽기는 np.memmap으로 열어 구간이 하나면 복사 없이 뷰를 돌려준다.
+- 한 티커의 행은 파티션 안에서 시간순이 유지되도록, append는 마지막 봉 이후 행만 받는다.
+  append(replace=True)는 새 데이터 첫 봉 이후의 저장된 행을 색인에서 잘라내고 이어 붙인다
+  (증분 수집이 겹쳐 받은 마지막 봉 교체용, 파티션마다 색인 교체 한 번).
+
+환경변수:
+  ALPHA_FILE_BACKEND        data_handler 파일 저장소 선택 (csv | columnar, 기본 csv)
+  ALPHA_COLUMNAR_CHECK_SEC  읽기 색인 캐시의 파일 변경 확인 간격 (기본 1초, 0이면 매번)
+  ALPHA_COLUMNAR_COMPACT_RATIO  죽은 행 비율이 이 값을 넘는 파티션은 쓰기 직후 정리 (기본 0.5, 0이면 끔)
+
+사용법:
+  python -m alpha_server.columnar_store --migrate   # market_data/*.csv → market_data/columnar
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .asset_screener import get_market_for_ticker
+
+try:  # Windows에는 fcntl이 없음 (프로세스 간 잠금 없이 프로세스 내 잠금만 사용)
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+CHECK_INTERVAL_SEC = float(os.getenv("ALPHA_COLUMNAR_CHECK_SEC", "1.0"))
+COMPACT_RATIO = float(os.getenv("ALPHA_COLUMNAR_COMPACT_RATIO", "0.5"))
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+_FILES = {c: f"{c.lower()}.f8" for c in COLUMNS}
+_TS_FILE = "timestamp.i8"
+_INDEX_FILE = "index.json"
+_LOCK_FILE = ".lock"
+_RECORD = 8  # 모든 컬럼 파일의 레코드 크기 (int64/float64)
+_ALL_ROWS = int(np.iinfo(np.int64).min)  # trim_from으로 주면 티커의 기존 행을 모두 잘라낸다
+
+
+def _open_column(path: str, dtype: str, rows: int) -> np.ndarray:
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+
+def _column_file(name: str, gen: int) -> str:
+    if gen == 0:
+        return name
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{gen}{ext}"
+
+
+def _year_bounds(start, end) -> tuple[Optional[int], Optional[int]]:
+    lo = pd.Timestamp(start).year if start is not None else None
+    hi = pd.Timestamp(end).year if end is not None else None
+    return lo, hi
+
+
+def _file_signature(path: str) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ColumnarStore:
+    def __init__(self, root: str, check_interval: float = CHECK_INTERVAL_SEC,
+                 compact_ratio: float = COMPACT_RATIO) -> None:
+        self.root = root
+        self.check_interval = check_interval
+        self.compact_ratio = compact_ratio
+        self._indices: Optional[dict[tuple[str, int], dict]] = None
+        self._signatures: dict[tuple[str, int], tuple[int, int]] = {}
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    # ---------- 색인 ----------
+    def _pdir(self, market: str, year: int) -> str:
+        return os.path.join(self.root, market, str(year))
+
+    def _path(self, market: str, year: int, index: dict, name: str) -> str:
+        """색인 세대에 맞는 컬럼 파일 경로."""
+        return os.path.join(self._pdir(market, year), _column_file(name, index.get("gen", 0)))
+
+    def _index_paths(self) -> dict[tuple[str, int], str]:
+        paths = {}
+        if os.path.isdir(self.root):
+            for market in os.listdir(self.root):
+                mdir = os.path.join(self.root, market)
+                if not os.path.isdir(mdir):
+                    continue
+                for year in os.listdir(mdir):
+                    path = os.path.join(mdir, year, _INDEX_FILE)
+                    if year.isdigit() and os.path.exists(path):
+                        paths[(market, int(year))] = path
+        return paths
+
+    def _load_indices(self, refresh: bool = False) -> dict[tuple[str, int], dict]:
+        """파티션 색인 캐시. check_interval이 지났거나 refresh=True면 디스크와 맞춘다
+        (index.json 서명이 바뀐 파티션만 다시 읽음)."""
+        now = time.monotonic()
+        if self._indices is not None and not refresh and now - self._checked_at < self.check_interval:
+            return self._indices
+        indices = {}
+        for key, path in self._index_paths().items():
+            signature = _file_signature(path)
+            cached = (self._indices or {}).get(key)
+            if cached is not None and signature == self._signatures.get(key):
+                indices[key] = cached
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    indices[key] = json.load(f)
+            except (OSError, ValueError):  # 교체 중이거나 사라진 파일은 다음 확인 때 다시 읽는다
+                if cached is not None:
+                    indices[key] = cached
+                continue
+            self._signatures[key] = signature
+        self._indices = indices
+        self._checked_at = now
+        return indices
+
+    def _read_index(self, market: str, year: int) -> dict:
+        """디스크의 최신 색인 (쓰기 직전에 파티션 잠금 안에서 호출). 없으면 빈 색인."""
+        path = os.path.join(self._pdir(market, year), _INDEX_FILE)
+        if not os.path.exists(path):
+            return {"rows": 0, "tickers": {}}
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self._load_indices()[(market, year)] = index
+        self._signatures[(market, year)] = _file_signature(path)
+        return index
+
+    def _save_index(self, market: str, year: int, index: dict) -> None:
+        path = os.path.join(self._pdir(market, year), _INDEX_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        self._load_indices()[(market, year)] = index
+        self._signatures[(market, year)] = _file_signature(path)
+
+    @contextmanager
+    def _partition_lock(self, market: str, year: int):
+        """파티션 쓰기 잠금 (프로세스 간: fcntl.flock, 프로세스 내: self._lock)."""
+        pdir = self._pdir(market, year)
+        os.makedirs(pdir, exist_ok=True)
+        with self._lock, open(os.path.join(pdir, _LOCK_FILE), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _partitions(self, ticker: str, start=None, end=None) -> list[tuple[int, dict]]:
+        """티커가 들어있는 (연도, 색인) 목록. start/end 연도 밖의 파티션은 건너뛴다."""
+        market = get_market_for_ticker(ticker)
+        lo, hi = _year_bounds(start, end)
+        out = []
+        for (m, year), index in self._load_indices().items():
+            if m != market or ticker not in index["tickers"]:
+                continue
+            if (lo is not None and year < lo) or (hi is not None and year > hi):
+                continue
+            out.append((year, index))
+        return sorted(out, key=lambda item: item[0])
+
+    def tickers(self) -> list[str]:
+        with self._lock:
+            names = set()
+            for index in self._load_indices().values():
+                names.update(index["tickers"])
+            return sorted(names)
+
+    # ---------- 쓰기 ----------
+    def _append_partition(
+        self, ticker: str, market: str, year: int, part: pd.DataFrame, trim_from: Optional[int] = None
+    ) -> None:
+        """파티션 잠금을 잡은 상태에서 호출한다.
+
+        trim_from(나노초)이 주어지면 티커의 기존 행 중 그 시각 이후를 색인에서 잘라낸다. 새 행을 먼저 쓰고
+        자르기와 새 구간은 색인 교체 한 번으로 함께 커밋한다.
+        """
+        index = self._read_index(market, year)
+        rows = index["rows"]
+        committed = rows * _RECORD
+        if trim_from is not None and ticker in index["tickers"]:
+            ts = _open_column(self._path(market, year, index, _TS_FILE), "<i8", rows)
+            kept = []
+            for lo, hi in index["tickers"][ticker]:
+                cut = lo + int(np.searchsorted(ts[lo:hi], trim_from, "left"))
+                if cut > lo:
+                    kept.append([lo, cut])
+            del ts
+            if kept:
+                index["tickers"][ticker] = kept
+            else:
+                del index["tickers"][ticker]
+        if not part.empty:
+            arrays = {_TS_FILE: pd.DatetimeIndex(part.index).asi8.astype("<i8")}
+            for col in COLUMNS:
+                arrays[_FILES[col]] = part[col].to_numpy(dtype="<f8")
+            for name in arrays:
+                path = self._path(market, year, index, name)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                if size < committed:
+                    raise RuntimeError(f"컬럼 파일이 색인보다 짧습니다: {path} ({size} < {committed}바이트)")
+            for name, values in arrays.items():
+                with open(self._path(market, year, index, name), "ab") as f:
+                    f.truncate(committed)  # 커밋된 마지막 레코드 경계 뒤의 꼬리만 제거
+                    f.write(values.tobytes())
+
+            ranges = index["tickers"].setdefault(ticker, [])
+            end = rows + len(part)
+            if ranges and ranges[-1][1] == rows:
+                ranges[-1][1] = end
+            else:
+                ranges.append([rows, end])
+            index["rows"] = end
+        self._save_index(market, year, index)
+        self._maybe_compact(market, year, index)
+
+    def _maybe_compact(self, market: str, year: int, index: dict) -> None:
+        """죽은 행이 파티션 행의 compact_ratio를 넘으면 정리한다 (파티션 잠금 안에서 호출)."""
+        if self.compact_ratio <= 0 or not index["rows"]:
+            return
+        live = sum(hi - lo for ranges in index["tickers"].values() for lo, hi in ranges)
+        if index["rows"] - live > self.compact_ratio * index["rows"]:
+            self._compact_partition(market, year)
+
+    def _write_parts(self, ticker: str, df: pd.DataFrame, trim_from: Optional[int]) -> None:
+        """df를 연도 파티션별로 이어 붙인다. trim_from이 있으면 그 이후의 기존 행이 있는 파티션도 모두 다룬다."""
+        market = get_market_for_ticker(ticker)
+        years = set(int(y) for y in df.index.year)
+        if trim_from is not None:
+            start = None if trim_from == _ALL_ROWS else pd.Timestamp(trim_from)
+            years.update(y for y, _ in self._partitions(ticker, start=start))
+        for year in sorted(years):
+            with self._partition_lock(market, year):
+                self._append_partition(ticker, market, year, df[df.index.year == year], trim_from)
+
+    def append(self, ticker: str, data: pd.DataFrame, replace: bool = False) -> int:
+        """마지막 저장 봉 이후의 행만 이어 붙인다. 추가한 행 수를 반환.
+
+        replace=True면 data 첫 봉 이후로 저장된 행을 새 행으로 교체한다 (겹친 구간 덮어쓰기).
+        """
+        if data is None or data.empty:
+            return 0
+        with self._lock:
+            self._load_indices(refresh=True)
+            df = data.sort_index()
+            df = df[~df.index.duplicated(keep="last")]
+            trim_from = None
+            if replace:
+                trim_from = int(df.index[0].value)
+            else:
+                last_ts = self.last_timestamp(ticker)
+                if last_ts is not None:
+                    df = df[df.index > last_ts]
+                if df.empty:
+                    return 0
+            self._write_parts(ticker, df, trim_from)
+            return len(df)
+
+    def delete(self, ticker: str) -> None:
+        """티커를 색인에서 제거한다 (데이터 행은 compact() 때 정리)."""
+        with self._lock:
+            market = get_market_for_ticker(ticker)
+            self._load_indices(refresh=True)
+            for year, _ in self._partitions(ticker):
+                with self._partition_lock(market, year):
+                    index = self._read_index(market, year)
+                    if index["tickers"].pop(ticker, None) is not None:
+                        self._save_index(market, year, index)
+                        self._maybe_compact(market, year, index)
+
+    def write(self, ticker: str, data: pd.DataFrame) -> int:
+        """티커 데이터를 통째로 교체한다. 새 행을 쓴 뒤 파티션마다 색인 교체 한 번으로 바꾼다."""
+        if data is None or data.empty:
+            self.delete(ticker)
+            return 0
+        with self._lock:
+            self._load_indices(refresh=True)
+            df = data.sort_index()
+            df = df[~df.index.duplicated(keep="last")]
+            self._write_parts(ticker, df, _ALL_ROWS)
+            return len(df)
+
+    def compact(self) -> None:
+        """죽은 행을 버리고 각 파티션을 티커별로 연속된 구간 하나가 되도록 다시 쓴다.
+
+        새 세대 파일에 쓰고 색인을 교체하므로 읽기 중에 실행해도 된다.
+        """
+        with self._lock:
+            for market, year in list(self._load_indices(refresh=True)):
+                with self._partition_lock(market, year):
+                    self._compact_partition(market, year)
+
+    def _compact_partition(self, market: str, year: int) -> None:
+        pdir = self._pdir(market, year)
+        index = self._read_index(market, year)
+        cols = self._open_partition(market, year, index)
+        gen = index.get("gen", 0) + 1
+        new_index = {"rows": 0, "tickers": {}, "gen": gen}
+        order = []
+        for ticker, ranges in sorted(index["tickers"].items()):
+            start = new_index["rows"]
+            for lo, hi in ranges:
+                order.append(np.arange(lo, hi))
+                new_index["rows"] += hi - lo
+            new_index["tickers"][ticker] = [[start, new_index["rows"]]]
+        take = np.concatenate(order) if order else np.empty(0, dtype=np.int64)
+        names = list(cols)
+        for name in names:
+            path = os.path.join(pdir, _column_file(name, gen))
+            np.ascontiguousarray(cols.pop(name)[take]).tofile(path + ".tmp")
+            os.replace(path + ".tmp", path)
+        self._save_index(market, year, new_index)
+        # 직전 세대는 낡은 색인으로 읽는 중일 수 있어 남기고, 그 전 세대 파일만 지운다
+        if gen >= 2:
+            for name in names:
+                try:
+                    os.remove(os.path.join(pdir, _column_file(name, gen - 2)))
+                except FileNotFoundError:
+                    pass
+
+    # ---------- 읽기 ----------
+    def _open_partition(self, market: str, year: int, index: dict, columns: Iterable[str] = COLUMNS) -> dict:
+        rows = index["rows"]
+        out = {_TS_FILE: _open_column(self._path(market, year, index, _TS_FILE), "<i8", rows)}
+        for col in columns:
+            out[_FILES[col]] = _open_column(self._path(market, year, index, _FILES[col]), "<f8", rows)
+        return out
+
+    def read_arrays(
+        self,
+        ticker: str,
+        start=None,
+        end=None,
+        last_n: Optional[int] = None,
+        columns: Optional[list[str]] = None,
+    ) -> Optional[dict[str, np.ndarray]]:
+        """{'timestamp': int64 ns, 컬럼명: float64} 배열 dict. 구간이 하나면 memmap 뷰(무복사).
+
+        티커가 없으면 None, 있지만 조건에 맞는 행이 없으면 (last_n=0 포함) 빈 배열 dict (load_from_csv와 같음).
+        """
+        columns = list(columns) if columns is not None else COLUMNS
+        market = get_market_for_ticker(ticker)
+        lo_ns = pd.Timestamp(start).value if start is not None else None
+        hi_ns = pd.Timestamp(end).value if end is not None else None
+        pieces: list[dict[str, np.ndarray]] = []
+        with self._lock:
+            parts = self._partitions(ticker, start, end)
+        # last_n만 필요하면 최근 연도부터 읽고 충분해지면 멈춘다.
+        remaining = last_n
+        for year, index in reversed(parts):
+            cols = self._open_partition(market, year, index, columns)
+            for lo, hi in reversed(index["tickers"].get(ticker, [])):
+                ts = cols[_TS_FILE][lo:hi]
+                i = int(np.searchsorted(ts, lo_ns, "left")) if lo_ns is not None else 0
+                j = int(np.searchsorted(ts, hi_ns, "right")) if hi_ns is not None else len(ts)
+                if remaining is not None:
+                    i = max(i, j - remaining)
+                if j <= i:
+                    continue
+                piece = {"timestamp": ts[i:j]}
+                for col in columns:
+                    piece[col] = cols[_FILES[col]][lo + i:lo + j]
+                pieces.append(piece)
+                if remaining is not None:
+                    remaining -= j - i
+                    if remaining <= 0:
+                        break
+            if remaining is not None and remaining <= 0:
+                break
+        if not pieces:
+            if not parts and not self._partitions(ticker):
+                return None
+            empty = {"timestamp": np.empty(0, dtype="<i8")}
+            empty.update((col, np.empty(0, dtype="<f8")) for col in columns)
+            return empty
+        pieces.reverse()
+        if len(pieces) == 1:
+            return pieces[0]
+        return {key: np.concatenate([p[key] for p in pieces]) for key in pieces[0]}
+
+    def read(self, ticker: str, start=None, end=None, last_n=None, columns=None) -> Optional[pd.DataFrame]:
+        """load_from_csv와 같은 형태(Date 인덱스 DataFrame)로 반환. Volume도 float64."""
+        arrays = self.read_arrays(ticker, start, end, last_n, columns)
+        if arrays is None:
+            return None
+        index = pd.DatetimeIndex(arrays.pop("timestamp").astype("datetime64[ns]"), name="Date")
+        return pd.DataFrame(arrays, index=index)
+
+    def last_timestamp(self, ticker: str) -> Optional[pd.Timestamp]:
+        with self._lock:
+            parts = self._partitions(ticker)
+            if not parts:
+                return None
+            year, index = parts[-1]
+            ranges = index["tickers"][ticker]
+            path = self._path(get_market_for_ticker(ticker), year, index, _TS_FILE)
+            ts = _open_column(path, "<i8", index["rows"])
+            return pd.Timestamp(int(ts[ranges[-1][1] - 1]))
+
+    def read_panel(self, tickers: list[str], start=None, end=None, columns=None) -> pd.DataFrame:
+        """여러 티커를 파티션 단위로 한 번씩 열어 읽은 long 형태(Date, ticker, 컬럼...) DataFrame."""
+        columns = list(columns) if columns is not None else COLUMNS
+        lo_ns = pd.Timestamp(start).value if start is not None else None
+        hi_ns = pd.Timestamp(end).value if end is not None else None
+        lo_year, hi_year = _year_bounds(start, end)
+        wanted = set(tickers)
+        with self._lock:
+            indices = sorted(self._load_indices().items())
+        frames = []
+        for (market, year), index in indices:
+            if (lo_year is not None and year < lo_year) or (hi_year is not None and year > hi_year):
+                continue
+            hits = [(t, r) for t, r in index["tickers"].items() if t in wanted]
+            if not hits:
+                continue
+            cols = self._open_partition(market, year, index, columns)
+            ts_all = cols[_TS_FILE]
+            takes, labels = [], []
+            for ticker, ranges in hits:
+                for lo, hi in ranges:
+                    ts = ts_all[lo:hi]
+                    i = int(np.searchsorted(ts, lo_ns, "left")) if lo_ns is not None else 0
+                    j = int(np.searchsorted(ts, hi_ns, "right")) if hi_ns is not None else len(ts)
+                    if j > i:
+                        takes.append(np.arange(lo + i, lo + j))
+                        labels.append(np.full(j - i, ticker, dtype=object))
+            if not takes:
+                continue
+            take = np.concatenate(takes)
+            frame = {"Date": ts_all[take].astype("datetime64[ns]"), "ticker": np.concatenate(labels)}
+            for col in columns:
+                frame[col] = cols[_FILES[col]][take]
+            frames.append(pd.DataFrame(frame))
+        if not frames:
+            return pd.DataFrame(columns=["Date", "ticker"] + columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            indices = self._load_indices()
+            live = sum(hi - lo for idx in indices.values() for r in idx["tickers"].values() for lo, hi in r)
+            total = sum(idx["rows"] for idx in indices.values())
+            return {"partitions": len(indices), "rows": total, "live_rows": live, "tickers": len(self.tickers())}
+
+
+def migrate_csv(csv_dir: str, store: ColumnarStore) -> dict:
+    """csv_dir의 <ticker>.csv 파일을 모두 컬럼형 저장소로 옮긴다. CSV 파일은 그대로 둔다."""
+    migrated, failed = 0, []
+    names = sorted(f[:-4] for f in os.listdir(csv_dir) if f.endswith(".csv"))
+    for i, ticker in enumerate(names, 1):
+        try:
+            df = pd.read_csv(os.path.join(csv_dir, f"{ticker}.csv"), index_col=0)
+            # 과거 파일에 남은 UTC 오프셋은 버리고 현지 날짜/시각만 사용 (_normalize_ohlcv와 동일)
+            df.index = pd.to_datetime(df.index.astype(str).str.slice(0, 19), format="mixed")
+            store.write(ticker, df[COLUMNS])
+            migrated += 1
+        except Exception as e:
+            print(f"오류: '{ticker}' 마이그레이션 실패: {e}")
+            failed.append(ticker)
+        if i % 100 == 0:
+            print(f"마이그레이션 진행률: {i}/{len(names)}")
+    store.compact()
+    print(f"--- 컬럼형 저장소 마이그레이션 완료: {migrated}개 성공, {len(failed)}개 실패 ---")
+    return {"migrated": migrated, "failed": failed}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from . import data_handler
+
+    parser = argparse.ArgumentParser(description="컬럼형 OHLCV 저장소 관리")
+    parser.add_argument("--migrate", action="store_true", help="market_data/*.csv를 컬럼형 저장소로 변환")
+    parser.add_argument("--compact", action="store_true", help="죽은 행 정리")
+    args = parser.parse_args()
+
+    store = data_handler.get_columnar_store()
+    if args.migrate:
+        migrate_csv(data_handler.CSV_DIR, store)
+    if args.compact:
+        store.compact()
+    print(store.stats())
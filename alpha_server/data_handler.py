@@ -2,11 +2,19 @@ import yfinance as yf
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
+import io
+import numpy as np
 import os
-import socket
+import threading
 import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
 from dotenv import load_dotenv
 from .asset_screener import get_all_tickers
+from .circuit_breaker import CircuitBreaker
+from .columnar_store import ColumnarStore
+from .ilp_writer import ILPWriter
+from .ohlcv_cache import MISS, cache as ohlcv_cache
 
 # 환경 변수 로드
 load_dotenv()
@@ -23,32 +31,75 @@ TABLE_NAME = "stock_prices"
 CSV_DIR = os.path.join(os.path.dirname(__file__), "market_data")
 os.makedirs(CSV_DIR, exist_ok=True)
 
-# QuestDB 사용 가능 여부 확인
-USE_QUESTDB = False
+# QuestDB 미사용 시 파일 저장소: csv(티커별 CSV) 또는 columnar(CSV_DIR/columnar 아래 시장/연도 파티션)
+FILE_BACKEND = os.getenv("ALPHA_FILE_BACKEND", "csv").lower()
+_columnar_store = None
 
-def check_questdb_available():
-    """QuestDB 연결 가능 여부 확인"""
-    global USE_QUESTDB
+def get_columnar_store():
+    """CSV_DIR/columnar의 컬럼형 저장소 (CSV_DIR이 바뀌면 새로 엽니다)."""
+    global _columnar_store
+    root = os.path.join(CSV_DIR, "columnar")
+    if _columnar_store is None or _columnar_store.root != root:
+        _columnar_store = ColumnarStore(root)
+    return _columnar_store
+
+def _use_columnar():
+    return FILE_BACKEND == "columnar"
+
+# QuestDB 사용 여부: None이면 서킷 브레이커가 호출마다 결정, True/False면 강제 (테스트/벤치마크용)
+_forced = os.getenv("ALPHA_USE_QUESTDB")
+USE_QUESTDB = None if _forced is None else _forced.lower() in ("1", "true", "yes")
+DB_CONNECT_TIMEOUT = int(os.getenv("ALPHA_DB_CONNECT_TIMEOUT", "3"))
+
+# 연결 장애로 간주해 브레이커 실패로 집계할 예외
+_CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, OSError)
+
+def _probe_questdb():
+    conn = get_db_connection()
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            connect_timeout=3
-        )
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
         conn.close()
-        USE_QUESTDB = True
-        print("✅ QuestDB 연결 성공")
-        return True
-    except Exception as e:
-        USE_QUESTDB = False
-        print(f"⚠️  QuestDB 연결 실패, CSV 파일 모드로 전환: {e}")
-        return False
 
-# 초기 연결 확인
-check_questdb_available()
+questdb_breaker = CircuitBreaker(
+    "QuestDB",
+    probe=_probe_questdb,
+    failure_threshold=int(os.getenv("ALPHA_QDB_FAILURE_THRESHOLD", "3")),
+    probe_interval=float(os.getenv("ALPHA_QDB_PROBE_SEC", "10")),
+)
+
+def check_questdb_available():
+    """QuestDB 연결 가능 여부를 지금 바로 확인합니다 (동기 프로브, 결과는 브레이커 상태에 반영)."""
+    return questdb_breaker.probe_now()
+
+# 첫 프로브 결과를 기다리는 최대 시간 (연결 타임아웃 + 여유)
+FIRST_PROBE_WAIT_SEC = DB_CONNECT_TIMEOUT + 1
+
+def questdb_enabled(wait=FIRST_PROBE_WAIT_SEC):
+    """이번 호출을 QuestDB로 보낼지 결정합니다.
+
+    브레이커는 확인 전(open) 상태로 시작하므로, 아직 첫 프로브 결과가 없으면 최대 wait초 기다립니다.
+    기다리지 않으면 새 프로세스(학습 작업 프로세스, CLI, 배치 작업)의 첫 조회/쓰기가 QuestDB 대신 파일
+    저장소로 가서, QuestDB만 쓰는 배포에서는 티커가 빠지고 예전 CSV가 있으면 낡은 데이터로 학습합니다.
+    첫 프로브가 끝난 뒤에는 기다리지 않습니다 (서버는 기동 시 프로브를 시작하므로 요청 경로는 보통 대기 없음).
+    """
+    if USE_QUESTDB is not None:
+        return USE_QUESTDB
+    if wait:
+        questdb_breaker.wait_ready(wait)
+    return questdb_breaker.allow()
+
+@contextmanager
+def _questdb_call():
+    """QuestDB 호출 결과를 브레이커에 기록합니다."""
+    try:
+        yield
+    except _CONNECTION_ERRORS as e:
+        questdb_breaker.record_failure(e)
+        raise
+    else:
+        questdb_breaker.record_success()
 
 def get_db_connection():
     """QuestDB 연결을 반환합니다."""
@@ -57,222 +108,994 @@ def get_db_connection():
         port=DB_PORT,
         dbname=DB_NAME,
         user=DB_USER,
-        password=DB_PASSWORD
+        password=DB_PASSWORD,
+        connect_timeout=DB_CONNECT_TIMEOUT,
     )
 
-def download_ticker_data(ticker, period="5y", interval="1d"):
-    """지정된 티커의 과거 시세 데이터를 yfinance로부터 다운로드합니다."""
-    print(f"'{ticker}' 데이터 다운로드 중 (기간: {period}, 간격: {interval})...")
+class PoolExhausted(RuntimeError):
+    """풀의 모든 커넥션이 사용 중이라 acquire_timeout 안에 빌리지 못한 경우 (DB 장애가 아님)."""
+
+class QuestDBPool:
+    """PG-wire 읽기 경로용 스레드 안전 커넥션 풀.
+
+    - 최대 size개 커넥션을 재사용하며, 모두 사용 중이면 acquire_timeout초까지 대기합니다.
+    - 일정 시간(check_after초) 이상 쉬던 커넥션은 꺼낼 때 SELECT 1로 헬스 체크 후,
+      실패하면 버리고 새로 연결합니다.
+    - 사용 중 연결 오류(OperationalError/InterfaceError)가 나면 해당 커넥션은 폐기됩니다.
+    - 통계 카운터는 모두 _lock 안에서 갱신합니다 (연결/헬스 체크 자체는 잠금 밖에서).
+    """
+
+    def __init__(self, size=8, check_after=30.0, acquire_timeout=10.0, connect=None):
+        self.size = size
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+        self._connect = connect or get_db_connection
+        self._idle = []  # (conn, last_used)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.health_check_failures = 0
+
+    def _healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            return True
+        except Exception:
+            with self._lock:
+                self.health_check_failures += 1
+            return False
+
+    def _close_quietly(self, conn):
+        with self._lock:
+            self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolExhausted(f"QuestDB 커넥션 풀 대기 시간 초과 ({self.acquire_timeout}s)")
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    conn = self._connect()
+                    conn.autocommit = True
+                    with self._lock:
+                        self.created += 1
+                    return conn
+                conn, last_used = item
+                if self._healthy(conn, last_used):
+                    with self._lock:
+                        self.reused += 1
+                    return conn
+                self._close_quietly(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        try:
+            if broken or conn.closed:
+                self._close_quietly(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "health_check_failures": self.health_check_failures,
+            }
+
+db_pool = QuestDBPool(
+    size=int(os.getenv("ALPHA_DB_POOL_SIZE", "8")),
+    check_after=float(os.getenv("ALPHA_DB_POOL_CHECK_SEC", "30")),
+)
+
+def pooled_connection():
+    """풀에서 QuestDB 커넥션을 빌려주는 컨텍스트 매니저 (with pooled_connection() as conn)."""
+    return db_pool.connection()
+
+def _normalize_ohlcv(data):
+    """yfinance DataFrame을 단일 레벨 컬럼 + tz-naive 인덱스로 정리합니다."""
+    df = data
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = [col[0] if isinstance(col, tuple) else col for col in df.columns]
+    if getattr(df.index, "tz", None) is not None:
+        df = df.copy()
+        df.index = df.index.tz_convert("UTC").tz_localize(None)
+    return df
+
+def _invalidate_cache(ticker, data):
+    """쓰기 후 해당 티커의 OHLCV 캐시 항목을 새 마지막 봉 기준으로 무효화합니다."""
+    last_ts = data.index[-1] if data is not None and not data.empty else None
+    ohlcv_cache.invalidate(ticker, last_ts)
+
+def download_ticker_data(ticker, period="5y", interval="1d", start=None):
+    """지정된 티커의 과거 시세 데이터를 yfinance로부터 다운로드합니다.
+
+    start가 주어지면 period 대신 start 이후 구간만 요청합니다 (증분 업데이트용).
+    """
+    if start is not None:
+        print(f"'{ticker}' 데이터 다운로드 중 (시작: {start:%Y-%m-%d}, 간격: {interval})...")
+    else:
+        print(f"'{ticker}' 데이터 다운로드 중 (기간: {period}, 간격: {interval})...")
     try:
-        data = yf.download(ticker, period=period, interval=interval, auto_adjust=True, timeout=10)
+        if start is not None:
+            data = yf.download(ticker, start=start, interval=interval, auto_adjust=True, timeout=10)
+        else:
+            data = yf.download(ticker, period=period, interval=interval, auto_adjust=True, timeout=10)
         if data.empty:
             print(f"경고: '{ticker}'에 대한 데이터를 다운로드할 수 없습니다.")
             return None
-        return data
+        return _normalize_ohlcv(data)
     except Exception as e:
         print(f"오류: '{ticker}' 데이터 다운로드 중 예외 발생: {e}")
         return None
 
 def save_to_csv(ticker, data):
-    """DataFrame을 CSV 파일로 저장합니다."""
+    """DataFrame을 파일 저장소에 저장합니다 (ALPHA_FILE_BACKEND=columnar면 컬럼형 저장소, 기본 CSV)."""
     if data is None or data.empty:
         return
+    if _use_columnar():
+        rows = get_columnar_store().write(ticker, data)
+        _invalidate_cache(ticker, data)
+        print(f"성공: '{ticker}' 데이터 {rows}개 행을 컬럼형 저장소에 저장했습니다.")
+        return
     csv_path = os.path.join(CSV_DIR, f"{ticker}.csv")
     data.to_csv(csv_path)
+    _invalidate_cache(ticker, data)
     print(f"성공: '{ticker}' 데이터를 {csv_path}에 저장했습니다.")
 
-def load_from_csv(ticker):
-    """CSV 파일에서 데이터를 로드합니다."""
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def _validate_columns(columns):
+    """요청 컬럼을 검증하고 표준 순서의 리스트로 반환합니다."""
+    if columns is None:
+        return list(OHLCV_COLUMNS)
+    unknown = [c for c in columns if c not in OHLCV_COLUMNS]
+    if unknown:
+        raise ValueError(f"지원하지 않는 컬럼: {unknown} (가능: {OHLCV_COLUMNS})")
+    return [c for c in OHLCV_COLUMNS if c in columns]
+
+def _apply_window(df, start=None, end=None, last_n=None, columns=None):
+    """DataFrame에 기간/마지막 N행/컬럼 조건을 적용합니다."""
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df.index <= pd.Timestamp(end)]
+    if last_n is not None:
+        df = df.tail(max(int(last_n), 0))
+    if columns is not None:
+        df = df[[c for c in _validate_columns(columns) if c in df.columns]]
+    return df
+
+def _read_csv_tail(csv_path, n):
+    """파일 끝에서부터 블록 단위로 읽어 헤더 + 마지막 n행만 파싱합니다. n <= 0이면 빈 DataFrame."""
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        if n <= 0:
+            return pd.read_csv(io.BytesIO(header), index_col=0, parse_dates=True)
+        body_start = f.tell()
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        chunk = b""
+        block = 64 * 1024
+        while pos > body_start and chunk.count(b"\n") <= n:
+            step = min(block, pos - body_start)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + chunk
+    lines = [line for line in chunk.splitlines() if line.strip()]
+    if pos > body_start:
+        lines = lines[1:]  # 블록 경계에서 잘린 첫 줄 제거
+    payload = header + b"\n".join(lines[-n:]) + b"\n"
+    return pd.read_csv(io.BytesIO(payload), index_col=0, parse_dates=True)
+
+def load_from_csv(ticker, start=None, end=None, last_n=None, columns=None):
+    """CSV 파일에서 데이터를 로드합니다.
+
+    end 없이 last_n만 주어지면 파일 끝부분만 읽고, columns가 주어지면 해당 컬럼만 파싱합니다.
+    """
     csv_path = os.path.join(CSV_DIR, f"{ticker}.csv")
     if not os.path.exists(csv_path):
         return None
     try:
-        df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
-        return df
+        if last_n is not None and end is None:
+            df = _read_csv_tail(csv_path, int(last_n))
+        else:
+            usecols = None
+            if columns is not None:
+                wanted = set(_validate_columns(columns))
+                usecols = lambda c: c in wanted or c not in OHLCV_COLUMNS
+            df = pd.read_csv(csv_path, index_col=0, parse_dates=True, usecols=usecols)
+        return _apply_window(df, start, end, last_n, columns)
     except Exception as e:
         print(f"오류: CSV 파일 로드 실패: {e}")
         return None
 
-import socket
+def _csv_line_timestamp(line):
+    # 과거 파일에 남은 UTC 오프셋은 버리고 현지 날짜/시각만 비교 (_normalize_ohlcv와 동일)
+    return pd.Timestamp(line.split(b",", 1)[0].decode("utf-8")[:19])
+
+def _truncate_csv_from(csv_path, first_ts):
+    """CSV 끝에서부터 블록 단위로 읽어, 인덱스가 first_ts 이상인 꼬리 행들을 잘라냅니다."""
+    first_ts = pd.Timestamp(first_ts)
+    with open(csv_path, "r+b") as f:
+        f.readline()
+        body_start = f.tell()
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        pos, chunk, start = size, b"", 0
+        while pos > body_start:
+            step = min(64 * 1024, pos - body_start)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + chunk
+            # 블록 경계에서 잘린 첫 줄은 건너뛰고, 첫 온전한 줄이 first_ts 이전이면 더 읽을 필요 없음
+            start = 0 if pos == body_start else chunk.find(b"\n") + 1
+            first = chunk[start:].split(b"\n", 1)[0]
+            if start > 0 and first.strip() and _csv_line_timestamp(first) < first_ts:
+                break
+        cut = size
+        offset = pos + start
+        for line in chunk[start:].splitlines(keepends=True):
+            if line.strip() and _csv_line_timestamp(line) >= first_ts:
+                cut = offset
+                break
+            offset += len(line)
+        if cut < size:
+            f.truncate(cut)
+
+def append_to_csv(ticker, data):
+    """기존 CSV 파일 끝에 새 행을 추가합니다. 파일이 없거나 헤더가 다르면 전체를 다시 씁니다.
+
+    data 첫 봉 이후로 이미 저장된 행은 새 행으로 교체합니다 (증분 수집이 겹쳐 받은 마지막 봉).
+    컬럼형 저장소에서도 같은 구간을 잘라내고 파티션 끝에 이어 붙입니다.
+    """
+    if data is None or data.empty:
+        return
+    data = data.sort_index()
+    if _use_columnar():
+        rows = get_columnar_store().append(ticker, data, replace=True)
+        _invalidate_cache(ticker, data)
+        print(f"성공: '{ticker}' 데이터 {rows}개 행을 컬럼형 저장소에 추가했습니다.")
+        return
+    csv_path = os.path.join(CSV_DIR, f"{ticker}.csv")
+    header = None
+    if os.path.exists(csv_path):
+        with open(csv_path, "r", encoding="utf-8") as f:
+            header = f.readline().strip().split(",")
+    columns = header[1:] if header else []
+    if not columns or not set(columns).issubset(data.columns):
+        existing = load_from_csv(ticker)
+        if existing is not None:
+            data = pd.concat([existing, data])
+            data = data[~data.index.duplicated(keep="last")].sort_index()
+        save_to_csv(ticker, data)
+        return
+    _truncate_csv_from(csv_path, data.index[0])
+    data[columns].to_csv(csv_path, mode="a", header=False)
+    _invalidate_cache(ticker, data)
+    print(f"성공: '{ticker}' 데이터 {len(data)}개 행을 {csv_path}에 추가했습니다.")
 
-# ... (기존 임포트 유지)
+def _read_csv_last_timestamp(csv_path):
+    """CSV 파일의 마지막 줄만 읽어 마지막 인덱스(타임스탬프)를 반환합니다."""
+    try:
+        with open(csv_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            lines = [line for line in f.read().splitlines() if line.strip()]
+        last = lines[-1].decode("utf-8").split(",", 1)[0]
+        return pd.Timestamp(last)
+    except (OSError, ValueError, IndexError):
+        return None
 
 # QuestDB ILP Port
 ILP_PORT = 9009
 
 # ... (중략) ...
 
-def insert_data_to_db(conn, ticker, data):
-    """DataFrame을 QuestDB에 삽입합니다 (ILP 프로토콜 사용). 벡터화 최적화 완료."""
+# --- QuestDB 스키마 관리 ---
+# ticker는 인덱스된 SYMBOL, 월 단위 파티션 + WAL, (timestamp, ticker) 중복은 업서트로 덮어씀
+SCHEMA_PARTITION_BY = "MONTH"
+SCHEMA_DEDUP_KEYS = ("timestamp", "ticker")
+
+def _create_table_sql(name):
+    return (
+        f"CREATE TABLE IF NOT EXISTS {name} ("
+        "timestamp TIMESTAMP, "
+        "ticker SYMBOL CAPACITY 16384 CACHE INDEX, "
+        "open DOUBLE, high DOUBLE, low DOUBLE, close DOUBLE, volume LONG"
+        f") TIMESTAMP(timestamp) PARTITION BY {SCHEMA_PARTITION_BY} WAL "
+        f"DEDUP UPSERT KEYS({', '.join(SCHEMA_DEDUP_KEYS)})"
+    )
+
+def _fetch_dicts(cursor, query):
+    cursor.execute(query)
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+def _describe_table(cursor, name):
+    """tables()/table_columns() 메타데이터. 테이블이 없으면 None."""
+    tables = _fetch_dicts(cursor, "SELECT * FROM tables()")
+    # QuestDB 버전에 따라 테이블 이름 컬럼이 table_name 또는 name
+    info = next((t for t in tables if t.get("table_name", t.get("name")) == name), None)
+    if info is None:
+        return None
+    columns = {c["column"]: c for c in _fetch_dicts(cursor, f"SELECT * FROM table_columns('{name}')")}
+    return info, columns
+
+def plan_schema_changes(info, columns):
+    """현재 테이블 메타데이터를 목표 스키마와 비교합니다.
+
+    반환: (제자리에서 적용할 ALTER 문 목록, 테이블 재생성이 필요한 사유 목록)
+    """
+    rebuild = []
+    ticker = columns.get("ticker", {})
+    if info.get("designatedTimestamp") != "timestamp":
+        rebuild.append("designated timestamp 없음")
+    if str(info.get("partitionBy", "")).upper() != SCHEMA_PARTITION_BY:
+        rebuild.append(f"PARTITION BY {info.get('partitionBy')}")
+    if not info.get("walEnabled"):
+        rebuild.append("WAL 비활성")
+    if str(ticker.get("type", "")).upper() != "SYMBOL":
+        rebuild.append(f"ticker 타입 {ticker.get('type')}")
+    if rebuild:
+        return [], rebuild
+
+    alters = []
+    if not ticker.get("indexed"):
+        alters.append(f"ALTER TABLE {TABLE_NAME} ALTER COLUMN ticker ADD INDEX")
+    upsert = {name for name, col in columns.items() if col.get("upsertKey")}
+    if not info.get("dedup") or upsert != set(SCHEMA_DEDUP_KEYS):
+        alters.append(f"ALTER TABLE {TABLE_NAME} DEDUP ENABLE UPSERT KEYS({', '.join(SCHEMA_DEDUP_KEYS)})")
+    return alters, []
+
+def _rebuild_table(cursor):
+    """목표 스키마로 새 테이블을 만들어 기존 행을 복사한 뒤 이름을 맞바꿉니다.
+
+    dedup 테이블로 복사되므로 기존 중복 행은 (timestamp, ticker)당 하나로 합쳐집니다.
+    기존 테이블은 {TABLE_NAME}_pre_v2로 남겨 두며, 확인 후 직접 DROP 합니다.
+    수집 작업을 멈춘 상태에서 실행해야 합니다 (도중의 ILP 쓰기는 이전 테이블로 갈 수 있음).
+    """
+    staging, backup = f"{TABLE_NAME}_v2", f"{TABLE_NAME}_pre_v2"
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(_create_table_sql(staging))
+    cursor.execute(
+        f"INSERT INTO {staging} SELECT timestamp, ticker, open, high, low, close, volume FROM {TABLE_NAME}"
+    )
+    cursor.execute(f"RENAME TABLE {TABLE_NAME} TO {backup}")
+    cursor.execute(f"RENAME TABLE {staging} TO {TABLE_NAME}")
+    print(f"성공: '{TABLE_NAME}' 테이블을 새 스키마로 재생성했습니다. 이전 테이블은 '{backup}'에 남아 있습니다.")
+
+_schema_ready = False
+_schema_dedup = False  # 테이블에 DEDUP UPSERT KEYS가 적용되어 있는지 (ILP 재전송 안전 여부)
+_schema_lock = threading.Lock()
+
+def ensure_schema(conn=None, migrate=False):
+    """stock_prices 테이블을 목표 스키마로 맞춥니다.
+
+    - 테이블이 없으면 생성합니다.
+    - 인덱스/DEDUP처럼 제자리 변경이 가능한 항목은 ALTER로 적용합니다.
+    - 파티션 단위, WAL, 타입 등 재생성이 필요한 차이는 migrate=True일 때만 데이터를 옮겨 재생성하고,
+      아니면 경고만 출력합니다 (python -m alpha_server.data_handler --migrate-schema).
+    성공하면 True를 반환합니다. DEDUP 적용 여부는 schema_has_dedup()으로 확인합니다.
+    """
+    global _schema_ready, _schema_dedup
+    with _schema_lock:
+        if _schema_ready and not migrate:
+            return True
+        try:
+            with _questdb_call(), (nullcontext(conn) if conn is not None else pooled_connection()) as c:
+                with c.cursor() as cursor:
+                    described = _describe_table(cursor, TABLE_NAME)
+                    if described is None:
+                        cursor.execute(_create_table_sql(TABLE_NAME))
+                        print(f"성공: '{TABLE_NAME}' 테이블을 생성했습니다.")
+                        dedup = True
+                    else:
+                        alters, rebuild = plan_schema_changes(*described)
+                        dedup = not any(" DEDUP " in a for a in alters)
+                        if rebuild and migrate:
+                            _rebuild_table(cursor)
+                            dedup = True
+                        elif rebuild:
+                            print(
+                                f"경고: '{TABLE_NAME}' 스키마가 목표와 다릅니다 ({', '.join(rebuild)}). "
+                                "수집을 멈추고 'python -m alpha_server.data_handler --migrate-schema'를 실행하세요."
+                            )
+                        for statement in alters:
+                            try:
+                                cursor.execute(statement)
+                                print(f"스키마 변경 적용: {statement}")
+                                dedup = dedup or " DEDUP " in statement
+                            except psycopg2.OperationalError:
+                                raise
+                            except psycopg2.Error as e:
+                                # 구버전 QuestDB 등에서 지원하지 않는 변경은 건너뜀 (매 쓰기마다 재시도하지 않도록)
+                                print(f"경고: 스키마 변경 실패 ({statement}): {e}")
+            _schema_ready = True
+            _schema_dedup = dedup
+            return True
+        except Exception as e:
+            print(f"경고: QuestDB 스키마 확인 실패: {e}")
+            return False
+
+def schema_has_dedup():
+    """ensure_schema가 확인한 테이블에 (timestamp, ticker) DEDUP이 켜져 있는지."""
+    return _schema_dedup
+
+_ilp_writer = None
+_ilp_lock = threading.Lock()
+
+def get_ilp_writer():
+    """프로세스 전역 ILP 전송기 (연결은 첫 전송 시 열고 이후 재사용, 멈춘 버퍼는 타이머로 전송)."""
+    global _ilp_writer
+    with _ilp_lock:
+        if _ilp_writer is None:
+            _ilp_writer = ILPWriter(
+                DB_HOST, ILP_PORT, TABLE_NAME,
+                on_flush=lambda ticker, last_ts: ohlcv_cache.invalidate(ticker, last_ts),
+                # 재전송은 DEDUP 테이블에서만 중복 없이 안전하다
+                can_resend=schema_has_dedup,
+            )
+        return _ilp_writer
+
+def flush_ilp():
+    """버퍼에 남은 ILP 라인을 전송합니다 (수집 작업이 끝날 때 호출)."""
+    if _ilp_writer is not None:
+        with _questdb_call():
+            _ilp_writer.flush()
+
+def take_lost_ilp_tickers():
+    """전송 실패로 ILP 버퍼와 함께 버려진 티커들 (마지막 호출 이후, 타이머 전송 실패 포함)."""
+    return _ilp_writer.take_lost() if _ilp_writer is not None else set()
+
+def ilp_stats():
+    """ILP 전송 처리량 통계 (아직 쓰기가 없었으면 None)."""
+    return _ilp_writer.stats() if _ilp_writer is not None else None
+
+def insert_data_to_db(conn, ticker, data, flush=True):
+    """DataFrame을 QuestDB에 삽입합니다 (ILP 프로토콜 사용).
+
+    공용 ILPWriter 버퍼에 컬럼 단위로 인코딩해 쌓고, flush=True면 바로 전송합니다.
+    여러 티커를 연달아 쓰는 경우 flush=False로 쌓은 뒤 마지막에 flush_ilp()를 호출합니다.
+    캐시 무효화는 실제 전송 후 ILPWriter의 on_flush에서 이뤄집니다.
+    전송 실패는 기록 후 다시 올립니다 (호출자가 실패로 집계하도록). flush=False로 쌓아둔 행이
+    나중 전송에서 버려진 티커는 take_lost_ilp_tickers()로 확인합니다.
+    """
     if data is None or data.empty:
         return
-        
+
     try:
-        # yfinance DataFrame 정리
-        df = data.copy()
+        df = data
         # MultiIndex 컬럼 정리
         if isinstance(df.columns, pd.MultiIndex):
+            df = df.copy()
             df.columns = [col[0] if isinstance(col, tuple) else col for col in df.columns]
         
-        # ILP 전송을 위한 소켓 연결
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((DB_HOST, ILP_PORT))
-        
-        # 타임스탬프: 나노초 단위 정수
-        ts_ns = df.index.astype('int64').values
-        
-        # 결측치 처리 (0으로 대체)
-        df_filled = df.fillna(0)
-        
-        open_val = df_filled['Open'].values
-        high_val = df_filled['High'].values
-        low_val = df_filled['Low'].values
-        close_val = df_filled['Close'].values
-        volume_val = df_filled['Volume'].astype(int).values
-        
-        # 리스트 컴프리헨션으로 문자열 생성 (iterrows보다 압도적으로 빠름)
-        lines = [
-            f"{TABLE_NAME},ticker={ticker} open={o},high={h},low={l},close={c},volume={v}i {t}"
-            for o, h, l, c, v, t in zip(open_val, high_val, low_val, close_val, volume_val, ts_ns)
-        ]
-        
-        # 배치 전송
-        BATCH_SIZE = 5000
-        for i in range(0, len(lines), BATCH_SIZE):
-            payload = "\n".join(lines[i:i+BATCH_SIZE]) + "\n"
-            sock.sendall(payload.encode('utf-8'))
-            
-        sock.close()
+        ensure_schema()
+        writer = get_ilp_writer()
+        with _questdb_call():
+            writer.write(ticker, df)
+            if flush:
+                writer.flush()
         
     except Exception as e:
         print(f"오류: '{ticker}' ILP 데이터 삽입 중 예외 발생: {e}")
-        import traceback
-        traceback.print_exc()
+        raise
+
+def _load_from_file(ticker, start=None, end=None, last_n=None, columns=None):
+    """파일 저장소(컬럼형 또는 CSV)에서 조회합니다."""
+    if _use_columnar():
+        return get_columnar_store().read(ticker, start=start, end=end, last_n=last_n, columns=columns)
+    return load_from_csv(ticker, start=start, end=end, last_n=last_n, columns=columns)
+
+def load_data(ticker, conn=None, start=None, end=None, last_n=None, columns=None):
+    """QuestDB 또는 CSV에서 특정 티커의 데이터를 조회하여 DataFrame으로 반환합니다.
 
-def load_data(ticker, conn=None):
-    """QuestDB 또는 CSV에서 특정 티커의 데이터를 조회하여 DataFrame으로 반환합니다."""
-    if USE_QUESTDB:
-        return load_data_from_questdb(ticker, conn=conn)
+    start/end: 포함 구간의 타임스탬프 경계, last_n: 조건을 만족하는 마지막 N행만,
+    columns: 'Open'/'High'/'Low'/'Close'/'Volume' 중 필요한 컬럼만.
+    조건은 저장소 쪽(SQL 또는 파일 읽기)에서 적용되므로 필요한 구간만 읽습니다.
+    결과는 프로세스 전역 OHLCV 캐시(ohlcv_cache)를 거치며, 쓰기 경로에서 무효화됩니다.
+    QuestDB 사용 여부는 호출마다 서킷 브레이커가 정하며, 연결 장애 시 파일 저장소로 폴백합니다.
+    """
+    if columns is not None:
+        _validate_columns(columns)
+    use_db = questdb_enabled()
+    query = (
+        str(pd.Timestamp(start)) if start is not None else None,
+        str(pd.Timestamp(end)) if end is not None else None,
+        int(last_n) if last_n is not None else None,
+        tuple(columns) if columns is not None else None,
+        # 폴백 중 파일에서 읽은 결과가 QuestDB 복구 후에 재사용되지 않도록 출처를 키에 포함
+        "questdb" if use_db else "file",
+    )
+    cached = ohlcv_cache.get(ticker, query)
+    if cached is not MISS:
+        return cached
+
+    version = ohlcv_cache.version(ticker)
+    if use_db:
+        try:
+            with _questdb_call():
+                df = load_data_from_questdb(
+                    ticker, conn=conn, start=start, end=end, last_n=last_n, columns=columns, raise_errors=True
+                )
+        except _CONNECTION_ERRORS as e:
+            # 연결 장애: 이번 호출만 파일 저장소로 폴백하고 캐시하지 않는다
+            print(f"경고: QuestDB 조회 실패, 파일 저장소로 폴백: {e}")
+            return _load_from_file(ticker, start=start, end=end, last_n=last_n, columns=columns)
+        except Exception as e:
+            # 조회 실패는 캐시하지 않는다 (일시 장애가 TTL 동안 고정되지 않도록)
+            print(f"오류: DB 조회 중 예외 발생: {e}")
+            return None
     else:
-        return load_from_csv(ticker)
+        df = _load_from_file(ticker, start=start, end=end, last_n=last_n, columns=columns)
+    ohlcv_cache.put(ticker, query, df, version=version)
+    return df
+
+def _build_select(ticker, start=None, end=None, last_n=None, columns=None):
+    """load_data 조건을 QuestDB SELECT 문과 파라미터로 변환합니다."""
+    cols = _validate_columns(columns)
+    query = f"SELECT timestamp, {', '.join(c.lower() for c in cols)} FROM {TABLE_NAME} WHERE ticker = %s"
+    params = [ticker]
+    if start is not None:
+        query += " AND timestamp >= %s"
+        params.append(pd.Timestamp(start).to_pydatetime())
+    if end is not None:
+        query += " AND timestamp <= %s"
+        params.append(pd.Timestamp(end).to_pydatetime())
+    query += " ORDER BY timestamp"
+    if last_n is not None:
+        # QuestDB의 음수 LIMIT은 정렬 결과의 마지막 N행을 반환합니다.
+        query += f" LIMIT -{int(last_n)}"
+    return query, params, cols
 
-def load_data_from_questdb(ticker, conn=None):
-    """QuestDB에서 특정 티커의 데이터를 조회하여 DataFrame으로 반환합니다."""
+def load_data_from_questdb(ticker, conn=None, start=None, end=None, last_n=None, columns=None, raise_errors=False):
+    """QuestDB에서 특정 티커의 데이터를 조회하여 DataFrame으로 반환합니다.
+
+    raise_errors=True면 조회 오류를 None으로 삼키지 않고 호출자에게 전달합니다.
+    """
     # print(f"DB에서 '{ticker}' 데이터 조회 중...")
     try:
-        close_conn = False
-        if conn is None:
-            conn = get_db_connection()
-            close_conn = True
-            
         # Use parameterized query to prevent SQL injection
-        query = "SELECT timestamp, open, high, low, close, volume FROM stock_prices WHERE ticker = %s ORDER BY timestamp"
-        
-        with conn.cursor() as cursor:
-            cursor.execute(query, (ticker,))
-            rows = cursor.fetchall()
+        query, params, cols = _build_select(ticker, start, end, last_n, columns)
         
-        if close_conn:
-            conn.close()
+        if conn is None:
+            with pooled_connection() as pooled:
+                with pooled.cursor() as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
             
         if not rows:
             print(f"경고: DB에 '{ticker}' 데이터가 없습니다.")
             return None
             
         # DataFrame으로 변환 (yfinance 형식과 동일하게)
-        df = pd.DataFrame(rows, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        df = pd.DataFrame(rows, columns=['Date'] + cols)
         df.set_index('Date', inplace=True)
         df.index.name = 'Date'
         # print(f"성공: '{ticker}' 데이터 {len(df)}개 행 조회 완료.")
         return df
 
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"오류: DB 조회 중 예외 발생: {e}")
         import traceback
         traceback.print_exc()
         return None
 
+# --- 다종목 패널 조회 ---
+# WHERE ticker IN (...) 한 쿼리에 넣을 최대 티커 수
+PANEL_CHUNK_SIZE = int(os.getenv("ALPHA_PANEL_CHUNK", "500"))
+
+# layout="wide" 결과: dates(DatetimeIndex) × tickers(list) 격자, values는 필드별 2차원 float64 배열
+OHLCVPanel = namedtuple("OHLCVPanel", ["dates", "tickers", "values"])
+
+def _build_panel_select(tickers, start=None, end=None, columns=None):
+    """여러 티커를 한 번에 읽는 QuestDB SELECT 문과 파라미터를 만듭니다."""
+    cols = _validate_columns(columns)
+    placeholders = ", ".join(["%s"] * len(tickers))
+    query = (
+        f"SELECT timestamp, ticker, {', '.join(c.lower() for c in cols)} "
+        f"FROM {TABLE_NAME} WHERE ticker IN ({placeholders})"
+    )
+    params = list(tickers)
+    if start is not None:
+        query += " AND timestamp >= %s"
+        params.append(pd.Timestamp(start).to_pydatetime())
+    if end is not None:
+        query += " AND timestamp <= %s"
+        params.append(pd.Timestamp(end).to_pydatetime())
+    return query + " ORDER BY timestamp", params, cols
+
+def _load_panel_from_questdb(tickers, start, end, cols, conn=None):
+    frames = []
+    for i in range(0, len(tickers), PANEL_CHUNK_SIZE):
+        query, params, _ = _build_panel_select(tickers[i:i + PANEL_CHUNK_SIZE], start, end, cols)
+        if conn is None:
+            with pooled_connection() as pooled, pooled.cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        if rows:
+            frames.append(pd.DataFrame(rows, columns=['Date', 'ticker'] + cols))
+    if not frames:
+        return pd.DataFrame(columns=['Date', 'ticker'] + cols)
+    return pd.concat(frames, ignore_index=True)
+
+def _load_panel_from_csv(tickers, start, end, cols):
+    frames = []
+    for ticker in tickers:
+        df = load_from_csv(ticker, start=start, end=end, columns=cols)
+        if df is None or df.empty:
+            continue
+        df = df.reset_index()
+        df.columns = ['Date'] + cols
+        df.insert(1, 'ticker', ticker)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=['Date', 'ticker'] + cols)
+    return pd.concat(frames, ignore_index=True)
+
+def load_panel(tickers, start=None, end=None, fields=None, layout="long", conn=None):
+    """여러 티커의 OHLCV를 한 번에 조회합니다.
+
+    QuestDB에서는 PANEL_CHUNK_SIZE개씩 WHERE ticker IN (...) 쿼리로, 컬럼형 저장소에서는 파티션별
+    memmap 한 번씩, CSV에서는 티커별 파일을 읽은 뒤 한 번에 이어 붙입니다. (티커 단위 캐시는 거치지 않습니다.)
+
+    layout="long": Date 인덱스 + 범주형 'ticker' 컬럼 + fields 컬럼의 DataFrame (ticker, Date 순 정렬).
+        티커별 DataFrame이 필요하면 split_panel()을 사용합니다. (bars는 split_bars())
+    layout="wide": OHLCVPanel(dates, tickers, values). values[field]는 (날짜 × 티커) float64 배열이며
+        해당 날짜에 봉이 없는 칸은 NaN입니다. tickers 순서는 입력 순서를 따릅니다.
+    layout="bars": OHLCVPanel(dates, tickers, values). 날짜로 맞추지 않고 티커마다 자기 봉을 위에서부터
+        채운 (봉 × 티커) 배열입니다. dates도 같은 모양의 datetime64 배열이며 남는 칸은 NaT/NaN입니다.
+        시장마다 휴장일이 달라도 열 하나가 곧 그 티커의 시계열이므로 패널 단위 지표 계산에 씁니다.
+    """
+    if layout not in ("long", "wide", "bars"):
+        raise ValueError(f"지원하지 않는 layout: {layout} (long, wide 또는 bars)")
+    tickers = list(dict.fromkeys(tickers))
+    cols = _validate_columns(fields)
+
+    raw = None
+    if tickers and questdb_enabled():
+        try:
+            with _questdb_call():
+                raw = _load_panel_from_questdb(tickers, start, end, cols, conn=conn)
+        except _CONNECTION_ERRORS as e:
+            print(f"경고: QuestDB 패널 조회 실패, 파일 저장소로 폴백: {e}")
+        except Exception as e:
+            print(f"오류: 패널 조회 중 예외 발생: {e}")
+            raw = pd.DataFrame(columns=['Date', 'ticker'] + cols)
+    if raw is None:
+        if _use_columnar():
+            raw = get_columnar_store().read_panel(tickers, start, end, cols)
+        else:
+            raw = _load_panel_from_csv(tickers, start, end, cols)
+
+    raw['Date'] = pd.to_datetime(raw['Date'])
+    raw['ticker'] = pd.Categorical(raw['ticker'], categories=tickers)
+
+    if layout == "wide":
+        dates = pd.DatetimeIndex(raw['Date'].unique()).sort_values()
+        rows = dates.get_indexer(raw['Date'])
+        columns = raw['ticker'].cat.codes.to_numpy()
+        values = {}
+        for col in cols:
+            block = np.full((len(dates), len(tickers)), np.nan)
+            block[rows, columns] = raw[col].to_numpy(dtype=float)
+            values[col] = block
+        return OHLCVPanel(dates=dates, tickers=tickers, values=values)
+
+    if layout == "bars":
+        raw = raw.sort_values(['ticker', 'Date'], kind='stable')
+        columns = raw['ticker'].cat.codes.to_numpy()
+        counts = np.bincount(columns, minlength=len(tickers))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rows = np.arange(len(raw)) - starts[columns]
+        shape = (int(counts.max(initial=0)), len(tickers))
+        dates = np.full(shape, np.datetime64('NaT'), dtype='datetime64[ns]')
+        dates[rows, columns] = raw['Date'].to_numpy(dtype='datetime64[ns]')
+        values = {}
+        for col in cols:
+            block = np.full(shape, np.nan)
+            block[rows, columns] = raw[col].to_numpy(dtype=float)
+            values[col] = block
+        return OHLCVPanel(dates=dates, tickers=tickers, values=values)
+
+    long = raw.sort_values(['ticker', 'Date'], kind='stable').set_index('Date')
+    return long
+
+def split_panel(long):
+    """long 패널을 {ticker: load_data와 같은 형태의 DataFrame}으로 나눕니다."""
+    out = {}
+    for ticker, group in long.groupby('ticker', observed=True, sort=False):
+        out[ticker] = group.drop(columns='ticker')
+    return out
+
+def split_bars(panel, fields=None):
+    """bars 패널을 {ticker: load_data와 같은 형태의 DataFrame}으로 나눕니다 (봉이 없는 티커는 제외).
+
+    패널 배열의 열을 잘라 만드므로 같은 패널로 지표 계산(predict_global_batch 등)과 티커별 처리를
+    함께 할 때 OHLCV를 다시 조회하지 않습니다. fields를 주면 그 컬럼만 담습니다.
+    """
+    cols = list(fields or panel.values)
+    n_bars = (~np.isnat(panel.dates)).sum(axis=0) if panel.dates.size else np.zeros(len(panel.tickers), dtype=int)
+    out = {}
+    for j, ticker in enumerate(panel.tickers):
+        n = int(n_bars[j])
+        if n:
+            out[ticker] = pd.DataFrame(
+                {c: panel.values[c][:n, j] for c in cols},
+                index=pd.DatetimeIndex(panel.dates[:n, j], name='Date'),
+            )
+    return out
+
 def bulk_insert_data_to_db(ticker_data_dict):
-    """여러 티커의 데이터를 단일 소켓 연결로 QuestDB에 벌크 삽입합니다."""
+    """여러 티커의 데이터를 공용 ILP 연결로 QuestDB에 벌크 삽입합니다.
+
+    티커별로 버퍼에 인코딩하며 크기 임계값마다 전송하므로 전체 라인을 메모리에 모아두지 않습니다.
+    전송 실패는 기록 후 다시 올립니다.
+    """
     if not ticker_data_dict:
         return
         
     try:
-        # 단일 소켓 연결
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((DB_HOST, ILP_PORT))
-        
-        all_lines = []
+        ensure_schema()
+        writer = get_ilp_writer()
         for ticker, data in ticker_data_dict.items():
             if data is None or data.empty:
                 continue
-                
-            df = data.copy()
+            df = data
             if isinstance(df.columns, pd.MultiIndex):
+                df = df.copy()
                 df.columns = [col[0] if isinstance(col, tuple) else col for col in df.columns]
-                
-            ts_ns = df.index.astype('int64').values
-            df_filled = df.fillna(0)
-            
-            open_val = df_filled['Open'].values
-            high_val = df_filled['High'].values
-            low_val = df_filled['Low'].values
-            close_val = df_filled['Close'].values
-            volume_val = df_filled['Volume'].astype(int).values
-            
-            lines = [
-                f"{TABLE_NAME},ticker={ticker} open={o},high={h},low={l},close={c},volume={v}i {t}"
-                for o, h, l, c, v, t in zip(open_val, high_val, low_val, close_val, volume_val, ts_ns)
-            ]
-            all_lines.extend(lines)
-            
-        # 배치 전송
-        BATCH_SIZE = 10000
-        for i in range(0, len(all_lines), BATCH_SIZE):
-            payload = "\n".join(all_lines[i:i+BATCH_SIZE]) + "\n"
-            sock.sendall(payload.encode('utf-8'))
-            
-        sock.close()
-        # print(f"벌크 삽입 완료: 총 {len(all_lines)} 행")
+            writer.write(ticker, df)
+        writer.flush()
         
     except Exception as e:
         print(f"오류: 벌크 삽입 중 예외 발생: {e}")
-        import traceback
-        traceback.print_exc()
+        raise
+
+def _fetch_watermark_rows(query, conn=None):
+    if conn is None:
+        with pooled_connection() as pooled, pooled.cursor() as cursor:
+            cursor.execute(query)
+            return cursor.fetchall()
+    with conn.cursor() as cursor:
+        cursor.execute(query)
+        return cursor.fetchall()
+
+def get_last_timestamps(tickers=None, conn=None):
+    """티커별로 마지막으로 저장된 봉의 타임스탬프(워터마크)를 반환합니다.
+
+    QuestDB에서는 GROUP BY 쿼리 한 번으로, 컬럼형 저장소에서는 색인의 마지막 행으로,
+    CSV 모드에서는 각 파일의 마지막 줄만 읽어서 조회합니다.
+    저장된 데이터가 없는 티커는 결과에 포함되지 않습니다.
+    """
+    watermarks = {}
+    if conn is not None or questdb_enabled():
+        query = f"SELECT ticker, max(timestamp) FROM {TABLE_NAME} GROUP BY ticker"
+        try:
+            with _questdb_call():
+                rows = _fetch_watermark_rows(query, conn)
+            watermarks = {t: pd.Timestamp(ts) for t, ts in rows if ts is not None}
+        except Exception as e:
+            print(f"경고: 워터마크 조회 실패 (전체 다운로드로 진행): {e}")
+    elif _use_columnar():
+        store = get_columnar_store()
+        for ticker in (tickers if tickers is not None else store.tickers()):
+            ts = store.last_timestamp(ticker)
+            if ts is not None:
+                watermarks[ticker] = ts
+    else:
+        names = tickers if tickers is not None else [
+            f[:-4] for f in os.listdir(CSV_DIR) if f.endswith(".csv")
+        ]
+        for ticker in names:
+            csv_path = os.path.join(CSV_DIR, f"{ticker}.csv")
+            if not os.path.exists(csv_path):
+                continue
+            ts = _read_csv_last_timestamp(csv_path)
+            if ts is not None:
+                watermarks[ticker] = ts
+    if tickers is not None:
+        wanted = set(tickers)
+        watermarks = {t: ts for t, ts in watermarks.items() if t in wanted}
+    return watermarks
+
+# 증분 수집은 워터마크(마지막 저장 봉)를 포함해 그 앞 며칠을 겹쳐 받는다.
+# 마지막 봉은 장중에 저장된 미완성 봉일 수 있어 새 값으로 교체하고, 그 이전의 완성된 봉은
+# 저장된 종가와 비교해 분할/배당 보정(auto_adjust)으로 과거 가격이 다시 계산됐는지 확인한다.
+INCREMENTAL_OVERLAP_DAYS = int(os.getenv("ALPHA_INCREMENTAL_OVERLAP_DAYS", "7"))
+RESYNC_TOLERANCE = float(os.getenv("ALPHA_RESYNC_TOLERANCE", "0.0005"))
+
+def incremental_start(last_ts):
+    """증분 다운로드 시작일 (워터마크 날짜에서 INCREMENTAL_OVERLAP_DAYS일 전, 워터마크 포함)."""
+    return (pd.Timestamp(last_ts) - pd.Timedelta(days=INCREMENTAL_OVERLAP_DAYS)).normalize()
+
+def reconcile_overlap(ticker, data, last_ts, conn=None):
+    """겹쳐 받은 data를 저장된 봉과 비교해 (상태, 저장할 DataFrame)을 반환합니다.
+
+    - 'resync': 워터마크 이전 완성 봉의 종가가 RESYNC_TOLERANCE(상대오차)보다 달라짐 → 전체 재수집 필요
+    - 'unchanged': 워터마크 이후 새 봉이 없고 마지막 봉도 그대로 → 쓸 것 없음
+    - 'update': 워터마크 봉부터의 행 (마지막 봉은 저장소에서 교체/upsert됨)
+    DEDUP이 없는 QuestDB 테이블은 upsert가 안 되므로 워터마크 이후 행만 돌려줍니다.
+    """
+    last_ts = pd.Timestamp(last_ts)
+    data = data.sort_index()
+    stored = load_data(ticker, conn=conn, start=data.index[0], end=last_ts)
+    if stored is not None and not stored.empty:
+        done = stored["Close"][stored.index < last_ts]
+        fresh = data["Close"].reindex(done.index)
+        both = fresh.notna() & done.notna()
+        drift = (fresh[both] - done[both]).abs() > RESYNC_TOLERANCE * done[both].abs()
+        if drift.any():
+            print(f"경고: '{ticker}' 과거 종가가 바뀌었습니다 ({int(drift.sum())}개 봉, 분할/배당 보정 추정). 전체 재수집합니다.")
+            return "resync", None
+    rows = data[data.index >= last_ts]
+    if current_store(conn) == "questdb" and not (ensure_schema() and schema_has_dedup()):
+        rows = rows[rows.index > last_ts]
+    newer = rows[rows.index > last_ts]
+    if newer.empty:
+        if rows.empty or stored is None or last_ts not in stored.index:
+            return "unchanged", rows.iloc[:0]
+        old = stored.loc[[last_ts], OHLCV_COLUMNS].to_numpy(dtype=float)
+        new = rows.loc[[last_ts], OHLCV_COLUMNS].to_numpy(dtype=float)
+        if np.allclose(old, new, rtol=1e-9, atol=0, equal_nan=True):
+            return "unchanged", rows.iloc[:0]
+    return "update", rows
 
-def update_all_data():
-    """스크리너로 얻은 모든 자산의 데이터를 다운로드하고 QuestDB 또는 CSV에 저장합니다."""
-    global USE_QUESTDB
-    print("--- 모든 자산 데이터 업데이트 시작 ---")
+def update_ticker_data(ticker, last_ts=None, full_resync=False, conn=None, period="2y"):
+    """한 티커에 대해 워터마크 봉부터 겹쳐 내려받아 저장합니다 (마지막 봉은 교체).
+
+    last_ts가 없거나 full_resync=True면 period 전체를 다시 받습니다. 겹친 구간의 과거 종가가
+    저장된 값과 다르면(reconcile_overlap) 그 티커만 전체 재수집으로 바꿉니다.
+    저장된 행 수를 반환합니다 (새 데이터가 없으면 0).
+    """
+    incremental = last_ts is not None and not full_resync
+    if incremental:
+        data = download_ticker_data(ticker, start=incremental_start(last_ts))
+        if data is None:
+            return 0
+        status, data = reconcile_overlap(ticker, data, last_ts, conn=conn)
+        if status == "resync":
+            incremental = False
+            data = download_ticker_data(ticker, period=period)
+    else:
+        data = download_ticker_data(ticker, period=period)
+
+    if data is None or data.empty:
+        return 0
+
+    store_ticker_data(ticker, data, incremental=incremental, conn=conn)
+    return len(data)
+
+class StoreUnavailable(RuntimeError):
+    """수집 도중 쓰기 대상 저장소가 바뀐 경우 (서킷 브레이커 차단/복구). 해당 티커는 쓰지 않습니다."""
+
+def current_store(conn=None):
+    """지금 워터마크 조회/쓰기가 향할 저장소 ('questdb' 또는 'file')."""
+    return "questdb" if conn is not None or questdb_enabled() else "file"
+
+def store_ticker_data(ticker, data, incremental=False, conn=None, flush=True, target=None):
+    """현재 저장소(QuestDB 또는 CSV)에 데이터를 씁니다. incremental=True면 CSV에 추가 모드로 씁니다.
+
+    추가 모드에서 data 첫 봉 이후로 이미 저장된 행은 교체됩니다 (QuestDB는 DEDUP upsert).
+
+    flush=False면 QuestDB 쓰기를 ILP 버퍼에 쌓아두며, 호출자가 마지막에 flush_ilp()를 호출해야 합니다.
+    QuestDB가 차단(circuit open) 상태면 파일 저장소에 씁니다.
+    target('questdb'/'file')을 주면 그 저장소에만 쓰고, 지금 저장소가 다르면 StoreUnavailable을 올립니다.
+    증분 데이터는 target 저장소의 워터마크 이후 구간이므로, 다른 저장소에 쓰면 그쪽 워터마크만
+    앞당겨지고 사이 구간은 다시 받지 않는 빈틈이 생기기 때문입니다.
+    """
+    store = "questdb" if questdb_enabled() else "file"
+    if target is not None and store != target:
+        raise StoreUnavailable(f"저장소가 {target}에서 {store}(으)로 바뀌어 '{ticker}'를 쓰지 않습니다")
+    if store == "questdb":
+        insert_data_to_db(conn, ticker, data, flush=flush)
+    elif incremental:
+        append_to_csv(ticker, data)
+    else:
+        save_to_csv(ticker, data)
+
+def update_all_data(full_resync=False, progress=None):
+    """스크리너로 얻은 모든 자산의 데이터를 QuestDB 또는 CSV에 저장합니다.
+
+    기본은 증분 모드로, 티커별 마지막 저장 봉부터 겹쳐 내려받아 마지막 봉을 교체하고 새 봉을 추가합니다.
+    겹친 구간의 과거 종가가 바뀐 티커(분할/배당 보정)는 그 티커만 전체 기간을 다시 받습니다.
+    full_resync=True면 워터마크를 무시하고 전체 기간을 다시 받습니다 (복구용).
+    다운로드는 ingest 모듈의 배치/동시 파이프라인으로 수행되며, 저장은 도착 순서대로 이뤄집니다.
+    progress(done, total, ticker) 콜백이 주어지면 티커마다 호출됩니다.
+    """
+    mode = "전체 재동기화" if full_resync else "증분"
+    print(f"--- 모든 자산 데이터 업데이트 시작 ({mode}) ---")
     tickers = get_all_tickers()
     if not tickers:
         print("오류: 데이터를 업데이트할 티커 목록을 가져올 수 없습니다.")
         return
 
-    success_count = 0
-    
-    if USE_QUESTDB:
+    from .ingest import download_and_store
+
+    def _run(conn=None):
+        # 워터마크를 읽은 저장소에만 쓴다 (도중에 브레이커가 바뀐 티커는 다음 수집으로 미룸)
+        target = current_store(conn)
+        watermarks = {} if full_resync else get_last_timestamps(tickers, conn=conn)
+        return download_and_store(
+            tickers, watermarks, full_resync=full_resync, conn=conn, progress=progress, target=target
+        )
+
+    # 첫 프로브 결과를 기다려 저장 위치를 정확히 고른다 (questdb_enabled 참고).
+    result = None
+    if questdb_enabled():
         try:
-            conn = get_db_connection()
-            for ticker in tickers:
-                data = download_ticker_data(ticker, period="2y")
-                if data is not None:
-                    insert_data_to_db(conn, ticker, data)
-                    success_count += 1
-            conn.close()
+            with _questdb_call(), pooled_connection() as conn:
+                result = _run(conn)
         except psycopg2.OperationalError as e:
             print(f"오류: QuestDB에 연결할 수 없습니다: {e}")
-            print("CSV 모드로 전환합니다.")
-            USE_QUESTDB = False
-    
-    if not USE_QUESTDB:
-        for ticker in tickers:
-            data = download_ticker_data(ticker, period="2y")
-            if data is not None:
-                save_to_csv(ticker, data)
-                success_count += 1
-    
-    print(f"--- 총 {success_count}/{len(tickers)}개 자산 데이터 업데이트 완료 ---")
+            print("이번 업데이트는 파일 저장소에 씁니다.")
+
+    if result is None:
+        result = _run()
+
+    print(
+        f"--- 총 {result['updated']}/{len(tickers)}개 자산 갱신, {result['rows']}개 행 저장 완료 "
+        f"(최신 {result['up_to_date']}개, 전체 재수집 {result['resynced']}개, 실패 {result['failed']}개, 다음 수집으로 미룸 {result['deferred']}개) ---"
+    )
+    return result
 
 if __name__ == '__main__':
-    update_all_data()
+    import sys
+    if "--migrate-schema" in sys.argv:
+        if not check_questdb_available():
+            sys.exit("오류: QuestDB에 연결할 수 없습니다.")
+        sys.exit(0 if ensure_schema(migrate=True) else 1)
+    update_all_data(full_resync="--full-resync" in sys.argv)
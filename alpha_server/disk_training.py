@@ -0,0 +1,113 @@
+"""디스크(memmap) 글로벌 데이터셋으로 X 전체를 메모리에 올리지 않고 앙상블을 학습하는 도구.
+
+- LightGBM: 학습 행을 lgb.Sequence로 묶음(CHUNK_ROWS행) 단위로 읽어 lgb.Dataset을 만들고, 데이터셋
+  디렉터리에 바이너리(lgb_train_<h>_<행 수>.bin)로 저장해 다음 재학습에서 다시 쓴다. 학습 중에는
+  구간화된 값(행 × 피처 × 1바이트)만 메모리에 있다. 모델은 lgb.train의 Booster를 감싼 LGBMBoosterClassifier.
+- RandomForest/XGBoost: sklearn 입력 검사와 XGBoost DMatrix는 입력을 통째로 메모리에 올리므로, 학습 구간에서
+  최대 ALPHA_GLOBAL_TRAIN_MAX_ROWS행을 (시드 고정) 무작위로 뽑아 그 표본만 올린다.
+- 평가 예측은 predict_chunked로 묶음 단위로 한다.
+글로벌 학습(global_model_handler.fit_global_ensemble)에서만 import하므로 서빙 프로세스는 불러오지 않는다.
+
+환경변수:
+  ALPHA_GLOBAL_TRAIN_MAX_ROWS  RandomForest/XGBoost에 올릴 최대 학습 행 수 (기본 2000000, 0이면 제한 없음)
+"""
+from __future__ import annotations
+
+import os
+from typing import Optional, Sequence, Union
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+GLOBAL_TRAIN_MAX_ROWS = int(os.getenv("ALPHA_GLOBAL_TRAIN_MAX_ROWS", "2000000"))
+CHUNK_ROWS = 1 << 16  # 디스크 행렬을 한 번에 읽는 행 수
+# lgb.Dataset 구성과 학습에 같은 값을 써야 저장한 바이너리를 그대로 다시 쓸 수 있다
+LGB_DATASET_PARAMS = {"max_bin": 255, "verbose": -1}
+
+
+def sample_rows(n: int, max_rows: int, seed: int = 42) -> Union[slice, np.ndarray]:
+    """앞에서부터 n개 행 중 학습에 올릴 행. max_rows 이하이면 전체 slice, 넘으면 정렬된 무작위 행 번호."""
+    if max_rows <= 0 or n <= max_rows:
+        return slice(0, n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=max_rows, replace=False))
+
+
+def predict_chunked(model, X, chunk: int = CHUNK_ROWS) -> np.ndarray:
+    """X(DataFrame)를 chunk행씩 나눠 예측한다 (memmap 검증 구간을 통째로 올리지 않음)."""
+    parts = [model.predict(X.iloc[lo:lo + chunk]) for lo in range(0, len(X), chunk)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def _row_sequence(lgb, X: np.ndarray):
+    class _Rows(lgb.Sequence):
+        batch_size = CHUNK_ROWS
+
+        def __len__(self) -> int:
+            return len(X)
+
+        def __getitem__(self, idx):
+            return np.asarray(X[idx])
+
+    return _Rows()
+
+
+def lgb_dataset_file(path: str, target_days: int, X: np.ndarray, y: np.ndarray,
+                     feature_names: Sequence[str]) -> str:
+    """학습 행 (X, y)의 lgb.Dataset 바이너리 경로. path(디스크 데이터셋 디렉터리)에 없으면 묶음 단위로 만든다."""
+    import lightgbm as lgb
+
+    file = os.path.join(path, f"lgb_train_{target_days}_{len(y)}.bin")
+    if not os.path.exists(file):
+        tmp = file + ".tmp"
+        train_set = lgb.Dataset(
+            _row_sequence(lgb, X), label=np.asarray(y, dtype=np.float32),
+            feature_name=list(feature_names), params=dict(LGB_DATASET_PARAMS),
+        )
+        train_set.save_binary(tmp)
+        del train_set
+        os.replace(tmp, file)
+    return file
+
+
+class LGBMBoosterClassifier(ClassifierMixin, BaseEstimator):
+    """LightGBM 이진 분류기 (make_global_ensemble의 LGBMClassifier와 같은 하이퍼파라미터).
+
+    dataset_file(lgb_dataset_file의 바이너리)이 있으면 fit(X, y)의 X/y 대신 그 파일로 학습하므로,
+    VotingClassifier 안에서 다른 구성 모델이 행 표본으로 학습하는 동안 이 모델은 학습 행 전체를 쓴다.
+    tree_compiler는 LGBMClassifier와 같이 booster_로 컴파일한다.
+    """
+
+    def __init__(self, dataset_file: Optional[str] = None, n_estimators: int = 100, max_depth: int = 6,
+                 learning_rate: float = 0.05, random_state: int = 42, n_jobs: int = -1) -> None:
+        self.dataset_file = dataset_file
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.learning_rate = learning_rate
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def _params(self) -> dict:
+        return {
+            "objective": "binary", "max_depth": self.max_depth, "learning_rate": self.learning_rate,
+            "seed": self.random_state, "num_threads": self.n_jobs if self.n_jobs > 0 else 0,
+            **LGB_DATASET_PARAMS,
+        }
+
+    def fit(self, X, y):
+        import lightgbm as lgb
+
+        if self.dataset_file is not None:
+            train_set = lgb.Dataset(self.dataset_file, params=dict(LGB_DATASET_PARAMS))
+        else:
+            train_set = lgb.Dataset(np.asarray(X), label=np.asarray(y), params=dict(LGB_DATASET_PARAMS))
+        self.booster_ = lgb.train(self._params(), train_set, num_boost_round=self.n_estimators)
+        self.classes_ = np.array([0, 1])
+        self.n_features_in_ = self.booster_.num_feature()
+        return self
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.booster_.predict(np.asarray(X, dtype=np.float64))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
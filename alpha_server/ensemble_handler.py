@@ -25,17 +25,44 @@ except ImportError:
 
 from .data_handler import load_data
 from .model_handler import create_features_and_target
+from .training_manifest import UNCHANGED, data_fingerprint, needs_training, write_manifest
+from .model_pack import rebuild_packs
+from .training_scheduler import run_training, summarize
+from .tree_compiler import write_compiled
 
 MODELS_DIR = os.path.expanduser("~/AlphaModels")
 
-def train_ensemble_model(ticker):
-    """Phase 2: 앙상블 모델 학습"""
-    print(f"--- '{ticker}' 앙상블 모델 학습 시작 ---")
+# 개별 모델 하이퍼파라미터 (매니페스트에 기록되어 바뀌면 재학습)
+RF_PARAMS = {'n_estimators': 200, 'max_depth': 15, 'min_samples_split': 5, 'random_state': 42}
+XGB_PARAMS = {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.05, 'random_state': 42, 'eval_metric': 'logloss'}
+LGBM_PARAMS = {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.05, 'random_state': 42, 'verbose': -1}
+
+def train_ensemble_model(ticker, n_jobs=-1, force=False):
+    """Phase 2: 앙상블 모델 학습
+    n_jobs: 개별 모델의 학습 스레드 수. VotingClassifier는 개별 모델을 차례로 학습해
+    스레드가 겹치지 않게 한다 (n_jobs 중첩 시 코어 초과).
+    force: False면 입력이 마지막 학습과 같을 때 건너뛰고 UNCHANGED 반환 (training_manifest)"""
     data = load_data(ticker)
     if data is None:
         return
 
-    features, target = create_features_and_target(data)
+    model_path = os.path.join(MODELS_DIR, f"{ticker}_model.joblib")
+    fingerprint = data_fingerprint(data)
+    # 같은 파일을 쓰는 model_handler.train_model과 구분되도록 학습기 구성을 기록
+    params = {
+        'trainer': 'ensemble',
+        'rf': RF_PARAMS,
+        'xgb': XGB_PARAMS if XGBOOST_AVAILABLE else None,
+        'lgbm': LGBM_PARAMS if LIGHTGBM_AVAILABLE else None,
+    }
+    if not force:
+        stale, reason = needs_training(model_path, fingerprint, params)
+        if not stale:
+            print(f"'{ticker}' 앙상블 모델 재학습 건너뜀 ({reason})")
+            return UNCHANGED
+    print(f"--- '{ticker}' 앙상블 모델 학습 시작 ---")
+
+    features, target = create_features_and_target(data, ticker=ticker)
     
     if features.empty:
         print(f"오류: '{ticker}'에 대한 학습 데이터를 생성할 수 없습니다.")
@@ -49,42 +76,22 @@ def train_ensemble_model(ticker):
     estimators = []
     
     # RandomForest
-    rf = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=15,
-        min_samples_split=5,
-        random_state=42,
-        n_jobs=-1
-    )
+    rf = RandomForestClassifier(**RF_PARAMS, n_jobs=n_jobs)
     estimators.append(('rf', rf))
     
     # XGBoost
     if XGBOOST_AVAILABLE:
-        xgb = XGBClassifier(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            random_state=42,
-            n_jobs=-1,
-            eval_metric='logloss'
-        )
+        xgb = XGBClassifier(**XGB_PARAMS, n_jobs=n_jobs)
         estimators.append(('xgb', xgb))
     
     # LightGBM
     if LIGHTGBM_AVAILABLE:
-        lgbm = LGBMClassifier(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.05,
-            random_state=42,
-            n_jobs=-1,
-            verbose=-1
-        )
+        lgbm = LGBMClassifier(**LGBM_PARAMS, n_jobs=n_jobs)
         estimators.append(('lgbm', lgbm))
     
     # 앙상블
     if len(estimators) > 1:
-        ensemble = VotingClassifier(estimators=estimators, voting='soft', n_jobs=-1)
+        ensemble = VotingClassifier(estimators=estimators, voting='soft')
         ensemble.fit(X_train, y_train)
         model = ensemble
         model_type = "Ensemble"
@@ -100,31 +107,28 @@ def train_ensemble_model(ticker):
     print(f"'{ticker}' {model_type} 모델 테스트 정확도: {accuracy:.2%}")
     
     # 저장
-    model_path = os.path.join(MODELS_DIR, f"{ticker}_model.joblib")
     joblib.dump({
         'model': model,
         'features': list(features.columns),
         'type': model_type
     }, model_path)
+    write_compiled(model_path, model, list(features.columns), {'type': model_type})
+    write_manifest(model_path, fingerprint, params, accuracy)
     print(f"'{ticker}' 모델을 '{model_path}'에 저장했습니다.")
     
     return accuracy
 
-def update_all_ensemble_models():
-    """모든 자산에 대해 앙상블 모델 학습"""
+def update_all_ensemble_models(force=False):
+    """모든 자산에 대해 앙상블 모델 학습 (force=False면 입력이 바뀐 티커만)"""
     from .asset_screener import get_all_tickers
     
     tickers = get_all_tickers()
     print(f"\n총 {len(tickers)}개 자산에 대한 앙상블 모델 학습을 시작합니다...\n")
     
-    accuracies = {}
-    for ticker in tickers:
-        try:
-            acc = train_ensemble_model(ticker)
-            if acc:
-                accuracies[ticker] = acc
-        except Exception as e:
-            print(f"오류: '{ticker}' 모델 학습 실패 - {e}")
+    summary = summarize(run_training(train_ensemble_model, tickers, kwargs={'force': force}))
+    accuracies = summary["scores"]
+    print(f"\n학습 {summary['trained']}개, 변경 없음 {summary['unchanged']}개 건너뜀, 실패 {len(summary['failed'])}개")
+    rebuild_packs(["model"])
     
     # 평균 정확도
     if accuracies:
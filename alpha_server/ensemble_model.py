@@ -2,7 +2,7 @@ import joblib
 import os
 from .model_handler import predict_latest as predict_technical
 from .news_model import predict_news
-from .lstm_handler import predict_lstm
+from .lstm_handler import predict_lstm, PREDICT_BARS
 from .data_handler import load_data
 
 MODELS_DIR = os.path.expanduser("~/AlphaModels")
@@ -10,8 +10,8 @@ MODELS_DIR = os.path.expanduser("~/AlphaModels")
 def ensemble_predict(ticker, weights={'technical': 0.4, 'news': 0.4, 'lstm': 0.2}):
     """기술적 분석, 뉴스 분석, LSTM 딥러닝을 앙상블하여 최종 예측을 생성합니다."""
     
-    # 데이터 로드
-    data = load_data(ticker)
+    # 데이터 로드 (뉴스/LSTM 예측에 필요한 최근 구간만)
+    data = load_data(ticker, last_n=PREDICT_BARS)
     if data is None:
         return {
             'ticker': ticker,
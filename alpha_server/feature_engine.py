@@ -0,0 +1,353 @@
+"""모든 모델 계열이 공유하는 기술적 지표 피처 엔진.
+
+- 피처는 이름 → 커널 함수로 선언되어 있고, 요청된 피처만 한 번에 계산한다.
+  (SMA_20처럼 여러 피처가 쓰는 중간값은 한 번만 계산해 재사용)
+- 입력은 OHLCV 컬럼의 NumPy 배열, 출력은 float32 블록 (행: 봉, 열: 피처).
+- 학습과 추론이 같은 엔진을 쓰므로, 모델 파일에는 FEATURE_SET_VERSION을 함께 저장하고
+  추론 시 버전이 다르면 경고한다. 피처 정의를 바꾸면 버전을 올려야 한다.
+
+윈도우 초기 구간(지표 계산에 봉이 모자란 행)과 0으로 나누는 경우는 NaN이다.
+
+증분 계산(compute_incremental): 새 봉 앞에 history_bars(features)개의 과거 봉을 붙여 넘기면
+윈도우 지표는 과거 봉으로 워밍업하고, EMA/Wilder RSI는 이전 계산의 마지막 값(state)에서 이어서
+재귀하므로 전체 재계산과 같은 값을 낸다. 봉 하나씩 갱신하는 추론용 누산기는 streaming_features 참고.
+"""
+from __future__ import annotations
+
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+FEATURE_SET_VERSION = "ta-v1"
+
+# 종목별/글로벌 모델 공통 기술적 지표
+TECHNICAL_FEATURES = [
+    "SMA_20", "SMA_50", "RSI_14", "Volatility",
+    "EMA_12", "MACD", "ROC", "Return_5d", "BB_Width",
+    "Volume_Ratio", "High_Low_Ratio", "DayOfWeek", "Month",
+]
+
+# scoring_engine 점수 계산용 지표 (종가만 필요)
+SCORING_FEATURES = ["RSI_14", "SMA_20", "SMA_50", "Return_252d", "Volatility_252d"]
+
+
+# ---------- 커널 (시간축은 axis 0: 1차원 시계열 또는 (봉 × 티커) 패널) ----------
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window, axis=0).mean(axis=-1)
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """표본 표준편차 (ddof=1, pandas rolling().std()와 동일)."""
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window, axis=0).std(axis=-1, ddof=1)
+    return out
+
+
+def ema(x: np.ndarray, span: int, prev=None) -> np.ndarray:
+    """pandas ewm(span=span, adjust=False).mean()과 같은 재귀식.
+
+    prev가 없으면 첫 유효값에서 시작하고, 있으면 x 직전 봉의 EMA 값으로 보고 이어서 계산한다.
+    NaN 입력은 ewm(ignore_na=False)처럼 직전 값을 그대로 두고, 다음 유효값에서는 건너뛴 봉 수만큼
+    감쇠한 이전 값의 가중치로 합친다 (첫 유효값 전은 NaN). NaN이 없는 열은 lfilter 한 번으로 계산한다.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) == 0:
+        return np.empty(x.shape)
+    alpha = 2.0 / (span + 1.0)
+    valid = ~np.isnan(x)
+    if valid.all():
+        seed = x[0] if prev is None else np.where(np.isfinite(prev), prev, x[0])
+        y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, axis=0, zi=_zi((1.0 - alpha) * seed))
+        return y
+    if x.ndim == 1:
+        return _ema_with_gaps(x, alpha, prev)
+    prevs = np.broadcast_to(np.asarray(np.nan if prev is None else prev, dtype=np.float64), x.shape[1:])
+    out = np.empty(x.shape)
+    clean = valid.all(axis=0)
+    if clean.any():
+        out[:, clean] = ema(x[:, clean], span, None if prev is None else prevs[clean])
+    for j in np.flatnonzero(~clean):
+        out[:, j] = _ema_with_gaps(x[:, j], alpha, prevs[j])
+    return out
+
+
+def _ema_with_gaps(x: np.ndarray, alpha: float, prev=None) -> np.ndarray:
+    """NaN이 섞인 1차원 시계열의 EMA. 연속된 유효 구간마다 lfilter로 계산하고 구간 사이를 잇는다."""
+    obs = np.flatnonzero(~np.isnan(x))
+    y = float(prev) if prev is not None and np.isfinite(prev) else None
+    out = np.full(x.shape, np.nan)
+    if len(obs) == 0:
+        return out if y is None else np.full(x.shape, y)
+    breaks = np.flatnonzero(np.diff(obs) > 1)
+    last = -1  # 직전 관측 위치 (prev는 x 바로 앞 봉)
+    for lo, hi in zip(obs[np.r_[0, breaks + 1]], obs[np.r_[breaks, len(obs) - 1]] + 1):
+        if y is None:
+            first = x[lo]
+        else:
+            w = (1.0 - alpha) ** (lo - last)
+            first = (w * y + alpha * x[lo]) / (w + alpha)
+        out[lo] = first
+        if hi - lo > 1:
+            out[lo + 1:hi], _ = lfilter([alpha], [1.0, alpha - 1.0], x[lo + 1:hi], zi=[(1.0 - alpha) * first])
+        y, last = out[hi - 1], hi - 1
+    # NaN 자리는 직전 EMA 값을 유지 (첫 유효값 전은 prev, 없으면 NaN)
+    filled = np.maximum.accumulate(np.where(np.isnan(x), -1, np.arange(len(x))))
+    return np.where(filled >= 0, out[np.maximum(filled, 0)], np.nan if prev is None else prev)
+
+
+def _zi(value) -> np.ndarray:
+    """lfilter(axis=0)의 초기 상태: (1,) 또는 (1, 티커 수)."""
+    return np.asarray(value, dtype=np.float64)[np.newaxis, ...]
+
+
+def shift_change(x: np.ndarray, periods: int) -> np.ndarray:
+    """x[t] / x[t - periods] - 1 (pct_change)."""
+    out = np.full(x.shape, np.nan)
+    if len(x) > periods:
+        out[periods:] = _safe_div(x[periods:], x[:-periods]) - 1.0
+    return out
+
+
+def _safe_div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b == 0, np.nan, a / np.where(b == 0, 1.0, b))
+
+
+def _rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    if len(close) == 0:
+        return np.empty(close.shape)
+    delta = np.empty(close.shape)
+    delta[0] = np.nan
+    delta[1:] = np.diff(close, axis=0)
+    # 첫 봉(diff 없음)은 pandas의 where(delta > 0, 0)과 같이 0으로 취급
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), window)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0.0), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+def _wilder_rsi(
+    close: np.ndarray, window: int = 14, start: int = 0, prev: Optional[Sequence[float]] = None,
+) -> tuple[np.ndarray, Optional[list[float]]]:
+    """Wilder 평활 RSI. close[start:] 구간을 계산하고 마지막 [평균 상승폭, 평균 하락폭]을 함께 반환.
+
+    prev가 없으면 close[start]부터 새 시계열로 보고, 첫 window개 변화량의 단순 평균을 시드로 삼아
+    close[start + window] 행부터 값이 나온다. prev가 있으면 직전 봉의 평균값에서 이어서 재귀한다.
+    """
+    out = np.full(close.shape, np.nan)
+    alpha = 1.0 / window
+    if prev is not None and start > 0:
+        delta = np.diff(close[start - 1:], axis=0)
+        first, seeds = start, [np.asarray(p, dtype=np.float64) for p in prev]
+    else:
+        delta = np.diff(close[start:], axis=0)
+        if len(delta) < window:
+            return out, None
+        seeds = [np.where(delta[:window] > 0, delta[:window], 0.0).mean(axis=0),
+                 np.where(delta[:window] < 0, -delta[:window], 0.0).mean(axis=0)]
+        out[start + window] = _rsi_from_averages(seeds[0], seeds[1])
+        delta = delta[window:]
+        first = start + window + 1
+    if len(delta) == 0:
+        return out, [seeds[0].tolist(), seeds[1].tolist()]
+    averages = []
+    for moves, seed in ((np.where(delta > 0, delta, 0.0), seeds[0]), (np.where(delta < 0, -delta, 0.0), seeds[1])):
+        y, _ = lfilter([alpha], [1.0, alpha - 1.0], moves, axis=0, zi=_zi((1.0 - alpha) * seed))
+        averages.append(y)
+    out[first:] = _rsi_from_averages(averages[0], averages[1])
+    return out, [averages[0][-1].tolist(), averages[1][-1].tolist()]
+
+
+def _rsi_from_averages(gain, loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100.0 - 100.0 / (1.0 + np.divide(gain, loss))
+
+
+class _Context:
+    """한 번의 계산 동안 입력 배열과 중간값을 보관.
+
+    start 이전 행은 워밍업용이며, EMA/Wilder RSI는 state의 직전 값에서 start 행부터 다시 재귀한다.
+    계산 후 state에는 재귀 지표별 마지막 값이 남는다 (다음 증분 계산의 시작점).
+    """
+
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        index: pd.DatetimeIndex,
+        state: Optional[dict] = None,
+        start: int = 0,
+    ) -> None:
+        self.columns = columns
+        self.index = index  # 패널이면 (봉 × 티커)를 행 우선으로 펼친 타임스탬프
+        self.shape = next(iter(columns.values())).shape if columns else (len(index),)
+        self.start = start
+        self.prev_state = dict(state or {})
+        self.state: dict = {}
+        self._memo: dict[str, np.ndarray] = {}
+
+    def col(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            raise KeyError(f"피처 계산에 '{name}' 컬럼이 필요합니다.")
+        return self.columns[name]
+
+    def get(self, name: str) -> np.ndarray:
+        if name not in self._memo:
+            self._memo[name] = _KERNELS[name](self)
+        return self._memo[name]
+
+    def calendar(self, field: str) -> np.ndarray:
+        return np.asarray(getattr(self.index, field), dtype=np.float64).reshape(self.shape)
+
+    def ema(self, column: str, span: int) -> np.ndarray:
+        key = f"ema:{column}:{span}"
+        x = self.col(column)
+        out = np.full(x.shape, np.nan)
+        out[self.start:] = ema(x[self.start:], span, self.prev_state.get(key))
+        if len(x) > self.start:
+            self.state[key] = out[-1].tolist()
+        return out
+
+    def wilder_rsi(self, window: int) -> np.ndarray:
+        key = f"wilder:Close:{window}"
+        out, last = _wilder_rsi(self.col("Close"), window, self.start, self.prev_state.get(key))
+        if last is not None:
+            self.state[key] = last
+        return out
+
+
+_KERNELS: dict[str, Callable[[_Context], np.ndarray]] = {
+    "SMA_20": lambda c: rolling_mean(c.col("Close"), 20),
+    "SMA_50": lambda c: rolling_mean(c.col("Close"), 50),
+    "RSI_14": lambda c: _rsi(c.col("Close"), 14),
+    "RSI_14_Wilder": lambda c: c.wilder_rsi(14),
+    "Volatility": lambda c: rolling_std(c.col("Close"), 20),
+    "EMA_12": lambda c: c.ema("Close", 12),
+    "EMA_26": lambda c: c.ema("Close", 26),
+    "MACD": lambda c: c.get("EMA_12") - c.get("EMA_26"),
+    "ROC": lambda c: shift_change(c.col("Close"), 10) * 100.0,
+    "Return_5d": lambda c: shift_change(c.col("Close"), 5),
+    "BB_Width": lambda c: _safe_div(c.get("Volatility") * 4.0, c.get("SMA_20")),
+    "Volume_SMA": lambda c: rolling_mean(c.col("Volume"), 20),
+    "Volume_Ratio": lambda c: _safe_div(c.col("Volume"), c.get("Volume_SMA")),
+    "High_Low_Ratio": lambda c: _safe_div(c.col("High"), c.col("Low")),
+    "DayOfWeek": lambda c: c.calendar("dayofweek"),
+    "Month": lambda c: c.calendar("month"),
+    "Return_252d": lambda c: shift_change(c.col("Close"), 252) * 100.0,
+    "Volatility_252d": lambda c: rolling_std(shift_change(c.col("Close"), 1), 252) * np.sqrt(252),
+}
+
+AVAILABLE_FEATURES = sorted(_KERNELS)
+
+# 피처 한 행을 계산하는 데 필요한 봉 수 (현재 봉 포함). EMA는 state로 이어가므로 1,
+# Wilder RSI는 시드 구간(window + 1봉)만 필요하고 이후로는 state로 이어간다.
+_WARMUP_BARS: dict[str, int] = {
+    "SMA_20": 20, "SMA_50": 50, "RSI_14": 15, "RSI_14_Wilder": 15, "Volatility": 20,
+    "EMA_12": 1, "EMA_26": 1, "MACD": 1, "ROC": 11, "Return_5d": 6,
+    "BB_Width": 20, "Volume_SMA": 20, "Volume_Ratio": 20, "High_Low_Ratio": 1,
+    "DayOfWeek": 1, "Month": 1, "Return_252d": 253, "Volatility_252d": 253,
+}
+
+
+def _check_features(features: Sequence[str]) -> None:
+    unknown = [f for f in features if f not in _KERNELS]
+    if unknown:
+        raise ValueError(f"알 수 없는 피처: {unknown}")
+
+
+def history_bars(features: Sequence[str] = TECHNICAL_FEATURES) -> int:
+    """증분 계산 시 새 봉 앞에 붙여야 하는 과거 봉 수."""
+    _check_features(features)
+    return max((_WARMUP_BARS[f] for f in features), default=1) - 1
+
+
+def _compute(
+    data: pd.DataFrame, features: Sequence[str], state: Optional[dict], start: int,
+) -> tuple[np.ndarray, dict]:
+    _check_features(features)
+    columns = {
+        name: data[name].to_numpy(dtype=np.float64)
+        for name in ("Open", "High", "Low", "Close", "Volume")
+        if name in data.columns
+    }
+    ctx = _Context(columns, pd.DatetimeIndex(data.index), state, start)
+    block = np.empty((len(data) - start, len(features)), dtype=np.float32)
+    for j, name in enumerate(features):
+        block[:, j] = ctx.get(name)[start:]
+    return block, ctx.state
+
+
+def compute_feature_block(data: pd.DataFrame, features: Sequence[str] = TECHNICAL_FEATURES) -> np.ndarray:
+    """data(OHLCV, DatetimeIndex)에서 features를 계산해 (행 × 피처) float32 배열로 반환."""
+    return _compute(data, features, None, 0)[0]
+
+
+def compute_incremental(
+    data: pd.DataFrame,
+    features: Sequence[str] = TECHNICAL_FEATURES,
+    state: Optional[dict] = None,
+    start: int = 0,
+) -> tuple[np.ndarray, dict]:
+    """data[start:] 행의 피처와 다음 호출에 넘길 state를 반환.
+
+    data[:start]는 윈도우 워밍업용 과거 봉(history_bars개 이상), state는 직전 호출이 돌려준 값.
+    state가 None이면 data 첫 봉부터 새로 계산한 것과 같다.
+    """
+    return _compute(data, features, state, start)
+
+
+def compute_panel_block(
+    values: dict[str, np.ndarray],
+    dates: np.ndarray,
+    features: Sequence[str] = TECHNICAL_FEATURES,
+    mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """(봉 × 티커) 패널 전체의 피처를 한 번에 계산 (data_handler.load_panel(layout="bars")).
+
+    각 열은 한 티커의 봉을 시간순으로 위에서부터 채운 것이어야 하며(남는 칸은 아래쪽 NaN/NaT),
+    그 열만으로 compute_feature_block을 호출한 것과 같은 값을 낸다.
+    반환: mask(기본: 봉이 있는 칸)가 True인 칸의 (행 × 피처) float32 블록. 행 순서는 티커 → 봉.
+    """
+    _check_features(features)
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    if mask is None:
+        mask = ~np.isnat(dates)
+    columns = {
+        name: np.asarray(values[name], dtype=np.float64)
+        for name in ("Open", "High", "Low", "Close", "Volume")
+        if name in values
+    }
+    ctx = _Context(columns, pd.DatetimeIndex(dates.ravel()))
+    ctx.shape = dates.shape
+    cells = mask.T  # 티커 → 봉 순서로 꺼내기 위해 전치
+    block = np.empty((int(cells.sum()), len(features)), dtype=np.float32)
+    for j, name in enumerate(features):
+        block[:, j] = ctx.get(name).T[cells]
+    return block
+
+
+def compute_features(data: pd.DataFrame, features: Sequence[str] = TECHNICAL_FEATURES) -> pd.DataFrame:
+    """compute_feature_block 결과를 data와 같은 인덱스의 DataFrame으로 감싼다."""
+    return pd.DataFrame(compute_feature_block(data, features), index=data.index, columns=list(features))
+
+
+_warned_versions: set = set()
+
+
+def check_feature_version(saved_version: Optional[str], model_name: str) -> bool:
+    """모델이 학습된 피처 버전이 현재 엔진과 같은지 확인. 다르면 (모델별 한 번) 경고."""
+    if saved_version == FEATURE_SET_VERSION:
+        return True
+    if model_name not in _warned_versions:
+        _warned_versions.add(model_name)
+        print(
+            f"경고: '{model_name}' 모델의 피처 버전({saved_version})이 현재 엔진({FEATURE_SET_VERSION})과 "
+            "다릅니다. 재학습을 권장합니다."
+        )
+    return False
@@ -0,0 +1,397 @@
+"""티커별 기술적 지표 피처 저장소 (학습/추론 공용 캐시).
+
+디렉터리 구조 (피처 버전별):
+  <root>/<FEATURE_SET_VERSION>/<ticker>/timestamp.i8   int64 나노초 타임스탬프 (원본 봉과 1:1)
+  <root>/<FEATURE_SET_VERSION>/<ticker>/features.f4    float32 (행 × 피처) 행 우선 블록
+  <root>/<FEATURE_SET_VERSION>/<ticker>/source.u8      uint64 원본 OHLCV 행 해시 (원본 봉과 1:1)
+  <root>/<FEATURE_SET_VERSION>/<ticker>/meta.json      {"features", "rows", "first_ts", "last_ts",
+                                                        "source_hash", "stream"}
+
+- get(ticker, data)는 data의 각 봉에 해당하는 피처를 돌려준다. 저장된 마지막 봉 이후의 새 봉만
+  meta에 보관한 스트리밍 누산기(streaming_features)로 봉 하나씩 계산해 파일 끝에 이어 붙인다.
+  따라서 data는 마지막 저장 봉부터만 있어도 된다 (latest_features 참고).
+- 저장본과 겹치는 data 봉은 행 해시(source.u8)로 원본이 그대로인지 확인한다 (새 봉이 없는 조회 포함).
+  data가 저장본보다 이른 봉부터 시작하거나 겹치는 봉의 OHLCV가 바뀌었으면(과거 데이터 수정/백필)
+  전체를 배치 엔진으로 다시 계산해 덮어쓴다. data에 저장본의 첫 봉이 없으면 history(공용 저장소는
+  data_handler.load_data)로 전체 이력을 읽어 다시 계산한다 (증분 수집이 미완성 마지막 봉을 교체한 뒤
+  load_recent가 최근 봉만 넘기는 경우). history가 없거나, 마지막 저장 봉이 없어 이어지는지 확인할 수
+  없으면 저장하지 않고 바로 계산한다.
+- 추론은 load_recent()로 마지막 저장 봉 이후의 봉만 읽으므로, 최신 봉 피처 비용이 윈도우 길이와
+  무관하다 (새 봉이 없으면 파일에서 한 행을 읽을 뿐). 누산기는 요청 시점에 필요한 만큼만 전진하고,
+  그 결과를 파일에 쓰는 일은 백그라운드 쓰기 스레드가 맡아 요청은 디스크 쓰기를 기다리지 않는다.
+- 피처 정의가 바뀌면 FEATURE_SET_VERSION이 올라가므로 새 디렉터리에 다시 쌓인다.
+
+환경변수:
+  ALPHA_FEATURE_STORE      1이면 사용 (기본 1, 0이면 항상 바로 계산)
+  ALPHA_FEATURE_STORE_DIR  저장 위치 (기본 ~/AlphaModels/features)
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .feature_engine import (
+    FEATURE_SET_VERSION,
+    TECHNICAL_FEATURES,
+    compute_features,
+    compute_incremental,
+)
+from .data_handler import load_data
+from .streaming_features import StreamingFeatures, tail_bars
+
+FEATURE_STORE_ENABLED = os.getenv("ALPHA_FEATURE_STORE", "1") == "1"
+FEATURE_STORE_DIR = os.path.expanduser(
+    os.getenv("ALPHA_FEATURE_STORE_DIR", os.path.join("~", "AlphaModels", "features"))
+)
+
+_TS_FILE = "timestamp.i8"
+_BLOCK_FILE = "features.f4"
+_SRC_FILE = "source.u8"
+_META_FILE = "meta.json"
+_SOURCE_HASH = "ohlcv-fnv1a"
+_OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def source_hashes(data: pd.DataFrame) -> np.ndarray:
+    """봉별 OHLCV 값의 64비트 FNV-1a 스타일 해시 (uint64, 행마다 하나)."""
+    bits = np.ascontiguousarray(data[_OHLCV].to_numpy(np.float64)).view(np.uint64)
+    h = np.full(len(bits), 0xCBF29CE484222325, dtype=np.uint64)
+    prime = np.uint64(0x100000001B3)
+    for k in range(bits.shape[1]):
+        h = (h ^ bits[:, k]) * prime
+    return h
+
+
+def _version(meta: Optional[dict]) -> Optional[tuple]:
+    return None if meta is None else (meta["first_ts"], meta["rows"], meta["last_ts"])
+
+
+_writer_pool: Optional[ThreadPoolExecutor] = None
+_writer_lock = threading.Lock()
+
+
+def _writer() -> ThreadPoolExecutor:
+    """저장소 쓰기 전용 스레드 하나 (티커 간 쓰기 순서 유지, 요청 스레드는 기다리지 않는다)."""
+    global _writer_pool
+    with _writer_lock:
+        if _writer_pool is None:
+            _writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feature-store")
+        return _writer_pool
+
+
+def wait_for_writes() -> None:
+    """지금까지 넘긴 백그라운드 쓰기가 끝날 때까지 기다린다 (테스트/종료 시)."""
+    _writer().submit(lambda: None).result()
+
+
+class FeatureStore:
+    def __init__(
+        self,
+        root: str,
+        version: str = FEATURE_SET_VERSION,
+        features: Sequence[str] = TECHNICAL_FEATURES,
+        history: Optional[Callable[[str], Optional[pd.DataFrame]]] = None,
+    ) -> None:
+        self.root = root
+        self.version = version
+        self.features = list(features)
+        self.history = history
+        self.tail = tail_bars(self.features)
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.hits = 0
+        self.appends = 0
+        self.appended_rows = 0
+        self.rebuilds = 0
+        self.bypasses = 0
+        self.deferred_writes = 0
+        self.skipped_writes = 0
+
+    # ---------- 파일 ----------
+    def _tdir(self, ticker: str) -> str:
+        return os.path.join(self.root, self.version, ticker.replace(os.sep, "_"))
+
+    def _lock_for(self, ticker: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _read_meta(self, ticker: str) -> Optional[dict]:
+        path = os.path.join(self._tdir(ticker), _META_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (
+            meta.get("features") != self.features
+            or "stream" not in meta
+            or meta.get("source_hash") != _SOURCE_HASH
+        ):
+            return None
+        return meta
+
+    def _write_meta(self, ticker: str, meta: dict) -> None:
+        path = os.path.join(self._tdir(ticker), _META_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _read_arrays(self, ticker: str, rows: int) -> tuple[np.ndarray, np.ndarray]:
+        if rows == 0:
+            return np.empty(0, dtype="<i8"), np.empty((0, len(self.features)), dtype="<f4")
+        tdir = self._tdir(ticker)
+        ts = np.memmap(os.path.join(tdir, _TS_FILE), dtype="<i8", mode="r", shape=(rows,))
+        block = np.memmap(
+            os.path.join(tdir, _BLOCK_FILE), dtype="<f4", mode="r", shape=(rows, len(self.features))
+        )
+        return ts, block
+
+    def _read_hashes(self, ticker: str, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype="<u8")
+        return np.memmap(os.path.join(self._tdir(ticker), _SRC_FILE), dtype="<u8", mode="r", shape=(rows,))
+
+    def _source_changed(self, ticker: str, meta: dict, data: pd.DataFrame) -> bool:
+        """data 중 저장본에 있는 봉의 OHLCV가 저장할 때와 다른지 (저장본에 없는 봉은 보지 않는다)."""
+        index = pd.DatetimeIndex(data.index)
+        overlap = int(index.searchsorted(pd.Timestamp(meta["last_ts"]), side="right"))
+        if overlap == 0:
+            return False
+        ts, _ = self._read_arrays(ticker, meta["rows"])
+        wanted = index.asi8[:overlap]
+        idx = np.minimum(np.searchsorted(ts, wanted), len(ts) - 1)
+        found = ts[idx] == wanted
+        stored = self._read_hashes(ticker, meta["rows"])[idx[found]]
+        return not np.array_equal(stored, source_hashes(data.iloc[:overlap][found]))
+
+    def _append_rows(self, ticker: str, meta: Optional[dict], data: pd.DataFrame,
+                     block: np.ndarray, stream: StreamingFeatures) -> dict:
+        """data(새 봉)와 그 피처 block을 이어 붙이고 meta를 커밋한다. meta가 None이면 새로 쓴다."""
+        tdir = self._tdir(ticker)
+        os.makedirs(tdir, exist_ok=True)
+        rows = meta["rows"] if meta else 0
+        row_bytes = 4 * len(self.features)
+        for name, values, width in (
+            (_TS_FILE, pd.DatetimeIndex(data.index).asi8.astype("<i8"), 8),
+            (_BLOCK_FILE, np.ascontiguousarray(block, dtype="<f4"), row_bytes),
+            (_SRC_FILE, source_hashes(data).astype("<u8"), 8),
+        ):
+            with open(os.path.join(tdir, name), "ab") as f:
+                f.truncate(rows * width)  # 커밋되지 않은 꼬리 행 제거
+                f.write(values.tobytes())
+        new_meta = {
+            "features": self.features,
+            "rows": rows + len(data),
+            "first_ts": meta["first_ts"] if meta else int(pd.Timestamp(data.index[0]).value),
+            "last_ts": int(pd.Timestamp(data.index[-1]).value),
+            "source_hash": _SOURCE_HASH,
+            "stream": stream.to_dict(),
+        }
+        self._write_meta(ticker, new_meta)
+        return new_meta
+
+    # ---------- 조회 ----------
+    def _plan_rebuild(self, meta: Optional[dict], data: pd.DataFrame) -> tuple:
+        block, state = compute_incremental(data, self.features)
+        stream = StreamingFeatures.from_history(data.iloc[-self.tail:], state, self.features)
+        self.rebuilds += 1
+        return "rebuild", meta, data, block, stream
+
+    def _refresh(self, ticker: str, data: pd.DataFrame) -> tuple:
+        """저장본과 data를 비교해 (동작, meta, 쓸 봉, 피처 블록, 누산기)를 정한다. 파일은 쓰지 않는다.
+
+        동작은 "hit"(저장본 그대로), "append"(새 봉을 이어 붙임), "rebuild"(전체 재계산),
+        None(저장본을 쓸 수 없음). 쓰기는 _commit이 한다.
+        """
+        meta = self._read_meta(ticker)
+        index = pd.DatetimeIndex(data.index)
+        first_ns = int(index[0].value)
+        none = (None, meta, None, None, None)
+
+        if meta is None or first_ns < meta["first_ts"]:
+            return self._plan_rebuild(meta, data)
+
+        if self._source_changed(ticker, meta, data):
+            # 저장본과 겹치는 봉이 바뀜 → 과거 데이터가 수정됨
+            if first_ns == meta["first_ts"]:
+                return self._plan_rebuild(meta, data)
+            full = self._with_history(ticker, data)
+            return self._plan_rebuild(meta, full) if full is not None else none
+
+        last_ts = pd.Timestamp(meta["last_ts"])
+        if index[-1] <= last_ts:
+            self.hits += 1
+            return "hit", meta, None, None, None
+
+        pos = int(index.searchsorted(last_ts))
+        if pos == len(index) or index[pos] != last_ts:
+            return none  # 저장본과 이어지는지 확인할 수 없음
+
+        # 새 봉은 저장된 누산기 상태에서 봉 하나씩 이어서 계산 (봉당 O(피처 수))
+        stream = StreamingFeatures.from_dict(meta["stream"])
+        new = data.iloc[pos + 1:]
+        block = stream.update_frame(new)
+        self.appends += 1
+        self.appended_rows += len(new)
+        return "append", meta, new, block, stream
+
+    def _with_history(self, ticker: str, data: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """history로 읽은 전체 이력 중 data 이전 봉 + data. 이력을 읽을 수 없으면 None."""
+        if self.history is None:
+            return None
+        try:
+            full = self.history(ticker)
+        except Exception as e:
+            print(f"경고: '{ticker}' 전체 이력 조회 실패 ({e})")
+            return None
+        if full is None or full.empty:
+            return None
+        head = full[full.index < data.index[0]]
+        return pd.concat([head[_OHLCV], data[_OHLCV]]) if not head.empty else None
+
+    def _commit(self, ticker: str, action: str, meta: Optional[dict], rows: pd.DataFrame,
+                block: np.ndarray, stream: StreamingFeatures) -> dict:
+        return self._append_rows(ticker, meta if action == "append" else None, rows, block, stream)
+
+    def _commit_later(self, ticker: str, plan: tuple) -> None:
+        """plan의 쓰기를 백그라운드 스레드로 넘긴다. 그사이 저장본이 바뀌었으면 (다른 요청이 먼저 썼으면) 버린다."""
+        action, seen = plan[0], _version(plan[1])
+
+        def _run() -> None:
+            with self._lock_for(ticker):
+                if _version(self._read_meta(ticker)) != seen:
+                    self.skipped_writes += 1
+                    return
+                try:
+                    self._commit(ticker, *plan)
+                except OSError as e:
+                    print(f"경고: '{ticker}' 피처 저장소 쓰기 실패 ({e})")
+
+        self.deferred_writes += 1
+        _writer().submit(_run)
+
+    def _lookup(self, ticker: str, meta: dict, index: pd.DatetimeIndex) -> Optional[np.ndarray]:
+        """저장본에서 index의 각 봉에 해당하는 피처 행. 없는 봉이 있으면 None."""
+        if len(index) == 0:
+            return np.empty((0, len(self.features)), dtype=np.float32)
+        ts, block = self._read_arrays(ticker, meta["rows"])
+        wanted = index.asi8
+        idx = np.minimum(np.searchsorted(ts, wanted), max(len(ts) - 1, 0))
+        if not len(ts) or not np.array_equal(ts[idx], wanted):
+            return None
+        return np.asarray(block[idx])
+
+    def get(self, ticker: str, data: pd.DataFrame, background: bool = False) -> pd.DataFrame:
+        """data(OHLCV, 시간순 DatetimeIndex)의 각 봉에 대한 피처 DataFrame (float32).
+
+        background=True면 새 봉/재계산 결과를 메모리에서 바로 돌려주고 파일 쓰기는 백그라운드
+        스레드에서 한다 (추론 요청 경로). 기본은 쓰기를 마친 뒤 저장본에서 읽는다.
+        """
+        if data is None or data.empty:
+            return pd.DataFrame(columns=self.features, dtype=np.float32)
+        index = pd.DatetimeIndex(data.index)
+        with self._lock_for(ticker):
+            try:
+                plan = self._refresh(ticker, data)
+                action, meta, rows, block = plan[:4]
+                if action in ("append", "rebuild"):
+                    if background:
+                        self._commit_later(ticker, plan)
+                    else:
+                        meta = self._commit(ticker, *plan)
+                        action = "hit"
+                if action == "rebuild":
+                    # 전체 이력으로 다시 계산했으면 data 봉에 해당하는 꼬리만
+                    values = block[len(rows) - len(index):]
+                elif action == "append":
+                    head = self._lookup(ticker, meta, index[:len(index) - len(rows)])
+                    values = None if head is None else np.vstack([head, block])
+                elif action == "hit":
+                    values = self._lookup(ticker, meta, index)
+                else:
+                    values = None
+            except OSError as e:
+                print(f"경고: '{ticker}' 피처 저장소 갱신 실패 ({e}), 바로 계산합니다.")
+                values = None
+            if values is not None:
+                return pd.DataFrame(np.asarray(values, dtype=np.float32), index=data.index, columns=self.features)
+        self.bypasses += 1
+        return compute_features(data, self.features)
+
+    def last_timestamp(self, ticker: str) -> Optional[pd.Timestamp]:
+        meta = self._read_meta(ticker)
+        return None if meta is None else pd.Timestamp(meta["last_ts"])
+
+    def stats(self) -> dict:
+        return {
+            "root": os.path.join(self.root, self.version),
+            "hits": self.hits,
+            "appends": self.appends,
+            "appended_rows": self.appended_rows,
+            "rebuilds": self.rebuilds,
+            "bypasses": self.bypasses,
+            "deferred_writes": self.deferred_writes,
+            "skipped_writes": self.skipped_writes,
+        }
+
+
+_store: Optional[FeatureStore] = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    """FEATURE_STORE_DIR 기준 공용 저장소 (디렉터리가 바뀌면 새로 만든다)."""
+    global _store
+    with _store_lock:
+        if _store is None or _store.root != FEATURE_STORE_DIR:
+            _store = FeatureStore(FEATURE_STORE_DIR, history=_load_history)
+        return _store
+
+
+def _load_history(ticker: str) -> Optional[pd.DataFrame]:
+    return load_data(ticker)
+
+
+def load_features(ticker: Optional[str], data: pd.DataFrame,
+                  features: Sequence[str] = TECHNICAL_FEATURES, background: bool = False) -> pd.DataFrame:
+    """ticker의 피처를 저장소에서 읽는다 (저장소를 못 쓰면 바로 계산).
+
+    학습은 전체 이력을, 추론은 최근 봉만 넘겨도 된다. 저장소에 없는 피처를 요청하면 바로 계산한다.
+    추론 요청 경로는 background=True로 저장소 쓰기를 백그라운드로 넘긴다 (FeatureStore.get 참고).
+    """
+    if not FEATURE_STORE_ENABLED or not ticker:
+        return compute_features(data, features)
+    store = get_feature_store()
+    if not set(features) <= set(store.features):
+        return compute_features(data, features)
+    frame = store.get(ticker, data, background=background)
+    return frame if list(features) == store.features else frame[list(features)]
+
+
+def load_recent(ticker: str, fallback_bars: int = 100) -> Optional[pd.DataFrame]:
+    """최신 봉 추론에 필요한 OHLCV만 조회.
+
+    저장본이 있으면 마지막 저장 봉부터(누산기로 이어 계산), 없으면 최근 fallback_bars개 봉.
+    """
+    since = get_feature_store().last_timestamp(ticker) if FEATURE_STORE_ENABLED else None
+    if since is not None:
+        data = load_data(ticker, start=since)
+        if data is not None and not data.empty and data.index[0] == since:
+            return data
+    return load_data(ticker, last_n=fallback_bars)
+
+
+def latest_features(ticker: str, features: Sequence[str] = TECHNICAL_FEATURES,
+                    fallback_bars: int = 100) -> Optional[pd.DataFrame]:
+    """ticker 마지막 봉의 피처 한 행 (1행 DataFrame). 데이터가 없으면 None."""
+    data = load_recent(ticker, fallback_bars)
+    if data is None or data.empty:
+        return None
+    return load_features(ticker, data, features, background=True).iloc[-1:]
@@ -0,0 +1,516 @@
+"""글로벌 모델 학습용 압축 데이터셋.
+
+(봉 × 티커) 패널에서 한 번에 만들고, 학습까지 추가 사본 없이 쓰도록 다음 형태로 보관한다.
+- X: 날짜순으로 정렬된 C-연속 float32 (행 × 피처) 행렬. Sector/Industry는 정수 코드 값으로 들어있다.
+- 범주 코드: ticker/sector/industry 모두 int16 (범주가 32767개를 넘으면 int32)
+- targets: {target_days: int8} 호라이즌별 타깃 (target_days 뒤 종가 상승 1 / 하락 0 / 미래 봉 없음 -1).
+  피처 행렬은 한 번만 만들고 단기/중기/장기 모델이 라벨 벡터만 바꿔 공유한다.
+- dates: datetime64[ns] (정렬 완료)
+- label_ends: {target_days: datetime64[ns]} 라벨이 보는 미래 봉의 날짜 (그 티커의 target_days번째 다음 봉,
+  라벨이 없으면 NaT). 시장마다 거래일 달력이 달라 h봉 뒤가 며칠 뒤인지 행마다 다르므로, 검증 폴드는
+  날짜 수가 아니라 이 값으로 학습 행을 퍼지한다 (walk_forward.expanding_folds).
+split()/labeled()는 라벨 있는 행을 날짜순으로 모은 뒤 앞/뒤 구간으로 나눈다. 라벨 없는 행(티커마다
+마지막 h개 봉)은 티커별 마지막 날짜가 달라 보통 끝부분에 모여 있지 않으므로, 실제 유니버스에서는
+라벨 있는 행만 모은 X 사본이 호라이즌마다 하나씩 생긴다 (디스크 데이터셋이면 같은 디렉터리의
+X_labeled_<h>.npy에 한 번 써 두고 memmap으로 다시 연다). 라벨 행이 앞부분에 모여 있을 때만 뷰다.
+
+build_cached_dataset()은 같은 데이터셋을 티커 묶음 단위로 읽어 디스크(.npy memmap)에 쓴다.
+구축하는 동안 피처 행렬(X) 전체를 메모리에 올리지 않고 (행마다 날짜/코드/라벨과 정렬 인덱스만
+메모리에 둔다), 티커·메타데이터·워터마크·호라이즌이 같으면 다음 재학습에서 그대로 다시 연다.
+학습(global_model_handler.fit_global_ensemble)도 X를 통째로 올리지 않는다: LightGBM은 memmap을 묶음
+단위로 읽어 만든 lgb.Dataset 바이너리(같은 디렉터리의 lgb_train_<h>_<행 수>.bin)로, RandomForest/XGBoost는
+학습 구간에서 뽑은 최대 ALPHA_GLOBAL_TRAIN_MAX_ROWS행 표본으로 학습한다 (disk_training).
+(측정: tests/benchmark_dataset_memory.py)
+  <ALPHA_DATASET_CACHE_DIR>/<입력 키>/{X.npy, dates.npy, ticker_codes.npy, target_<h>.npy,
+                                       label_end_<h>.npy, meta.json}
+
+환경변수:
+  ALPHA_PANEL_FEATURE_CHUNK   패널 지표 계산 시 한 번에 처리할 티커 수 (기본 128)
+  ALPHA_DATASET_CACHE         1이면 글로벌 학습에 디스크 데이터셋 사용 (기본 1)
+  ALPHA_DATASET_CACHE_DIR     디스크 데이터셋 위치 (기본 ~/AlphaModels/datasets)
+  ALPHA_DATASET_TICKER_CHUNK  디스크 데이터셋 구축 시 한 번에 읽을 티커 수 (기본 256)
+  ALPHA_DATASET_CACHE_KEEP    보관할 디스크 데이터셋 수 (기본 2, 오래된 것부터 삭제)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from sklearn.preprocessing import OrdinalEncoder
+
+from .feature_engine import FEATURE_SET_VERSION, TECHNICAL_FEATURES, compute_panel_block
+
+try:  # Windows에는 resource 모듈이 없음
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+PANEL_FEATURE_CHUNK = int(os.getenv("ALPHA_PANEL_FEATURE_CHUNK", "128"))
+DATASET_CACHE_ENABLED = os.getenv("ALPHA_DATASET_CACHE", "1") == "1"
+DATASET_CACHE_DIR = os.path.expanduser(
+    os.getenv("ALPHA_DATASET_CACHE_DIR", os.path.join("~", "AlphaModels", "datasets"))
+)
+DATASET_TICKER_CHUNK = int(os.getenv("ALPHA_DATASET_TICKER_CHUNK", "256"))
+DATASET_CACHE_KEEP = int(os.getenv("ALPHA_DATASET_CACHE_KEEP", "2"))
+
+_META_FILE = "meta.json"
+_COPY_ROWS = 1 << 16  # 디스크 행렬을 옮길 때 한 번에 다루는 행 수
+_FORMAT = 2  # 디스크 데이터셋 파일 구성 버전 (2: label_end_<h>.npy 추가)
+
+CATEGORICAL_COLUMNS = ["Sector", "Industry"]
+# 모델 입력 피처 순서 (Ticker는 학습에서 제외)
+FEATURE_COLUMNS = CATEGORICAL_COLUMNS + ["Log_MarketCap", "Beta"] + TECHNICAL_FEATURES
+
+
+def _code_dtype(n_categories: int) -> np.dtype:
+    return np.dtype(np.int16) if n_categories <= np.iinfo(np.int16).max else np.dtype(np.int32)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """프로세스 최대 RSS (MB). 측정할 수 없으면 None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # macOS는 바이트, Linux는 KB
+
+
+def _metadata_arrays(tickers: list[str], metadata: dict) -> dict:
+    """티커별 메타데이터를 범주 코드/수치 배열로 변환 (범주는 정렬된 순서).
+
+    create_global_features와 같이 sector/industry/beta가 None인 티커는 사용할 수 없다 (ok=False).
+    """
+    metas = [metadata.get(t, {}) for t in tickers]
+    out: dict = {"ok": np.ones(len(tickers), dtype=bool)}
+    for col, key in (("Sector", "sector"), ("Industry", "industry")):
+        names = [m.get(key, "Unknown") for m in metas]
+        out["ok"] &= np.array([n is not None for n in names], dtype=bool)
+        categories = sorted({n for n in names if n is not None})
+        lookup = {n: i for i, n in enumerate(categories)}
+        codes = np.array([lookup.get(n, -1) for n in names], dtype=_code_dtype(len(categories)))
+        out[col] = (codes, categories)
+    mcaps = np.array([m.get("marketCap", 0) or 0 for m in metas], dtype=np.float64)
+    out["Log_MarketCap"] = np.where(mcaps > 0, np.log1p(np.maximum(mcaps, 0)), 0.0)
+    betas = np.array(
+        [np.nan if m.get("beta", 1.0) is None else m.get("beta", 1.0) for m in metas], dtype=np.float64
+    )
+    out["ok"] &= ~np.isnan(betas)
+    out["Beta"] = betas
+    return out
+
+
+@dataclass
+class GlobalDataset:
+    X: np.ndarray
+    targets: dict[int, np.ndarray]
+    dates: np.ndarray
+    ticker_codes: np.ndarray
+    tickers: list[str]
+    categories: dict[str, list[str]]
+    feature_names: tuple[str, ...] = tuple(FEATURE_COLUMNS)
+    path: Optional[str] = None  # 디스크 데이터셋 디렉터리 (메모리 데이터셋이면 None)
+    label_ends: dict[int, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.X)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.X) == 0
+
+    @property
+    def horizons(self) -> list[int]:
+        return sorted(self.targets)
+
+    @property
+    def nbytes(self) -> int:
+        labels = sum(t.nbytes for t in self.targets.values()) + sum(e.nbytes for e in self.label_ends.values())
+        return self.X.nbytes + labels + self.dates.nbytes + self.ticker_codes.nbytes
+
+    def labeled_rows(self, target_days: int) -> Union[slice, np.ndarray]:
+        """target_days 라벨이 있는 행. 날짜순 앞부분에 모여 있으면 slice, 아니면 행 번호 배열.
+
+        티커마다 상장/수집 종료일이 다르면 라벨 없는 행이 중간에 섞이므로 보통은 행 번호 배열이다.
+        """
+        known = self.targets[target_days] >= 0
+        k = int(known.sum())
+        if known[:k].all():
+            return slice(0, k)
+        return np.flatnonzero(known)
+
+    def codes(self, column: str) -> np.ndarray:
+        """Sector/Industry 정수 코드 (X 안의 값과 같음)."""
+        j = self.feature_names.index(column)
+        return self.X[:, j].astype(_code_dtype(len(self.categories[column])))
+
+    def frame(self, rows: slice = slice(None)) -> pd.DataFrame:
+        """X[rows]를 복사 없이 감싼 DataFrame (모델 입력용, 피처 이름 포함)."""
+        return pd.DataFrame(self.X[rows], columns=list(self.feature_names), copy=False)
+
+    def split(
+        self, target_days: int, test_size: float = 0.2,
+    ) -> tuple[pd.DataFrame, pd.DataFrame, np.ndarray, np.ndarray]:
+        """target_days 라벨이 있는 행을 날짜순 앞쪽은 학습, 뒤쪽 test_size 비율은 검증으로 나눈다
+        (train_test_split(shuffle=False)와 같은 크기)."""
+        X, y, _ = self.labeled(target_days)
+        n_test = math.ceil(len(y) * test_size)
+        cut = len(y) - n_test
+        frame = lambda part: pd.DataFrame(X[part], columns=list(self.feature_names), copy=False)
+        return frame(slice(None, cut)), frame(slice(cut, None)), y[:cut], y[cut:]
+
+    def split_multi(
+        self, horizons: Sequence[int], test_size: float = 0.2,
+    ) -> tuple[pd.DataFrame, pd.DataFrame, np.ndarray, np.ndarray]:
+        """labeled_multi 행을 날짜순 앞쪽 학습 / 뒤쪽 test_size 비율 검증으로 나눈다 (다중 호라이즌 모델용).
+
+        같은 날짜는 한쪽에만 두고, 학습 행 중 라벨 종료일이 검증 시작일 이후인 호라이즌은 Y를 -1로
+        바꾼다 (라벨이 검증 구간의 봉을 보는 행을 퍼지, walk_forward와 같은 규칙).
+        """
+        X, Y, dates = self.labeled_multi(horizons)
+        rows = self.labeled_rows(min(horizons))
+        test_start = dates[len(Y) - math.ceil(len(Y) * test_size)]
+        cut = int(np.searchsorted(dates, test_start))
+        ends = np.column_stack([self.label_ends[h][rows][:cut] for h in horizons])
+        Y_train = np.where(ends < test_start, Y[:cut], -1)
+        frame = lambda part: pd.DataFrame(X[part], columns=list(self.feature_names), copy=False)
+        return frame(slice(None, cut)), frame(slice(cut, None)), Y_train, Y[cut:]
+
+    def labeled(self, target_days: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """target_days 라벨이 있는 행의 (X, y, dates).
+
+        labeled_rows가 slice면 뷰, 행 번호 배열이면 사본이다 (X는 _labeled_matrix 참고).
+        """
+        rows = self.labeled_rows(target_days)
+        X = self.X[rows] if isinstance(rows, slice) else self._labeled_matrix(target_days, rows)
+        return X, self.targets[target_days][rows], self.dates[rows]
+
+    def labeled_ends(self, target_days: int) -> np.ndarray:
+        """labeled(target_days) 행 순서의 라벨 종료 날짜 (라벨이 보는 미래 봉의 날짜)."""
+        return self.label_ends[target_days][self.labeled_rows(target_days)]
+
+    def labeled_multi(self, horizons: Sequence[int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """어느 호라이즌이든 라벨이 있는 행의 (X, Y, dates). Y는 (행 × 호라이즌) int8 (다중 출력 모델용)이고,
+        그 행에 라벨이 없는 호라이즌은 -1이다 (호라이즌별 무시 마스크).
+        미래 봉이 있으면 더 짧은 호라이즌의 미래 봉도 있으므로 가장 짧은 호라이즌의 라벨 행과 같다."""
+        shortest = min(horizons)
+        rows = self.labeled_rows(shortest)
+        X, _, dates = self.labeled(shortest)
+        Y = np.column_stack([self.targets[h][rows] for h in horizons])
+        return X, Y, dates
+
+    def _labeled_matrix(self, target_days: int, rows: np.ndarray) -> np.ndarray:
+        """라벨 있는 행만 모은 X. 디스크 데이터셋이면 같은 디렉터리에 묶음 단위로 복사해 두고 재사용한다."""
+        if self.path is None:
+            return self.X[rows]
+        file = os.path.join(self.path, f"X_labeled_{target_days}.npy")
+        if not os.path.exists(file):
+            tmp = file + ".tmp"
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=self.X.dtype, shape=(len(rows), self.X.shape[1]))
+            for lo in range(0, len(rows), _COPY_ROWS):
+                out[lo:lo + _COPY_ROWS] = self.X[rows[lo:lo + _COPY_ROWS]]
+            out.flush()
+            del out
+            os.replace(tmp, file)
+        return np.load(file, mmap_mode="c")
+
+    def encoder(self) -> OrdinalEncoder:
+        """예측 시 Sector/Industry 문자열을 X와 같은 코드로 바꾸는 인코더 (모델과 함께 저장)."""
+        from sklearn.preprocessing import OrdinalEncoder  # 학습 시에만 필요 (서빙은 sklearn 없이 import)
+
+        encoder = OrdinalEncoder(
+            categories=[self.categories[c] for c in CATEGORICAL_COLUMNS],
+            handle_unknown="use_encoded_value", unknown_value=-1,
+        )
+        encoder.fit(pd.DataFrame([[self.categories[c][0] for c in CATEGORICAL_COLUMNS]], columns=CATEGORICAL_COLUMNS))
+        return encoder
+
+    def to_frame(self) -> pd.DataFrame:
+        """디버깅/분석용 DataFrame (Date 인덱스, Ticker/Sector/Industry는 Categorical)."""
+        df = self.frame()
+        df.index = pd.DatetimeIndex(self.dates, name="Date")
+        for col in CATEGORICAL_COLUMNS:
+            df[col] = pd.Categorical.from_codes(self.codes(col), categories=self.categories[col])
+        df.insert(0, "Ticker", pd.Categorical.from_codes(self.ticker_codes, categories=self.tickers))
+        return df
+
+    def memory_report(self) -> dict:
+        return {
+            "rows": len(self),
+            "dataset_mb": round(self.nbytes / 1e6, 2),
+            "storage": "memory" if self.path is None else "memmap",
+            "peak_rss_mb": None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+        }
+
+
+def _panel_parts(panel, meta: dict, horizons: list[int], min_bars: int, offset: int = 0):
+    """패널을 PANEL_FEATURE_CHUNK개 티커씩 계산해
+    (지표 블록, 티커 코드, 날짜, {h: 라벨}, {h: 라벨 종료 날짜}) 조각을 낸다.
+
+    meta는 전체 티커 기준 _metadata_arrays 결과이고, 패널의 j번째 열은 전체 티커 중 offset+j번째다.
+    조각 안의 행은 compute_panel_block과 같은 티커 → 봉 순서다.
+    """
+    dates = panel.dates
+    close = panel.values["Close"]
+    ok = meta["ok"][offset:offset + len(panel.tickers)]
+    eligible = np.flatnonzero(((~np.isnat(dates)).sum(axis=0) >= min_bars) & ok)
+
+    def shifted(values, h, fill):
+        future = np.full(values.shape, fill, dtype=values.dtype)
+        if h < len(values):
+            future[:len(values) - h] = values[h:]
+        return future
+
+    # 가장 짧은 호라이즌의 미래 봉이 있는 행까지 포함 (더 긴 호라이즌은 -1 라벨)
+    futures = {h: shifted(close, h, np.nan) for h in horizons}
+    nearest = futures[horizons[0]]
+
+    for lo in range(0, len(eligible), PANEL_FEATURE_CHUNK):
+        cols = eligible[lo:lo + PANEL_FEATURE_CHUNK]
+        sub_dates = dates[:, cols]
+        present = ~np.isnat(sub_dates) & ~np.isnan(nearest[:, cols])
+        block = compute_panel_block(
+            {k: v[:, cols] for k, v in panel.values.items()}, sub_dates, TECHNICAL_FEATURES, mask=present
+        )
+        valid = ~np.isnan(block).any(axis=1)
+        cells = present.T
+        labels = {h: _labels(f[:, cols], close[:, cols]).T[cells][valid] for h, f in futures.items()}
+        ends = {}
+        for h, y in labels.items():
+            end = shifted(sub_dates, h, np.datetime64("NaT")).T[cells][valid]
+            end[y < 0] = np.datetime64("NaT")
+            ends[h] = end
+        yield (
+            block[valid],
+            offset + np.broadcast_to(cols[:, None], cells.shape)[cells][valid],
+            sub_dates.T[cells][valid],
+            labels,
+            ends,
+        )
+
+
+def _fill_rows(X: np.ndarray, rows, block: np.ndarray, codes: np.ndarray, meta: dict) -> None:
+    """X[rows]에 메타데이터 열과 지표 블록을 채운다 (FEATURE_COLUMNS 순서)."""
+    n_meta = len(FEATURE_COLUMNS) - len(TECHNICAL_FEATURES)
+    X[rows, 0] = meta["Sector"][0][codes]
+    X[rows, 1] = meta["Industry"][0][codes]
+    X[rows, 2] = meta["Log_MarketCap"][codes]
+    X[rows, 3] = meta["Beta"][codes]
+    X[rows, n_meta:] = block
+
+
+def _horizons(target_days: Union[int, Sequence[int]]) -> list[int]:
+    return sorted({int(target_days)} if np.isscalar(target_days) else {int(h) for h in target_days})
+
+
+def build_panel_dataset(
+    panel, metadata: dict, target_days: Union[int, Sequence[int]] = 7, min_bars: int = 50,
+) -> GlobalDataset:
+    """(봉 × 티커) 패널(load_panel(layout="bars"))에서 글로벌 학습 데이터셋을 한 번에 만든다.
+
+    지표는 PANEL_FEATURE_CHUNK개 티커씩 NumPy 커널로 계산한다. target_days에 여러 호라이즌을 주면
+    피처는 한 번만 계산하고 호라이즌별 라벨 벡터만 따로 만든다. 호라이즌 h의 라벨이 있는 행과 값은
+    티커별 create_global_features_and_target(target_days=h) 결과를 이어 붙인 것과 같고 (봉이 min_bars개
+    미만인 티커는 제외), 순서만 날짜순(같은 날짜는 티커 순)으로 정렬되어 있다.
+    """
+    horizons = _horizons(target_days)
+    tickers = list(panel.tickers)
+    meta = _metadata_arrays(tickers, metadata)
+    parts = list(_panel_parts(panel, meta, horizons, min_bars))
+
+    n = sum(len(p[1]) for p in parts)
+    stamps = np.concatenate([p[2] for p in parts]) if parts else np.empty(0, dtype="datetime64[ns]")
+    order = np.argsort(stamps, kind="stable")
+    dest = np.empty(n, dtype=np.int64)
+    dest[order] = np.arange(n)  # 조각 행 → 정렬 후 위치
+
+    X = np.empty((n, len(FEATURE_COLUMNS)), dtype=np.float32)
+    targets = {h: np.empty(n, dtype=np.int8) for h in horizons}
+    label_ends = {h: np.empty(n, dtype="datetime64[ns]") for h in horizons}
+    ticker_codes = np.empty(n, dtype=_code_dtype(len(tickers)))
+    offset = 0
+    while parts:
+        block, codes, _, labels, ends = parts.pop(0)  # 옮긴 조각은 바로 해제
+        rows = dest[offset:offset + len(codes)]
+        offset += len(codes)
+        _fill_rows(X, rows, block, codes, meta)
+        for h in horizons:
+            targets[h][rows] = labels[h]
+            label_ends[h][rows] = ends[h]
+        ticker_codes[rows] = codes
+
+    return GlobalDataset(
+        X=X,
+        targets=targets,
+        dates=stamps[order],
+        ticker_codes=ticker_codes,
+        tickers=tickers,
+        categories={col: meta[col][1] for col in CATEGORICAL_COLUMNS},
+        label_ends=label_ends,
+    )
+
+
+def _labels(future: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """상승 1 / 하락·보합 0 / 미래 봉 없음 -1 (int8)."""
+    return np.where(np.isnan(future), -1, future > close).astype(np.int8)
+
+
+# ---------- 디스크 데이터셋 ----------
+def dataset_key(tickers: Sequence[str], metadata: dict, horizons: Sequence[int], min_bars: int,
+                watermarks: Optional[dict] = None) -> str:
+    """데이터셋 입력의 키. 티커/메타데이터/호라이즌/피처 버전/티커별 마지막 봉 시각이 같으면 같다."""
+    payload = {
+        "format": _FORMAT,
+        "feature_set_version": FEATURE_SET_VERSION,
+        "features": FEATURE_COLUMNS,
+        "tickers": list(tickers),
+        "horizons": sorted(int(h) for h in horizons),
+        "min_bars": min_bars,
+        "metadata": {t: metadata.get(t) for t in tickers},
+        "watermarks": None if watermarks is None else {t: str(watermarks.get(t)) for t in tickers},
+    }
+    text = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode(), digest_size=10).hexdigest()
+
+
+def open_dataset(path: str) -> GlobalDataset:
+    """build_cached_dataset이 쓴 디렉터리를 memmap으로 연다.
+
+    copy-on-write("c")로 열어 파일은 바뀌지 않고, 쓰지 않는 한 페이지 캐시를 그대로 공유한다
+    (sklearn은 DataFrame 입력을 쓰기 가능 배열로 표시하려 하므로 읽기 전용 모드는 쓸 수 없다).
+    """
+    with open(os.path.join(path, _META_FILE), "r", encoding="utf-8") as f:
+        info = json.load(f)
+    load = lambda name: np.load(os.path.join(path, name), mmap_mode="c")
+    return GlobalDataset(
+        X=load("X.npy"),
+        targets={int(h): load(f"target_{h}.npy") for h in info["horizons"]},
+        dates=load("dates.npy"),
+        ticker_codes=load("ticker_codes.npy"),
+        tickers=info["tickers"],
+        categories=info["categories"],
+        feature_names=tuple(info["feature_names"]),
+        path=path,
+        label_ends={int(h): load(f"label_end_{h}.npy") for h in info["horizons"]},
+    )
+
+
+def _prune_cache(cache_dir: str, keep: int) -> None:
+    """완성된 디스크 데이터셋 중 최근 keep개만 남긴다."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        meta = os.path.join(cache_dir, name, _META_FILE)
+        if os.path.exists(meta):
+            entries.append((os.path.getmtime(meta), name))
+    for _, name in sorted(entries, reverse=True)[max(keep, 1):]:
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+def build_cached_dataset(
+    tickers: Sequence[str],
+    metadata: dict,
+    load_chunk: Callable[[list[str]], Any],
+    target_days: Union[int, Sequence[int]] = 7,
+    min_bars: int = 50,
+    watermarks: Optional[dict] = None,
+    cache_dir: Optional[str] = None,
+    ticker_chunk: Optional[int] = None,
+) -> GlobalDataset:
+    """build_panel_dataset과 같은 데이터셋을 디스크에 만들고 memmap으로 연다.
+
+    load_chunk(티커 목록)은 그 티커들의 (봉 × 티커) 패널을 입력 순서대로 돌려준다
+    (load_panel(..., layout="bars")). 티커를 ticker_chunk개씩 읽어 행을 임시 파일에 이어 쓴 뒤,
+    날짜순 위치로 묶음 단위로 옮기므로 피처 행렬 전체가 메모리에 올라오지 않는다.
+    watermarks({ticker: 마지막 봉 시각})를 주면 입력 키가 같은 기존 데이터셋을 다시 쓴다.
+    (워터마크는 새 봉만 감지하므로 과거 봉을 고친 뒤에는 ALPHA_DATASET_CACHE_DIR를 비운다.)
+    """
+    horizons = _horizons(target_days)
+    tickers = list(dict.fromkeys(tickers))
+    cache_dir = cache_dir or DATASET_CACHE_DIR
+    chunk = max(1, ticker_chunk or DATASET_TICKER_CHUNK)
+    path = os.path.join(cache_dir, dataset_key(tickers, metadata, horizons, min_bars, watermarks))
+
+    if watermarks is not None and os.path.exists(os.path.join(path, _META_FILE)):
+        try:
+            dataset = open_dataset(path)
+            print(f"디스크 데이터셋 재사용: {path} ({len(dataset):,}행)")
+            return dataset
+        except (OSError, ValueError, KeyError) as e:
+            print(f"경고: 디스크 데이터셋을 열 수 없어 다시 만듭니다 ({e})")
+
+    meta = _metadata_arrays(tickers, metadata)
+    width = len(FEATURE_COLUMNS)
+    building = path + ".building"
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+
+    # 1) 티커 묶음별로 행을 만들어 임시 파일에 이어 쓰기 (날짜/코드/라벨만 메모리에 모음)
+    spill_path = os.path.join(building, "rows.f4")
+    codes, stamps = [], []
+    labels, ends = {h: [] for h in horizons}, {h: [] for h in horizons}
+    with open(spill_path, "wb") as spill:
+        for lo in range(0, len(tickers), chunk):
+            panel = load_chunk(tickers[lo:lo + chunk])
+            for block, part_codes, part_dates, part_labels, part_ends in _panel_parts(
+                panel, meta, horizons, min_bars, lo
+            ):
+                rows = np.empty((len(part_codes), width), dtype=np.float32)
+                _fill_rows(rows, slice(None), block, part_codes, meta)
+                spill.write(rows.tobytes())
+                codes.append(part_codes)
+                stamps.append(part_dates)
+                for h in horizons:
+                    labels[h].append(part_labels[h])
+                    ends[h].append(part_ends[h])
+            del panel
+
+    # 2) 날짜순으로 정렬된 위치에 묶음 단위로 옮기기
+    codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+    stamps = np.concatenate(stamps) if stamps else np.empty(0, dtype="datetime64[ns]")
+    n = len(codes)
+    order = np.argsort(stamps, kind="stable")
+    dest = np.empty(n, dtype=np.int64)
+    dest[order] = np.arange(n)
+    X = np.lib.format.open_memmap(os.path.join(building, "X.npy"), mode="w+", dtype=np.float32, shape=(n, width))
+    if n:
+        src = np.memmap(spill_path, dtype=np.float32, mode="r", shape=(n, width))
+        for lo in range(0, n, _COPY_ROWS):
+            X[dest[lo:lo + _COPY_ROWS]] = src[lo:lo + _COPY_ROWS]
+        del src
+    X.flush()
+    del X, dest
+    os.remove(spill_path)
+
+    np.save(os.path.join(building, "dates.npy"), stamps[order])
+    np.save(os.path.join(building, "ticker_codes.npy"), codes[order].astype(_code_dtype(len(tickers))))
+    for h in horizons:
+        target = np.concatenate(labels[h])[order] if labels[h] else np.empty(0, dtype=np.int8)
+        np.save(os.path.join(building, f"target_{h}.npy"), target)
+        end = np.concatenate(ends[h])[order] if ends[h] else np.empty(0, dtype="datetime64[ns]")
+        np.save(os.path.join(building, f"label_end_{h}.npy"), end)
+    with open(os.path.join(building, _META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": _FORMAT,
+            "rows": n,
+            "horizons": horizons,
+            "min_bars": min_bars,
+            "tickers": tickers,
+            "categories": {col: meta[col][1] for col in CATEGORICAL_COLUMNS},
+            "feature_names": FEATURE_COLUMNS,
+            "feature_set_version": FEATURE_SET_VERSION,
+            "built_at": time.time(),
+        }, f, ensure_ascii=False)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(building, path)
+    _prune_cache(cache_dir, DATASET_CACHE_KEEP)
+    return open_dataset(path)
@@ -1,52 +1,39 @@
 import pandas as pd
 import numpy as np
 import os
+import functools
 import joblib
-from .data_handler import load_data, get_db_connection
+from .data_handler import get_last_timestamps, load_panel
+from .feature_engine import FEATURE_SET_VERSION, TECHNICAL_FEATURES
+from .global_dataset import DATASET_CACHE_ENABLED, build_cached_dataset, build_panel_dataset, peak_rss_mb
+from .feature_store import load_features
 from .market_features import get_ticker_metadata
 from .asset_screener import get_all_tickers
-from sklearn.model_selection import train_test_split
+from .tree_compiler import write_compiled
 
 MODELS_DIR = os.path.expanduser("~/AlphaModels")
 os.makedirs(MODELS_DIR, exist_ok=True)
 
-def create_global_features_and_target(ticker, data, metadata, target_days=7):
+# 1이면 update_all_global_models가 호라이즌별 앙상블 세 개 대신 다중 호라이즌 모델 하나를 학습하고,
+# 예측(global_model_predictor)도 그 모델 하나로 세 호라이즌 확률을 함께 계산합니다.
+GLOBAL_MULTI_HORIZON = os.getenv("ALPHA_GLOBAL_MULTI_HORIZON", "0") == "1"
+
+GLOBAL_HORIZONS = {
+    "short": 5,   # 1주일
+    "mid": 20,    # 1개월
+    "long": 60    # 1분기 (3개월)
+}
+
+GLOBAL_FEATURE_COLUMNS = ['Ticker', 'Sector', 'Industry', 'Log_MarketCap', 'Beta'] + TECHNICAL_FEATURES
+
+def create_global_features(ticker, data, metadata, background=False):
     """
-    개별 종목의 기술적 지표 + 메타데이터를 결합하여 Feature 생성.
+    개별 종목의 기술적 지표 + 메타데이터를 결합하여 Feature 생성 (학습/추론 공용).
+    지표 초기 구간 등 결측치가 있는 행도 그대로 반환합니다.
+    추론 요청 경로는 background=True로 피처 저장소 쓰기를 백그라운드로 넘깁니다.
     """
-    df = data.copy()
-    
-    # --- 기술적 지표 (Technical Indicators) ---
-    df['SMA_20'] = df['Close'].rolling(window=20).mean()
-    df['SMA_50'] = df['Close'].rolling(window=50).mean()
-    
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI_14'] = 100 - (100 / (1 + rs))
-    df['Volatility'] = df['Close'].rolling(window=20).std()
-    
-    df['EMA_12'] = df['Close'].ewm(span=12, adjust=False).mean()
-    df['EMA_26'] = df['Close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = df['EMA_12'] - df['EMA_26']
-    
-    df['ROC'] = df['Close'].pct_change(periods=10) * 100
-    df['Return_5d'] = df['Close'].pct_change(5)
-    
-    # 분모가 0이 되는 것을 방지
-    sma_20_safe = df['SMA_20'].replace(0, np.nan)
-    df['BB_Width'] = (df['Volatility'] * 4) / sma_20_safe
-    
-    df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
-    vol_sma_safe = df['Volume_SMA'].replace(0, np.nan)
-    df['Volume_Ratio'] = df['Volume'] / vol_sma_safe
-    
-    low_safe = df['Low'].replace(0, np.nan)
-    df['High_Low_Ratio'] = df['High'] / low_safe
-    
-    df['DayOfWeek'] = df.index.dayofweek
-    df['Month'] = df.index.month
+    # --- 기술적 지표 (Technical Indicators): 종목별 모델과 같은 피처 저장소/엔진 ---
+    df = load_features(ticker, data, TECHNICAL_FEATURES, background=background)
     
     # --- 메타데이터 지표 (Metadata Indicators) ---
     meta = metadata.get(ticker, {})
@@ -59,165 +46,174 @@ def create_global_features_and_target(ticker, data, metadata, target_days=7):
     
     # 티커 문자열 보존 (디버깅/조회용)
     df['Ticker'] = ticker
+    return df[GLOBAL_FEATURE_COLUMNS]
+
+def create_global_features_and_target(ticker, data, metadata, target_days=7):
+    """
+    학습용 Feature와 target_days 뒤 상승 여부 Target을 생성합니다.
+    """
+    df = create_global_features(ticker, data, metadata)
     
     # --- 목표 변수 (Target) 생성 ---
-    df['future_price'] = df['Close'].shift(-target_days)
-    df['target'] = (df['future_price'] > df['Close']).astype(int)
-    
-    # 결측치 제거
-    df = df.dropna()
-    
-    feature_columns = [
-        'Ticker', 'Sector', 'Industry', 'Log_MarketCap', 'Beta',
-        'SMA_20', 'SMA_50', 'RSI_14', 'Volatility',
-        'EMA_12', 'MACD', 'ROC', 'Return_5d', 'BB_Width',
-        'Volume_Ratio', 'High_Low_Ratio', 'DayOfWeek', 'Month'
-    ]
+    future_price = data['Close'].shift(-target_days)
+    target = (future_price > data['Close']).astype(int)
     
-    return df[feature_columns], df['target']
+    # 결측치 제거 (지표 초기 구간 + 미래 가격이 없는 마지막 구간)
+    valid = df.notna().all(axis=1) & future_price.notna()
+    return df[valid], target[valid]
 
 def build_global_dataset(tickers, target_days=7):
-    """모든 티커의 데이터를 모아 하나의 거대한 데이터셋을 생성합니다."""
-    print(f"[{target_days}일 모델] 글로벌 데이터셋 구축 중... (대상: {len(tickers)}개 종목)")
+    """모든 티커의 데이터를 모아 하나의 글로벌 학습 데이터셋(GlobalDataset)을 생성합니다.
+    target_days에 여러 호라이즌(예: [5, 20, 60])을 주면 피처는 한 번만 만들고 라벨만 호라이즌별로 붙입니다.
+    ALPHA_DATASET_CACHE=1(기본)이면 티커 묶음 단위로 디스크(memmap)에 만들고, 시세 워터마크가 같으면 재사용합니다."""
+    horizons = [target_days] if np.isscalar(target_days) else list(target_days)
+    label = "/".join(f"{d}일" for d in horizons)
+    print(f"[{label} 모델] 글로벌 데이터셋 구축 중... (대상: {len(tickers)}개 종목)")
     
     # 메타데이터 한 번에 로드
     metadata = get_ticker_metadata(tickers)
     
-    all_features = []
-    all_targets = []
-    
-    # QuestDB 연결 공유로 네트워크 오버헤드 감소
-    conn = get_db_connection()
-    
-    success_count = 0
-    for i, ticker in enumerate(tickers):
-        if i % 50 == 0 and i > 0:
-            print(f"데이터셋 처리 진행률: {i}/{len(tickers)}")
-            
-        data = load_data(ticker, conn=conn)
-        if data is None or data.empty or len(data) < 50:
-            continue
-            
-        features, target = create_global_features_and_target(data=data, ticker=ticker, metadata=metadata, target_days=target_days)
-        
-        if not features.empty:
-            all_features.append(features)
-            all_targets.append(target)
-            success_count += 1
-            
-    conn.close()
+    if DATASET_CACHE_ENABLED:
+        # 티커 묶음마다 (봉 × 티커) 패널을 읽어 디스크에 쓰므로 메모리는 묶음 크기만큼만 사용합니다.
+        dataset = build_cached_dataset(
+            tickers, metadata, lambda chunk: load_panel(chunk, layout="bars"),
+            target_days=target_days, watermarks=get_last_timestamps(tickers),
+        )
+    else:
+        # 티커별 조회/계산 대신 (봉 × 티커) 패널 한 번으로 전체 시세를 읽고 지표도 패널 단위로 계산합니다.
+        panel = load_panel(tickers, layout="bars")
+        dataset = build_panel_dataset(panel, metadata, target_days=target_days)
+        del panel
     
-    if not all_features:
+    if dataset.empty:
         print("오류: 글로벌 데이터셋 생성 실패 (사용 가능한 데이터 없음)")
-        return pd.DataFrame(), pd.Series()
-        
-    global_X = pd.concat(all_features)
-    global_y = pd.concat(all_targets)
+        return dataset
     
-    print(f"[{target_days}일 모델] 데이터셋 구축 완료! 총 {success_count}개 종목, {len(global_X):,}개 데이터 포인트 확보.")
-    return global_X, global_y
+    success_count = len(np.unique(dataset.ticker_codes))
+    print(f"[{label} 모델] 데이터셋 구축 완료! 총 {success_count}개 종목, {len(dataset):,}개 데이터 포인트 확보.")
+    return dataset
 
 
-from sklearn.ensemble import VotingClassifier, RandomForestClassifier
-from sklearn.metrics import accuracy_score
-from sklearn.preprocessing import OrdinalEncoder
+# sklearn/xgboost/lightgbm은 학습 함수 안에서 import한다. 예측(global_model_predictor)은 이 모듈의
+# 피처 정의만 쓰고 컴파일본으로 추론하므로, 서빙 프로세스가 학습 라이브러리를 불러오지 않는다.
+@functools.lru_cache(maxsize=None)
+def _boosters():
+    """(xgboost, lightgbm) 모듈. 네이티브 라이브러리가 번들되지 않은 환경(예: PyInstaller dist)에서는 None."""
+    try:
+        import xgboost as xgb
+    except Exception as e:  # pragma: no cover
+        xgb = None
+        print(f"⚠️ xgboost 사용 불가 (앙상블 학습 시 폴백): {e}")
+    try:
+        import lightgbm as lgb
+    except Exception as e:  # pragma: no cover
+        lgb = None
+        print(f"⚠️ lightgbm 사용 불가 (앙상블 학습 시 폴백): {e}")
+    return xgb, lgb
 
-# 선택적 의존성: xgboost/lightgbm 네이티브 라이브러리가 번들되지 않은 환경(예: PyInstaller dist)에서도
-# 서버 부팅 자체는 가능하도록 lazy + 안전 처리.
-try:
-    import xgboost as xgb
-except Exception as _xgb_err:  # pragma: no cover
-    xgb = None
-    print(f"⚠️ xgboost 사용 불가 (앙상블 학습 시 폴백): {_xgb_err}")
-try:
-    import lightgbm as lgb
-except Exception as _lgb_err:  # pragma: no cover
-    lgb = None
-    print(f"⚠️ lightgbm 사용 불가 (앙상블 학습 시 폴백): {_lgb_err}")
+GLOBAL_RF_PARAMS = {'n_estimators': 100, 'max_depth': 10, 'min_samples_split': 10, 'random_state': 42}
 
-def train_global_model(horizon_name="short", target_days=7):
-    """
-    모든 종목의 데이터를 사용하여 단일 글로벌 모델을 학습합니다.
-    horizon_name: "short", "mid", "long" 중 하나
-    """
-    print(f"========== 글로벌 앙상블 모델 학습 시작 ({horizon_name}, {target_days}일 예측) ==========")
-    tickers = get_all_tickers()
-    
-    # 1. 통합 데이터셋 구축
-    X, y = build_global_dataset(tickers, target_days=target_days)
-    
-    if X.empty:
-        print("학습 중단: 데이터셋을 구축하지 못했습니다.")
-        return None
-        
-    # Ticker는 피처에서 제외 (메타데이터로 충분히 설명됨), 하지만 나중에 분석을 위해 따로 빼둠
-    X_features = X.drop(columns=['Ticker'])
-    
-    # 2. 카테고리형 변수 인코딩 (Sector, Industry)
-    # LightGBM과 XGBoost는 자체적으로 카테고리를 지원하지만, Scikit-learn의 VotingClassifier와 
-    # 호환성을 위해 숫자로 인코딩 (Ordinal Encoding)
-    print("카테고리 변수 인코딩 중...")
-    cat_cols = ['Sector', 'Industry']
-    encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
-    X_features[cat_cols] = encoder.fit_transform(X_features[cat_cols])
-    
-    # 3. 데이터 분할 (시계열 특성을 고려하여 Shuffle=False 유지)
-    # Global 모델에서는 단순 split보다 TimeSeriesSplit이 좋지만, 
-    # 일단 기존 로직과 동일하게 유지하되, 모든 티커가 섞이지 않도록 주의 (날짜별 정렬 후 split 권장)
-    # 여기서는 DataFrame 인덱스가 날짜이므로 날짜순 정렬 후 split
-    
-    # 인덱스(날짜)에 중복이 있으므로(여러 종목이 같은 날짜를 가짐), reindex 대신 sort_index를 양쪽에 동일하게 적용
-    # 먼저 인덱스를 초기화하여 정렬 후 순서가 맞도록 유지
-    X_features = X_features.reset_index()
-    y = y.reset_index(drop=True)
-    
-    # 날짜(Date) 기준으로 정렬
-    X_features_sorted = X_features.sort_values(by='Date')
-    y_sorted = y.iloc[X_features_sorted.index]
-    
-    # Date를 다시 인덱스로 세팅 (선택사항이지만 모델 훈련에서는 필요 없음, 드롭)
-    X_features_sorted = X_features_sorted.drop(columns=['Date'])
-    
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_features_sorted, y_sorted, test_size=0.2, random_state=42, shuffle=False
-    )
-    
-    print(f"학습 데이터: {len(X_train):,} 건, 테스트 데이터: {len(X_test):,} 건")
-    
-    # 4. 모델 앙상블 구축
+def make_global_ensemble(n_jobs=-1, lgb_dataset_file=None):
+    """글로벌 모델 앙상블 (RandomForest + XGBoost + LightGBM, soft voting).
+    XGBoost/LightGBM은 requirements.txt의 필수 의존성이며, import에 실패한 환경에서만 빠진다.
+    n_jobs: 개별 모델의 학습 스레드 수 (walk_forward 폴드 병렬 실행 시 폴드당 스레드 예산)
+    lgb_dataset_file: 주면 LightGBM은 fit의 X 대신 이 lgb.Dataset 바이너리로 학습한다 (fit_global_ensemble)"""
+    from sklearn.ensemble import VotingClassifier, RandomForestClassifier
+
+    xgb, lgb = _boosters()
     estimators = []
     
     # RandomForest
-    rf = RandomForestClassifier(
-        n_estimators=100, max_depth=10, min_samples_split=10, random_state=42, n_jobs=-1
-    )
+    rf = RandomForestClassifier(**GLOBAL_RF_PARAMS, n_jobs=n_jobs)
     estimators.append(('rf', rf))
     
-    # XGBoost (선택적)
+    # XGBoost (import 실패 시 제외)
     if xgb is not None:
         xgb_model = xgb.XGBClassifier(
-            n_estimators=100, max_depth=6, learning_rate=0.05, random_state=42, n_jobs=-1,
+            n_estimators=100, max_depth=6, learning_rate=0.05, random_state=42, n_jobs=n_jobs,
             eval_metric='logloss'
         )
         estimators.append(('xgb', xgb_model))
 
-    # LightGBM (선택적)
-    if lgb is not None:
+    # LightGBM (import 실패 시 제외)
+    if lgb is not None and lgb_dataset_file is not None:
+        from .disk_training import LGBMBoosterClassifier
+
+        estimators.append(('lgbm', LGBMBoosterClassifier(dataset_file=lgb_dataset_file, n_jobs=n_jobs)))
+    elif lgb is not None:
         lgbm_model = lgb.LGBMClassifier(
-            n_estimators=100, max_depth=6, learning_rate=0.05, random_state=42, n_jobs=-1,
+            n_estimators=100, max_depth=6, learning_rate=0.05, random_state=42, n_jobs=n_jobs,
             verbose=-1
         )
         estimators.append(('lgbm', lgbm_model))
     
-    # 앙상블 학습
+    # 개별 모델이 이미 n_jobs 스레드를 쓰므로 VotingClassifier는 차례로 학습 (중첩 병렬 방지)
+    return VotingClassifier(estimators=estimators, voting='soft')
+
+def fit_global_ensemble(dataset, target_days, test_size=0.2, n_jobs=-1, max_rows=None):
+    """dataset의 target_days 라벨로 앙상블을 학습해 (앙상블, X_test, y_test)를 반환합니다.
+    날짜순 앞쪽은 학습, 뒤쪽 test_size 비율은 검증입니다 (dataset.split).
+    디스크 데이터셋이면 X를 통째로 메모리에 올리지 않습니다: RandomForest/XGBoost는 학습 구간에서 뽑은
+    최대 max_rows(기본 ALPHA_GLOBAL_TRAIN_MAX_ROWS)행 표본으로, LightGBM은 디스크에서 묶음 단위로 만든
+    lgb.Dataset 바이너리(학습 행 전체)로 학습합니다 (disk_training). 메모리 데이터셋은 학습 구간 전체를 씁니다."""
+    X_train, X_test, y_train, y_test = dataset.split(target_days, test_size=test_size)
+    if dataset.path is None:
+        return make_global_ensemble(n_jobs).fit(X_train, y_train), X_test, y_test
+
+    from .disk_training import GLOBAL_TRAIN_MAX_ROWS, lgb_dataset_file, sample_rows
+
+    X = X_train.to_numpy()  # memmap 뷰 (복사 없음)
+    lgb_file = None
+    if _boosters()[1] is not None:
+        lgb_file = lgb_dataset_file(dataset.path, target_days, X, y_train, dataset.feature_names)
+    rows = sample_rows(len(y_train), GLOBAL_TRAIN_MAX_ROWS if max_rows is None else max_rows)
+    if not isinstance(rows, slice):
+        print(f"RandomForest/XGBoost 학습 행: {len(rows):,} / {len(y_train):,} (무작위 표본)")
+    X_fit = pd.DataFrame(X[rows], columns=list(dataset.feature_names), copy=False)
+    ensemble = make_global_ensemble(n_jobs, lgb_dataset_file=lgb_file)
+    return ensemble.fit(X_fit, y_train[rows]), X_test, y_test
+
+def train_global_model(horizon_name="short", target_days=7, dataset=None, rss_before=None):
+    """
+    모든 종목의 데이터를 사용하여 단일 글로벌 모델을 학습합니다.
+    horizon_name: "short", "mid", "long" 중 하나
+    dataset: target_days 라벨이 들어있는 GlobalDataset (update_all_global_models에서 공유). 없으면 새로 구축
+    rss_before: 데이터셋 구축 전에 잰 최대 RSS(MB). 공유 데이터셋을 넘길 때 함께 넘긴다
+    """
+    print(f"========== 글로벌 앙상블 모델 학습 시작 ({horizon_name}, {target_days}일 예측) ==========")
+    
+    # 1. 통합 데이터셋 구축 (날짜순 정렬된 float32 행렬 + int8 타깃, 범주는 정수 코드)
+    if rss_before is None:
+        rss_before = peak_rss_mb()
+    rss_before = None if rss_before is None else round(rss_before, 1)
+    if dataset is None:
+        dataset = build_global_dataset(get_all_tickers(), target_days=target_days)
+    
+    if dataset.empty or target_days not in dataset.targets:
+        print("학습 중단: 데이터셋을 구축하지 못했습니다.")
+        return None
+    
+    # 2. 카테고리형 변수 (Sector, Industry)는 이미 정수 코드로 들어있음.
+    # 예측 시 문자열을 같은 코드로 바꿀 수 있도록 같은 범주 순서의 인코더를 함께 저장
+    cat_cols = ['Sector', 'Industry']
+    encoder = dataset.encoder()
+    
+    # 3. 데이터 분할 (시계열 특성을 고려하여 날짜순 앞 80% 학습 / 뒤 20% 검증, 라벨 행 사본을 나눈 뷰)
+    # 4. 모델 앙상블 구축 (디스크 데이터셋이면 X를 통째로 올리지 않고 학습, fit_global_ensemble 참고)
+    from sklearn.metrics import accuracy_score
+    from .disk_training import predict_chunked
+
     print("모델 학습 중... (시간이 다소 소요될 수 있습니다)")
-    ensemble = VotingClassifier(estimators=estimators, voting='soft', n_jobs=-1)
-    ensemble.fit(X_train, y_train)
+    ensemble, X_test, y_test = fit_global_ensemble(dataset, target_days, test_size=0.2)
+    n_train = int((dataset.targets[target_days] >= 0).sum()) - len(X_test)
+    print(f"학습 데이터: {n_train:,} 건, 테스트 데이터: {len(X_test):,} 건")
     
     # 5. 평가
-    predictions = ensemble.predict(X_test)
+    predictions = predict_chunked(ensemble, X_test)
     accuracy = accuracy_score(y_test, predictions)
     print(f"[{horizon_name}] 글로벌 모델 테스트 정확도: {accuracy:.2%}")
+    report = dataset.memory_report()
+    print(f"메모리: 데이터셋 {report['dataset_mb']} MB ({report['storage']}), 최대 RSS {rss_before} MB (구축 전) → {report['peak_rss_mb']} MB (학습 후)")
     
     # 6. 저장
     model_path = os.path.join(MODELS_DIR, f"global_{horizon_name}_model.joblib")
@@ -225,28 +221,112 @@ def train_global_model(horizon_name="short", target_days=7):
     # 저장할 때 인코더도 같이 저장해야 나중에 예측할 때 새로운 데이터 변환 가능
     joblib.dump({
         'model': ensemble,
-        'features': list(X_features.columns),
+        'features': list(dataset.feature_names),
         'encoder': encoder,
         'cat_cols': cat_cols,
-        'target_days': target_days
+        'target_days': target_days,
+        'feature_set_version': FEATURE_SET_VERSION,
     }, model_path)
+    # 서빙용 컴파일본: 인코더 대신 범주 목록을 저장 (예측 시 sklearn 불필요)
+    write_compiled(model_path, ensemble, list(dataset.feature_names), {
+        'cat_cols': cat_cols,
+        'categories': [list(c) for c in encoder.categories_],
+        'target_days': target_days,
+        'feature_set_version': FEATURE_SET_VERSION,
+    })
     
     print(f"모델 저장 완료: {model_path}")
     print("=" * 60)
     
     return accuracy
 
-def update_all_global_models():
-    """단기, 중기, 장기 글로벌 모델을 모두 학습합니다."""
-    horizons = {
-        "short": 5,   # 1주일
-        "mid": 20,    # 1개월
-        "long": 60    # 1분기 (3개월)
+def make_multi_horizon_forest(n_jobs=-1):
+    """여러 호라이즌 라벨을 한 번에 학습하는 다중 출력 RandomForest.
+    트리 구조(분할)는 모든 호라이즌이 공유하고 리프마다 호라이즌별 상승 비율을 가지므로,
+    predict_proba 한 번으로 호라이즌 수만큼의 확률을 얻습니다. 하이퍼파라미터는 앙상블의 RF와 같습니다."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    return RandomForestClassifier(**GLOBAL_RF_PARAMS, n_jobs=n_jobs)
+
+def fit_multi_horizon_forest(X, Y, n_jobs=-1):
+    """다중 호라이즌 포레스트 학습. Y는 (행 × 호라이즌) 라벨이고 -1은 그 호라이즌 라벨이 없는 행입니다.
+    sklearn 분할 기준에는 출력별 마스크가 없으므로 모든 호라이즌 라벨이 있는 행(가장 긴 호라이즌의
+    라벨 행)만으로 학습합니다. 긴 호라이즌 라벨이 아직 없는 최근 행은 짧은 호라이즌에도 쓰지 않습니다."""
+    Y = np.asarray(Y)
+    known = (Y >= 0).all(axis=1)
+    model = make_multi_horizon_forest(n_jobs=n_jobs)
+    model.fit(X[known], Y[known])
+    return model
+
+def train_multi_horizon_model(horizons=None, dataset=None):
+    """
+    세 호라이즌 글로벌 모델 대신 다중 호라이즌 모델 하나를 학습해 global_multi_model.joblib에 저장합니다.
+    horizons: {이름: target_days} (기본 GLOBAL_HORIZONS). 학습은 모든 호라이즌 라벨이 있는 행으로 하고
+    (fit_multi_horizon_forest), 평가는 호라이즌마다 그 라벨이 있는 검증 행으로 합니다.
+    반환: {이름: 테스트 정확도}
+    """
+    horizons = dict(horizons or GLOBAL_HORIZONS)
+    names, days = list(horizons), list(horizons.values())
+    print(f"========== 다중 호라이즌 글로벌 모델 학습 시작 ({', '.join(f'{n} {d}일' for n, d in horizons.items())}) ==========")
+    if dataset is None:
+        dataset = build_global_dataset(get_all_tickers(), target_days=days)
+    if dataset.empty or any(d not in dataset.targets for d in days):
+        print("학습 중단: 데이터셋을 구축하지 못했습니다.")
+        return None
+
+    cat_cols = ['Sector', 'Industry']
+    encoder = dataset.encoder()
+
+    # 날짜순 앞 80% 학습 / 뒤 20% 검증 (라벨이 없거나 라벨 종료일이 검증 구간인 호라이즌은 Y가 -1)
+    X_train, X_test, Y_train, Y_test = dataset.split_multi(days, test_size=0.2)
+    print(f"학습 데이터: {len(X_train):,} 건, 테스트 데이터: {len(X_test):,} 건")
+
+    from sklearn.metrics import accuracy_score
+
+    model = fit_multi_horizon_forest(X_train, Y_train)
+
+    predictions = model.predict(X_test)
+    results = {}
+    for k, name in enumerate(names):
+        known = Y_test[:, k] >= 0
+        results[name] = accuracy_score(Y_test[known, k], predictions[known, k])
+        print(f"[{name}] 다중 호라이즌 모델 테스트 정확도: {results[name]:.2%}")
+
+    model_path = os.path.join(MODELS_DIR, "global_multi_model.joblib")
+    meta = {
+        'cat_cols': cat_cols,
+        'horizons': names,
+        'target_days': days,
+        'feature_set_version': FEATURE_SET_VERSION,
+        'type': 'multi_horizon',
     }
+    joblib.dump({'model': model, 'features': list(dataset.feature_names), 'encoder': encoder, **meta}, model_path)
+    write_compiled(model_path, model, list(dataset.feature_names), {
+        **meta, 'categories': [list(c) for c in encoder.categories_],
+    })
+    print(f"모델 저장 완료: {model_path}")
+    print("=" * 60)
+    return results
+
+def update_all_global_models():
+    """단기, 중기, 장기 글로벌 모델을 모두 학습합니다.
+    ALPHA_GLOBAL_MULTI_HORIZON=1이면 세 앙상블 대신 다중 호라이즌 모델 하나를 학습합니다."""
+    horizons = GLOBAL_HORIZONS
+    
+    # 피처/메타데이터/시세 로드는 한 번만 하고, 세 모델은 호라이즌별 라벨 벡터만 바꿔 학습
+    rss_before = peak_rss_mb()
+    dataset = build_global_dataset(get_all_tickers(), target_days=list(horizons.values()))
+    
+    if GLOBAL_MULTI_HORIZON:
+        results = train_multi_horizon_model(horizons, dataset=dataset) or {}
+        print("\n✅ 다중 호라이즌 글로벌 모델 학습 최종 결과:")
+        for name, acc in results.items():
+            print(f"- {name.capitalize()} (Target {horizons[name]}d): {acc:.2%}")
+        return results
     
     results = {}
     for name, days in horizons.items():
-        acc = train_global_model(horizon_name=name, target_days=days)
+        acc = train_global_model(horizon_name=name, target_days=days, dataset=dataset, rss_before=rss_before)
         if acc:
             results[name] = acc
             
@@ -1,42 +1,84 @@
 import pandas as pd
 import numpy as np
+import datetime
 import os
-import joblib
-from .data_handler import load_data
+from .data_handler import load_panel
+from .feature_store import load_recent
 from .market_features import get_ticker_metadata
-from .global_model_handler import create_global_features_and_target
+from .feature_engine import TECHNICAL_FEATURES, check_feature_version, compute_panel_block
+from .global_model_handler import GLOBAL_FEATURE_COLUMNS, GLOBAL_HORIZONS, GLOBAL_MULTI_HORIZON, create_global_features
+from .model_registry import load_predictor
 
 MODELS_DIR = os.path.expanduser("~/AlphaModels")
 
+
+def _load_global_model(horizon_name):
+    """호라이즌 모델 저장본 (컴파일본이 있으면 NumPy 트리 엔진, 레지스트리 캐시). 없으면 None.
+    ALPHA_GLOBAL_MULTI_HORIZON=1이고 다중 호라이즌 모델이 이 호라이즌을 포함하면 그 모델을 돌려줍니다."""
+    if GLOBAL_MULTI_HORIZON:
+        multi = load_predictor(os.path.join(MODELS_DIR, "global_multi_model.joblib"))
+        if multi is not None and horizon_name in multi['horizons']:
+            return multi
+    return load_predictor(os.path.join(MODELS_DIR, f"global_{horizon_name}_model.joblib"))
+
+
+def _up_probabilities(saved_data, X, horizon_names):
+    """predict_proba 한 번으로 horizon_names 각각의 상승 확률 배열 {horizon: array}.
+    다중 호라이즌 모델은 출력별 확률 리스트를, 일반 모델은 하나의 확률 행렬을 돌려줍니다."""
+    model = saved_data['model']
+    proba = model.predict_proba(X)
+    out = {}
+    for horizon_name in horizon_names:
+        if 'horizons' in saved_data:
+            k = saved_data['horizons'].index(horizon_name)
+            p, classes = proba[k], list(model.classes_[k])
+        else:
+            p, classes = proba, list(model.classes_)
+        out[horizon_name] = p[:, classes.index(1)] if 1 in classes else np.zeros(len(X))
+    return out
+
+
+def _category_key(saved_data):
+    if 'encoder' in saved_data:
+        return tuple(tuple(c) for c in saved_data['encoder'].categories_)
+    return tuple(tuple(c) for c in saved_data['categories'])
+
+
+def _encode_categories(frame, saved_data):
+    """Sector/Industry 문자열을 학습 때의 코드로 변환한 사본 (모르는 범주는 -1).
+    컴파일본에는 sklearn 인코더 대신 범주 목록만 있으므로 같은 규칙으로 직접 변환합니다."""
+    frame = frame.copy()
+    cat_cols = saved_data['cat_cols']
+    if 'encoder' in saved_data:
+        frame[cat_cols] = saved_data['encoder'].transform(frame[cat_cols])
+        return frame
+    for col, categories in zip(cat_cols, saved_data['categories']):
+        lookup = {c: float(i) for i, c in enumerate(categories)}
+        frame[col] = [lookup.get(v, -1.0) for v in frame[col]]
+    return frame
+
 def predict_with_global_model(ticker, horizon_name="short"):
     """
     저장된 글로벌 모델을 사용하여 특정 종목의 최신 데이터에 대한 예측을 생성합니다.
     """
-    model_path = os.path.join(MODELS_DIR, f"global_{horizon_name}_model.joblib")
-    if not os.path.exists(model_path):
+    # 모델, 피처 목록, 인코더 로드 (레지스트리에 한 번만 로드, 재학습으로 파일이 바뀌면 다시 로드)
+    saved_data = _load_global_model(horizon_name)
+    if saved_data is None:
         print(f"경고: {horizon_name} 글로벌 모델이 없습니다. 먼저 모델을 학습시키세요.")
         return "Not Trained"
-
-    # 모델, 피처 목록, 인코더 로드
-    saved_data = joblib.load(model_path)
-    model = saved_data['model']
     feature_columns = saved_data['features']
-    encoder = saved_data['encoder']
-    cat_cols = saved_data['cat_cols']
 
-    # 1. 최신 데이터 로드
-    data = load_data(ticker)
-    if data is None or len(data) < 50:
+    # 1. 최신 데이터 로드 (피처 저장소의 마지막 봉 이후만, 저장본이 없으면 최근 100일)
+    latest_data = load_recent(ticker)
+    if latest_data is None or latest_data.empty:
         return "Insufficient Data"
-        
-    latest_data = data.tail(100) # 최근 100일 데이터로 충분
     
     # 2. 메타데이터 로드
     metadata = get_ticker_metadata([ticker])
 
-    # 3. 피처 생성
-    # target_days는 예측 시점에서는 실제 계산되지 않지만 함수 시그니처 맞추기 위해 더미값 전달
-    features, _ = create_global_features_and_target(ticker, latest_data, metadata, target_days=1)
+    # 3. 피처 생성 (학습과 같은 피처 엔진, 타깃 없이 마지막 봉까지 계산)
+    check_feature_version(saved_data.get('feature_set_version'), f"global_{horizon_name}")
+    features = create_global_features(ticker, latest_data, metadata, background=True)
     
     if features.empty:
         return "Feature Error"
@@ -49,7 +91,7 @@ def predict_with_global_model(ticker, horizon_name="short"):
         latest_features = latest_features.drop(columns=['Ticker'])
         
     # 카테고리 인코딩
-    latest_features[cat_cols] = encoder.transform(latest_features[cat_cols])
+    latest_features = _encode_categories(latest_features, saved_data)
     
     # 피처 순서 맞추기 (학습에 쓰인 컬럼들만 선택)
     latest_features = latest_features[feature_columns]
@@ -57,9 +99,97 @@ def predict_with_global_model(ticker, horizon_name="short"):
     if latest_features.isnull().values.any():
         return "Insufficient Data (NaNs in features)"
         
-    # 예측
-    prediction = model.predict(latest_features)[0]
-    decision = "UP" if prediction == 1 else "DOWN"
+    # 예측 (이진 분류의 predict와 같이 상승 확률 > 0.5면 UP)
+    up = _up_probabilities(saved_data, latest_features, [horizon_name])[horizon_name][0]
+    decision = "UP" if up > 0.5 else "DOWN"
     
     # print(f"'{ticker}' [{horizon_name}] 최신 예측: {decision}")
-    return decision
\ No newline at end of file
+    return decision
+
+# predict_global_batch가 패널을 조회할 달력 기준 기간. EMA 계열 지표가 전체 이력으로 계산한 값과
+# 사실상 같아지도록 워밍업(최대 50봉)보다 넉넉히 잡는다 (약 270 영업일).
+BATCH_LOOKBACK_DAYS = 400
+
+
+def latest_global_rows(tickers, panel=None, metadata=None):
+    """티커별 마지막 봉의 글로벌 피처 한 행씩을 모은 DataFrame (인덱스: 티커, Ticker 컬럼 제외).
+
+    OHLCV는 (봉 × 티커) 패널 한 번으로 읽고 지표도 패널 단위로 계산합니다.
+    데이터/메타데이터가 부족해 피처에 결측치가 있는 티커는 빠집니다.
+    Sector/Industry는 인코딩 전 문자열 그대로입니다.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if panel is None:
+        start = datetime.date.today() - datetime.timedelta(days=BATCH_LOOKBACK_DAYS)
+        panel = load_panel(tickers, start=start, layout="bars")
+    if metadata is None:
+        metadata = get_ticker_metadata(tickers)
+    columns = [c for c in GLOBAL_FEATURE_COLUMNS if c != 'Ticker']
+
+    dates = np.asarray(panel.dates, dtype="datetime64[ns]")
+    n_bars = (~np.isnat(dates)).sum(axis=0) if dates.size else np.zeros(len(panel.tickers), dtype=int)
+    present = np.flatnonzero(n_bars > 0)
+    if len(present) == 0:
+        return pd.DataFrame(columns=columns)
+
+    # 각 티커 열의 마지막 봉 칸만 꺼냄 (지표는 열 전체로 계산)
+    mask = np.zeros(dates.shape, dtype=bool)
+    mask[n_bars[present] - 1, present] = True
+    block = compute_panel_block(panel.values, dates, TECHNICAL_FEATURES, mask=mask)
+
+    names = [panel.tickers[j] for j in present]
+    rows = pd.DataFrame(block, index=pd.Index(names, name='Ticker'), columns=TECHNICAL_FEATURES)
+    metas = [metadata.get(t, {}) for t in names]
+    rows['Sector'] = [m.get('sector', 'Unknown') for m in metas]
+    rows['Industry'] = [m.get('industry', 'Unknown') for m in metas]
+    mcaps = np.array([m.get('marketCap', 0) or 0 for m in metas], dtype=np.float64)
+    rows['Log_MarketCap'] = np.where(mcaps > 0, np.log1p(np.maximum(mcaps, 0)), 0.0)
+    rows['Beta'] = [np.nan if m.get('beta', 1.0) is None else m.get('beta', 1.0) for m in metas]
+    rows = rows[columns]
+    return rows[rows.notna().all(axis=1)]
+
+
+def predict_global_batch(tickers, horizons=tuple(GLOBAL_HORIZONS), panel=None, metadata=None):
+    """여러 티커를 글로벌 모델로 한 번에 예측합니다.
+
+    마지막 봉 피처를 한 행렬로 만들고 범주형 인코딩도 한 번만 한 뒤, 호라이즌 모델마다
+    predict_proba를 한 번 호출합니다 (티커 수와 무관하게 호라이즌 수만큼의 모델 호출).
+    다중 호라이즌 모델(ALPHA_GLOBAL_MULTI_HORIZON=1)이면 모든 호라이즌이 호출 한 번입니다.
+    반환: {ticker: {horizon: 상승 확률}}. 모델이 없거나 피처가 부족한 티커/호라이즌은 None.
+    predict_with_global_model의 "UP"은 상승 확률 > 0.5와 같습니다.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    results = {t: {h: None for h in horizons} for t in tickers}
+
+    models = {}
+    for horizon_name in horizons:
+        saved_data = _load_global_model(horizon_name)
+        if saved_data is None:
+            print(f"경고: {horizon_name} 글로벌 모델이 없습니다. 먼저 모델을 학습시키세요.")
+            continue
+        check_feature_version(saved_data.get('feature_set_version'), f"global_{horizon_name}")
+        models[horizon_name] = saved_data
+    if not models or not tickers:
+        return results
+
+    rows = latest_global_rows(tickers, panel=panel, metadata=metadata)
+    if rows.empty:
+        return results
+
+    # 같은 모델(다중 호라이즌)을 쓰는 호라이즌은 한 번에 예측
+    groups = {}
+    for horizon_name, saved_data in models.items():
+        groups.setdefault(id(saved_data['model']), (saved_data, []))[1].append(horizon_name)
+
+    # 같은 데이터셋으로 학습한 호라이즌 모델들은 범주 순서가 같으므로 인코딩 결과를 공유
+    encoded = {}
+    for saved_data, horizon_names in groups.values():
+        key = _category_key(saved_data)
+        if key not in encoded:
+            encoded[key] = _encode_categories(rows, saved_data)
+        X = encoded[key][saved_data['features']]
+
+        for horizon_name, proba in _up_probabilities(saved_data, X, horizon_names).items():
+            for ticker, p in zip(X.index, proba):
+                results[ticker][horizon_name] = float(p)
+    return results
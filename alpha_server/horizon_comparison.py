@@ -0,0 +1,180 @@
+"""호라이즌별 글로벌 앙상블 세 개 vs 다중 호라이즌 모델 하나 비교 보고서.
+
+같은 글로벌 데이터셋에서 라벨이 있는 행을 날짜순으로 앞(학습)/뒤(검증)로 나누고 다음을 비교한다.
+호라이즌 h의 학습 행은 h 라벨이 있고 라벨 종료일이 검증 시작 전인 행(GlobalDataset.split_multi, walk_forward와
+같은 purge)이며, 호라이즌별 앙상블은 그 행으로, 다중 호라이즌 모델은 모든 호라이즌의 학습 행인 행(가장 긴
+호라이즌의 학습 행)으로 학습한다.
+두 구성 모두 호라이즌마다 h 라벨이 있는 같은 검증 행에서 평가한다.
+- 호라이즌별 검증 지표 (walk_forward.fold_metrics: 정확도, AUC, log loss 등)
+- 학습 시간, 모델 크기 (joblib 바이트, tree_compiler 배열 바이트)
+- 예측 지연: 전체 종목 크기의 배치 / 단일 행, sklearn과 컴파일본 각각 (세 호라이즌 확률을 모두 얻는 시간)
+결과는 <ALPHA_VALIDATION_DIR>/horizon_comparison_<시각>.json에 저장한다.
+
+  python -m alpha_server.horizon_comparison [--tickers AAPL,MSFT] [--latency-rows 3000]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import time
+from typing import Callable, Optional
+
+import joblib
+import numpy as np
+
+from .asset_screener import get_all_tickers
+from .global_dataset import GlobalDataset
+from .global_model_handler import GLOBAL_HORIZONS, build_global_dataset, fit_multi_horizon_forest, make_global_ensemble
+from .tree_compiler import compile_model, to_arrays
+from .walk_forward import VALIDATION_DIR, fold_metrics
+
+
+def _median_ms(fn: Callable[[], object], repeat: int) -> float:
+    fn()  # 워밍업
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(float(np.median(samples)) * 1000, 3)
+
+
+def _sizes(models: list) -> tuple[int, int]:
+    """(joblib 바이트, 컴파일 배열 바이트) 합계."""
+    dumped = 0
+    compiled = 0
+    for model in models:
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        dumped += buffer.tell()
+        compiled += sum(a.nbytes for a in to_arrays(compile_model(model))[1].values())
+    return dumped, compiled
+
+
+def _up(proba: np.ndarray, classes) -> np.ndarray:
+    classes = list(classes)
+    return proba[:, classes.index(1)] if 1 in classes else np.zeros(len(proba))
+
+
+def compare_global_setups(
+    dataset: GlobalDataset,
+    horizons: Optional[dict] = None,
+    test_size: float = 0.2,
+    n_jobs: int = -1,
+    latency_rows: int = 3000,
+    repeat: int = 5,
+    write: bool = True,
+) -> dict:
+    """두 구성을 학습/평가해 보고서 dict를 반환 (write=True면 JSON 파일로도 저장)."""
+    horizons = dict(horizons or GLOBAL_HORIZONS)
+    names, days = list(horizons), list(horizons.values())
+    # 행: 가장 짧은 호라이즌 라벨이 있는 행 (Y는 라벨이 없거나 퍼지된 호라이즌이 -1)
+    X_train, X_test, Y_train, Y_test = dataset.split_multi(days, test_size)
+    batch = X_test.iloc[:latency_rows]
+    single = X_test.iloc[:1]
+    known = {h: Y_test[:, k] >= 0 for k, h in enumerate(names)}  # 호라이즌별 검증 행 (두 구성 공통)
+    n_rows = {h: {"train": int((Y_train[:, k] >= 0).sum()), "test": int(known[h].sum())} for k, h in enumerate(names)}
+    print(f"호라이즌 구성 비교: 학습 {len(X_train):,}행, 검증 {len(X_test):,}행, 호라이즌 {horizons}")
+
+    # 1. 호라이즌별 앙상블 세 개 (현재 구성): 각자 그 호라이즌 라벨이 있는 학습 행으로
+    started = time.perf_counter()
+    separate = []
+    for k in range(len(names)):
+        train = Y_train[:, k] >= 0
+        separate.append(make_global_ensemble(n_jobs=n_jobs).fit(X_train[train], Y_train[train, k]))
+    separate_fit = time.perf_counter() - started
+    separate_compiled = [compile_model(m) for m in separate]
+
+    def separate_predict(models, rows):
+        return {h: _up(m.predict_proba(rows), m.classes_) for h, m in zip(names, models)}
+
+    # 2. 다중 호라이즌 모델 하나
+    started = time.perf_counter()
+    multi = fit_multi_horizon_forest(X_train, Y_train, n_jobs=n_jobs)
+    multi_fit = time.perf_counter() - started
+    multi_compiled = compile_model(multi)
+
+    def multi_predict(model, rows):
+        probas = model.predict_proba(rows)
+        return {h: _up(probas[k], model.classes_[k]) for k, h in enumerate(names)}
+
+    setups = {}
+    for name, models, compiled, predict, fit_seconds, calls in (
+        ("separate", separate, separate_compiled, separate_predict, separate_fit, len(names)),
+        ("multi", [multi], multi_compiled, multi_predict, multi_fit, 1),
+    ):
+        target = models if name == "separate" else models[0]
+        probas = predict(target, X_test)
+        model_bytes, compiled_bytes = _sizes(models)
+        setups[name] = {
+            "metrics": {
+                h: fold_metrics(Y_test[known[h], k], probas[h][known[h]]) if known[h].any() else None
+                for k, h in enumerate(names)
+            },
+            "fit_seconds": round(fit_seconds, 3),
+            "model_bytes": model_bytes,
+            "compiled_bytes": compiled_bytes,
+            "model_calls": calls,
+            "latency_ms": {
+                "batch_sklearn": _median_ms(lambda: predict(target, batch), repeat),
+                "single_sklearn": _median_ms(lambda: predict(target, single), repeat),
+                "batch_compiled": _median_ms(lambda: predict(compiled, batch), repeat),
+                "single_compiled": _median_ms(lambda: predict(compiled, single), repeat),
+            },
+        }
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "horizons": horizons,
+        "rows": {
+            "train": int(len(X_train)), "test": int(len(X_test)), "latency_batch": int(len(batch)), "horizons": n_rows,
+        },
+        "setups": setups,
+    }
+    _print_report(report)
+    if write:
+        os.makedirs(VALIDATION_DIR, exist_ok=True)
+        path = os.path.join(VALIDATION_DIR, f"horizon_comparison_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        report["path"] = path
+        print(f"보고서 저장: {path}")
+    return report
+
+
+def _print_report(report: dict) -> None:
+    separate, multi = report["setups"]["separate"], report["setups"]["multi"]
+    print(f"{'':<24}{'앙상블 ×3':>14}{'다중 호라이즌':>14}")
+    for h in report["horizons"]:
+        if separate["metrics"][h] is None:
+            print(f"{f'정확도 {h}':<24}{'-':>14}{'-':>14}")  # 검증 구간에 라벨 있는 행 없음
+            continue
+        a, b = separate["metrics"][h]["accuracy"], multi["metrics"][h]["accuracy"]
+        print(f"{f'정확도 {h}':<24}{a:>14.2%}{b:>14.2%}")
+    for key, label in (("fit_seconds", "학습 시간 (초)"), ("model_calls", "예측 호출 수")):
+        print(f"{label:<24}{separate[key]:>14}{multi[key]:>14}")
+    for key, label in (("model_bytes", "모델 크기 (MB)"), ("compiled_bytes", "컴파일본 크기 (MB)")):
+        print(f"{label:<24}{separate[key] / 1e6:>14.2f}{multi[key] / 1e6:>14.2f}")
+    for key in separate["latency_ms"]:
+        print(f"{f'지연 {key} (ms)':<24}{separate['latency_ms'][key]:>14.3f}{multi['latency_ms'][key]:>14.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="글로벌 호라이즌 모델 구성 비교 (앙상블 ×3 vs 다중 호라이즌 모델)")
+    parser.add_argument("--tickers", help="쉼표로 구분한 티커 (기본: 전체)")
+    parser.add_argument("--latency-rows", type=int, default=3000, help="배치 지연 측정 행 수 (전체 종목 수 근사)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(",") if args.tickers else get_all_tickers()
+    dataset = build_global_dataset(tickers, target_days=list(GLOBAL_HORIZONS.values()))
+    if dataset.empty:
+        print("오류: 데이터셋을 구축하지 못했습니다.")
+        return
+    compare_global_setups(dataset, latency_rows=args.latency_rows, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""QuestDB ILP(InfluxDB Line Protocol) 전송기.
+
+- 컬럼 배열을 청크 단위로 한 번에 포맷해 재사용 bytearray 버퍼에 바로 쌓는다 (행별 문자열/리스트 없음)
+- 하나의 TCP 연결을 유지하고, 전송 실패 시 한 번 재연결 후 버퍼 전체를 다시 보낸다.
+  ILP에는 수신 확인이 없어 서버가 어디까지 받았는지 알 수 없으므로, 재전송은 테이블이
+  DEDUP UPSERT KEYS(timestamp, ticker)일 때만 중복 없이 안전하다. can_resend()가 False를
+  돌려주면 재전송하지 않고 예외를 올린다 (빠진 행은 다음 수집에서 워터마크 이후로 다시 받는다).
+- 버퍼가 flush_bytes를 넘으면 write 시점에 전송하고, 마지막 전송 후 flush_interval초가 지나면
+  백그라운드 타이머 스레드가 전송한다 (쓰기가 멈춘 버퍼도 오래 머물지 않도록).
+  (sendall이 소켓 버퍼가 찰 때까지 블록되므로 서버가 느리면 생산자도 자연히 느려진다)
+- 전송이 끝난 티커는 on_flush(ticker, last_ts)로 알려 캐시 무효화 등을 전송 이후에 하도록 한다
+- 전송 실패로 버퍼와 함께 버려진 티커는 take_lost()로 알 수 있다 (타이머 스레드에서 실패한 경우 포함)
+
+환경변수:
+  ALPHA_ILP_FLUSH_BYTES  버퍼 크기 기준 전송 임계값 (기본 1MB)
+  ALPHA_ILP_FLUSH_SEC    시간 기준 전송 임계값 (기본 1초)
+  ALPHA_ILP_CHUNK_ROWS   한 번에 포맷할 최대 행 수 (기본 5000)
+  ALPHA_ILP_TIMEOUT_SEC  소켓 연결/전송 타임아웃 (기본 10초)
+"""
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from itertools import chain
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+FLUSH_BYTES = int(os.getenv("ALPHA_ILP_FLUSH_BYTES", str(1024 * 1024)))
+FLUSH_INTERVAL_SEC = float(os.getenv("ALPHA_ILP_FLUSH_SEC", "1.0"))
+CHUNK_ROWS = int(os.getenv("ALPHA_ILP_CHUNK_ROWS", "5000"))
+SOCKET_TIMEOUT_SEC = float(os.getenv("ALPHA_ILP_TIMEOUT_SEC", "10"))
+
+FlushFn = Callable[[str, pd.Timestamp], None]
+
+
+def _escape_tag(value: str) -> str:
+    """ILP 태그 값의 특수문자(쉼표, 공백, 등호) 이스케이프."""
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace(" ", "\\ ").replace("=", "\\=")
+
+
+def encode_ohlcv(buf: bytearray, table: str, ticker: str, data: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> int:
+    """OHLCV DataFrame을 ILP 라인으로 buf 끝에 이어 쓴다. 쓴 행 수를 반환.
+
+    청크마다 (행 템플릿 × n) % (컬럼 값 평탄화 튜플) 한 번으로 포맷하므로 행 단위 파이썬 문자열이
+    생기지 않는다. 결측치는 기존 동작과 같이 0으로 채운다.
+    """
+    if data is None or data.empty:
+        return 0
+    prefix = f"{table},ticker={_escape_tag(ticker)} ".replace("%", "%%")
+    row_fmt = prefix + "open=%r,high=%r,low=%r,close=%r,volume=%di %d\n"
+
+    filled = data[["Open", "High", "Low", "Close", "Volume"]].fillna(0)
+    floats = filled[["Open", "High", "Low", "Close"]].to_numpy(dtype=np.float64)
+    volume = filled["Volume"].to_numpy().astype(np.int64)
+    ts_ns = pd.DatetimeIndex(data.index).asi8
+
+    n = len(ts_ns)
+    for i in range(0, n, chunk_rows):
+        j = min(i + chunk_rows, n)
+        block = floats[i:j]
+        flat = tuple(chain.from_iterable(zip(
+            block[:, 0].tolist(), block[:, 1].tolist(), block[:, 2].tolist(), block[:, 3].tolist(),
+            volume[i:j].tolist(), ts_ns[i:j].tolist(),
+        )))
+        buf += ((row_fmt * (j - i)) % flat).encode("utf-8")
+    return n
+
+
+class ILPWriter:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        table: str,
+        flush_bytes: int = FLUSH_BYTES,
+        flush_interval: float = FLUSH_INTERVAL_SEC,
+        chunk_rows: int = CHUNK_ROWS,
+        timeout: float = SOCKET_TIMEOUT_SEC,
+        on_flush: Optional[FlushFn] = None,
+        connect: Optional[Callable[[], socket.socket]] = None,
+        can_resend: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.table = table
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.chunk_rows = chunk_rows
+        self.timeout = timeout
+        self.on_flush = on_flush
+        self._connect_fn = connect or self._open_socket
+        self._can_resend = can_resend or (lambda: True)
+        self._sock: Optional[socket.socket] = None
+        self._buf = bytearray()
+        self._pending_rows = 0
+        self._pending: dict[str, pd.Timestamp] = {}
+        self._lost: set[str] = set()
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.rows_sent = 0
+        self.bytes_sent = 0
+        self.flushes = 0
+        self.reconnects = 0
+        self.timer_flushes = 0
+        self.flush_errors = 0
+        self.busy_seconds = 0.0
+
+    def _open_socket(self) -> socket.socket:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _socket(self) -> socket.socket:
+        if self._sock is None:
+            self._sock = self._connect_fn()
+        return self._sock
+
+    def _drop_socket(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _start_timer(self) -> None:
+        if self._timer is None and self.flush_interval > 0:
+            self._stop.clear()
+            self._timer = threading.Thread(target=self._flush_loop, name="ilp-flush", daemon=True)
+            self._timer.start()
+
+    def _flush_loop(self) -> None:
+        """마지막 전송 후 flush_interval초가 지난 버퍼를 전송한다. 실패는 기록만 하고 계속 돈다."""
+        while True:
+            with self._lock:
+                wait = self._last_flush + self.flush_interval - time.monotonic()
+            if self._stop.wait(max(wait, 0.01)):
+                return
+            with self._lock:
+                if not self._buf or time.monotonic() - self._last_flush < self.flush_interval:
+                    continue
+                try:
+                    self.flush()
+                    self.timer_flushes += 1
+                except OSError as e:
+                    self.flush_errors += 1
+                    print(f"경고: ILP 타이머 전송 실패: {e}")
+
+    def write(self, ticker: str, data: pd.DataFrame) -> int:
+        """한 티커의 OHLCV를 버퍼에 추가하고, 임계값을 넘으면 전송한다. 추가한 행 수를 반환."""
+        if data is None or data.empty:
+            return 0
+        with self._lock:
+            self._start_timer()
+            started = time.perf_counter()
+            rows = encode_ohlcv(self._buf, self.table, ticker, data, self.chunk_rows)
+            self.busy_seconds += time.perf_counter() - started
+            self._pending_rows += rows
+            last_ts = pd.Timestamp(data.index[-1])
+            prev = self._pending.get(ticker)
+            self._pending[ticker] = last_ts if prev is None else max(prev, last_ts)
+            if (
+                len(self._buf) >= self.flush_bytes
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+            return rows
+
+    def flush(self) -> None:
+        """버퍼를 전송한다. 실패하면 한 번 재연결해 다시 보내고 (can_resend()가 True일 때만),
+        그래도 실패하면 예외를 올린다.
+
+        실패 시에도 버퍼는 비우며(서버가 어디까지 받았는지 알 수 없으므로), on_flush는 성공/실패와
+        무관하게 호출해 일부만 기록된 티커의 캐시도 무효화되도록 한다.
+        """
+        with self._lock:
+            if not self._buf:
+                self._last_flush = time.monotonic()
+                return
+            started = time.perf_counter()
+            pending, self._pending = self._pending, {}
+            try:
+                with memoryview(self._buf) as view:
+                    try:
+                        self._socket().sendall(view)
+                    except OSError:
+                        self._drop_socket()
+                        if not self._can_resend():
+                            raise
+                        self.reconnects += 1
+                        self._socket().sendall(view)
+                self.rows_sent += self._pending_rows
+                self.bytes_sent += len(self._buf)
+                self.flushes += 1
+            except OSError:
+                self._drop_socket()
+                self._lost.update(pending)
+                raise
+            finally:
+                self._buf.clear()
+                self._pending_rows = 0
+                self._last_flush = time.monotonic()
+                self.busy_seconds += time.perf_counter() - started
+                if self.on_flush:
+                    for ticker, last_ts in pending.items():
+                        self.on_flush(ticker, last_ts)
+
+    def take_lost(self) -> set[str]:
+        """마지막 호출 이후 전송 실패로 버려진 행이 있던 티커들을 돌려주고 비운다."""
+        with self._lock:
+            lost, self._lost = self._lost, set()
+            return lost
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._timer is not None and self._timer is not threading.current_thread():
+            self._timer.join()
+        self._timer = None
+        with self._lock:
+            try:
+                self.flush()
+            finally:
+                self._drop_socket()
+
+    def stats(self) -> dict:
+        with self._lock:
+            busy = self.busy_seconds
+            return {
+                "rows_sent": self.rows_sent,
+                "bytes_sent": self.bytes_sent,
+                "flushes": self.flushes,
+                "reconnects": self.reconnects,
+                "timer_flushes": self.timer_flushes,
+                "flush_errors": self.flush_errors,
+                "buffered_bytes": len(self._buf),
+                "buffered_rows": self._pending_rows,
+                "busy_seconds": round(busy, 4),
+                "rows_per_sec": round(self.rows_sent / busy, 1) if busy else 0.0,
+                "bytes_per_sec": round(self.bytes_sent / busy, 1) if busy else 0.0,
+            }
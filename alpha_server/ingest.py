@@ -0,0 +1,245 @@
+"""시세 데이터 동시 수집 파이프라인.
+
+- 같은 시작일(워터마크)을 가진 티커끼리 묶어 yf.download 배치 요청
+- 스레드 풀 + 호스트별 동시성 제한 + 지수 백오프 재시도
+- 다운로드(생산자)와 저장(소비자)을 bounded 큐로 분리해 쓰기와 다운로드를 겹친다
+- QuestDB 쓰기는 공용 ILPWriter 버퍼에 쌓아 임계값마다 전송하고, 끝에서 남은 버퍼를 비운다
+- 워터마크는 저장된 마지막 봉이므로, 워터마크를 읽은 저장소(target)에만 쓴다. 도중에 서킷 브레이커가
+  바뀌어 다른 저장소로 갈 티커는 쓰지 않고 deferred로 세며, 다음 수집이 같은 워터마크부터 다시 받는다
+- 증분 배치는 워터마크 봉을 포함해 겹쳐 받는다 (data_handler.incremental_start). 마지막 봉은 교체하고,
+  겹친 과거 종가가 바뀐 티커(분할/배당 보정)는 저장 스레드에서 그 티커만 전체 기간을 다시 받는다
+
+환경변수:
+  ALPHA_DOWNLOAD_WORKERS   동시에 실행할 배치 다운로드 수 (기본 4)
+  ALPHA_DOWNLOAD_BATCH     yf.download 한 번에 묶을 티커 수 (기본 50)
+  ALPHA_DOWNLOAD_RETRIES   배치당 최대 시도 횟수 (기본 3)
+  ALPHA_YAHOO_CONCURRENCY  Yahoo 호스트에 대한 최대 동시 요청 수 (기본 2)
+  ALPHA_INCREMENTAL_OVERLAP_DAYS  증분 수집 때 워터마크 앞으로 겹쳐 받을 일수 (기본 7, data_handler)
+  ALPHA_RESYNC_TOLERANCE   겹친 과거 종가의 허용 상대오차, 넘으면 전체 재수집 (기본 0.0005, data_handler)
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+import yfinance as yf
+
+from . import data_handler
+
+DOWNLOAD_WORKERS = int(os.getenv("ALPHA_DOWNLOAD_WORKERS", "4"))
+BATCH_SIZE = int(os.getenv("ALPHA_DOWNLOAD_BATCH", "50"))
+MAX_RETRIES = int(os.getenv("ALPHA_DOWNLOAD_RETRIES", "3"))
+BACKOFF_BASE_SEC = 1.0
+
+HOST_LIMITS = {"yahoo": int(os.getenv("ALPHA_YAHOO_CONCURRENCY", "2"))}
+_host_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_host_lock = threading.Lock()
+
+ProgressFn = Callable[[int, int, str], None]
+
+
+def _host_for(ticker: str) -> str:
+    """티커를 받아올 데이터 소스 호스트. 현재는 모든 시장을 yfinance(Yahoo)에서 받는다."""
+    return "yahoo"
+
+
+@contextmanager
+def _host_slot(host: str):
+    with _host_lock:
+        sem = _host_semaphores.get(host)
+        if sem is None:
+            sem = threading.BoundedSemaphore(max(1, HOST_LIMITS.get(host, DOWNLOAD_WORKERS)))
+            _host_semaphores[host] = sem
+    with sem:
+        yield
+
+
+def _with_retry(fn, attempts: int = MAX_RETRIES, base_delay: float = BACKOFF_BASE_SEC):
+    """fn()을 최대 attempts회 시도. 실패 사이에 base_delay * 2^n 초 대기."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = base_delay * (2 ** attempt)
+            print(f"경고: 다운로드 실패, {delay:.1f}초 후 재시도 ({attempt + 1}/{attempts}): {e}")
+            time.sleep(delay)
+
+
+def _split_batch(raw: pd.DataFrame, tickers: list[str]) -> dict[str, pd.DataFrame]:
+    """group_by='ticker'로 받은 배치 결과를 티커별 DataFrame으로 분리."""
+    out: dict[str, pd.DataFrame] = {}
+    if raw is None or raw.empty:
+        return out
+    if not isinstance(raw.columns, pd.MultiIndex):
+        if len(tickers) == 1:
+            out[tickers[0]] = raw
+        return out
+    available = set(raw.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in available:
+            continue
+        df = raw[ticker].dropna(how="all")
+        if not df.empty:
+            out[ticker] = df
+    return out
+
+
+def download_batch(
+    tickers: list[str], start: Optional[pd.Timestamp] = None, period: str = "2y"
+) -> dict[str, pd.DataFrame]:
+    """여러 티커를 한 번의 yf.download로 받아 티커별로 나눠 반환. 재시도 + 호스트 동시성 제한 적용."""
+
+    def _fetch():
+        kwargs = {"start": start} if start is not None else {"period": period}
+        return yf.download(
+            tickers,
+            interval="1d",
+            auto_adjust=True,
+            group_by="ticker",
+            threads=False,
+            progress=False,
+            timeout=10,
+            **kwargs,
+        )
+
+    with _host_slot(_host_for(tickers[0])):
+        raw = _with_retry(_fetch)
+    return {t: data_handler._normalize_ohlcv(df) for t, df in _split_batch(raw, tickers).items()}
+
+
+def plan_batches(
+    tickers: Iterable[str],
+    watermarks: dict[str, pd.Timestamp],
+    full_resync: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> list[tuple[list[str], Optional[pd.Timestamp]]]:
+    """같은 시작일끼리 묶은 배치 목록을 반환 (워터마크가 없으면 시작일 None = period 전체).
+
+    마지막 저장 봉은 미완성일 수 있으므로 워터마크가 오늘이어도 건너뛰지 않고 겹쳐 받는다.
+    """
+    groups: dict[Optional[pd.Timestamp], list[str]] = {}
+    for ticker in tickers:
+        last_ts = None if full_resync else watermarks.get(ticker)
+        start = data_handler.incremental_start(last_ts) if last_ts is not None else None
+        groups.setdefault(start, []).append(ticker)
+
+    batches = []
+    for start, group in groups.items():
+        for i in range(0, len(group), batch_size):
+            batches.append((group[i:i + batch_size], start))
+    return batches
+
+
+def download_and_store(
+    tickers: list[str],
+    watermarks: dict[str, pd.Timestamp],
+    full_resync: bool = False,
+    conn=None,
+    progress: Optional[ProgressFn] = None,
+    period: str = "2y",
+    workers: int = DOWNLOAD_WORKERS,
+    target: Optional[str] = None,
+) -> dict:
+    """배치 다운로드를 스레드 풀에서 돌리고, 호출 스레드는 도착하는 순서대로 저장한다.
+
+    모든 티커는 (성공/실패/최신 여부와 무관하게) 큐를 정확히 한 번 통과하므로
+    progress(done, total, ticker)의 done은 처리 완료된 티커 수와 일치한다.
+    target('questdb'/'file', 기본: 지금 저장소)은 watermarks를 읽은 저장소다.
+    up_to_date는 겹쳐 받은 구간에 새 봉도 바뀐 마지막 봉도 없던 티커, resynced는 과거 종가가
+    바뀌어 전체 기간을 다시 받은 티커 수다.
+    QuestDB 쓰기는 ILP 버퍼에 쌓았다가 전송하므로, 전송 실패로 버려진 티커는 마지막에
+    updated에서 failed로 옮긴다.
+    """
+    total = len(tickers)
+    target = target or data_handler.current_store(conn)
+    batches = plan_batches(tickers, watermarks, full_resync)
+    results: queue.Queue = queue.Queue(maxsize=max(2, workers * 2))
+
+    def _produce(batch: list[str], start: Optional[pd.Timestamp]) -> None:
+        try:
+            frames = download_batch(batch, start=start, period=period)
+        except Exception as e:
+            print(f"오류: 배치 다운로드 실패 ({len(batch)}개 티커): {e}")
+            frames = {}
+        for ticker in batch:
+            data = frames.get(ticker)
+            if data is None:
+                # 배치에서 빠진 티커는 단건으로 한 번 더 시도
+                try:
+                    data = download_batch([ticker], start=start, period=period).get(ticker)
+                except Exception as e:
+                    print(f"오류: '{ticker}' 다운로드 실패: {e}")
+            results.put((ticker, data))
+
+    stats = {
+        "tickers": total, "updated": 0, "rows": 0, "failed": 0, "deferred": 0, "up_to_date": 0, "resynced": 0,
+    }
+    done = 0
+    buffered: dict[str, int] = {}  # ILP 버퍼에 쌓아 updated로 센 티커 → 행 수
+
+    def _advance(ticker: str) -> None:
+        nonlocal done
+        done += 1
+        if progress:
+            progress(done, total, ticker)
+
+    pending = total
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest") as pool:
+        for batch, start in batches:
+            pool.submit(_produce, batch, start)
+
+        while pending:
+            ticker, data = results.get()
+            pending -= 1
+            last_ts = None if full_resync else watermarks.get(ticker)
+            try:
+                if data is not None and last_ts is not None:
+                    if data_handler.current_store(conn) != target:
+                        raise data_handler.StoreUnavailable(f"저장소가 {target}에서 바뀌어 '{ticker}'를 쓰지 않습니다")
+                    status, data = data_handler.reconcile_overlap(ticker, data, last_ts, conn=conn)
+                    if status == "resync":
+                        stats["resynced"] += 1
+                        last_ts = None
+                        data = download_batch([ticker], period=period).get(ticker)
+                    elif status == "unchanged":
+                        stats["up_to_date"] += 1
+                if data is None:
+                    stats["failed"] += 1
+                elif not data.empty:
+                    data_handler.store_ticker_data(
+                        ticker, data, incremental=last_ts is not None, conn=conn, flush=False, target=target
+                    )
+                    stats["updated"] += 1
+                    stats["rows"] += len(data)
+                    if target == "questdb":
+                        buffered[ticker] = buffered.get(ticker, 0) + len(data)
+            except data_handler.StoreUnavailable:
+                stats["deferred"] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"오류: '{ticker}' 저장 실패: {e}")
+            _advance(ticker)
+
+    # 크기/시간 임계값에 못 미쳐 ILP 버퍼에 남은 행 전송
+    try:
+        data_handler.flush_ilp()
+    except Exception as e:
+        print(f"오류: ILP 버퍼 전송 실패: {e}")
+    lost = [t for t in data_handler.take_lost_ilp_tickers() if t in buffered]
+    for ticker in lost:
+        stats["updated"] -= 1
+        stats["rows"] -= buffered[ticker]
+        stats["failed"] += 1
+    if lost:
+        print(f"오류: ILP 전송 실패로 {len(lost)}개 티커의 행이 기록되지 않았습니다 (다음 수집에서 다시 받습니다).")
+    if stats["deferred"]:
+        print(f"경고: 저장소({target})를 쓸 수 없게 되어 {stats['deferred']}개 티커를 다음 수집으로 미룹니다.")
+    return stats
@@ -20,9 +20,14 @@ except ImportError:
 
 from .data_handler import load_data
 from .model_handler import create_features_and_target
+from .model_registry import load_model
+from .training_scheduler import run_training, summarize
 
 MODELS_DIR = os.path.expanduser("~/AlphaModels")
 
+# 예측 시 조회할 구간: lookback(60) + 지표 워밍업(50) + 타깃 시프트로 잘리는 구간 여유
+PREDICT_BARS = 250
+
 def create_sequences(data, lookback=60):
     """시계열 데이터를 LSTM 입력 형태로 변환"""
     X, y = [], []
@@ -31,18 +36,26 @@ def create_sequences(data, lookback=60):
         y.append(data[i, -1])  # 마지막 열이 target
     return np.array(X), np.array(y)
 
-def train_lstm_model(ticker, lookback=60, epochs=50):
-    """Phase 3: LSTM 모델 학습"""
+def train_lstm_model(ticker, lookback=60, epochs=50, n_jobs=-1):
+    """Phase 3: LSTM 모델 학습
+    n_jobs: TensorFlow 연산 스레드 수 (-1이면 TensorFlow 기본값)"""
     if not TENSORFLOW_AVAILABLE:
         print("TensorFlow가 필요합니다. Phase 2 앙상블 모델을 사용하세요.")
         return None
+
+    if n_jobs > 0:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(n_jobs)
+            tf.config.threading.set_inter_op_parallelism_threads(n_jobs)
+        except RuntimeError:
+            pass  # 런타임 초기화 후에는 바꿀 수 없음 (작업 프로세스는 TF_NUM_*_THREADS로 이미 고정)
     
     print(f"--- '{ticker}' LSTM 모델 학습 시작 ---")
     data = load_data(ticker)
     if data is None:
         return None
 
-    features, target = create_features_and_target(data)
+    features, target = create_features_and_target(data, ticker=ticker)
     
     if features.empty or len(features) < lookback + 100:
         print(f"오류: '{ticker}'에 대한 충분한 학습 데이터가 없습니다.")
@@ -123,20 +136,19 @@ def predict_lstm(ticker, data=None):
     model_path = os.path.join(MODELS_DIR, f"{ticker}_lstm_model.h5")
     scaler_path = os.path.join(MODELS_DIR, f"{ticker}_scaler.joblib")
     
-    if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+    # 모델 로드 (model_registry 캐시, 파일이 없으면 None)
+    model = load_model(model_path, loader=tf.keras.models.load_model)
+    scaler_data = load_model(scaler_path)
+    if model is None or scaler_data is None:
         return None
-    
-    # 모델 로드
-    model = tf.keras.models.load_model(model_path)
-    scaler_data = joblib.load(scaler_path)
     scaler = scaler_data['scaler']
     lookback = scaler_data['lookback']
     
     # 데이터 준비
     if data is None:
-        data = load_data(ticker)
+        data = load_data(ticker, last_n=PREDICT_BARS)
     
-    features, _ = create_features_and_target(data)
+    features, _ = create_features_and_target(data, ticker=ticker)
     
     if len(features) < lookback:
         return None
@@ -163,14 +175,7 @@ def update_all_lstm_models(sample_size=10):
     tickers = get_all_tickers()[:sample_size]
     print(f"\n{len(tickers)}개 자산에 대한 LSTM 모델 학습을 시작합니다...\n")
     
-    accuracies = {}
-    for ticker in tickers:
-        try:
-            acc = train_lstm_model(ticker, epochs=30)
-            if acc:
-                accuracies[ticker] = acc
-        except Exception as e:
-            print(f"오류: '{ticker}' LSTM 학습 실패 - {e}")
+    accuracies = summarize(run_training(train_lstm_model, tickers, kwargs={"epochs": 30}))["scores"]
     
     if accuracies:
         avg_acc = np.mean(list(accuracies.values()))
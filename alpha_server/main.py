@@ -8,7 +8,7 @@ import threading
 import time
 import asyncio
 
-from . import audit_log, credentials, data_handler
+from . import audit_log, credentials, data_handler, model_pack
 from .auth import (
     UserCreate,
     UserPublic,
@@ -23,11 +23,16 @@ from .auth import (
     require_user,
 )
 from .brokers import build_broker_for_user, supported_brokers
-from .data_handler import update_all_data
+from .data_handler import db_pool, update_all_data
 from .errors import install_handlers
+from .feature_store import get_feature_store
+from .ohlcv_cache import cache as ohlcv_cache
+from .model_registry import registry as model_registry
 from .model_handler import update_all_models, train_model
+from .training_scheduler import UNCHANGED, run_training, summarize
 from .asset_screener import get_all_tickers, get_market_for_ticker
-from .scoring_engine import calculate_scores
+from .scoring_engine import SCORING_LOOKBACK_DAYS, SCORING_WINDOW, calculate_scores
+from .global_model_predictor import BATCH_LOOKBACK_DAYS, predict_global_batch
 from .trading_handler import broker
 from .risk_manager import RiskManager
 from .rate_limit import rate_limit
@@ -360,63 +365,89 @@ def metrics(_: UserPublic = Depends(require_admin)):
     return audit_log.metrics_summary()
 
 
+@app.get("/metrics/data", summary="데이터 계층 메트릭 (OHLCV 캐시 등)")
+def data_metrics(_: UserPublic = Depends(require_admin)):
+    return {
+        "ohlcv_cache": ohlcv_cache.stats(),
+        "questdb_pool": db_pool.stats(),
+        "ilp_writer": data_handler.ilp_stats(),
+        "questdb_breaker": data_handler.questdb_breaker.stats(),
+        "feature_store": get_feature_store().stats(),
+        "model_registry": model_registry.stats(),
+        "model_packs": model_pack.stats(),
+    }
+
+
 # --- 데이터/모델 파이프라인 (admin 전용) ---
-@app.post("/update-data", summary="데이터 파이프라인 실행")
-def trigger_data_update(background_tasks: BackgroundTasks, user: UserPublic = Depends(require_admin)):
+@app.post("/update-data", summary="데이터 파이프라인 실행 (기본 증분, full_resync=true면 전체 재수집)")
+def trigger_data_update(
+    background_tasks: BackgroundTasks,
+    full_resync: bool = False,
+    user: UserPublic = Depends(require_admin),
+):
     progress_status["data_update"] = {"status": "running", "current": 0, "total": 0, "message": "시작 중..."}
-    background_tasks.add_task(update_all_data_with_progress)
-    audit_log.record("system", "trigger_update_data", actor=user.username)
+    background_tasks.add_task(update_all_data_with_progress, full_resync)
+    audit_log.record("system", "trigger_update_data", actor=user.username, full_resync=full_resync)
     return {"message": "모든 자산 데이터에 대한 백그라운드 업데이트가 시작되었습니다."}
 
 
-@app.post("/update-models", summary="모델 파이프라인 실행")
-def trigger_model_update(background_tasks: BackgroundTasks, user: UserPublic = Depends(require_admin)):
+@app.post("/update-models", summary="모델 파이프라인 실행 (기본은 입력이 바뀐 티커만, force=true면 전체 재학습)")
+def trigger_model_update(
+    background_tasks: BackgroundTasks,
+    force: bool = False,
+    user: UserPublic = Depends(require_admin),
+):
     progress_status["model_update"] = {"status": "running", "current": 0, "total": 0, "message": "시작 중..."}
-    background_tasks.add_task(update_all_models_with_progress)
-    audit_log.record("system", "trigger_update_models", actor=user.username)
+    background_tasks.add_task(update_all_models_with_progress, force)
+    audit_log.record("system", "trigger_update_models", actor=user.username, force=force)
     return {"message": "모든 AI 모델에 대한 백그라운드 재학습이 시작되었습니다."}
 
 
-def update_all_data_with_progress():
-    try:
-        tickers = get_all_tickers()
-        progress_status["data_update"]["total"] = len(tickers)
-        progress_status["data_update"]["message"] = f"총 {len(tickers)}개 자산 데이터 다운로드 중..."
+def update_all_data_with_progress(full_resync: bool = False):
+    def _progress(i, total, ticker):
+        progress_status["data_update"]["current"] = i
+        progress_status["data_update"]["total"] = total
+        progress_status["data_update"]["message"] = f"{ticker} 다운로드 중... ({i}/{total})"
 
-        from .data_handler import download_ticker_data
-        for i, ticker in enumerate(tickers, 1):
-            progress_status["data_update"]["current"] = i
-            progress_status["data_update"]["message"] = f"{ticker} 다운로드 중... ({i}/{len(tickers)})"
-            download_ticker_data(ticker)
+    try:
+        progress_status["data_update"]["status"] = "running"
+        result = update_all_data(full_resync=full_resync, progress=_progress)
 
         progress_status["data_update"]["status"] = "completed"
-        progress_status["data_update"]["message"] = "완료!"
+        if result:
+            progress_status["data_update"]["message"] = (
+                f"완료! {result['updated']}개 자산 갱신, 신규 {result['rows']}개 행"
+            )
+        else:
+            progress_status["data_update"]["message"] = "완료!"
     except Exception as e:
         progress_status["data_update"]["status"] = "error"
         progress_status["data_update"]["message"] = f"오류: {e}"
 
 
-def update_all_models_with_progress():
+def update_all_models_with_progress(force: bool = False):
+    def _progress(done, total, result):
+        progress_status["model_update"]["current"] = done
+        progress_status["model_update"]["total"] = total
+        state = {UNCHANGED: "생략 (변경 없음)"}.get(result.value, "완료") if result.ok else "실패"
+        progress_status["model_update"]["message"] = f"{result.ticker} 학습 {state} ({done}/{total})"
+
     try:
         tickers = get_all_tickers()
         progress_status["model_update"]["total"] = len(tickers)
         progress_status["model_update"]["message"] = f"총 {len(tickers)}개 모델 학습 중..."
 
-        for i, ticker in enumerate(tickers, 1):
-            if data_handler.load_data(ticker) is None:
-                print(f"'{ticker}'에 대한 데이터가 QuestDB에 없습니다. 학습 건너뜀.")
-                continue
-
-            progress_status["model_update"]["current"] = i
-            progress_status["model_update"]["message"] = f"{ticker} 학습 중... ({i}/{len(tickers)})"
-            try:
-                train_model(ticker)
-            except Exception as e:
-                print(f"'{ticker}' 학습 실패: {e}")
-                continue
+        # 티커별 학습은 프로세스 풀에서 병렬 실행 (데이터가 없는 티커는 train_model이 건너뜀)
+        summary = summarize(run_training(train_model, tickers, kwargs={"force": force}, progress=_progress))
+        # 새로 학습한 모델을 묶음 파일에 반영 (묶음 이후 바뀐 원본은 그 전까지 원본 파일로 예측)
+        progress_status["model_update"]["message"] = "모델 묶음 파일 갱신 중..."
+        model_pack.rebuild_packs(["model"])
 
         progress_status["model_update"]["status"] = "completed"
-        progress_status["model_update"]["message"] = "완료!"
+        progress_status["model_update"]["message"] = (
+            f"완료! 학습 {summary['trained']}개, 변경 없음 {summary['unchanged']}개, "
+            f"건너뜀 {summary['skipped']}개, 실패 {len(summary['failed'])}개"
+        )
     except Exception as e:
         progress_status["model_update"]["status"] = "error"
         progress_status["model_update"]["message"] = f"오류: {e}"
@@ -442,6 +473,7 @@ async def startup_event():
     auto_update_thread = threading.Thread(target=auto_update_task, daemon=True)
     auto_update_thread.start()
     strategy_executor.start()
+    data_handler.questdb_breaker.start()  # QuestDB 가용성은 백그라운드에서 확인
     audit_log.record("system", "startup")
     print("✅ Alpha 서버 v3.1 시작 (자동 업데이트 6h, 전략 워커 5분 주기)")
 
@@ -465,14 +497,25 @@ def get_recommendations(
         return {"error": "horizon 파라미터는 'short', 'medium', 'long' 중 하나여야 합니다."}
 
     tickers = get_all_tickers()
-    available_tickers = [t for t in tickers if data_handler.load_data(t) is not None]
-    if not available_tickers:
+    # OHLCV 패널은 한 번만 읽고 점수 계산(종가)과 글로벌 모델 배치 예측(지표)이 함께 쓴다
+    lookback_days = max(SCORING_LOOKBACK_DAYS, BATCH_LOOKBACK_DAYS)
+    lookback_start = datetime.date.today() - datetime.timedelta(days=lookback_days)
+    panel = data_handler.load_panel(tickers, start=lookback_start, layout="bars")
+    frames = data_handler.split_bars(panel, fields=["Close"])
+    if not frames:
         return {"error": "사용 가능한 데이터가 없습니다. '서버 데이터 업데이트 요청'을 먼저 실행해주세요."}
 
+    # 글로벌 모델 예측은 전체 종목을 호라이즌별 predict_proba 한 번씩으로 계산
+    try:
+        ai_probs = predict_global_batch(list(frames), panel=panel)
+    except Exception as e:
+        print(f"글로벌 AI 배치 예측 실패, 종목별 예측으로 대체: {e}")
+        ai_probs = {}
+
     all_scores = []
-    for ticker in available_tickers:
+    for ticker, data in frames.items():
         try:
-            scores = calculate_scores(ticker)
+            scores = calculate_scores(ticker, data.tail(SCORING_WINDOW), ai_probs=ai_probs.get(ticker))
             if scores:
                 all_scores.append({"symbol": ticker, "score": scores.get(horizon, 0)})
         except Exception as e:
@@ -0,0 +1,283 @@
+"""종목별 모델 묶음 파일 (모델 계열당 파일 하나, memmap으로 공유).
+
+~/AlphaModels의 `{ticker}_model.joblib`, `{ticker}_news_model.joblib`, `{ticker}_scaler.joblib`를 계열별로
+`<ALPHA_MODEL_PACK_DIR>/<계열>.pack` 하나에 모은다. 파일 구조:
+  [매직 8바이트][인덱스 위치 uint64][인덱스 길이 uint64][데이터 영역 ...][JSON 인덱스]
+- 인덱스: {ticker: {"source": 원본 파일 [mtime_ns, 크기], "compiled"|"blob": ...}}
+- 트리 모델은 tree_compiler 배열을 64바이트 정렬된 비압축 원시 배열로 저장한다. 읽을 때는 파일 전체를
+  읽기 전용 memmap으로 열고 배열을 복사 없이 뷰로 감싸므로, 여러 uvicorn 워커가 같은 페이지 캐시를
+  공유하고 티커 조회는 인덱스 dict 조회 + 뷰 생성뿐이다 (파일 열기/역직렬화 없음).
+- 트리 모델이 아닌 저장본(스케일러 등)은 joblib 파일 바이트를 그대로 넣고, 처음 조회할 때 한 번 역직렬화한다.
+- 조회 결과는 묶음 객체(= 파일 시그니처 하나)마다 티커별로 한 번만 만들어 재사용한다.
+  파일이 바뀌면 get_pack이 새 묶음 객체를 열므로 이전 결과는 함께 버려진다.
+- LSTM(.h5)은 keras가 파일 경로로만 로드하므로 묶지 않는다.
+
+조회 시 원본 파일이 남아 있고 묶은 시점 이후 바뀌었으면(재학습) 묶음 대신 원본을 쓴다.
+묶음은 update_all_models 등 일괄 학습이 끝난 뒤 다시 만들며, 직접 만들려면:
+  python -m alpha_server.model_pack [--family model news scaler]
+
+환경변수:
+  ALPHA_MODEL_PACKS     1이면 묶음 파일을 만들고 예측에 사용 (기본 1)
+  ALPHA_MODEL_PACK_DIR  묶음 파일 위치 (기본 ~/AlphaModels/packs)
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import struct
+import threading
+from typing import Any, Optional
+
+import joblib
+import numpy as np
+
+from .tree_compiler import compile_model, compiled_path, from_arrays, load_compiled, to_arrays
+
+MODEL_PACKS_ENABLED = os.getenv("ALPHA_MODEL_PACKS", "1") == "1"
+MODELS_DIR = os.path.expanduser("~/AlphaModels")
+MODEL_PACK_DIR = os.path.expanduser(os.getenv("ALPHA_MODEL_PACK_DIR", os.path.join(MODELS_DIR, "packs")))
+
+# 계열 → 원본 파일 이름 접미사 (긴 접미사부터 비교)
+FAMILIES = {
+    "news": "_news_model.joblib",
+    "scaler": "_scaler.joblib",
+    "model": "_model.joblib",
+}
+
+_MAGIC = b"ALPHAPK1"
+_HEADER = struct.Struct("<8sQQ")
+_ALIGN = 64
+
+
+def pack_path(family: str, pack_dir: Optional[str] = None) -> str:
+    return os.path.join(pack_dir or MODEL_PACK_DIR, f"{family}.pack")
+
+
+def family_of(model_path: str) -> Optional[tuple[str, str]]:
+    """원본 모델 파일 경로 → (계열, 티커). 묶음 대상이 아니면 None."""
+    name = os.path.basename(model_path)
+    for family, suffix in FAMILIES.items():
+        if name.endswith(suffix) and len(name) > len(suffix):
+            ticker = name[:-len(suffix)]
+            return None if ticker.startswith("global_") else (family, ticker)
+    return None
+
+
+def _signature(path: str) -> Optional[list[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _compiled_entry(path: str) -> Optional[Any]:
+    """원본 저장본을 CompiledModel로 (최신 컴파일본이 있으면 그것, 아니면 원본을 컴파일). 불가능하면 None."""
+    sidecar = compiled_path(path)
+    if os.path.exists(sidecar):
+        compiled = load_compiled(sidecar)
+        if compiled.is_current(path):
+            return compiled
+    payload = joblib.load(path)
+    if not isinstance(payload, dict) or "model" not in payload:
+        return None
+    meta = {k: v for k, v in payload.items() if k not in ("model", "features")}
+    try:
+        json.dumps(meta)
+        return compile_model(payload["model"], payload.get("features", ()), meta)
+    except (TypeError, ValueError, AttributeError, KeyError):
+        return None
+
+
+def build_pack(family: str, models_dir: Optional[str] = None, pack_dir: Optional[str] = None) -> dict:
+    """models_dir의 family 원본 파일을 모두 묶어 <pack_dir>/<family>.pack으로 저장 (임시 파일에 쓰고 교체)."""
+    models_dir = models_dir or MODELS_DIR
+    path = pack_path(family, pack_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    suffix = FAMILIES[family]
+    names = sorted(
+        n for n in os.listdir(models_dir)
+        if n.endswith(suffix) and family_of(os.path.join(models_dir, n)) == (family, n[:-len(suffix)])
+    )
+
+    index: dict[str, dict] = {}
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, 0, 0))
+
+        def write_raw(data) -> int:
+            f.write(b"\0" * (-f.tell() % _ALIGN))
+            offset = f.tell()
+            f.write(data)
+            return offset
+
+        for name in names:
+            src = os.path.join(models_dir, name)
+            ticker = name[:-len(suffix)]
+            source = _signature(src)
+            try:
+                compiled = _compiled_entry(src)
+            except Exception as e:  # 손상된 파일은 건너뛴다
+                print(f"모델 묶음 제외 ({name}): {e}")
+                continue
+            entry: dict = {"source": source}
+            if compiled is not None:
+                header, arrays = to_arrays(compiled)
+                entry["compiled"] = {
+                    "header": header,
+                    "arrays": {
+                        key: [write_raw(np.ascontiguousarray(a).tobytes()), a.dtype.str, list(a.shape)]
+                        for key, a in arrays.items()
+                    },
+                }
+            else:
+                with open(src, "rb") as s:
+                    blob = s.read()
+                entry["blob"] = [write_raw(blob), len(blob)]
+            index[ticker] = entry
+
+        f.write(b"\0" * (-f.tell() % _ALIGN))
+        index_offset = f.tell()
+        raw_index = json.dumps(index, ensure_ascii=False).encode("utf-8")
+        f.write(raw_index)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, index_offset, len(raw_index)))
+    os.replace(tmp, path)
+
+    compiled_count = sum("compiled" in e for e in index.values())
+    stats = {
+        "family": family,
+        "path": path,
+        "entries": len(index),
+        "compiled": compiled_count,
+        "blobs": len(index) - compiled_count,
+        "bytes": os.path.getsize(path),
+    }
+    print(f"모델 묶음 저장: {family} {stats['entries']}개 (트리 배열 {compiled_count}개) → {path} ({stats['bytes'] / 1e6:.1f} MB)")
+    return stats
+
+
+class ModelPack:
+    """읽기 전용 묶음 파일. 배열은 memmap 뷰이므로 프로세스 간에 페이지를 공유한다."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.signature = _signature(path)
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, index_offset, index_len = _HEADER.unpack(bytes(self._mm[:_HEADER.size]))
+        if magic != _MAGIC:
+            raise ValueError(f"모델 묶음 파일이 아닙니다: {path}")
+        self.index: dict[str, dict] = json.loads(bytes(self._mm[index_offset:index_offset + index_len]))
+        self._loaded: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.index
+
+    def _array(self, offset: int, dtype: str, shape: list[int]) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        return self._mm[offset:offset + size].view(dtype).reshape(shape)
+
+    def get(self, ticker: str) -> Optional[Any]:
+        """티커의 저장본. 트리 모델은 {meta..., 'model': CompiledModel, 'features'} dict."""
+        entry = self.index.get(ticker)
+        if entry is None:
+            return None
+        with self._lock:
+            loaded = self._loaded.get(ticker)
+            if loaded is None:
+                loaded = self._loaded[ticker] = self._load(entry)
+            return loaded
+
+    def _load(self, entry: dict) -> Any:
+        if "compiled" in entry:
+            spec = entry["compiled"]
+            arrays = {key: self._array(*where) for key, where in spec["arrays"].items()}
+            compiled = from_arrays(spec["header"], arrays)
+            return {**compiled.meta, "model": compiled, "features": compiled.features}
+        offset, length = entry["blob"]
+        return joblib.load(io.BytesIO(self._mm[offset:offset + length].tobytes()))
+
+    def source(self, ticker: str) -> Optional[list[int]]:
+        entry = self.index.get(ticker)
+        return None if entry is None else entry["source"]
+
+
+_packs: dict[str, ModelPack] = {}
+_packs_lock = threading.Lock()
+_counters = {"hits": 0, "stale": 0}
+
+
+def get_pack(family: str) -> Optional[ModelPack]:
+    """계열 묶음 (파일이 바뀌면 다시 연다). 없으면 None."""
+    path = pack_path(family)
+    signature = _signature(path)
+    with _packs_lock:
+        pack = _packs.get(family)
+        if signature is None:
+            _packs.pop(family, None)
+            return None
+        if pack is None or pack.path != path or pack.signature != signature:
+            try:
+                pack = ModelPack(path)
+            except (OSError, ValueError) as e:
+                print(f"경고: 모델 묶음을 열 수 없습니다 ({path}): {e}")
+                return None
+            _packs[family] = pack
+        return pack
+
+
+def load_packed(model_path: str) -> Optional[Any]:
+    """원본 모델 파일 경로에 해당하는 묶음 저장본. 묶음에 없거나 원본이 그 뒤에 바뀌었으면 None."""
+    if not MODEL_PACKS_ENABLED:
+        return None
+    located = family_of(model_path)
+    if located is None:
+        return None
+    family, ticker = located
+    pack = get_pack(family)
+    if pack is None or ticker not in pack:
+        return None
+    current = _signature(model_path)
+    if current is not None and current != pack.source(ticker):
+        _counters["stale"] += 1
+        return None
+    _counters["hits"] += 1
+    return pack.get(ticker)
+
+
+def rebuild_packs(families=("model",)) -> None:
+    """일괄 학습 후 호출. 실패해도 학습 결과에는 영향이 없도록 경고만 남긴다."""
+    if not MODEL_PACKS_ENABLED:
+        return
+    for family in families:
+        try:
+            build_pack(family)
+        except OSError as e:
+            print(f"경고: 모델 묶음 생성 실패 ({family}): {e}")
+
+
+def stats() -> dict:
+    with _packs_lock:
+        packs = {
+            family: {"entries": len(pack.index), "bytes": int(pack._mm.size)}
+            for family, pack in _packs.items()
+        }
+    return {"enabled": MODEL_PACKS_ENABLED, "packs": packs, **_counters}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="종목별 모델 파일을 계열별 묶음 파일로 만듭니다.")
+    parser.add_argument("--family", nargs="+", choices=list(FAMILIES), default=list(FAMILIES))
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--pack-dir", default=MODEL_PACK_DIR)
+    args = parser.parse_args()
+    for family in args.family:
+        build_pack(family, args.models_dir, args.pack_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""프로세스 전역 모델 레지스트리 (예측 함수 앞단).
+
+- 키: 모델 파일 경로. 처음 요청될 때 한 번만 로드하고 이후에는 메모리의 객체를 돌려준다.
+- 핫 리로드: 파일의 (mtime_ns, 크기) 서명을 기록해 두고, 재학습으로 파일이 교체되면 다음
+  조회에서 다시 로드한다. stat 호출은 ALPHA_MODEL_CHECK_SEC 간격으로만 한다.
+- 디스크 파일 크기를 메모리 사용량의 근사치로 쓰는 바이트 예산 + 항목 수 기반 LRU.
+- 같은 파일을 여러 스레드가 동시에 요청해도 로드는 한 번만 일어난다 (경로별 잠금). 경로별 잠금은
+  약한 참조로만 보관해 그 경로를 기다리거나 로드하는 스레드가 없으면 사라진다 (캐시 항목 수와 무관하게
+  한 번이라도 조회된 경로 수만큼 쌓이지 않도록).
+
+환경변수:
+  ALPHA_MODEL_CACHE_SIZE  최대 항목 수 (기본 256, 0이면 비활성화: 매번 로드)
+  ALPHA_MODEL_CACHE_MB    바이트 예산, 파일 크기 기준 (기본 1024)
+  ALPHA_MODEL_CHECK_SEC   파일 변경 확인 간격 (기본 1초, 0이면 매 조회마다 확인)
+
+load_model()/load_predictor()는 종목별 모델 묶음 파일(model_pack)에 최신 저장본이 있으면 그것을 먼저 쓴다.
+load_predictor()는 그다음 트리 모델의 컴파일본(tree_compiler)이 원본과 같으면 그것을, 아니면 원본을 돌려준다.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import joblib
+
+from .model_pack import load_packed
+from .tree_compiler import COMPILED_TREES_ENABLED, compiled_path, load_compiled
+
+MODEL_CACHE_SIZE = int(os.getenv("ALPHA_MODEL_CACHE_SIZE", "256"))
+MODEL_CACHE_MB = float(os.getenv("ALPHA_MODEL_CACHE_MB", "1024"))
+MODEL_CHECK_SEC = float(os.getenv("ALPHA_MODEL_CHECK_SEC", "1.0"))
+
+
+def _signature(path: str) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class _Entry:
+    __slots__ = ("obj", "signature", "size", "checked_at")
+
+    def __init__(self, obj: Any, signature: tuple[int, int], checked_at: float) -> None:
+        self.obj = obj
+        self.signature = signature
+        self.size = signature[1]
+        self.checked_at = checked_at
+
+
+class ModelRegistry:
+    def __init__(self, max_entries: int = 256, max_bytes: int = 1024 * 1024 * 1024,
+                 check_interval: float = 1.0) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._path_locks: weakref.WeakValueDictionary[str, threading.Lock] = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.load_errors = 0
+        self.load_seconds = 0.0
+        self.max_load_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, path: str, loader: Callable[[str], Any] = joblib.load) -> Optional[Any]:
+        """경로의 모델 객체. 파일이 없으면 None (캐시된 항목도 제거)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry.obj
+            path_lock = self._path_locks.get(path)
+            if path_lock is None:
+                path_lock = self._path_locks[path] = threading.Lock()
+
+        with path_lock:
+            signature = _signature(path)
+            with self._lock:
+                entry = self._entries.get(path)
+                if signature is None:
+                    if entry is not None:
+                        self._drop(path)
+                    return None
+                if entry is not None and entry.signature == signature:
+                    # 다른 스레드가 방금 로드했거나 파일이 그대로인 경우
+                    entry.checked_at = now
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry.obj
+                reload = entry is not None
+
+            started = time.perf_counter()
+            try:
+                obj = loader(path)
+            except Exception:
+                with self._lock:
+                    self.load_errors += 1
+                raise
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self.loads += 1
+                self.reloads += int(reload)
+                self.load_seconds += elapsed
+                self.max_load_seconds = max(self.max_load_seconds, elapsed)
+                if path in self._entries:
+                    self._drop(path)
+                if self.enabled and signature[1] <= self.max_bytes:
+                    self._entries[path] = _Entry(obj, signature, time.monotonic())
+                    self._bytes += signature[1]
+                    while self._entries and (len(self._entries) > self.max_entries
+                                             or self._bytes > self.max_bytes):
+                        self._drop(next(iter(self._entries)))
+                        self.evictions += 1
+            if reload:
+                print(f"모델 파일 변경 감지, 다시 로드: {os.path.basename(path)} ({elapsed * 1000:.0f} ms)")
+            return obj
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """한 경로(또는 path=None이면 전체)의 캐시 항목 제거."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif path in self._entries:
+                self._drop(path)
+
+    def _drop(self, path: str) -> None:
+        entry = self._entries.pop(path)
+        self._bytes -= entry.size
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.loads
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "load_errors": self.load_errors,
+                "load_seconds_total": round(self.load_seconds, 4),
+                "load_seconds_avg": round(self.load_seconds / self.loads, 4) if self.loads else 0.0,
+                "load_seconds_max": round(self.max_load_seconds, 4),
+                "check_interval": self.check_interval,
+            }
+
+
+registry = ModelRegistry(
+    max_entries=MODEL_CACHE_SIZE,
+    max_bytes=int(MODEL_CACHE_MB * 1024 * 1024),
+    check_interval=MODEL_CHECK_SEC,
+)
+
+
+def load_model(path: str, loader: Callable[[str], Any] = joblib.load) -> Optional[Any]:
+    """registry.get의 단축 함수 (예측 함수에서 joblib.load 대신 사용). joblib 저장본은 묶음 파일 우선."""
+    if loader is joblib.load:
+        packed = load_packed(path)
+        if packed is not None:
+            return packed
+    return registry.get(path, loader)
+
+
+def load_predictor(model_path: str) -> Optional[dict]:
+    """예측용 모델 저장본 dict ('model', 'features', 'feature_set_version' 등).
+
+    컴파일본(<모델 파일>.trees.npz)이 원본 모델 파일과 같은 시점의 것이면 'model'은 NumPy만 쓰는
+    CompiledModel이고 원본은 로드하지 않는다. 컴파일본이 없거나 낡았으면 원본 joblib 저장본.
+    """
+    packed = load_packed(model_path)
+    if packed is not None:
+        return packed
+    if COMPILED_TREES_ENABLED:
+        compiled = registry.get(compiled_path(model_path), loader=load_compiled)
+        if compiled is not None and compiled.is_current(model_path):
+            return {**compiled.meta, 'model': compiled, 'features': compiled.features}
+    return registry.get(model_path)
@@ -6,6 +6,7 @@ from sklearn.metrics import accuracy_score
 import joblib
 import os
 from .news_handler import get_daily_sentiment
+from .model_registry import load_model
 
 MODELS_DIR = os.path.expanduser("~/AlphaModels")
 os.makedirs(MODELS_DIR, exist_ok=True)
@@ -84,10 +85,10 @@ def predict_news(ticker, data):
     """뉴스 모델로 예측합니다."""
     model_path = os.path.join(MODELS_DIR, f"{ticker}_news_model.joblib")
     
-    if not os.path.exists(model_path):
+    # model_registry 캐시 (파일이 없으면 None)
+    saved = load_model(model_path)
+    if saved is None:
         return None
-    
-    saved = joblib.load(model_path)
     model = saved['model']
     
     # 최신 뉴스 특성
@@ -0,0 +1,135 @@
+"""프로세스 전역 OHLCV 캐시 (load_data 앞단).
+
+- 키: (티커, 마지막 봉 타임스탬프, 조회 조건). 쓰기 경로가 invalidate(ticker, last_ts)를
+  호출하면 해당 티커의 기존 항목은 제거되고 이후 조회는 새 워터마크 키로 다시 채워진다.
+- 바이트 예산 기반 LRU. 예산을 넘으면 가장 오래 사용되지 않은 항목부터 제거한다.
+- 멀티 워커 환경에서는 다른 프로세스의 쓰기를 알 수 없으므로 TTL로 한 번 더 보호한다.
+
+환경변수:
+  ALPHA_OHLCV_CACHE_MB       캐시 바이트 예산 (기본 256, 0이면 비활성화)
+  ALPHA_OHLCV_CACHE_TTL_SEC  항목 최대 수명 (기본 300초)
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import pandas as pd
+
+MISS = object()
+
+# None(데이터 없음) 결과를 캐시할 때 사용할 명목상 크기
+_NONE_ENTRY_BYTES = 64
+
+
+def _frame_bytes(df: Optional[pd.DataFrame]) -> int:
+    if df is None:
+        return _NONE_ENTRY_BYTES
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+class OHLCVCache:
+    def __init__(self, max_bytes: int, ttl_seconds: float = 300.0) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple, tuple[Optional[pd.DataFrame], int, float]] = OrderedDict()
+        self._versions: dict[str, Any] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _key(self, ticker: str, query: Hashable) -> tuple:
+        return (ticker, self._versions.get(ticker), query)
+
+    def version(self, ticker: str) -> Any:
+        """티커의 현재 키 버전(마지막 쓰기의 마지막 봉 타임스탬프)."""
+        with self._lock:
+            return self._versions.get(ticker)
+
+    def get(self, ticker: str, query: Hashable):
+        """캐시된 DataFrame 사본(또는 None)을 반환. 없으면 MISS."""
+        if not self.enabled:
+            return MISS
+        with self._lock:
+            key = self._key(ticker, query)
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[2] > self.ttl_seconds:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            df = entry[0]
+        return None if df is None else df.copy()
+
+    def put(self, ticker: str, query: Hashable, df: Optional[pd.DataFrame], version: Any = MISS) -> None:
+        """조회 결과 저장. version은 조회 시작 전 version() 값으로, 그 사이 쓰기가 있었으면 버린다."""
+        if not self.enabled:
+            return
+        stored = None if df is None else df.copy()
+        size = _frame_bytes(stored)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version is not MISS and version != self._versions.get(ticker):
+                return
+            key = self._key(ticker, query)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (stored, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, ticker: str, last_ts: Any = None) -> None:
+        """티커의 모든 항목을 제거하고, 새 마지막 봉 타임스탬프를 키 버전으로 기록."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == ticker]:
+                self._drop(key)
+            self.invalidations += 1
+            # 같은 마지막 봉으로 재기록되는 경우(전체 재동기화)도 구분되도록 순번을 함께 둔다.
+            self._versions[ticker] = (last_ts, self.invalidations)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+cache = OHLCVCache(
+    max_bytes=int(float(os.getenv("ALPHA_OHLCV_CACHE_MB", "256")) * 1024 * 1024),
+    ttl_seconds=float(os.getenv("ALPHA_OHLCV_CACHE_TTL_SEC", "300")),
+)
@@ -22,7 +22,7 @@ def log_prediction(ticker, prediction_data):
     
     # 현재 가격 가져오기
     try:
-        data = load_data(ticker)
+        data = load_data(ticker, last_n=1)
         if data is not None and not data.empty:
             log_entry['current_price'] = float(data['Close'].iloc[-1])
     except:
@@ -66,7 +66,7 @@ def evaluate_predictions(days_ago=7):
         
         # 현재 가격 가져오기
         try:
-            data = load_data(ticker)
+            data = load_data(ticker, last_n=1)
             if data is None or data.empty:
                 continue
             
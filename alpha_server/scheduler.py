@@ -26,11 +26,17 @@ def scheduled_data_update():
         logger.error(f"데이터 업데이트 실패: {e}")
 
 def scheduled_model_update():
-    """주말에 모델 재학습"""
+    """주말에 모델 재학습 (입력이 바뀌었거나 오래된 모델만)"""
     logger.info(f"[{datetime.now()}] 자동 모델 재학습 시작")
     try:
-        update_all_models()
-        logger.info("모델 재학습 완료")
+        summary = update_all_models()
+        if summary:
+            logger.info(
+                f"모델 재학습 완료: 학습 {summary['trained']}개, 변경 없음 {summary['unchanged']}개 건너뜀, "
+                f"실패 {len(summary['failed'])}개"
+            )
+        else:
+            logger.info("모델 재학습 완료")
     except Exception as e:
         logger.error(f"모델 재학습 실패: {e}")
 
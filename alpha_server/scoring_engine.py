@@ -1,42 +1,51 @@
 import pandas as pd
 import numpy as np
-from .model_handler import load_data
+from .data_handler import load_data
+from .feature_engine import SCORING_FEATURES, compute_feature_block
 from .global_model_predictor import predict_with_global_model
 
-def calculate_scores(ticker):
+# 1년 수익률/변동성(252일) 계산에 필요한 최소 구간 + 여유분
+SCORING_WINDOW = 260
+# 패널 조회 시 SCORING_WINDOW개 봉을 확보하기 위한 달력 기준 조회 기간 (휴장일 포함)
+SCORING_LOOKBACK_DAYS = 400
+
+def calculate_scores(ticker, data=None, ai_probs=None):
     """
     하나의 티커에 대해 모든 시간대에 대한 투자 가치 점수를 계산합니다.
     글로벌(Global) AI 모델을 활용합니다.
+    data가 주어지면 (백테스트 등) 저장소 조회 없이 그 데이터를 사용합니다.
+    ai_probs: predict_global_batch 결과 중 이 티커의 {horizon: 상승 확률}. 주어지면 티커별 모델 호출 없이 사용합니다.
     """
-    data = load_data(ticker)
+    if data is None:
+        data = load_data(ticker, last_n=SCORING_WINDOW)
     if data is None or data.empty:
         return None
 
-    # --- 공통 지표 계산 ---
-    # 최근 데이터 포인트
-    latest = data.iloc[-1]
+    # --- 공통 지표 계산 (공용 피처 엔진, 마지막 봉 값만 사용) ---
+    block = compute_feature_block(data, SCORING_FEATURES)
+    latest = dict(zip(SCORING_FEATURES, (float(v) for v in block[-1])))
 
     # 1. 모멘텀 (RSI)
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    latest_rsi = rsi.iloc[-1]
+    latest_rsi = latest['RSI_14']
 
     # 2. 단기/중기 추세 (이동 평균)
-    sma_20 = data['Close'].rolling(window=20).mean().iloc[-1]
-    sma_50 = data['Close'].rolling(window=50).mean().iloc[-1]
+    sma_20 = latest['SMA_20']
+    sma_50 = latest['SMA_50']
 
-    # 3. 장기 추세 (1년 수익률)
-    annual_return = (data['Close'].pct_change(periods=252).iloc[-1]) * 100 # 1년 영업일 기준
+    # 3. 장기 추세 (1년 수익률, 252 영업일 기준 %)
+    annual_return = latest['Return_252d']
 
-    # 4. 변동성 (1년 표준편차)
-    volatility = (data['Close'].pct_change().rolling(window=252).std().iloc[-1]) * np.sqrt(252)
+    # 4. 변동성 (1년 표준편차, 연율화)
+    volatility = latest['Volatility_252d']
 
     # 5. 글로벌 AI 모델 예측 (단기, 중기, 장기)
     ai_scores = {}
     for horizon in ["short", "mid", "long"]:
+        if ai_probs is not None:
+            # 배치 예측 확률: predict_with_global_model의 UP(확률 > 0.5)/DOWN과 같은 규칙, 예측 없음은 0
+            prob = ai_probs.get(horizon)
+            ai_scores[horizon] = 0 if prob is None else 1 if prob > 0.5 else -1
+            continue
         try:
             prediction_result = predict_with_global_model(ticker, horizon_name=horizon)
             # 'UP' 예측은 1, 'DOWN'은 -1, 그 외는 0으로 변환
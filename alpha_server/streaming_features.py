@@ -0,0 +1,389 @@
+"""봉 하나씩 갱신하는 스트리밍 지표 누산기 (최신 봉 추론용).
+
+feature_engine의 배치 커널과 같은 정의를 따르므로 같은 값을 낸다 (float32 반올림 범위 내).
+- 이동평균/표준편차: 고정 길이 링 버퍼의 합·제곱합. 갱신은 O(1)이고, window번 갱신할 때마다
+  버퍼로 다시 합산해 부동소수 오차가 쌓이지 않게 한다.
+- EMA / Wilder RSI: 직전 값만 보관하는 재귀식
+- 종가 NaN: 배치 엔진과 같게 EMA는 직전 값을 유지하고 다음 유효값에서 건너뛴 봉 수만큼 감쇠해 합치며,
+  Wilder RSI는 NaN 변화량을 0으로, 이동 윈도우(수익률 표준편차 포함)는 NaN이 윈도우를 벗어날 때까지 NaN
+- ROC / 수익률: 직전 N개 종가 링 버퍼
+따라서 새 봉 하나의 피처 벡터 비용은 윈도우 길이와 무관하게 O(피처 수)이다.
+
+상태는 to_dict()/from_dict()로 JSON에 담을 수 있고, feature_store가 티커별 meta에 보관한다.
+배치 계산 뒤에는 from_history(마지막 봉들, compute_incremental이 돌려준 state)로 이어받는다.
+"""
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .feature_engine import TECHNICAL_FEATURES, history_bars
+
+_NAN = float("nan")
+
+
+def _div(a: float, b: float) -> float:
+    """feature_engine._safe_div와 같은 규칙 (분모 0 → NaN)."""
+    return _NAN if b == 0 else a / b
+
+
+def _rsi(gain: float, loss: float) -> float:
+    if math.isnan(gain) or math.isnan(loss):
+        return _NAN
+    if loss == 0:
+        return _NAN if gain == 0 else 100.0
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+# ---------- 누산기 ----------
+class RollingWindow:
+    """마지막 window개 값의 평균/표본 표준편차. NaN이 하나라도 있으면 NaN (rolling과 동일)."""
+
+    def __init__(self, window: int, values: Sequence[float] = ()) -> None:
+        self.window = window
+        self.values: deque = deque((float(v) for v in values), maxlen=window)
+        self._resync()
+
+    def _resync(self) -> None:
+        finite = [v for v in self.values if not math.isnan(v)]
+        self.nans = len(self.values) - len(finite)
+        # 상쇄 오차를 줄이기 위해 최근 값 기준으로 이동한 합/제곱합을 유지
+        self.shift = finite[-1] if finite else 0.0
+        self.total = math.fsum(v - self.shift for v in finite)
+        self.total_sq = math.fsum((v - self.shift) ** 2 for v in finite)
+        self.pushes = 0
+
+    def push(self, x: float) -> None:
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if math.isnan(old):
+                self.nans -= 1
+            else:
+                d = old - self.shift
+                self.total -= d
+                self.total_sq -= d * d
+        self.values.append(x)
+        if math.isnan(x):
+            self.nans += 1
+        else:
+            d = x - self.shift
+            self.total += d
+            self.total_sq += d * d
+        self.pushes += 1
+        if self.pushes >= self.window:
+            self._resync()
+
+    def ready(self) -> bool:
+        return len(self.values) == self.window and self.nans == 0
+
+    def mean(self) -> float:
+        return self.total / self.window + self.shift if self.ready() else _NAN
+
+    def std(self) -> float:
+        if not self.ready() or self.window < 2:
+            return _NAN
+        var = (self.total_sq - self.total * self.total / self.window) / (self.window - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def to_dict(self) -> dict:
+        return {"values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, window: int, state: dict) -> "RollingWindow":
+        return cls(window, state["values"])
+
+
+class Lag:
+    """x[t] / x[t - periods] - 1."""
+
+    def __init__(self, periods: int, values: Sequence[float] = ()) -> None:
+        self.periods = periods
+        self.values: deque = deque((float(v) for v in values), maxlen=periods + 1)
+
+    def push(self, x: float) -> None:
+        self.values.append(x)
+
+    def change(self) -> float:
+        if len(self.values) <= self.periods:
+            return _NAN
+        return _div(self.values[-1], self.values[0]) - 1.0
+
+    def to_dict(self) -> dict:
+        return {"values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, periods: int, state: dict) -> "Lag":
+        return cls(periods, state["values"])
+
+
+class EMA:
+    """ewm(span, adjust=False). 첫 값은 첫 유효 입력.
+
+    NaN 입력은 feature_engine._ema_with_gaps와 같이 값을 유지하고, 다음 유효값에서 직전 값의 가중치를
+    (1 - alpha) ** (직전 유효값 이후 봉 수)로 감쇠해 합친다. gap은 직전 유효값 이후 봉 수 (바로 앞이면 1).
+    """
+
+    def __init__(self, span: int, value: Optional[float] = None, gap: int = 1) -> None:
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        # 이전 형식 상태에 NaN이 저장돼 있으면 다음 유효값에서 다시 시작 (NaN이 영구히 남지 않도록)
+        self.value = None if value is None or math.isnan(value) else value
+        self.gap = gap
+
+    @property
+    def state_key(self) -> str:
+        return f"ema:Close:{self.span}"
+
+    def push(self, x: float) -> None:
+        if math.isnan(x):
+            if self.value is not None:
+                self.gap += 1
+            return
+        if self.value is None:
+            self.value = x
+        else:
+            w = (1.0 - self.alpha) ** self.gap
+            self.value = (w * self.value + self.alpha * x) / (w + self.alpha)
+        self.gap = 1
+
+    def current(self) -> float:
+        return _NAN if self.value is None else self.value
+
+    def restore(self, state, last_close: float) -> None:
+        # gap은 from_history가 꼬리 봉을 넣으며 센 값을 그대로 쓴다 (배치 state는 마지막 봉의 EMA)
+        value = float(state)
+        self.value = None if math.isnan(value) else value
+
+    def to_dict(self) -> dict:
+        return {"value": self.value, "gap": self.gap}
+
+    @classmethod
+    def from_dict(cls, span: int, state: dict) -> "EMA":
+        return cls(span, state["value"], state.get("gap", 1))
+
+
+class SimpleRSI:
+    """변화량 상승/하락분의 window 단순 평균으로 만든 RSI (feature_engine RSI_14)."""
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self.prev: Optional[float] = None
+        self.gains = RollingWindow(window)
+        self.losses = RollingWindow(window)
+
+    def push(self, close: float) -> None:
+        # 첫 봉(변화량 없음)은 배치 엔진과 같이 0으로 취급
+        delta = close - self.prev if self.prev is not None else _NAN
+        self.gains.push(delta if delta > 0 else 0.0)
+        self.losses.push(-delta if delta < 0 else 0.0)
+        self.prev = close
+
+    def current(self) -> float:
+        return _rsi(self.gains.mean(), self.losses.mean())
+
+    def to_dict(self) -> dict:
+        return {"prev": self.prev, "gains": self.gains.to_dict(), "losses": self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, window: int, state: dict) -> "SimpleRSI":
+        acc = cls(window)
+        acc.prev = state["prev"]
+        acc.gains = RollingWindow.from_dict(window, state["gains"])
+        acc.losses = RollingWindow.from_dict(window, state["losses"])
+        return acc
+
+
+class WilderRSI:
+    """첫 window개 변화량의 단순 평균을 시드로, 이후 1/window 평활 (feature_engine RSI_14_Wilder)."""
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self.prev: Optional[float] = None
+        self.count = 0
+        self.sums = [0.0, 0.0]
+        self.averages: Optional[list[float]] = None
+
+    @property
+    def state_key(self) -> str:
+        return f"wilder:Close:{self.window}"
+
+    def push(self, close: float) -> None:
+        if self.prev is None:
+            self.prev = close
+            return
+        delta = close - self.prev
+        self.prev = close
+        gain, loss = (delta if delta > 0 else 0.0), (-delta if delta < 0 else 0.0)
+        if self.averages is None:
+            self.sums[0] += gain
+            self.sums[1] += loss
+            self.count += 1
+            if self.count == self.window:
+                self.averages = [self.sums[0] / self.window, self.sums[1] / self.window]
+            return
+        alpha = 1.0 / self.window
+        self.averages = [alpha * gain + (1.0 - alpha) * self.averages[0],
+                         alpha * loss + (1.0 - alpha) * self.averages[1]]
+
+    def current(self) -> float:
+        return _NAN if self.averages is None else _rsi(self.averages[0], self.averages[1])
+
+    def restore(self, state, last_close: float) -> None:
+        self.averages = [float(state[0]), float(state[1])]
+        self.count = self.window
+        self.prev = last_close
+
+    def to_dict(self) -> dict:
+        return {"prev": self.prev, "count": self.count, "sums": self.sums, "averages": self.averages}
+
+    @classmethod
+    def from_dict(cls, window: int, state: dict) -> "WilderRSI":
+        acc = cls(window)
+        acc.prev, acc.count, acc.sums, acc.averages = state["prev"], state["count"], state["sums"], state["averages"]
+        return acc
+
+
+class ReturnStd:
+    """1봉 수익률의 window 표본 표준편차."""
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self.lag = Lag(1)
+        self.returns = RollingWindow(window)
+
+    def push(self, close: float) -> None:
+        self.lag.push(close)
+        self.returns.push(self.lag.change())
+
+    def std(self) -> float:
+        return self.returns.std()
+
+    def to_dict(self) -> dict:
+        return {"lag": self.lag.to_dict(), "returns": self.returns.to_dict()}
+
+    @classmethod
+    def from_dict(cls, window: int, state: dict) -> "ReturnStd":
+        acc = cls(window)
+        acc.lag = Lag.from_dict(1, state["lag"])
+        acc.returns = RollingWindow.from_dict(window, state["returns"])
+        return acc
+
+
+# 누산기 이름 → (클래스, 파라미터, 입력 컬럼). 순서대로 갱신된다.
+_ACCUMULATORS: dict[str, tuple[type, int, str]] = {
+    "close_20": (RollingWindow, 20, "Close"),
+    "close_50": (RollingWindow, 50, "Close"),
+    "volume_20": (RollingWindow, 20, "Volume"),
+    "rsi_14": (SimpleRSI, 14, "Close"),
+    "wilder_14": (WilderRSI, 14, "Close"),
+    "ema_12": (EMA, 12, "Close"),
+    "ema_26": (EMA, 26, "Close"),
+    "lag_5": (Lag, 5, "Close"),
+    "lag_10": (Lag, 10, "Close"),
+    "lag_252": (Lag, 252, "Close"),
+    "ret_252": (ReturnStd, 252, "Close"),
+}
+
+_Bar = tuple  # (timestamp, open, high, low, close, volume)
+_OUTPUTS: dict[str, tuple[tuple[str, ...], Callable[[dict, _Bar], float]]] = {
+    "SMA_20": (("close_20",), lambda a, b: a["close_20"].mean()),
+    "SMA_50": (("close_50",), lambda a, b: a["close_50"].mean()),
+    "RSI_14": (("rsi_14",), lambda a, b: a["rsi_14"].current()),
+    "RSI_14_Wilder": (("wilder_14",), lambda a, b: a["wilder_14"].current()),
+    "Volatility": (("close_20",), lambda a, b: a["close_20"].std()),
+    "EMA_12": (("ema_12",), lambda a, b: a["ema_12"].current()),
+    "EMA_26": (("ema_26",), lambda a, b: a["ema_26"].current()),
+    "MACD": (("ema_12", "ema_26"), lambda a, b: a["ema_12"].current() - a["ema_26"].current()),
+    "ROC": (("lag_10",), lambda a, b: a["lag_10"].change() * 100.0),
+    "Return_5d": (("lag_5",), lambda a, b: a["lag_5"].change()),
+    "BB_Width": (("close_20",), lambda a, b: _div(a["close_20"].std() * 4.0, a["close_20"].mean())),
+    "Volume_SMA": (("volume_20",), lambda a, b: a["volume_20"].mean()),
+    "Volume_Ratio": (("volume_20",), lambda a, b: _div(b[5], a["volume_20"].mean())),
+    "High_Low_Ratio": ((), lambda a, b: _div(b[2], b[3])),
+    "DayOfWeek": ((), lambda a, b: float(b[0].dayofweek)),
+    "Month": ((), lambda a, b: float(b[0].month)),
+    "Return_252d": (("lag_252",), lambda a, b: a["lag_252"].change() * 100.0),
+    "Volatility_252d": (("ret_252",), lambda a, b: a["ret_252"].std() * math.sqrt(252)),
+}
+
+_INPUT_POS = {"Close": 4, "Volume": 5}
+
+
+class StreamingFeatures:
+    def __init__(self, features: Sequence[str] = TECHNICAL_FEATURES) -> None:
+        unknown = [f for f in features if f not in _OUTPUTS]
+        if unknown:
+            raise ValueError(f"알 수 없는 피처: {unknown}")
+        self.features = list(features)
+        needed = {key for f in self.features for key in _OUTPUTS[f][0]}
+        self.acc = {key: spec[0](spec[1]) for key, spec in _ACCUMULATORS.items() if key in needed}
+        self._outputs = [_OUTPUTS[f][1] for f in self.features]
+        self.bars = 0
+        self.last_ts: Optional[pd.Timestamp] = None
+
+    def _push(self, bar: _Bar) -> None:
+        for key, acc in self.acc.items():
+            acc.push(bar[_INPUT_POS[_ACCUMULATORS[key][2]]])
+        self.bars += 1
+        self.last_ts = bar[0]
+
+    def update(self, ts, open_: float, high: float, low: float, close: float, volume: float) -> np.ndarray:
+        """새 봉 하나를 반영하고 그 봉의 피처 벡터(float64, features 순서)를 반환."""
+        bar = (pd.Timestamp(ts), float(open_), float(high), float(low), float(close), float(volume))
+        self._push(bar)
+        return np.array([fn(self.acc, bar) for fn in self._outputs], dtype=np.float64)
+
+    def update_frame(self, data: pd.DataFrame) -> np.ndarray:
+        """data의 봉을 차례로 반영하고 (행 × 피처) float32 블록을 반환."""
+        block = np.empty((len(data), len(self.features)), dtype=np.float32)
+        rows = zip(
+            pd.DatetimeIndex(data.index),
+            *(data[c].to_numpy(dtype=np.float64) for c in ("Open", "High", "Low", "Close", "Volume")),
+        )
+        for i, row in enumerate(rows):
+            block[i] = self.update(*row)
+        return block
+
+    @classmethod
+    def from_history(
+        cls, tail: pd.DataFrame, state: dict, features: Sequence[str] = TECHNICAL_FEATURES,
+    ) -> "StreamingFeatures":
+        """배치 계산의 마지막 봉들(history_bars(features) + 1개 이상)과 재귀 지표 state로 누산기 구성."""
+        sf = cls(features)
+        if tail.empty:
+            return sf
+        closes = tail["Close"].to_numpy(dtype=np.float64)
+        for ts, row in zip(pd.DatetimeIndex(tail.index), tail[["Open", "High", "Low", "Close", "Volume"]].to_numpy(np.float64)):
+            sf._push((ts,) + tuple(row.tolist()))
+        for acc in sf.acc.values():
+            key = getattr(acc, "state_key", None)
+            if key is not None and key in state:
+                acc.restore(state[key], float(closes[-1]))
+        return sf
+
+    def to_dict(self) -> dict:
+        return {
+            "features": self.features,
+            "bars": self.bars,
+            "last_ts": None if self.last_ts is None else int(self.last_ts.value),
+            "acc": {key: acc.to_dict() for key, acc in self.acc.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "StreamingFeatures":
+        sf = cls(state["features"])
+        for key in sf.acc:
+            spec = _ACCUMULATORS[key]
+            sf.acc[key] = spec[0].from_dict(spec[1], state["acc"][key])
+        sf.bars = state["bars"]
+        sf.last_ts = None if state["last_ts"] is None else pd.Timestamp(state["last_ts"])
+        return sf
+
+
+def tail_bars(features: Sequence[str] = TECHNICAL_FEATURES) -> int:
+    """from_history에 넘겨야 하는 마지막 봉 수."""
+    return history_bars(features) + 1
@@ -0,0 +1,97 @@
+"""모델 학습 매니페스트 (입력이 바뀐 티커만 재학습).
+
+모델 파일마다 옆에 `<모델 파일 이름>.manifest.json`을 두고 학습에 쓴 입력을 기록한다.
+  {"data": {"rows", "first_ts", "last_ts", "hash"}, "feature_set_version", "params",
+   "trained_at", "accuracy"}
+- data.hash는 OHLCV 값과 타임스탬프의 blake2b 해시이므로 과거 봉이 수정되어도 감지된다.
+- params는 학습기 종류와 하이퍼파라미터 (n_jobs 같은 실행 옵션은 넣지 않는다).
+재학습 전에 needs_training()으로 비교해 데이터/피처 버전/하이퍼파라미터가 모두 같고 모델이
+ALPHA_MODEL_MAX_AGE_DAYS보다 오래되지 않았으면 학습을 건너뛴다 (학습 함수는 UNCHANGED 반환).
+
+환경변수:
+  ALPHA_MODEL_MAX_AGE_DAYS  입력이 같아도 이 일수보다 오래된 모델은 재학습 (기본 30, 0이면 나이 무시)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .feature_engine import FEATURE_SET_VERSION
+from .training_scheduler import UNCHANGED
+
+MODEL_MAX_AGE_DAYS = float(os.getenv("ALPHA_MODEL_MAX_AGE_DAYS", "30"))
+
+_HASH_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def manifest_path(model_path: str) -> str:
+    return model_path + ".manifest.json"
+
+
+def data_fingerprint(data: pd.DataFrame) -> dict:
+    """OHLCV DataFrame의 지문 (행 수, 처음/마지막 타임스탬프, 내용 해시)."""
+    index = pd.DatetimeIndex(data.index)
+    columns = [c for c in _HASH_COLUMNS if c in data.columns]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(",".join(columns).encode())
+    digest.update(np.ascontiguousarray(index.asi8).tobytes())
+    digest.update(np.ascontiguousarray(data[columns].to_numpy(dtype=np.float64)).tobytes())
+    return {
+        "rows": int(len(data)),
+        "first_ts": index[0].isoformat() if len(index) else None,
+        "last_ts": index[-1].isoformat() if len(index) else None,
+        "hash": digest.hexdigest(),
+    }
+
+
+def read_manifest(model_path: str) -> Optional[dict]:
+    try:
+        with open(manifest_path(model_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(model_path: str, fingerprint: dict, params: dict,
+                   accuracy: Optional[float] = None) -> dict:
+    """모델 저장 직후 호출. 임시 파일에 쓰고 교체하므로 중간에 끊겨도 이전 매니페스트가 남는다."""
+    manifest = {
+        "data": fingerprint,
+        "feature_set_version": FEATURE_SET_VERSION,
+        "params": params,
+        "trained_at": time.time(),
+        "accuracy": None if accuracy is None else float(accuracy),
+    }
+    path = manifest_path(model_path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+    return manifest
+
+
+def needs_training(model_path: str, fingerprint: dict, params: dict,
+                   max_age_days: Optional[float] = None) -> tuple[bool, str]:
+    """(재학습 필요 여부, 이유)."""
+    if not os.path.exists(model_path):
+        return True, "모델 없음"
+    manifest = read_manifest(model_path)
+    if manifest is None:
+        return True, "매니페스트 없음"
+    if manifest.get("data") != fingerprint:
+        return True, "데이터 변경"
+    if manifest.get("feature_set_version") != FEATURE_SET_VERSION:
+        return True, "피처 버전 변경"
+    if manifest.get("params") != params:
+        return True, "하이퍼파라미터 변경"
+    max_age = MODEL_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    age_days = (time.time() - manifest.get("trained_at", 0)) / 86400
+    if max_age > 0 and age_days > max_age:
+        return True, f"모델 {age_days:.0f}일 경과"
+    return False, "변경 없음"
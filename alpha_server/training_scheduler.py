@@ -0,0 +1,196 @@
+"""티커별 모델 학습 스케줄러 (프로세스 풀 + CPU 예산).
+
+작은 티커별 학습을 여러 프로세스에서 동시에 돌리고, 학습 하나가 쓰는 스레드 수를 고정한다.
+- 각 학습은 n_jobs=threads_per_fit으로 호출되고, 작업 프로세스는 시작할 때 BLAS/OpenMP/TF 스레드
+  수를 같은 값으로 제한한다 (threadpoolctl + OMP_NUM_THREADS 등). 동시 실행 수는
+  CPU 예산 // threads_per_fit 이므로 모델 내부 n_jobs=-1과 티커 병렬이 겹쳐 코어를 초과하지 않는다.
+- 티커 하나의 예외(또는 작업 프로세스 비정상 종료)는 그 티커의 실패로만 기록하고 나머지는 계속한다.
+  프로세스가 죽으면 풀 전체가 깨지므로, 그때 끝나지 않은 티커는 티커마다 작업 프로세스 하나짜리
+  풀에서 다시 실행해 같은 티커가 다시 죽어도 다른 티커를 끌고 가지 않게 한다.
+- progress(done, total, result) 콜백은 티커가 끝날 때마다 호출 순서대로 불린다 (부모 프로세스).
+- 작업자가 1개이거나 PyInstaller 등으로 패키징된 실행 파일이면 같은 프로세스에서 차례로 학습한다.
+
+학습 함수는 모듈 최상위 함수여야 하고 fn(ticker, n_jobs=..., **kwargs) 형태로 호출된다.
+
+환경변수:
+  ALPHA_TRAIN_WORKERS          동시 학습 프로세스 수 (기본 0 = CPU 예산 // ALPHA_TRAIN_THREADS_PER_FIT)
+  ALPHA_TRAIN_THREADS_PER_FIT  학습 하나가 쓰는 스레드 수 (기본 1)
+  ALPHA_TRAIN_CPU_BUDGET       학습에 쓸 전체 코어 수 (기본 0 = os.cpu_count())
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # pragma: no cover
+    threadpool_limits = None
+
+TRAIN_WORKERS = int(os.getenv("ALPHA_TRAIN_WORKERS", "0"))
+THREADS_PER_FIT = int(os.getenv("ALPHA_TRAIN_THREADS_PER_FIT", "1"))
+CPU_BUDGET = int(os.getenv("ALPHA_TRAIN_CPU_BUDGET", "0"))
+
+# 작업 프로세스에서 고정할 네이티브 스레드 풀 환경변수
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+    "TF_NUM_INTEROP_THREADS",
+)
+
+# 학습 함수가 입력 변경 없음으로 학습을 건너뛰었을 때의 반환값 (training_manifest 참고)
+UNCHANGED = "unchanged"
+
+_limits = None  # 작업 프로세스의 threadpool_limits 핸들 (프로세스 수명 동안 유지)
+
+ProgressFn = Callable[[int, int, "TrainResult"], None]
+
+
+@dataclass
+class TrainResult:
+    ticker: str
+    value: Any = None      # 학습 함수 반환값 (보통 정확도, 데이터가 없으면 None)
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def plan(n_tasks: int, workers: Optional[int] = None, threads_per_fit: Optional[int] = None,
+         cpu_budget: Optional[int] = None) -> tuple[int, int]:
+    """(동시 학습 수, 학습당 스레드 수). 동시 학습 수 × 스레드 수가 CPU 예산을 넘지 않는다."""
+    budget = max(1, cpu_budget or CPU_BUDGET or os.cpu_count() or 1)
+    threads = max(1, min(threads_per_fit or THREADS_PER_FIT, budget))
+    slots = max(1, budget // threads)
+    workers = min(workers or TRAIN_WORKERS or slots, slots, max(1, n_tasks))
+    return max(1, workers), threads
+
+
+def _limit_threads(threads: int) -> None:
+    global _limits
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    if threadpool_limits is not None:
+        _limits = threadpool_limits(limits=threads)
+
+
+def _run_one(fn: Callable, ticker: str, threads: int, kwargs: dict) -> TrainResult:
+    started = time.perf_counter()
+    try:
+        value = fn(ticker, n_jobs=threads, **kwargs)
+        return TrainResult(ticker, value=value, seconds=time.perf_counter() - started)
+    except Exception as e:
+        return TrainResult(ticker, error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - started)
+
+
+def _frozen() -> bool:
+    return getattr(sys, "frozen", False)
+
+
+def run_training(
+    fn: Callable,
+    tickers: Iterable[str],
+    kwargs: Optional[dict] = None,
+    workers: Optional[int] = None,
+    threads_per_fit: Optional[int] = None,
+    cpu_budget: Optional[int] = None,
+    progress: Optional[ProgressFn] = None,
+) -> list[TrainResult]:
+    """tickers마다 fn(ticker, n_jobs=threads, **kwargs)를 실행하고 티커 순서대로 결과를 돌려준다."""
+    tickers = list(dict.fromkeys(tickers))
+    kwargs = kwargs or {}
+    total = len(tickers)
+    workers, threads = plan(total, workers, threads_per_fit, cpu_budget)
+    results: dict[str, TrainResult] = {}
+
+    def finish(result: TrainResult) -> None:
+        results[result.ticker] = result
+        if not result.ok:
+            print(f"오류: '{result.ticker}' 학습 실패 - {result.error}")
+        if progress is not None:
+            progress(len(results), total, result)
+
+    print(f"학습 스케줄: {total}개 티커, 동시 {workers}개 × 스레드 {threads}개")
+    if workers == 1 or _frozen():
+        for ticker in tickers:
+            finish(_run_one(fn, ticker, threads, kwargs))
+    else:
+        _run_pool(fn, tickers, workers, threads, kwargs, finish)
+    return [results[t] for t in tickers]
+
+
+def _new_pool(workers: int, threads: int) -> ProcessPoolExecutor:
+    ctx = multiprocessing.get_context("spawn")  # 부모의 스레드/DB 연결 상태를 물려받지 않음
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=_limit_threads, initargs=(threads,))
+
+
+def _run_pool(fn, tickers, workers, threads, kwargs, finish) -> None:
+    """프로세스 풀 실행. 작업 프로세스가 죽어 풀이 깨지면 끝나지 않은 티커를 하나씩 격리해 다시 시도한다."""
+    broken: list[str] = []
+    with _new_pool(min(workers, len(tickers)), threads) as pool:
+        pending = {pool.submit(_run_one, fn, t, threads, kwargs): t for t in tickers}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = pending.pop(future)
+                try:
+                    finish(future.result())
+                except BrokenProcessPool:
+                    broken.append(ticker)
+    if broken:
+        print(f"경고: 학습 프로세스가 비정상 종료되어 {len(broken)}개 티커를 하나씩 다시 시도합니다.")
+        _run_isolated(fn, broken, workers, threads, kwargs, finish)
+
+
+def _run_isolated(fn, tickers, workers, threads, kwargs, finish) -> None:
+    """티커마다 작업 프로세스 하나짜리 풀에서 실행한다 (동시에 workers개).
+    어떤 티커가 프로세스를 죽여도 그 티커만 실패로 기록된다."""
+    queue = list(tickers)
+    active: dict = {}
+    while queue or active:
+        while queue and len(active) < workers:
+            ticker = queue.pop(0)
+            pool = _new_pool(1, threads)
+            active[pool.submit(_run_one, fn, ticker, threads, kwargs)] = (ticker, pool)
+        done, _ = wait(active, return_when=FIRST_COMPLETED)
+        for future in done:
+            ticker, pool = active.pop(future)
+            try:
+                finish(future.result())
+            except BrokenProcessPool:
+                finish(TrainResult(ticker, error="학습 프로세스 비정상 종료"))
+            finally:
+                pool.shutdown(wait=True)
+
+
+def summarize(results: list[TrainResult]) -> dict:
+    """학습 결과 요약.
+
+    trained: 모델 저장, unchanged: 입력이 같아 재학습 생략 (UNCHANGED 반환),
+    skipped: 데이터 부족 등으로 반환값 없음, failed: 예외.
+    """
+    scores = {r.ticker: r.value for r in results if r.ok and isinstance(r.value, (int, float))}
+    unchanged = sum(1 for r in results if r.ok and isinstance(r.value, str) and r.value == UNCHANGED)
+    skipped = sum(1 for r in results if r.ok and r.value is None)
+    return {
+        "total": len(results),
+        "trained": sum(1 for r in results if r.ok) - unchanged - skipped,
+        "unchanged": unchanged,
+        "skipped": skipped,
+        "failed": [r.ticker for r in results if not r.ok],
+        "scores": scores,
+        "fit_seconds": round(sum(r.seconds for r in results), 1),  # 티커별 학습 시간 합 (벽시계 시간 아님)
+    }
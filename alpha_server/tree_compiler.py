@@ -0,0 +1,419 @@
+"""학습된 트리 앙상블을 NumPy 노드 배열로 컴파일해 서빙하는 추론 엔진.
+
+- 지원 모델: sklearn RandomForest/ExtraTrees/DecisionTree 분류기, XGBClassifier, LGBMClassifier,
+  그리고 이들을 soft voting으로 묶은 VotingClassifier (모두 이진/다중 클래스 확률 출력).
+  다중 출력 sklearn 포레스트(여러 호라이즌 라벨을 한 번에 학습한 모델)도 지원하며, 이때 predict_proba는
+  sklearn과 같이 출력별 (행 × 클래스) 배열의 리스트를 돌려준다.
+- 모든 트리의 노드를 하나의 연속 배열(feature, threshold, left, right, missing_left, value)로 이어
+  붙이고, 리프는 자기 자신을 가리키게 해 (행 × 트리) 노드 번호 행렬을 최대 깊이만큼 한꺼번에
+  전진시키는 방식으로 순회한다. 행 하나든 전체 종목이든 파이썬 루프는 깊이 횟수뿐이다.
+- 컴파일 결과는 `<모델 파일>.trees.npz`(비압축 npz)로 저장하며, 읽기/예측에는 NumPy만 필요하다
+  (서빙 프로세스가 sklearn/xgboost/lightgbm을 import하지 않아도 된다).
+- 호출당 검증/디스패치 비용이 없어 단일 행~수백 행 예측이 빠르다. 수천 행 배치는 sklearn의 C 순회가
+  더 빠를 수 있다 (tests/benchmark_trees.py).
+- 원본 모델 파일의 (mtime_ns, 크기)를 헤더에 기록하므로, 다른 경로로 모델이 다시 저장되어
+  컴파일본이 낡으면 is_current()가 False가 되고 호출 측은 원본 모델로 폴백한다.
+
+비교 규칙: sklearn은 float32로 바꾼 입력에 `x <= threshold`, XGBoost는 float32 입력에 `x < threshold`,
+LightGBM은 float64 입력에 `x <= threshold`. 결측치(NaN)는 노드별 missing_left 방향으로 보낸다.
+
+환경변수:
+  ALPHA_COMPILED_TREES  1이면 학습 시 컴파일본을 함께 저장하고 예측에 사용 (기본 1)
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+COMPILED_TREES_ENABLED = os.getenv("ALPHA_COMPILED_TREES", "1") == "1"
+
+FORMAT_VERSION = 2  # 2: 순회용 children 배열을 함께 저장 (1은 읽을 때 만든다)
+_PART_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots", "children")
+
+
+def compiled_path(model_path: str) -> str:
+    return model_path + ".trees.npz"
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+@dataclass
+class CompiledTrees:
+    """트리 묶음 하나 (앙상블의 구성 모델 하나).
+
+    kind="proba": value는 (노드 × 클래스) 리프 클래스 비율, 출력은 트리 평균 (RandomForest).
+        다중 출력 포레스트면 value는 (노드 × 출력 × 클래스)이고 출력도 (행 × 출력 × 클래스).
+    kind="margin": value는 (노드 × 1) 리프 점수, 출력은 base_score + 트리 합의 시그모이드 (부스터).
+    """
+    feature: np.ndarray       # int32, 리프는 0
+    threshold: np.ndarray     # float64 (입력 dtype으로 반올림된 값)
+    left: np.ndarray          # int32 전역 노드 번호, 리프는 자기 자신
+    right: np.ndarray
+    missing_left: np.ndarray  # bool
+    value: np.ndarray         # float64
+    roots: np.ndarray         # int32 트리별 루트 노드 번호
+    depth: int
+    kind: str = "proba"
+    strict: bool = False      # True면 x < threshold 일 때 왼쪽 (XGBoost)
+    input_dtype: str = "float32"
+    base_score: float = 0.0
+    # 순회용 int32: 노드 i의 (왼쪽, 오른쪽) 자식을 children[2i], children[2i + 1]에 두어 한 번의 gather로 전진.
+    # 저장본에 들어 있으므로 묶음 파일에서 읽으면 memmap 뷰 그대로 쓴다
+    children: Optional[np.ndarray] = None
+
+    def __post_init__(self) -> None:
+        if self.children is None:
+            self.children = np.column_stack([self.left, self.right]).ravel().astype(np.int32)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """(행 × 트리) 리프 노드 번호."""
+        X = np.asarray(X, dtype=self.input_dtype).astype(np.float64, copy=False)
+        n_rows, n_features = X.shape
+        flat = np.ascontiguousarray(X).ravel()
+        offsets = (np.arange(n_rows) * n_features).astype(np.int32)
+        has_nan = bool(np.isnan(flat).any())
+        # (트리 × 행) 순서: 같은 트리의 노드를 연달아 읽어 캐시 효율이 좋다
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        for _ in range(self.depth):
+            x = flat[offsets + self.feature[nodes]]
+            thr = self.threshold[nodes]
+            go_right = (x >= thr) if self.strict else (x > thr)
+            if has_nan:
+                go_right |= np.isnan(x) & ~self.missing_left[nodes]
+            nodes = self.children[2 * nodes + go_right]
+        return nodes.T
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X)
+        if self.kind == "proba":
+            return self.value[leaves].mean(axis=1)
+        p = _sigmoid(self.base_score + self.value[leaves, 0].sum(axis=1))
+        return np.column_stack([1.0 - p, p])
+
+
+@dataclass
+class CompiledModel:
+    """컴파일된 분류기. predict_proba/predict는 원본 모델과 같은 확률/클래스를 낸다."""
+    parts: list[CompiledTrees]
+    weights: Optional[list[float]]
+    classes: np.ndarray
+    features: list[str] = field(default_factory=list)
+    meta: dict = field(default_factory=dict)
+    source: Optional[list[int]] = None  # 원본 모델 파일의 [mtime_ns, 크기]
+
+    def _matrix(self, X: Any) -> np.ndarray:
+        if hasattr(X, "columns") and self.features:
+            X = X[self.features]
+        return np.asarray(X, dtype=np.float64)
+
+    @property
+    def n_outputs(self) -> int:
+        return 1 if self.classes.ndim == 1 else len(self.classes)
+
+    def predict_proba(self, X: Any):
+        X = self._matrix(X)
+        probas = [part.predict_proba(X) for part in self.parts]
+        proba = np.average(probas, axis=0, weights=self.weights)
+        if self.n_outputs > 1:
+            return [proba[:, k, :] for k in range(self.n_outputs)]
+        return proba
+
+    def predict(self, X: Any) -> np.ndarray:
+        proba = self.predict_proba(X)
+        if self.n_outputs > 1:
+            return np.column_stack([self.classes[k][np.argmax(p, axis=1)] for k, p in enumerate(proba)])
+        return self.classes[np.argmax(proba, axis=1)]
+
+    @property
+    def classes_(self) -> np.ndarray:
+        """sklearn 분류기와 같은 이름 (호출 측이 두 종류를 구분하지 않도록)."""
+        return self.classes
+
+    def is_current(self, model_path: str) -> bool:
+        """원본 모델 파일이 컴파일 당시 그대로인지."""
+        try:
+            st = os.stat(model_path)
+        except OSError:
+            return False
+        return self.source == [st.st_mtime_ns, st.st_size]
+
+
+# ---------- 컴파일러 ----------
+
+class _Builder:
+    """트리를 하나씩 받아 전역 노드 배열로 이어 붙인다."""
+
+    def __init__(self) -> None:
+        self.feature: list = []
+        self.threshold: list = []
+        self.left: list = []
+        self.right: list = []
+        self.missing_left: list = []
+        self.value: list = []
+        self.roots: list[int] = []
+        self.depth = 0
+        self.size = 0
+
+    def add(self, feature, threshold, left, right, missing_left, value, depth: int) -> None:
+        """트리 하나 (노드 번호는 트리 내부 기준, 리프는 left == -1)."""
+        n = len(feature)
+        leaf = np.asarray(left) < 0
+        own = np.arange(n) + self.size
+        self.feature.append(np.where(leaf, 0, feature).astype(np.int32))
+        self.threshold.append(np.where(leaf, 0.0, threshold).astype(np.float64))
+        self.left.append(np.where(leaf, own, np.asarray(left) + self.size).astype(np.int32))
+        self.right.append(np.where(leaf, own, np.asarray(right) + self.size).astype(np.int32))
+        self.missing_left.append(np.asarray(missing_left, dtype=bool) & ~leaf)
+        self.value.append(np.asarray(value, dtype=np.float64))
+        self.roots.append(self.size)
+        self.depth = max(self.depth, depth)
+        self.size += n
+
+    def build(self, **kwargs) -> CompiledTrees:
+        return CompiledTrees(
+            feature=np.concatenate(self.feature),
+            threshold=np.concatenate(self.threshold),
+            left=np.concatenate(self.left),
+            right=np.concatenate(self.right),
+            missing_left=np.concatenate(self.missing_left),
+            value=np.concatenate(self.value),
+            roots=np.asarray(self.roots, dtype=np.int32),
+            depth=self.depth,
+            **kwargs,
+        )
+
+
+def _compile_sklearn(model) -> CompiledTrees:
+    estimators = getattr(model, "estimators_", None) or [model]
+    builder = _Builder()
+    for est in estimators:
+        t = est.tree_
+        value = t.value.astype(np.float64)  # (노드 × 출력 × 클래스)
+        value = value[:, 0, :] if value.shape[1] == 1 else value
+        totals = value.sum(axis=-1, keepdims=True)
+        value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+        missing = getattr(t, "missing_go_to_left", np.zeros(t.node_count, dtype=np.uint8))
+        # sklearn은 float32 입력을 float64 임계값과 비교한다
+        builder.add(t.feature, t.threshold, t.children_left, t.children_right, missing, value, t.max_depth)
+    return builder.build(kind="proba", strict=False, input_dtype="float32")
+
+
+def _feature_index(name: str, features: Sequence[str]) -> int:
+    if name in features:
+        return list(features).index(name)
+    if name.startswith("f") and name[1:].isdigit():
+        return int(name[1:])
+    raise ValueError(f"알 수 없는 분할 피처: {name}")
+
+
+def _flatten_json(root: dict, children_of, is_leaf) -> list[dict]:
+    """JSON 트리를 전위 순회해 노드 목록으로 (각 노드에 _id/_depth 부여)."""
+    nodes: list[dict] = []
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        node["_id"], node["_depth"] = len(nodes), depth
+        nodes.append(node)
+        if not is_leaf(node):
+            for child in reversed(children_of(node)):
+                stack.append((child, depth + 1))
+    return nodes
+
+
+def _parse_base_score(raw) -> float:
+    """learner_model_param.base_score 파싱. XGBoost 2.1+는 출력별 벡터를 "[5E-1]" 형태로 쓴다."""
+    if isinstance(raw, str):
+        values = [v for v in raw.strip().strip("[]").split(",") if v.strip()]
+        if len(values) != 1:
+            raise ValueError(f"XGBoost base_score를 해석할 수 없습니다: {raw!r}")
+        raw = values[0]
+    return float(raw)
+
+
+def _xgboost_base_margin(config: dict) -> float:
+    """base_score(확률 단위)를 트리 합에 더할 마진(로짓)으로 변환. 로지스틱 목적함수만 지원."""
+    learner = config["learner"]
+    objective = learner.get("objective", {}).get("name", "binary:logistic")
+    base = _parse_base_score(learner["learner_model_param"]["base_score"])
+    if objective not in ("binary:logistic", "reg:logistic"):
+        raise ValueError(f"XGBoost 목적함수 {objective}는 컴파일할 수 없습니다.")
+    if not 0.0 < base < 1.0:
+        raise ValueError(f"XGBoost base_score {base}는 확률 범위 밖입니다.")
+    return float(np.log(base / (1.0 - base)))
+
+
+def _compile_xgboost(model, features: Sequence[str]) -> CompiledTrees:
+    booster = model.get_booster()
+    if getattr(model, "n_classes_", 2) != 2:
+        raise ValueError("XGBoost는 이진 분류만 컴파일할 수 있습니다.")
+    config = json.loads(booster.save_config())
+    base_margin = _xgboost_base_margin(config)
+    names = booster.feature_names or list(features)
+    builder = _Builder()
+    for dump in booster.get_dump(dump_format="json"):
+        nodes = _flatten_json(
+            json.loads(dump),
+            lambda n: sorted(n["children"], key=lambda c: c["nodeid"] != n["yes"]),
+            lambda n: "leaf" in n,
+        )
+        by_id = {n["nodeid"]: n for n in nodes}
+        leaf = ["leaf" in n for n in nodes]
+        builder.add(
+            feature=[0 if lf else _feature_index(n["split"], names) for n, lf in zip(nodes, leaf)],
+            # 분할값은 float32로 저장되어 있으므로 같은 값으로 반올림
+            threshold=np.float32([0.0 if lf else n["split_condition"] for n, lf in zip(nodes, leaf)]),
+            left=[-1 if lf else by_id[n["yes"]]["_id"] for n, lf in zip(nodes, leaf)],
+            right=[-1 if lf else by_id[n["no"]]["_id"] for n, lf in zip(nodes, leaf)],
+            missing_left=[not lf and n["missing"] == n["yes"] for n, lf in zip(nodes, leaf)],
+            value=[[n["leaf"] if lf else 0.0] for n, lf in zip(nodes, leaf)],
+            depth=max(n["_depth"] for n in nodes),
+        )
+    return builder.build(kind="margin", strict=True, input_dtype="float32", base_score=base_margin)
+
+
+def _compile_lightgbm(model) -> CompiledTrees:
+    dump = model.booster_.dump_model()
+    if dump.get("num_class", 1) != 1:
+        raise ValueError("LightGBM은 이진 분류만 컴파일할 수 있습니다.")
+    # "binary sigmoid:1": 확률 = 1 / (1 + exp(-sigmoid × 트리 합)) 이므로 리프 값에 sigmoid를 곱해 둔다
+    objective = dump.get("objective", "binary sigmoid:1").split()
+    if not objective or objective[0] != "binary":
+        raise ValueError(f"LightGBM 목적함수 {' '.join(objective)}는 컴파일할 수 없습니다.")
+    scale = next((float(p.split(":", 1)[1]) for p in objective[1:] if p.startswith("sigmoid:")), 1.0)
+    builder = _Builder()
+    for info in dump["tree_info"]:
+        nodes = _flatten_json(
+            info["tree_structure"],
+            lambda n: [n["left_child"], n["right_child"]],
+            lambda n: "leaf_value" in n,
+        )
+        for n in nodes:
+            if "decision_type" in n and n["decision_type"] != "<=":
+                raise ValueError("LightGBM 범주형 분할은 컴파일할 수 없습니다.")
+        leaf = ["leaf_value" in n for n in nodes]
+        builder.add(
+            feature=[0 if lf else n["split_feature"] for n, lf in zip(nodes, leaf)],
+            threshold=[0.0 if lf else n["threshold"] for n, lf in zip(nodes, leaf)],
+            left=[-1 if lf else n["left_child"]["_id"] for n, lf in zip(nodes, leaf)],
+            right=[-1 if lf else n["right_child"]["_id"] for n, lf in zip(nodes, leaf)],
+            missing_left=[not lf and n.get("default_left", False) for n, lf in zip(nodes, leaf)],
+            value=[[n["leaf_value"] * scale if lf else 0.0] for n, lf in zip(nodes, leaf)],
+            depth=max(n["_depth"] for n in nodes),
+        )
+    return builder.build(kind="margin", strict=False, input_dtype="float64")
+
+
+def _compile_part(model, features: Sequence[str]) -> CompiledTrees:
+    name = type(model).__name__
+    if name.startswith("XGB"):
+        return _compile_xgboost(model, features)
+    if name.startswith("LGBM"):
+        return _compile_lightgbm(model)
+    if hasattr(model, "tree_") or hasattr(getattr(model, "estimators_", None), "__len__"):
+        return _compile_sklearn(model)
+    raise ValueError(f"컴파일할 수 없는 모델: {name}")
+
+
+def compile_model(model, features: Sequence[str] = (), meta: Optional[dict] = None) -> CompiledModel:
+    """학습된 분류기를 CompiledModel로 변환. 지원하지 않는 모델이면 ValueError."""
+    features = list(features)
+    if type(model).__name__ == "VotingClassifier":
+        if model.voting != "soft":
+            raise ValueError("hard voting은 컴파일할 수 없습니다.")
+        parts = [_compile_part(est, features) for est in model.estimators_]
+        weights = None if model.weights is None else [float(w) for w in model.weights]
+        classes = np.asarray(model.le_.classes_)
+    else:
+        parts = [_compile_part(model, features)]
+        weights = None
+        classes = model.classes_
+        if isinstance(classes, list):  # 다중 출력: 출력마다 클래스 수가 같아야 (출력 × 클래스) 배열로 저장 가능
+            if len({len(c) for c in classes}) != 1:
+                raise ValueError("출력별 클래스 수가 다른 다중 출력 모델은 컴파일할 수 없습니다.")
+            classes = np.stack([np.asarray(c) for c in classes])
+        classes = np.asarray(classes)
+    return CompiledModel(parts=parts, weights=weights, classes=classes, features=features, meta=dict(meta or {}))
+
+
+# ---------- 저장/로드 (NumPy만 사용) ----------
+
+def to_arrays(compiled: CompiledModel) -> tuple[dict, dict[str, np.ndarray]]:
+    """(JSON 헤더, 이름 → 배열). 배열 이름은 p<구성 모델 번호>_<필드>."""
+    header = {
+        "format": FORMAT_VERSION,
+        "weights": compiled.weights,
+        "classes": compiled.classes.tolist(),
+        "features": compiled.features,
+        "meta": compiled.meta,
+        "source": compiled.source,
+        "parts": [
+            {"depth": p.depth, "kind": p.kind, "strict": p.strict,
+             "input_dtype": p.input_dtype, "base_score": p.base_score}
+            for p in compiled.parts
+        ],
+    }
+    arrays = {
+        f"p{i}_{name}": getattr(p, name) for i, p in enumerate(compiled.parts) for name in _PART_ARRAYS
+    }
+    return header, arrays
+
+
+def from_arrays(header: dict, arrays) -> CompiledModel:
+    if header.get("format") not in (1, FORMAT_VERSION):
+        raise ValueError(f"지원하지 않는 컴파일 형식: {header.get('format')}")
+    # 배열은 복사하지 않고 그대로 쓴다 (형식 1에는 children이 없어 CompiledTrees가 만든다)
+    parts = [
+        CompiledTrees(**{name: arrays[f"p{i}_{name}"] for name in _PART_ARRAYS if f"p{i}_{name}" in arrays}, **spec)
+        for i, spec in enumerate(header["parts"])
+    ]
+    return CompiledModel(
+        parts=parts,
+        weights=header["weights"],
+        classes=np.asarray(header["classes"]),
+        features=header["features"],
+        meta=header["meta"],
+        source=header["source"],
+    )
+
+
+def save_compiled(compiled: CompiledModel, path: str) -> None:
+    """비압축 npz로 저장 (임시 파일에 쓰고 교체)."""
+    header, arrays = to_arrays(compiled)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, header=np.array(json.dumps(header, ensure_ascii=False)), **arrays)
+    os.replace(tmp, path)
+
+
+def load_compiled(path: str) -> CompiledModel:
+    with np.load(path, allow_pickle=False) as npz:
+        header = json.loads(str(npz["header"]))
+        arrays = {name: npz[name] for name in npz.files if name != "header"}
+    return from_arrays(header, arrays)
+
+
+def write_compiled(model_path: str, model, features: Sequence[str], meta: Optional[dict] = None) -> bool:
+    """모델 파일 저장 직후 호출해 컴파일본을 옆에 저장. 지원하지 않는 모델이면 낡은 컴파일본을 지우고 False."""
+    path = compiled_path(model_path)
+    if COMPILED_TREES_ENABLED:
+        try:
+            compiled = compile_model(model, features, meta)
+            st = os.stat(model_path)
+            compiled.source = [st.st_mtime_ns, st.st_size]
+            save_compiled(compiled, path)
+            return True
+        except (ValueError, AttributeError, KeyError) as e:
+            print(f"트리 컴파일 건너뜀 ({os.path.basename(model_path)}): {e}")
+    if os.path.exists(path):
+        os.remove(path)
+    return False
@@ -0,0 +1,272 @@
+"""워크포워드(확장 윈도우) 검증.
+
+단일 80/20 분할 대신 시간순으로 여러 폴드를 만든다. 폴드 k는 검증 구간 첫 날짜 전의 행 중 라벨이 검증
+구간의 가격을 보지 않는 행으로 학습하고, 그 다음 날짜 구간을 검증한다.
+- 종목별 모델은 날짜가 곧 그 티커의 봉이므로 검증 구간 앞의 gap(=target_days)개 날짜를 뺀다.
+- 글로벌 모델은 미국/한국/암호화폐처럼 거래일 달력이 다른 티커가 섞여 있어 h봉 뒤가 며칠 뒤인지 행마다
+  다르므로 (합친 데이터셋의 고유 날짜 h개로는 모자라다), 행마다 라벨 종료 날짜(GlobalDataset.label_ends)가
+  검증 구간 첫 날짜보다 앞선 행만 학습에 쓴다.
+- 종목별 모델: 티커마다 피처를 한 번만 읽고 (feature_store) 모든 폴드가 같은 행렬을 구간별로 나눠 쓴다.
+  티커 단위로 training_scheduler 프로세스 풀에서 병렬 실행한다.
+- 글로벌 모델: 디스크 데이터셋(global_dataset.build_cached_dataset)을 작업 프로세스마다 memmap으로 열어
+  폴드 단위로 병렬 실행한다 (피처 재계산/행렬 전달 없음).
+폴드 결과는 끝나는 대로 JSONL 파일에 한 줄씩 기록한다.
+
+  python -m alpha_server.walk_forward [--global] [--tickers AAPL,MSFT] [--folds 5]
+
+환경변수:
+  ALPHA_WF_FOLDS        폴드 수 (기본 5)
+  ALPHA_WF_MIN_TRAIN    첫 폴드의 학습 구간 비율 (날짜 기준, 기본 0.5)
+  ALPHA_VALIDATION_DIR  결과 파일 위치 (기본 ~/AlphaModels/validation)
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, log_loss, precision_score, recall_score, roc_auc_score
+
+from . import training_scheduler
+from .asset_screener import get_all_tickers
+from .data_handler import load_data
+from .global_dataset import GlobalDataset, open_dataset
+from .global_model_handler import GLOBAL_HORIZONS, build_global_dataset, make_global_ensemble
+from .model_handler import RF_PARAMS, TARGET_DAYS, create_features_and_target
+from .training_scheduler import run_training
+
+WF_FOLDS = int(os.getenv("ALPHA_WF_FOLDS", "5"))
+WF_MIN_TRAIN = float(os.getenv("ALPHA_WF_MIN_TRAIN", "0.5"))
+VALIDATION_DIR = os.path.expanduser(
+    os.getenv("ALPHA_VALIDATION_DIR", os.path.join("~", "AlphaModels", "validation"))
+)
+
+
+@dataclass(frozen=True)
+class Fold:
+    index: int
+    train_end: int   # 학습 행 [0, train_end)
+    test_start: int  # 검증 행 [test_start, test_end)
+    test_end: int
+    # 라벨 종료 날짜로 퍼지한 학습 행 번호 (모두 train_end 미만). None이면 [0, train_end) 전체
+    train_rows: Optional[np.ndarray] = field(default=None, compare=False, repr=False)
+
+    @property
+    def train(self):
+        return slice(0, self.train_end) if self.train_rows is None else self.train_rows
+
+    @property
+    def n_train(self) -> int:
+        return self.train_end if self.train_rows is None else len(self.train_rows)
+
+
+def expanding_folds(dates: np.ndarray, n_folds: Optional[int] = None, gap: int = 0,
+                    min_train: Optional[float] = None, label_ends: Optional[np.ndarray] = None) -> list[Fold]:
+    """날짜순으로 정렬된 행의 확장 윈도우 폴드.
+
+    고유 날짜의 앞 min_train 비율 이후를 n_folds개 검증 구간으로 나눈다. 같은 날짜의 행은 항상 같은 쪽에
+    들어간다. label_ends(행마다 라벨이 보는 미래 봉의 날짜)가 없으면 각 구간 앞의 gap개 날짜를 학습에서
+    빼고, 있으면 검증 구간 첫 날짜 전의 행 중 label_ends가 그 날짜보다 앞선 행만 학습에 쓴다.
+    학습 행이 없는 폴드는 만들지 않는다.
+    """
+    n_folds = n_folds or WF_FOLDS
+    min_train = WF_MIN_TRAIN if min_train is None else min_train
+    unique = np.unique(dates)
+    first = int(len(unique) * min_train)
+    folds = []
+    for block in np.array_split(np.arange(first, len(unique)), n_folds):
+        if len(block) == 0:
+            continue
+        a, b = block[0], block[-1] + 1
+        test_start = int(np.searchsorted(dates, unique[a], side="left"))
+        test_end = int(np.searchsorted(dates, unique[b], side="left")) if b < len(unique) else len(dates)
+        if label_ends is None:
+            if a - gap <= 0:
+                continue
+            train_end, rows = int(np.searchsorted(dates, unique[a - gap], side="left")), None
+        else:
+            rows = np.flatnonzero(label_ends[:test_start] < unique[a])  # NaT 비교는 False
+            if len(rows) == 0:
+                continue
+            train_end = int(rows[-1]) + 1
+        folds.append(Fold(index=len(folds), train_end=train_end, test_start=test_start,
+                          test_end=test_end, train_rows=rows))
+    return folds
+
+
+def fold_metrics(y_true: np.ndarray, proba: np.ndarray) -> dict:
+    """상승 확률 proba에 대한 검증 지표."""
+    y_true = np.asarray(y_true).astype(int)
+    pred = (proba >= 0.5).astype(int)
+    both = len(np.unique(y_true)) == 2
+    return {
+        "n_test": int(len(y_true)),
+        "accuracy": float(accuracy_score(y_true, pred)),
+        "precision": float(precision_score(y_true, pred, zero_division=0)),
+        "recall": float(recall_score(y_true, pred, zero_division=0)),
+        "roc_auc": float(roc_auc_score(y_true, proba)) if both else None,
+        "log_loss": float(log_loss(y_true, np.clip(proba, 1e-6, 1 - 1e-6), labels=[0, 1])),
+        "base_rate": float(y_true.mean()),
+        "pred_up_rate": float(pred.mean()),
+    }
+
+
+def _evaluate(make_model: Callable, X: pd.DataFrame, y: np.ndarray, dates: np.ndarray, fold: Fold) -> dict:
+    started = time.perf_counter()
+    y = np.asarray(y)
+    train, test = fold.train, slice(fold.test_start, fold.test_end)
+    model = make_model()
+    model.fit(X.iloc[train], y[train])
+    classes = list(model.classes_)
+    proba = model.predict_proba(X.iloc[test])
+    up = proba[:, classes.index(1)] if 1 in classes else np.zeros(len(proba))
+    ts = lambda i: pd.Timestamp(dates[i]).isoformat()
+    return {
+        "fold": fold.index,
+        "n_train": fold.n_train,
+        "train_until": ts(fold.train_end - 1),
+        "test_from": ts(fold.test_start),
+        "test_to": ts(fold.test_end - 1),
+        **fold_metrics(y[test], up),
+        "fit_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def validate_ticker(ticker: str, n_jobs: int = -1, target_days: int = TARGET_DAYS,
+                    n_folds: Optional[int] = None, min_train: Optional[float] = None) -> Optional[list[dict]]:
+    """종목별 RandomForest(model_handler.RF_PARAMS)의 폴드별 지표. 데이터가 없으면 None."""
+    data = load_data(ticker)
+    if data is None:
+        return None
+    features, target = create_features_and_target(data, target_days=target_days, ticker=ticker)
+    if features.empty:
+        return None
+    dates = features.index.to_numpy()
+    folds = expanding_folds(dates, n_folds, gap=target_days, min_train=min_train)
+    make_model = lambda: RandomForestClassifier(**RF_PARAMS, n_jobs=n_jobs)
+    return [{"ticker": ticker, **_evaluate(make_model, features, target.to_numpy(), dates, fold)} for fold in folds]
+
+
+def _global_fold(fold_index: int, n_jobs: int = -1, path: Optional[str] = None,
+                 dataset: Optional[GlobalDataset] = None, target_days: int = 5,
+                 n_folds: Optional[int] = None, min_train: Optional[float] = None) -> dict:
+    """글로벌 앙상블의 폴드 하나. 작업 프로세스에서는 path의 디스크 데이터셋을 memmap으로 연다."""
+    ds = dataset if dataset is not None else open_dataset(path)
+    X, y, dates = ds.labeled(target_days)
+    fold = expanding_folds(dates, n_folds, min_train=min_train, label_ends=ds.labeled_ends(target_days))[fold_index]
+    frame = pd.DataFrame(X, columns=list(ds.feature_names), copy=False)
+    return _evaluate(lambda: make_global_ensemble(n_jobs), frame, y, dates, fold)
+
+
+def _results_path(kind: str) -> str:
+    os.makedirs(VALIDATION_DIR, exist_ok=True)
+    return os.path.join(VALIDATION_DIR, f"walk_forward_{kind}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+
+
+def _append(path: str, records: Sequence[dict]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def summarize_folds(records: Sequence[dict]) -> dict:
+    """폴드 지표 평균 (roc_auc는 값이 있는 폴드만)."""
+    out = {"folds": len(records)}
+    for key in ("accuracy", "precision", "recall", "roc_auc", "log_loss", "base_rate"):
+        values = [r[key] for r in records if r.get(key) is not None]
+        out[key] = round(float(np.mean(values)), 4) if values else None
+    return out
+
+
+def run_ticker_validation(
+    tickers: Optional[Sequence[str]] = None,
+    target_days: int = TARGET_DAYS,
+    n_folds: Optional[int] = None,
+    min_train: Optional[float] = None,
+    results_path: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> dict:
+    """종목별 모델 워크포워드 검증. 티커 단위 병렬, 티커가 끝날 때마다 폴드 결과를 기록한다."""
+    if tickers is None:
+        tickers = get_all_tickers()
+    results_path = results_path or _results_path("ticker")
+    run_id = os.path.splitext(os.path.basename(results_path))[0]
+    records: list[dict] = []
+
+    def _progress(done, total, result):
+        if result.ok and result.value:
+            rows = [{"run_id": run_id, "model": "ticker", "target_days": target_days, **r} for r in result.value]
+            _append(results_path, rows)
+            records.extend(rows)
+        print(f"[워크포워드] {result.ticker} 완료 ({done}/{total})")
+
+    kwargs = {"target_days": target_days, "n_folds": n_folds, "min_train": min_train}
+    run_training(validate_ticker, tickers, kwargs=kwargs, workers=workers, progress=_progress)
+    summary = {"results": results_path, "tickers": len({r["ticker"] for r in records}), **summarize_folds(records)}
+    print(f"[워크포워드] 종목별 모델: {summary}")
+    return summary
+
+
+def run_global_validation(
+    dataset: Optional[GlobalDataset] = None,
+    horizons: Optional[dict] = None,
+    n_folds: Optional[int] = None,
+    min_train: Optional[float] = None,
+    results_path: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> dict:
+    """글로벌 모델 워크포워드 검증. 호라이즌마다 폴드를 프로세스 풀에서 병렬 실행한다.
+
+    디스크 데이터셋이 아니면 (dataset.path가 없으면) 행렬을 넘기지 않도록 현재 프로세스에서 차례로 실행한다.
+    """
+    horizons = horizons or GLOBAL_HORIZONS
+    if dataset is None:
+        dataset = build_global_dataset(get_all_tickers(), target_days=list(horizons.values()))
+    results_path = results_path or _results_path("global")
+    run_id = os.path.splitext(os.path.basename(results_path))[0]
+    summaries = {"results": results_path}
+
+    for name, days in horizons.items():
+        _, _, dates = dataset.labeled(days)  # 라벨 행 memmap을 작업 프로세스보다 먼저 만든다
+        folds = expanding_folds(dates, n_folds, min_train=min_train, label_ends=dataset.labeled_ends(days))
+        records: list[dict] = []
+
+        def _progress(done, total, result):
+            if result.ok:
+                row = {"run_id": run_id, "model": f"global_{name}", "target_days": days, **result.value}
+                _append(results_path, [row])
+                records.append(row)
+            print(f"[워크포워드] global_{name} 폴드 {result.ticker} 완료 ({done}/{total})")
+
+        kwargs = {"target_days": days, "n_folds": n_folds, "min_train": min_train}
+        if dataset.path is None:
+            kwargs["dataset"], workers_h = dataset, 1
+        else:
+            kwargs["path"], workers_h = dataset.path, workers
+        # 큰 학습 몇 개이므로 CPU 예산을 폴드 수로 나눠 학습당 스레드를 준다
+        budget = training_scheduler.CPU_BUDGET or os.cpu_count() or 1
+        threads = max(1, budget // max(1, len(folds)))
+        run_training(_global_fold, range(len(folds)), kwargs=kwargs, workers=workers_h,
+                     threads_per_fit=threads, progress=_progress)
+        summaries[f"global_{name}"] = summarize_folds(records)
+        print(f"[워크포워드] global_{name}: {summaries[f'global_{name}']}")
+    return summaries
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="워크포워드 검증")
+    parser.add_argument("--global", dest="global_model", action="store_true", help="글로벌 모델 검증")
+    parser.add_argument("--tickers", help="쉼표로 구분한 티커 (기본: 전체)")
+    parser.add_argument("--folds", type=int, default=None)
+    args = parser.parse_args()
+    if args.global_model:
+        run_global_validation(n_folds=args.folds)
+    else:
+        run_ticker_validation(args.tickers.split(",") if args.tickers else None, n_folds=args.folds)
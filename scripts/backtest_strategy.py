@@ -12,18 +12,27 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from alpha_server.asset_screener import get_all_tickers
-from alpha_server.data_handler import load_data
-from alpha_server.scoring_engine import calculate_scores
+from alpha_server.data_handler import load_panel, split_panel
+from alpha_server.scoring_engine import SCORING_LOOKBACK_DAYS, calculate_scores
 import json
 
+_price_frames = None
+
+def get_price_frames():
+    """백테스트 전 구간(+점수 계산용 여유 구간) 종가를 패널 한 번으로 읽어 티커별로 보관"""
+    global _price_frames
+    if _price_frames is None:
+        start = datetime.now() - timedelta(days=365 + SCORING_LOOKBACK_DAYS)
+        tickers = get_all_tickers() + ['SPY']
+        _price_frames = split_panel(load_panel(tickers, start=start, fields=['Close']))
+    return _price_frames
+
 def get_historical_recommendations(date, horizon, top_n=10):
     """특정 날짜의 추천 목록 생성"""
-    tickers = get_all_tickers()
     scores = []
     
-    for ticker in tickers:
+    for ticker, data in get_price_frames().items():
         try:
-            data = load_data(ticker)
             if data is None or len(data) < 100:
                 continue
             
@@ -48,7 +57,7 @@ def get_historical_recommendations(date, horizon, top_n=10):
 def calculate_return(ticker, buy_date, sell_date):
     """특정 기간의 수익률 계산"""
     try:
-        data = load_data(ticker)
+        data = get_price_frames().get(ticker)
         if data is None:
             return None
         
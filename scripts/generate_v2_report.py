@@ -25,7 +25,7 @@ def evaluate_model(ticker):
         if data is None or len(data) < 100:
             return None
         
-        features, target = create_features_and_target(data)
+        features, target = create_features_and_target(data, ticker=ticker)
         if features.empty:
             return None
         
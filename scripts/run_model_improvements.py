@@ -39,7 +39,7 @@ def phase1_test():
             if data is None:
                 continue
             
-            features, target = create_features_and_target(data)
+            features, target = create_features_and_target(data, ticker=ticker)
             if features.empty:
                 continue
             
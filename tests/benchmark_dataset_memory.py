@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Global Dataset Memory Benchmark: 메모리 구축(build_panel_dataset) vs 디스크 구축(build_cached_dataset)
+합성 티커 패널로 데이터셋 구축과 그 뒤 글로벌 앙상블 학습(fit_global_ensemble) 구간의 최대 익명
+메모리(RssAnon) 증가량, 그리고 프로세스 최대 RSS(VmHWM)를 잰다.
+
+디스크 구축은 X를 memmap 파일로 쓰므로 구축 구간의 증가량은 티커 묶음 하나의 지표 계산 메모리와
+행당 날짜/코드/라벨/정렬 인덱스(수십 바이트)뿐이다. 디스크 데이터셋 학습은 RandomForest/XGBoost에
+최대 --max-train-rows행 표본만, LightGBM에는 묶음 단위로 만든 lgb.Dataset 바이너리를 쓰므로 학습 구간
+증가량도 X 크기가 아니라 표본 크기를 따른다. 메모리 구축에서는 이미 올라와 있던 X 전체로 학습한다.
+RandomForest는 측정 시간을 줄이려고 트리 10개, 깊이 8로 학습한다.
+최대 RSS(VmHWM)에는 memmap으로 읽은 파일 페이지도 들어가므로, 익명 메모리 증가량과 함께 본다.
+
+  python tests/benchmark_dataset_memory.py --tickers 1500 --bars 1000 --max-build-ratio 0.5
+  (--max-build-ratio를 주면 디스크 구축 증가량이 메모리 구축 증가량 × 비율을 넘을 때 종료 코드 1)
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+import numpy as np
+
+# 프로젝트 루트 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _proc_status_mb(key):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_anon_mb():
+    """현재 익명 메모리 (MB, Linux /proc). 없으면 None."""
+    return _proc_status_mb("RssAnon")
+
+
+def peak_rss_mb():
+    """프로세스 최대 RSS (MB, VmHWM). 없으면 None."""
+    return _proc_status_mb("VmHWM")
+
+
+class PeakSampler:
+    """구간 동안 RssAnon을 주기적으로 읽어 시작 대비 최대 증가량을 잰다."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.base = rss_anon_mb() or 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, (rss_anon_mb() or 0.0) - self.base)
+            time.sleep(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, (rss_anon_mb() or 0.0) - self.base)
+
+
+def make_panel(tickers, bars, seed=0):
+    from alpha_server.data_handler import OHLCVPanel
+
+    rng = np.random.default_rng(seed)
+    dates = np.broadcast_to(
+        np.arange(np.datetime64("2020-01-01"), np.datetime64("2020-01-01") + bars).astype("datetime64[ns]")[:, None],
+        (bars, len(tickers)),
+    ).copy()
+    close = 100 + rng.standard_normal((bars, len(tickers))).cumsum(axis=0)
+    values = {
+        "Open": close + rng.standard_normal(close.shape) * 0.1, "High": close + 1, "Low": close - 1,
+        "Close": close, "Volume": rng.integers(1_000, 10_000, close.shape).astype(float),
+    }
+    return OHLCVPanel(dates=dates, tickers=list(tickers), values=values)
+
+
+def _measure(mode, n_tickers, bars, horizons, cache_dir, max_train_rows, out):
+    """작업 프로세스: 한 방식으로 구축 후 학습하며 각 구간의 증가량과 최대 RSS를 out 큐로 돌려준다."""
+    from alpha_server import global_model_handler
+    from alpha_server.global_dataset import build_cached_dataset, build_panel_dataset
+
+    global_model_handler.GLOBAL_RF_PARAMS = {"n_estimators": 10, "max_depth": 8, "random_state": 0}
+
+    tickers = [f"T{i:05d}" for i in range(n_tickers)]
+    metadata = {t: {"sector": f"S{i % 11}", "industry": f"I{i % 97}", "beta": 1.0} for i, t in enumerate(tickers)}
+    seeds = {t: i for i, t in enumerate(tickers)}
+    load_chunk = lambda chunk: make_panel(chunk, bars, seed=seeds[chunk[0]])
+
+    started = time.perf_counter()
+    with PeakSampler() as build:
+        if mode == "memory":
+            ds = build_panel_dataset(load_chunk(tickers), metadata, target_days=horizons)
+        else:
+            ds = build_cached_dataset(tickers, metadata, load_chunk, target_days=horizons, cache_dir=cache_dir)
+    build_sec = time.perf_counter() - started
+
+    with PeakSampler() as train:
+        global_model_handler.fit_global_ensemble(ds, horizons[0], 0.2, n_jobs=1, max_rows=max_train_rows)
+    out.put({
+        "mode": mode, "rows": len(ds), "x_mb": ds.X.nbytes / 1e6, "build_mb": build.peak,
+        "train_mb": train.peak, "build_sec": build_sec, "peak_rss_mb": peak_rss_mb() or 0.0,
+    })
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Global Dataset Memory Benchmark")
+    parser.add_argument("--tickers", type=int, default=600)
+    parser.add_argument("--bars", type=int, default=750)
+    parser.add_argument("--max-build-ratio", type=float, default=None,
+                        help="디스크 구축 증가량 상한 (메모리 구축 증가량 대비 비율)")
+    parser.add_argument("--max-train-rows", type=int, default=100_000,
+                        help="디스크 데이터셋 학습에서 RandomForest/XGBoost에 올릴 최대 행 수")
+    args = parser.parse_args()
+    if rss_anon_mb() is None:
+        print("RssAnon을 읽을 수 없는 환경입니다 (Linux 전용).")
+        return 0
+
+    horizons = [5, 20, 60]
+    ctx = multiprocessing.get_context("spawn")  # 방식마다 새 프로세스에서 재서 서로 영향이 없게 한다
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for mode in ("memory", "disk"):
+            out = ctx.Queue()
+            proc = ctx.Process(
+                target=_measure, args=(mode, args.tickers, args.bars, horizons, cache_dir, args.max_train_rows, out)
+            )
+            proc.start()
+            results.append(out.get())
+            proc.join()
+
+    print(f"\n📦 {args.tickers}개 티커 × {args.bars}봉, 호라이즌 {horizons}: {results[0]['rows']:,}행, "
+          f"X {results[0]['x_mb']:.1f} MB")
+    print(f"   {'방식':<8}{'구축 (MB)':>12}{'학습 (MB)':>12}{'최대 RSS (MB)':>16}{'구축 시간 (s)':>16}")
+    for r in results:
+        print(f"   {r['mode']:<8}{r['build_mb']:>12.1f}{r['train_mb']:>12.1f}{r['peak_rss_mb']:>16.1f}"
+              f"{r['build_sec']:>16.2f}")
+
+    memory, disk = results
+    if args.max_build_ratio is not None:
+        limit = memory["build_mb"] * args.max_build_ratio
+        if disk["build_mb"] > limit:
+            print(f"❌ 디스크 구축 증가량 {disk['build_mb']:.1f} MB > 상한 {limit:.1f} MB")
+            return 1
+        print(f"✅ 디스크 구축 증가량 {disk['build_mb']:.1f} MB ≤ 상한 {limit:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_benchmark())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tree Inference Benchmark: sklearn vs 컴파일된 NumPy 트리 엔진
+종목별 모델(RandomForest 200트리, 깊이 15)과 글로벌 앙상블 구성으로 단일 행/배치 지연을 비교
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+# 프로젝트 루트 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import RandomForestClassifier
+from alpha_server.model_handler import RF_PARAMS
+from alpha_server.global_model_handler import make_global_ensemble
+from alpha_server.tree_compiler import compile_model
+
+
+def make_data(rows, n_features=17, seed=42):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((rows, n_features)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.standard_normal(rows) * 0.5 > 0).astype(int)
+    return X, y
+
+
+def timeit(fn, repeat):
+    fn()  # 워밍업
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return np.median(samples) * 1000
+
+
+def bench(name, model, X_eval, repeat):
+    compiled = compile_model(model)
+    diff = np.abs(compiled.predict_proba(X_eval) - model.predict_proba(X_eval)).max()
+    print(f"\n🌲 {name}: 트리 {sum(p.n_trees for p in compiled.parts)}개, 노드 {sum(len(p.feature) for p in compiled.parts):,}개, 최대 확률 차이 {diff:.2e}")
+    print(f"   {'입력':<10}{'sklearn (ms)':>15}{'compiled (ms)':>16}{'배속':>8}")
+    for rows in (1, 100, len(X_eval)):
+        X = X_eval[:rows]
+        t_sk = timeit(lambda: model.predict_proba(X), repeat)
+        t_np = timeit(lambda: compiled.predict_proba(X), repeat)
+        print(f"   {f'{rows}행':<10}{t_sk:>15.3f}{t_np:>16.3f}{t_sk / t_np:>7.1f}x")
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Tree Inference Benchmark")
+    parser.add_argument("--rows", type=int, default=20000, help="학습 행 수")
+    parser.add_argument("--eval-rows", type=int, default=3000, help="배치 예측 행 수 (전체 종목 수)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    X, y = make_data(args.rows)
+    X_eval, _ = make_data(args.eval_rows, seed=7)
+
+    print("=" * 60)
+    print("트리 추론 벤치마크 (sklearn predict_proba vs tree_compiler)")
+    print("=" * 60)
+
+    rf = RandomForestClassifier(**RF_PARAMS, n_jobs=1).fit(X, y)
+    bench("종목별 RandomForest", rf, X_eval, args.repeat)
+
+    ensemble = make_global_ensemble(n_jobs=1).fit(X, y)
+    bench("글로벌 앙상블", ensemble, X_eval, args.repeat)
+
+
+if __name__ == "__main__":
+    run_benchmark()
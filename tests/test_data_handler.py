@@ -0,0 +1,775 @@
+"""data_handler 저장/조회 경로 단위 테스트.
+
+QuestDB/yfinance 없이 CSV 모드로 격리해서 동작한다.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _ohlcv(start: str, periods: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range(start, periods=periods, freq="D", name="Date")
+    close = 100 + rng.standard_normal(periods).cumsum()
+    return pd.DataFrame(
+        {
+            "Close": close,
+            "High": close + 1,
+            "Low": close - 1,
+            "Open": close,
+            "Volume": rng.integers(1_000, 10_000, periods),
+        },
+        index=idx,
+    )
+
+
+@pytest.fixture
+def csv_mode(monkeypatch, tmp_path):
+    from alpha_server import data_handler
+    from alpha_server.ohlcv_cache import OHLCVCache
+
+    monkeypatch.setattr(data_handler, "USE_QUESTDB", False)
+    monkeypatch.setattr(data_handler, "CSV_DIR", str(tmp_path))
+    monkeypatch.setattr(data_handler, "ohlcv_cache", OHLCVCache(max_bytes=10 * 1024 * 1024))
+    return data_handler
+
+
+# ---------- incremental refresh ----------
+def test_csv_watermark_reads_last_row(csv_mode):
+    dh = csv_mode
+    dh.save_to_csv("AAA", _ohlcv("2024-01-01", 30))
+    marks = dh.get_last_timestamps(["AAA", "MISSING"])
+    assert marks == {"AAA": pd.Timestamp("2024-01-30")}
+
+
+def test_append_to_csv_keeps_column_order(csv_mode):
+    dh = csv_mode
+    full = _ohlcv("2024-01-01", 40)
+    dh.save_to_csv("AAA", full.iloc[:30])
+    dh.append_to_csv("AAA", full.iloc[30:][["Volume", "Open", "Low", "High", "Close"]])
+
+    loaded = dh.load_from_csv("AAA")
+    assert len(loaded) == 40
+    pd.testing.assert_frame_equal(loaded, full, check_freq=False)
+
+
+@pytest.mark.parametrize("backend", ["csv", "columnar"])
+def test_update_ticker_data_replaces_partial_last_bar(csv_mode, monkeypatch, backend):
+    dh = csv_mode
+    monkeypatch.setattr(dh, "FILE_BACKEND", backend)
+    full = _ohlcv("2023-12-20", 40)  # 겹친 구간이 연도 파티션 경계를 넘음
+    partial = full.iloc[:30].copy()
+    partial.iloc[-1, partial.columns.get_loc("Close")] += 0.5  # 장중에 저장된 미완성 마지막 봉
+    dh.save_to_csv("AAA", partial)
+    requested = []
+
+    def fake_download(ticker, period="5y", interval="1d", start=None):
+        requested.append(start)
+        return full[full.index >= start] if start is not None else full
+
+    monkeypatch.setattr(dh, "download_ticker_data", fake_download)
+    last_ts = dh.get_last_timestamps(["AAA"])["AAA"]
+    rows = dh.update_ticker_data("AAA", last_ts)
+
+    assert requested == [last_ts - pd.Timedelta(days=dh.INCREMENTAL_OVERLAP_DAYS)]  # 전체 재수집 없음
+    assert rows == 11  # 교체한 마지막 봉 + 새 봉 10개
+    loaded = dh.load_data("AAA")
+    pd.testing.assert_frame_equal(loaded, full.astype(float), check_freq=False, check_dtype=False, check_like=True)
+    assert dh.update_ticker_data("AAA", full.index[-1]) == 0  # 바뀐 것 없음
+
+
+@pytest.mark.parametrize("backend", ["csv", "columnar"])
+def test_update_ticker_data_resyncs_rebased_history(csv_mode, monkeypatch, backend):
+    dh = csv_mode
+    monkeypatch.setattr(dh, "FILE_BACKEND", backend)
+    full = _ohlcv("2024-01-01", 40)
+    dh.save_to_csv("AAA", full.iloc[:30])
+    rebased = full.copy()
+    rebased[["Open", "High", "Low", "Close"]] *= 0.5  # 2:1 분할 후 auto_adjust로 과거 가격이 다시 계산됨
+    requested = []
+
+    def fake_download(ticker, period="5y", interval="1d", start=None):
+        requested.append(start)
+        return rebased[rebased.index >= start] if start is not None else rebased
+
+    monkeypatch.setattr(dh, "download_ticker_data", fake_download)
+    rows = dh.update_ticker_data("AAA", full.index[29])
+
+    assert requested[-1] is None and rows == 40  # 그 티커만 전체 기간을 다시 받아 통째로 교체
+    loaded = dh.load_data("AAA")
+    pd.testing.assert_frame_equal(loaded, rebased.astype(float), check_freq=False, check_dtype=False,
+                                  check_like=True)
+
+
+def test_incremental_start_overlaps_watermark():
+    from alpha_server.data_handler import INCREMENTAL_OVERLAP_DAYS, incremental_start
+
+    now = pd.Timestamp.now()
+    assert incremental_start(now) == (now - pd.Timedelta(days=INCREMENTAL_OVERLAP_DAYS)).normalize()
+    assert incremental_start(pd.Timestamp("2024-01-10 15:30")) <= pd.Timestamp("2024-01-10")
+
+
+
+# ---------- range / tail pushdown ----------
+def test_load_from_csv_tail_and_range(csv_mode):
+    dh = csv_mode
+    full = _ohlcv("2024-01-01", 5000)
+    dh.save_to_csv("AAA", full)
+
+    tail = dh.load_data("AAA", last_n=30)
+    pd.testing.assert_frame_equal(tail, full.tail(30), check_freq=False)
+
+    window = dh.load_data("AAA", start="2024-02-01", end="2024-02-10", columns=["Close"])
+    assert list(window.columns) == ["Close"]
+    assert window.index[0] == pd.Timestamp("2024-02-01") and len(window) == 10
+
+    both = dh.load_data("AAA", start="2024-01-01", last_n=5, columns=["Close", "Volume"])
+    pd.testing.assert_frame_equal(both, full[["Close", "Volume"]].tail(5), check_freq=False)
+
+    empty = dh.load_data("AAA", last_n=0)
+    assert empty is not None and empty.empty and list(empty.columns) == list(full.columns)
+
+
+def test_load_data_rejects_unknown_columns(csv_mode):
+    with pytest.raises(ValueError):
+        csv_mode.load_data("AAA", columns=["Adj Close"])
+
+
+def test_questdb_select_pushes_down_limits():
+    from alpha_server.data_handler import _build_select
+
+    query, params, cols = _build_select("AAPL", start="2024-01-01", last_n=100, columns=["Close"])
+    assert query.startswith("SELECT timestamp, close FROM stock_prices WHERE ticker = %s")
+    assert "timestamp >= %s" in query and query.endswith("LIMIT -100")
+    assert params[0] == "AAPL" and cols == ["Close"]
+
+# ---------- multi-ticker panel ----------
+def test_load_panel_long_and_wide(csv_mode):
+    dh = csv_mode
+    a = _ohlcv("2024-01-01", 10, seed=1)
+    b = _ohlcv("2024-01-05", 10, seed=2)
+    dh.save_to_csv("AAA", a)
+    dh.save_to_csv("BBB", b)
+
+    long = dh.load_panel(["BBB", "AAA", "MISSING"], start="2024-01-03", fields=["Close"])
+    assert list(long.columns) == ["ticker", "Close"]
+    assert list(long["ticker"].cat.categories) == ["BBB", "AAA", "MISSING"]
+    frames = dh.split_panel(long)
+    assert list(frames) == ["BBB", "AAA"]
+    pd.testing.assert_frame_equal(frames["AAA"], a.loc["2024-01-03":, ["Close"]], check_freq=False)
+
+    wide = dh.load_panel(["AAA", "BBB"], fields=["Close", "Volume"], layout="wide")
+    assert wide.tickers == ["AAA", "BBB"] and len(wide.dates) == 14
+    assert wide.values["Close"].shape == (14, 2)
+    assert np.isnan(wide.values["Close"][:4, 1]).all()
+    np.testing.assert_allclose(wide.values["Close"][-6:, 1], b["Close"].to_numpy()[-6:])
+
+    # bars: 날짜가 아니라 티커별 봉 순서로 정렬, 짧은 티커는 아래쪽이 비어 있음
+    bars = dh.load_panel(["AAA", "BBB"], start="2024-01-03", fields=["Close"], layout="bars")
+    assert bars.values["Close"].shape == (10, 2) and bars.dates.shape == (10, 2)
+    np.testing.assert_allclose(bars.values["Close"][:8, 0], a["Close"].to_numpy()[2:])
+    assert np.isnan(bars.values["Close"][8:, 0]).all() and np.isnat(bars.dates[8:, 0]).all()
+    np.testing.assert_allclose(bars.values["Close"][:, 1], b["Close"].to_numpy())
+    assert bars.dates[0, 1] == np.datetime64("2024-01-05")
+
+    # bars 패널의 티커별 DataFrame은 long 패널을 나눈 것과 같다 (봉이 없는 티커 제외)
+    bars = dh.load_panel(["BBB", "AAA", "MISSING"], start="2024-01-03", layout="bars")
+    split = dh.split_bars(bars, fields=["Close"])
+    assert list(split) == ["BBB", "AAA"]
+    for ticker, frame in split.items():
+        pd.testing.assert_frame_equal(frame, frames[ticker], check_freq=False)
+
+
+def test_questdb_panel_select_uses_in_list():
+    from alpha_server.data_handler import _build_panel_select
+
+    query, params, cols = _build_panel_select(["A", "B"], end="2024-12-31", columns=["Close"])
+    assert "WHERE ticker IN (%s, %s) AND timestamp <= %s" in query
+    assert query.startswith("SELECT timestamp, ticker, close FROM stock_prices")
+    assert params[:2] == ["A", "B"] and cols == ["Close"]
+
+
+# ---------- concurrent ingest ----------
+def test_plan_batches_groups_by_start_and_overlaps_watermark(monkeypatch):
+    from alpha_server import data_handler, ingest
+
+    monkeypatch.setattr(data_handler, "INCREMENTAL_OVERLAP_DAYS", 3)
+    marks = {
+        "A": pd.Timestamp("2024-01-05"),
+        "B": pd.Timestamp("2024-01-05"),
+        "C": pd.Timestamp("2024-01-01"),
+        "FRESH": pd.Timestamp.now(),
+    }
+    batches = ingest.plan_batches(["A", "B", "C", "FRESH", "NEW"], marks, batch_size=1)
+    starts = {tuple(b): s for b, s in batches}
+    assert starts[("A",)] == starts[("B",)] == pd.Timestamp("2024-01-02")
+    assert starts[("C",)] == pd.Timestamp("2023-12-29")
+    assert starts[("FRESH",)] <= marks["FRESH"]  # 오늘 저장한 봉도 미완성일 수 있어 다시 받는다
+    assert starts[("NEW",)] is None
+
+
+def test_download_and_store_reports_every_ticker(csv_mode, monkeypatch):
+    from alpha_server import ingest
+
+    dh = csv_mode
+    full = _ohlcv("2024-01-01", 40)
+    dh.save_to_csv("OLD", full.iloc[:30])
+
+    def fake_batch(tickers, start=None, period="2y"):
+        return {t: full for t in tickers if t != "BROKEN"}
+
+    monkeypatch.setattr(ingest, "download_batch", fake_batch)
+    seen = []
+    stats = ingest.download_and_store(
+        ["OLD", "NEW", "BROKEN"],
+        dh.get_last_timestamps(["OLD"]),
+        progress=lambda done, total, t: seen.append((done, total)),
+        workers=2,
+    )
+
+    assert [d for d, _ in seen] == [1, 2, 3] and all(t == 3 for _, t in seen)
+    assert stats["failed"] == 1 and stats["updated"] == 2
+    assert stats["rows"] == 11 + 40  # 겹쳐 받은 마지막 봉 교체 + 새 봉
+    assert len(dh.load_from_csv("OLD")) == 40
+
+
+def test_download_and_store_resyncs_rebased_ticker(csv_mode, monkeypatch):
+    from alpha_server import ingest
+
+    dh = csv_mode
+    full = _ohlcv("2024-01-01", 40)
+    rebased = full.copy()
+    rebased["Close"] *= 0.5
+    for t in ("SAME", "SPLIT"):
+        dh.save_to_csv(t, full.iloc[:30])
+    calls = []
+
+    def fake_batch(tickers, start=None, period="2y"):
+        calls.append((tuple(tickers), start))
+        frame = lambda t: rebased if t == "SPLIT" else full
+        return {t: frame(t)[frame(t).index >= start] if start is not None else frame(t) for t in tickers}
+
+    monkeypatch.setattr(ingest, "download_batch", fake_batch)
+    stats = ingest.download_and_store(["SAME", "SPLIT"], dh.get_last_timestamps(), workers=1)
+
+    assert stats["resynced"] == 1 and stats["updated"] == 2 and stats["failed"] == 0
+    assert (("SPLIT",), None) in calls  # 재수집은 그 티커만
+    pd.testing.assert_frame_equal(dh.load_from_csv("SPLIT"), rebased, check_freq=False, check_dtype=False)
+    pd.testing.assert_frame_equal(dh.load_from_csv("SAME"), full, check_freq=False, check_dtype=False)
+    again = ingest.download_and_store(["SAME"], dh.get_last_timestamps(["SAME"]), workers=1)
+    assert again["up_to_date"] == 1 and again["updated"] == 0
+
+
+def test_download_and_store_defers_tickers_when_store_switches(csv_mode, monkeypatch):
+    from alpha_server import ingest
+
+    dh = csv_mode
+    full = _ohlcv("2024-01-01", 40)
+    for t in ("A", "B", "C"):
+        dh.save_to_csv(t, full.iloc[:30])
+    marks = dh.get_last_timestamps(["A", "B", "C"])
+    monkeypatch.setattr(ingest, "download_batch", lambda tickers, start=None, period="2y": {t: full for t in tickers})
+    sent_to_db = []
+    monkeypatch.setattr(dh, "insert_data_to_db", lambda conn, t, data, flush=True: sent_to_db.append(t))
+
+    def trip_after_first(done, total, ticker):
+        if done == 1:  # 첫 티커 저장 후 브레이커 상태가 바뀜 (파일 → QuestDB)
+            monkeypatch.setattr(dh, "USE_QUESTDB", True)
+
+    stats = ingest.download_and_store(["A", "B", "C"], marks, progress=trip_after_first, workers=1, target="file")
+
+    assert stats["updated"] == 1 and stats["deferred"] == 2 and stats["failed"] == 0
+    assert sent_to_db == []  # 파일 워터마크 기준 구간을 QuestDB에 쓰지 않는다
+    monkeypatch.setattr(dh, "USE_QUESTDB", False)
+    after = dh.get_last_timestamps(["A", "B", "C"])
+    assert sum(after[t] == full.index[-1] for t in after) == 1
+    assert sum(after[t] == marks[t] for t in after) == 2  # 미룬 티커의 워터마크는 그대로
+
+
+def test_download_and_store_counts_failed_ilp_writes(csv_mode, monkeypatch):
+    from alpha_server import ingest
+    from alpha_server.ilp_writer import ILPWriter
+
+    dh = csv_mode
+    full = _ohlcv("2024-01-01", 10)
+    monkeypatch.setattr(dh, "USE_QUESTDB", True)
+    monkeypatch.setattr(dh, "ensure_schema", lambda conn=None, migrate=False: True)
+    monkeypatch.setattr(dh.questdb_breaker, "record_failure", lambda e: None)
+    monkeypatch.setattr(ingest, "download_batch", lambda tickers, start=None, period="2y": {t: full for t in tickers})
+    writer = ILPWriter("localhost", 9009, "stock_prices", flush_bytes=1 << 30, flush_interval=3600,
+                       connect=lambda: _FakeSocket(fail_times=1), can_resend=lambda: False)
+    monkeypatch.setattr(dh, "_ilp_writer", writer)
+
+    # flush=False로 쌓아둔 행이 마지막 전송에서 버려지면 updated가 아니라 failed
+    stats = ingest.download_and_store(["A", "B"], {}, workers=1, target="questdb")
+    assert stats["updated"] == 0 and stats["rows"] == 0 and stats["failed"] == 2
+
+    # 바로 전송하는 쓰기의 실패는 호출자에게 올라간다
+    with pytest.raises(OSError):
+        dh.insert_data_to_db(None, "A", full)
+    assert dh.take_lost_ilp_tickers() == {"A"}
+
+
+def test_with_retry_backs_off_then_succeeds(monkeypatch):
+    from alpha_server import ingest
+
+    monkeypatch.setattr(ingest.time, "sleep", lambda s: None)
+    calls = {"n": 0}
+
+    def flaky():
+        calls["n"] += 1
+        if calls["n"] < 3:
+            raise ConnectionError("boom")
+        return "ok"
+
+    assert ingest._with_retry(flaky, attempts=3) == "ok"
+    assert calls["n"] == 3
+
+
+# ---------- OHLCV cache ----------
+def test_ohlcv_cache_lru_byte_budget():
+    from alpha_server.ohlcv_cache import MISS, OHLCVCache
+
+    frame = _ohlcv("2024-01-01", 100)
+    size = int(frame.memory_usage(index=True).sum())
+    cache = OHLCVCache(max_bytes=size * 2 + 10)
+
+    cache.put("A", "q", frame)
+    cache.put("B", "q", frame)
+    assert cache.get("A", "q") is not MISS  # A가 최근 사용으로 갱신됨
+    cache.put("C", "q", frame)  # 예산 초과 → 가장 오래된 B 제거
+
+    assert cache.get("B", "q") is MISS
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2 and stats["bytes"] <= stats["max_bytes"]
+
+
+def test_load_data_cache_hits_and_write_invalidates(csv_mode):
+    dh = csv_mode
+    fresh = dh.ohlcv_cache
+    full = _ohlcv("2024-01-01", 40)
+    dh.save_to_csv("AAA", full.iloc[:30])
+
+    first = dh.load_data("AAA", last_n=5)
+    first["Close"] = -1.0  # 호출자 수정이 캐시를 오염시키면 안 된다
+    second = dh.load_data("AAA", last_n=5)
+    assert fresh.stats()["hits"] == 1
+    assert (second["Close"] > 0).all()
+
+    dh.append_to_csv("AAA", full.iloc[30:])
+    third = dh.load_data("AAA", last_n=5)
+    assert third.index[-1] == full.index[-1]
+    assert fresh.stats()["invalidations"] >= 1
+
+
+# ---------- QuestDB connection pool ----------
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.dead:
+            raise RuntimeError("server closed the connection")
+
+    def fetchall(self):
+        return [(1,)]
+
+
+class _FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.dead = False
+        self.autocommit = False
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+
+def test_pool_reuses_and_replaces_unhealthy_connections():
+    from alpha_server.data_handler import QuestDBPool
+
+    made = []
+
+    def connect():
+        made.append(_FakeConn())
+        return made[-1]
+
+    pool = QuestDBPool(size=2, check_after=0.0, connect=connect)
+    with pool.connection() as c1:
+        pass
+    with pool.connection() as c2:
+        assert c2 is c1  # 헬스 체크 통과 → 재사용
+    c1.dead = True
+    with pool.connection() as c3:
+        assert c3 is not c1 and c1.closed  # 헬스 체크 실패 → 재연결
+
+    stats = pool.stats()
+    assert stats["created"] == 2 and stats["reused"] == 1
+    assert stats["health_check_failures"] == 1 and stats["idle"] == 1
+
+
+def test_pool_counters_are_consistent_under_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from alpha_server.data_handler import QuestDBPool
+
+    pool = QuestDBPool(size=4, check_after=60.0, connect=_FakeConn)
+
+    def borrow(_):
+        for _ in range(200):
+            with pool.connection():
+                pass
+
+    with ThreadPoolExecutor(8) as ex:
+        list(ex.map(borrow, range(8)))
+    stats = pool.stats()
+    assert stats["created"] + stats["reused"] == 8 * 200
+    assert stats["created"] == stats["idle"] <= 4
+
+
+def test_pool_blocks_when_exhausted():
+    from alpha_server.data_handler import PoolExhausted, QuestDBPool
+
+    pool = QuestDBPool(size=1, acquire_timeout=0.05, connect=_FakeConn)
+    held = pool.acquire()
+    with pytest.raises(PoolExhausted):
+        pool.acquire()
+    pool.release(held)
+    with pool.connection() as conn:
+        assert conn is held
+
+
+# ---------- ILP writer ----------
+class _FakeSocket:
+    def __init__(self, fail_times=0):
+        self.sent = bytearray()
+        self.fail_times = fail_times
+
+    def sendall(self, data):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionResetError("peer reset")
+        self.sent += bytes(data)
+
+    def close(self):
+        pass
+
+
+def test_encode_ohlcv_matches_row_format():
+    from alpha_server.ilp_writer import encode_ohlcv
+
+    df = _ohlcv("2024-01-01", 7)
+    df.iloc[2, 0] = np.nan
+    buf = bytearray()
+    assert encode_ohlcv(buf, "stock_prices", "AAA", df, chunk_rows=3) == 7
+
+    f = df.fillna(0)
+    expected = "".join(
+        f"stock_prices,ticker=AAA open={o},high={h},low={l},close={c},volume={v}i {t}\n"
+        for o, h, l, c, v, t in zip(
+            f["Open"].tolist(), f["High"].tolist(), f["Low"].tolist(), f["Close"].tolist(),
+            f["Volume"].astype(int).tolist(), df.index.asi8.tolist(),
+        )
+    )
+    assert buf.decode() == expected
+
+
+def test_ilp_writer_flushes_on_size_and_reconnects():
+    from alpha_server.ilp_writer import ILPWriter
+
+    sockets = [_FakeSocket(fail_times=1), _FakeSocket()]
+    flushed = {}
+    writer = ILPWriter(
+        "localhost", 9009, "stock_prices",
+        flush_bytes=1, flush_interval=3600,
+        connect=lambda: sockets.pop(0) if len(sockets) > 1 else sockets[0],
+        on_flush=lambda t, ts: flushed.setdefault(t, ts),
+    )
+    df = _ohlcv("2024-01-01", 5)
+    writer.write("AAA", df)
+
+    stats = writer.stats()
+    assert stats["rows_sent"] == 5 and stats["reconnects"] == 1 and stats["buffered_bytes"] == 0
+    assert sockets[0].sent.count(b"\n") == 5
+    assert flushed == {"AAA": df.index[-1]}
+
+
+def test_ilp_writer_timer_flushes_idle_buffer():
+    import time
+
+    from alpha_server.ilp_writer import ILPWriter
+
+    sock = _FakeSocket()
+    writer = ILPWriter("localhost", 9009, "stock_prices", flush_bytes=1 << 30, flush_interval=0.05,
+                       connect=lambda: sock)
+    writer.write("AAA", _ohlcv("2024-01-01", 3))
+    deadline = time.monotonic() + 5
+    while not sock.sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        assert sock.sent.count(b"\n") == 3  # 이후 쓰기 없이도 전송됨
+        assert writer.stats()["timer_flushes"] == 1 and writer.stats()["buffered_bytes"] == 0
+    finally:
+        writer.close()
+
+
+def test_ilp_writer_does_not_resend_without_dedup():
+    from alpha_server.ilp_writer import ILPWriter
+
+    sockets = [_FakeSocket(fail_times=1), _FakeSocket()]
+    writer = ILPWriter(
+        "localhost", 9009, "stock_prices", flush_bytes=1, flush_interval=3600,
+        connect=lambda: sockets.pop(0), can_resend=lambda: False,
+    )
+    with pytest.raises(OSError):
+        writer.write("AAA", _ohlcv("2024-01-01", 5))
+    stats = writer.stats()
+    assert stats["reconnects"] == 0 and stats["rows_sent"] == 0 and stats["buffered_bytes"] == 0
+    assert len(sockets) == 1 and not sockets[0].sent  # 두 번째 연결로 다시 보내지 않음
+
+
+# ---------- columnar file backend ----------
+@pytest.fixture
+def columnar_mode(csv_mode, monkeypatch):
+    monkeypatch.setattr(csv_mode, "FILE_BACKEND", "columnar")
+    return csv_mode
+
+
+def test_columnar_backend_round_trip_and_append(columnar_mode):
+    dh = columnar_mode
+    full = _ohlcv("2023-12-20", 40)  # 연도 파티션 두 개에 걸침
+    dh.save_to_csv("AAA", full.iloc[:30])
+    dh.append_to_csv("AAA", full.iloc[25:])  # 겹치는 행은 교체
+
+    store = dh.get_columnar_store()
+    assert store.stats()["partitions"] == 2
+    assert dh.get_last_timestamps(["AAA"]) == {"AAA": full.index[-1]}
+
+    loaded = dh.load_data("AAA")
+    pd.testing.assert_frame_equal(loaded, full.astype(float), check_freq=False, check_like=True)
+    tail = dh.load_data("AAA", last_n=15, columns=["Close"])
+    pd.testing.assert_frame_equal(tail, full[["Close"]].tail(15), check_freq=False)
+    window = dh.load_data("AAA", start="2024-01-02", end="2024-01-05")
+    assert len(window) == 4
+
+    panel = dh.load_panel(["AAA", "NONE"], start="2024-01-01", fields=["Close"], layout="wide")
+    assert panel.values["Close"].shape == (len(full.loc["2024-01-01":]), 2)
+
+
+def test_columnar_arrays_are_zero_copy_and_migration(csv_mode, tmp_path):
+    from alpha_server.columnar_store import ColumnarStore, migrate_csv
+
+    dh = csv_mode
+    dh.save_to_csv("AAA", _ohlcv("2024-01-01", 20))
+    dh.save_to_csv("BBB", _ohlcv("2024-01-01", 20, seed=3))
+
+    store = ColumnarStore(str(tmp_path / "columnar"))
+    assert migrate_csv(dh.CSV_DIR, store)["migrated"] == 2
+    arrays = store.read_arrays("BBB", last_n=5, columns=["Close"])
+    assert isinstance(arrays["Close"].base, np.memmap) or isinstance(arrays["Close"], np.memmap)
+    np.testing.assert_allclose(arrays["Close"], dh.load_from_csv("BBB")["Close"].to_numpy()[-5:])
+
+    store.write("AAA", _ohlcv("2024-01-01", 10, seed=9))  # 재저장 → 죽은 행 발생
+    assert store.stats()["live_rows"] < store.stats()["rows"]
+    store.compact()
+    assert store.stats()["live_rows"] == store.stats()["rows"] == 30
+
+
+def test_columnar_store_sees_other_writers_and_keeps_their_rows(tmp_path):
+    import os
+
+    from alpha_server.columnar_store import ColumnarStore, get_market_for_ticker
+
+    root = str(tmp_path / "columnar")
+    full = _ohlcv("2024-01-01", 30)
+    writer = ColumnarStore(root, check_interval=0)
+    reader = ColumnarStore(root, check_interval=0)  # 다른 프로세스 역할
+    stale = ColumnarStore(root, check_interval=3600)
+    writer.append("AAA", full.iloc[:10])
+    assert len(reader.read("AAA")) == 10 and len(stale.read("AAA")) == 10
+
+    writer.append("AAA", full.iloc[10:20])
+    assert len(reader.read("AAA")) == 20  # 캐시된 색인 대신 바뀐 index.json을 다시 읽음
+
+    # 낡은 색인(10행)을 가진 인스턴스가 같은 파티션에 써도 이미 커밋된 행은 남는다
+    stale.append("BBB", _ohlcv("2024-01-01", 5, seed=2))
+    pd.testing.assert_frame_equal(reader.read("AAA"), full.iloc[:20].astype(float), check_freq=False,
+                                  check_like=True)
+    assert len(reader.read("BBB")) == 5
+
+    # 죽은 쓰기가 남긴 커밋 안 된 꼬리(반쪽 레코드 포함)는 커밋 경계까지만 잘린다
+    pdir = os.path.join(root, get_market_for_ticker("AAA"), "2024")
+    with open(os.path.join(pdir, "close.f8"), "ab") as f:
+        f.write(b"\x01" * 13)
+    writer.append("AAA", full.iloc[20:])
+    sizes = {os.path.getsize(os.path.join(pdir, n)) for n in os.listdir(pdir) if n.endswith((".f8", ".i8"))}
+    assert sizes == {35 * 8}
+    pd.testing.assert_frame_equal(reader.read("AAA"), full.astype(float), check_freq=False, check_like=True)
+
+    # 색인보다 짧은 컬럼 파일은 잘라내지 않고 거부
+    with open(os.path.join(pdir, "open.f8"), "r+b") as f:
+        f.truncate(8)
+    with pytest.raises(RuntimeError):
+        writer.append("BBB", _ohlcv("2024-02-01", 3))
+
+
+def test_columnar_write_swaps_ticker_without_gap_and_compacts(tmp_path):
+    import os
+
+    from alpha_server.columnar_store import ColumnarStore
+
+    root = str(tmp_path / "columnar")
+    store = ColumnarStore(root, check_interval=0, compact_ratio=0.5)
+    reader = ColumnarStore(root, check_interval=0)
+    old, new = _ohlcv("2023-12-01", 60, seed=1), _ohlcv("2023-12-10", 40, seed=2)
+    store.write("AAA", old)
+    store.write("BBB", _ohlcv("2023-12-01", 60, seed=3))
+
+    seen = []
+    save_index = store._save_index
+
+    def observe(market, year, index):
+        save_index(market, year, index)
+        seen.append(reader.read("AAA"))
+
+    store._save_index = observe
+    store.write("AAA", new)  # 연도 파티션 두 개에 걸친 재저장
+    del store._save_index
+    # 색인이 바뀔 때마다 다른 읽기는 AAA를 항상 보며 (빈 순간 없음), 파티션 단위로 옛/새 행만 본다
+    assert seen and all(frame is not None and len(frame) for frame in seen)
+    pd.testing.assert_frame_equal(reader.read("AAA"), new.astype(float), check_freq=False, check_like=True)
+
+    # 죽은 행이 절반을 넘은 파티션은 바로 정리되고, 새 세대 파일로 바뀐다
+    for seed in range(4, 8):
+        store.write("AAA", _ohlcv("2023-12-10", 40, seed=seed))
+    stats = store.stats()
+    assert stats["rows"] - stats["live_rows"] <= 0.5 * stats["rows"]
+    pd.testing.assert_frame_equal(reader.read("AAA"), _ohlcv("2023-12-10", 40, seed=7).astype(float),
+                                  check_freq=False, check_like=True)
+    assert len(reader.read("BBB")) == 60
+    store.compact()
+    store.compact()
+    stats = store.stats()
+    assert stats["rows"] == stats["live_rows"] == 100
+    for market_dir in os.listdir(root):
+        for year in os.listdir(os.path.join(root, market_dir)):
+            names = os.listdir(os.path.join(root, market_dir, year))
+            assert "close.f8" not in names  # 두 세대 전 파일은 지움
+
+
+def test_columnar_last_n_zero_matches_csv(columnar_mode):
+    dh = columnar_mode
+    full = _ohlcv("2024-01-01", 10)
+    dh.save_to_csv("AAA", full)
+
+    arrays = dh.get_columnar_store().read_arrays("AAA", last_n=0)
+    assert arrays is not None and all(len(v) == 0 for v in arrays.values())
+    empty = dh.load_data("AAA", last_n=0)
+    assert empty is not None and empty.empty and set(empty.columns) == set(full.columns)
+    assert dh.load_data("AAA", start="2030-01-01").empty
+    assert dh.load_data("MISSING", last_n=0) is None
+
+
+# ---------- QuestDB circuit breaker ----------
+def test_circuit_breaker_opens_and_recovers_via_probe():
+    from alpha_server.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+
+    healthy = {"ok": False}
+
+    def probe():
+        if not healthy["ok"]:
+            raise ConnectionRefusedError("refused")
+
+    breaker = CircuitBreaker("db", probe, failure_threshold=2, autostart=False)
+    assert breaker.allow() is False  # 프로브 전에는 폴백
+    assert breaker.probe_now() is False and breaker.state == OPEN
+
+    healthy["ok"] = True
+    assert breaker.probe_now() is True and breaker.allow() is True
+
+    breaker.record_failure(OSError("reset"))
+    assert breaker.state == CLOSED
+    breaker.record_failure(OSError("reset"))
+    assert breaker.state == OPEN and breaker.allow() is False
+
+    stats = breaker.stats()
+    assert stats["total_failures"] == 3 and stats["rejected"] == 2
+    assert [t["to"] for t in stats["transitions"]][-2:] == ["closed", "open"]
+
+
+def test_load_data_falls_back_to_files_when_breaker_open(csv_mode, monkeypatch):
+    from alpha_server.circuit_breaker import CircuitBreaker
+
+    dh = csv_mode
+    dh.save_to_csv("AAA", _ohlcv("2024-01-01", 10))
+
+    def refused():
+        raise ConnectionRefusedError("refused")
+
+    breaker = CircuitBreaker("db", refused, autostart=False)
+    monkeypatch.setattr(dh, "USE_QUESTDB", None)
+    monkeypatch.setattr(dh, "questdb_breaker", breaker)
+
+    def boom(*args, **kwargs):
+        raise AssertionError("open 상태에서는 QuestDB를 호출하면 안 된다")
+
+    monkeypatch.setattr(dh, "load_data_from_questdb", boom)
+    assert len(dh.load_data("AAA")) == 10
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_load_data_waits_for_first_probe_on_fresh_breaker(csv_mode, monkeypatch):
+    import threading
+
+    from alpha_server.circuit_breaker import CircuitBreaker
+
+    dh = csv_mode
+    dh.save_to_csv("AAA", _ohlcv("2024-01-01", 10))  # 낡은 CSV가 있어도 QuestDB를 읽어야 한다
+    release = threading.Event()
+    breaker = CircuitBreaker("db", lambda: release.wait(5), autostart=True)  # 새 프로세스처럼 확인 전 상태
+    monkeypatch.setattr(dh, "USE_QUESTDB", None)
+    monkeypatch.setattr(dh, "questdb_breaker", breaker)
+    monkeypatch.setattr(dh, "load_data_from_questdb", lambda ticker, **kwargs: _ohlcv("2024-01-01", 30))
+
+    threading.Timer(0.05, release.set).start()  # 첫 프로브가 늦게 끝나도 기다린다
+    assert len(dh.load_data("AAA")) == 30
+    assert breaker.stats()["rejected"] == 0 and breaker.stats()["probed"]
+
+
+# ---------- QuestDB schema ----------
+def test_plan_schema_changes_in_place_vs_rebuild():
+    from alpha_server.data_handler import _create_table_sql, plan_schema_changes
+
+    ddl = _create_table_sql("stock_prices")
+    assert "ticker SYMBOL" in ddl and "INDEX" in ddl
+    assert "PARTITION BY MONTH WAL DEDUP UPSERT KEYS(timestamp, ticker)" in ddl
+
+    columns = {
+        "timestamp": {"type": "TIMESTAMP", "upsertKey": False},
+        "ticker": {"type": "SYMBOL", "indexed": False, "upsertKey": False},
+    }
+    info = {"designatedTimestamp": "timestamp", "partitionBy": "MONTH", "walEnabled": True, "dedup": False}
+    alters, rebuild = plan_schema_changes(info, columns)
+    assert rebuild == []
+    assert any("ADD INDEX" in a for a in alters) and any("DEDUP ENABLE" in a for a in alters)
+
+    # ILP가 암묵적으로 만든 테이블(일 단위 파티션)은 재생성 대상
+    alters, rebuild = plan_schema_changes(dict(info, partitionBy="DAY"), columns)
+    assert alters == [] and rebuild == ["PARTITION BY DAY"]
+
+    done = {
+        "timestamp": {"type": "TIMESTAMP", "upsertKey": True},
+        "ticker": {"type": "SYMBOL", "indexed": True, "upsertKey": True},
+    }
+    assert plan_schema_changes(dict(info, dedup=True), done) == ([], [])
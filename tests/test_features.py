@@ -0,0 +1,615 @@
+"""feature_engine 단위 테스트: 기존 pandas 구현과의 일치 여부."""
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _ohlcv(periods: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2020-01-01", periods=periods, freq="B", name="Date")
+    close = 100 + rng.standard_normal(periods).cumsum()
+    return pd.DataFrame(
+        {
+            "Open": close + rng.standard_normal(periods) * 0.1,
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close,
+            "Volume": rng.integers(1_000, 10_000, periods).astype(float),
+        },
+        index=idx,
+    )
+
+
+def _pandas_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """리팩터링 전 model_handler/global_model_handler의 피처 계산."""
+    d = df.copy()
+    d["SMA_20"] = d["Close"].rolling(window=20).mean()
+    d["SMA_50"] = d["Close"].rolling(window=50).mean()
+    delta = d["Close"].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    d["RSI_14"] = 100 - (100 / (1 + gain / loss))
+    d["Volatility"] = d["Close"].rolling(window=20).std()
+    d["EMA_12"] = d["Close"].ewm(span=12, adjust=False).mean()
+    d["EMA_26"] = d["Close"].ewm(span=26, adjust=False).mean()
+    d["MACD"] = d["EMA_12"] - d["EMA_26"]
+    d["ROC"] = d["Close"].pct_change(periods=10) * 100
+    d["Return_5d"] = d["Close"].pct_change(5)
+    d["BB_Width"] = (d["Volatility"] * 4) / d["SMA_20"]
+    d["Volume_Ratio"] = d["Volume"] / d["Volume"].rolling(window=20).mean()
+    d["High_Low_Ratio"] = d["High"] / d["Low"]
+    d["DayOfWeek"] = d.index.dayofweek
+    d["Month"] = d.index.month
+    d["Return_252d"] = d["Close"].pct_change(periods=252) * 100
+    d["Volatility_252d"] = d["Close"].pct_change().rolling(window=252).std() * np.sqrt(252)
+    return d
+
+
+def test_feature_engine_matches_pandas_reference():
+    from alpha_server.feature_engine import SCORING_FEATURES, TECHNICAL_FEATURES, compute_features
+
+    df = _ohlcv(400)
+    expected = _pandas_reference(df)
+    features = TECHNICAL_FEATURES + SCORING_FEATURES[3:]
+    got = compute_features(df, features)
+
+    assert all(got.dtypes == np.float32)
+    for name in features:
+        a = got[name].to_numpy(np.float64)
+        b = expected[name].to_numpy(np.float64)
+        np.testing.assert_array_equal(np.isnan(a), np.isnan(b), err_msg=name)
+        np.testing.assert_allclose(a[~np.isnan(a)], b[~np.isnan(b)], rtol=1e-5, atol=1e-5, err_msg=name)
+
+
+def test_training_and_inference_share_features():
+    from alpha_server.feature_engine import compute_features
+    from alpha_server.model_handler import create_features_and_target
+
+    df = _ohlcv(120, seed=4)
+    features, target = create_features_and_target(df, target_days=5)
+    # 학습 피처의 각 행은 그 시점까지의 데이터만으로 계산한 추론 피처와 같아야 한다
+    cut = features.index[-1]
+    served = compute_features(df.loc[:cut], list(features.columns)).iloc[-1]
+    pd.testing.assert_series_equal(served, features.iloc[-1], check_names=False)
+    assert len(features) == len(target) == 120 - 49 - 5
+
+
+def test_unknown_feature_rejected():
+    from alpha_server.feature_engine import compute_features
+
+    with pytest.raises(ValueError):
+        compute_features(_ohlcv(10), ["NOPE"])
+
+
+def test_feature_store_incremental_matches_full(tmp_path):
+    from alpha_server.feature_engine import TECHNICAL_FEATURES, compute_features
+    from alpha_server.feature_store import FeatureStore
+
+    df = _ohlcv(300, seed=7)
+    store = FeatureStore(str(tmp_path))
+    store.get("AAPL", df.iloc[:200])
+    # 새 봉이 조금씩 들어오는 경우: 추론처럼 최근 봉만 넘겨도 이어 붙인다
+    store.get("AAPL", df.iloc[150:260])
+    got = store.get("AAPL", df)
+    assert store.stats()["rebuilds"] == 1
+    assert store.stats()["appended_rows"] == 100
+    assert store.stats()["bypasses"] == 0
+
+    expected = compute_features(df, TECHNICAL_FEATURES)
+    np.testing.assert_allclose(got.to_numpy(np.float64), expected.to_numpy(np.float64), rtol=1e-5, equal_nan=True)
+
+    # 최근 봉만 조회하면 계산 없이 저장본에서 읽는다
+    tail = store.get("AAPL", df.iloc[-30:])
+    pd.testing.assert_frame_equal(tail, got.iloc[-30:])
+    assert store.stats()["hits"] == 1
+
+
+def test_feature_store_rebuilds_on_rewritten_history(tmp_path):
+    from alpha_server.feature_engine import compute_features
+    from alpha_server.feature_store import FeatureStore
+
+    df = _ohlcv(120, seed=8)
+    store = FeatureStore(str(tmp_path))
+    store.get("MSFT", df.iloc[:100])
+
+    revised = df.copy()
+    revised.iloc[:100, revised.columns.get_loc("Close")] *= 1.01
+    # 짧은 data로는 재계산 여부를 판단할 수 없으므로 저장하지 않고 바로 계산
+    short = store.get("MSFT", revised.iloc[-10:])
+    assert store.stats()["bypasses"] == 1
+    pd.testing.assert_frame_equal(short, compute_features(revised.iloc[-10:], store.features))
+
+    got = store.get("MSFT", revised)
+    assert store.stats()["rebuilds"] == 2
+    pd.testing.assert_frame_equal(got, compute_features(revised, store.features))
+
+
+def test_feature_store_detects_revised_history_without_new_bars(tmp_path):
+    from alpha_server.feature_engine import compute_features
+    from alpha_server.feature_store import FeatureStore
+
+    df = _ohlcv(150, seed=9)
+    store = FeatureStore(str(tmp_path))
+    store.get("NVDA", df)
+
+    # 새 봉 없이 과거 봉만 수정(백필)된 경우에도 캐시를 그대로 돌려주지 않는다
+    revised = df.copy()
+    revised.iloc[60:70, revised.columns.get_loc("Close")] *= 0.97
+    got = store.get("NVDA", revised)
+    assert store.stats()["hits"] == 0
+    assert store.stats()["rebuilds"] == 2
+    pd.testing.assert_frame_equal(got, compute_features(revised, store.features))
+
+    # 저장본 첫 봉이 없어 다시 쓸 수 없으면 저장하지 않고 바로 계산
+    again = revised.copy()
+    again.iloc[100:, again.columns.get_loc("Volume")] += 1
+    tail = store.get("NVDA", again.iloc[90:])
+    assert store.stats()["bypasses"] == 1
+    pd.testing.assert_frame_equal(tail, compute_features(again.iloc[90:], store.features))
+
+    # 바뀌지 않은 봉은 저장본에서 읽는다
+    store.get("NVDA", revised.iloc[-20:])
+    assert store.stats()["hits"] == 1
+
+
+def test_latest_features_rebuilds_from_history_when_last_bar_replaced(monkeypatch, tmp_path):
+    from alpha_server import feature_store
+    from alpha_server.feature_engine import compute_features
+
+    df = _ohlcv(300, seed=11)
+    frames = {"AAPL": df.iloc[:250]}
+
+    def fake_load_data(ticker, start=None, last_n=None, **kwargs):
+        frame = frames.get(ticker)
+        if frame is not None and start is not None:
+            frame = frame[frame.index >= start]
+        return frame.tail(last_n) if frame is not None and last_n is not None else frame
+
+    monkeypatch.setattr(feature_store, "load_data", fake_load_data)
+    monkeypatch.setattr(feature_store, "FEATURE_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(feature_store, "_store", None)
+    store = feature_store.get_feature_store()
+    store.get("AAPL", frames["AAPL"])
+
+    # 증분 수집이 장중에 저장된 마지막 봉을 교체하고 새 봉을 붙임 → load_recent는 그 봉부터만 읽는다
+    revised = df.iloc[:260].copy()
+    revised.iloc[249, revised.columns.get_loc("Close")] += 0.5
+    frames["AAPL"] = revised
+    got = feature_store.latest_features("AAPL")
+    feature_store.wait_for_writes()
+
+    expected = compute_features(revised, store.features).iloc[-1:]
+    assert not got.isna().to_numpy().any()
+    np.testing.assert_allclose(got.to_numpy(np.float64), expected.to_numpy(np.float64), rtol=1e-5)
+    assert store.stats()["bypasses"] == 0 and store.stats()["rebuilds"] == 2
+    assert store.last_timestamp("AAPL") == revised.index[-1]
+
+
+def test_feature_store_background_writes_match_sync(tmp_path):
+    import threading
+
+    from alpha_server.feature_store import FeatureStore, _writer, wait_for_writes
+
+    df = _ohlcv(220, seed=10)
+    sync, bg = FeatureStore(str(tmp_path / "sync")), FeatureStore(str(tmp_path / "bg"))
+    for part in (df.iloc[:150], df.iloc[140:200], df.iloc[190:]):
+        expected = sync.get("AMD", part)
+        gate = threading.Event()
+        _writer().submit(gate.wait, 10)  # 쓰기 스레드를 잠시 막아 두 요청 모두 쓰기 전에 끝나게 한다
+        got = bg.get("AMD", part, background=True)
+        pd.testing.assert_frame_equal(got, expected)
+        # 쓰기 전에 같은 봉을 다시 요청하면 다시 계산하고, 먼저 넘긴 쓰기만 반영된다
+        pd.testing.assert_frame_equal(bg.get("AMD", part, background=True), expected)
+        gate.set()
+        wait_for_writes()
+    assert bg.stats()["deferred_writes"] == 6
+    assert bg.stats()["skipped_writes"] == 3
+    assert bg.last_timestamp("AMD") == df.index[-1]
+    pd.testing.assert_frame_equal(bg.get("AMD", df), sync.get("AMD", df))
+
+
+def _wilder_reference(close: pd.Series, window: int = 14) -> np.ndarray:
+    delta = close.diff().to_numpy()
+    out = np.full(len(close), np.nan)
+    avg_gain = np.where(delta[1:window + 1] > 0, delta[1:window + 1], 0).mean()
+    avg_loss = np.where(delta[1:window + 1] < 0, -delta[1:window + 1], 0).mean()
+    out[window] = 100 - 100 / (1 + avg_gain / avg_loss)
+    for t in range(window + 1, len(close)):
+        avg_gain = (avg_gain * (window - 1) + max(delta[t], 0)) / window
+        avg_loss = (avg_loss * (window - 1) + max(-delta[t], 0)) / window
+        out[t] = 100 - 100 / (1 + avg_gain / avg_loss)
+    return out
+
+
+def test_wilder_rsi_matches_reference():
+    from alpha_server.feature_engine import compute_features
+
+    df = _ohlcv(120, seed=5)
+    got = compute_features(df, ["RSI_14_Wilder"])["RSI_14_Wilder"].to_numpy(np.float64)
+    np.testing.assert_allclose(got, _wilder_reference(df["Close"]), rtol=1e-5, equal_nan=True)
+
+
+def test_ema_skips_nan_like_pandas_ewm():
+    from alpha_server.feature_engine import ema
+
+    rng = np.random.default_rng(11)
+    x = 100 + rng.normal(size=200).cumsum()
+    x[[0, 1, 9, 40, 41, 42, 199]] = np.nan
+    panel = np.column_stack([x, 100 + rng.normal(size=200).cumsum(), np.r_[x[5:], [np.nan] * 5]])
+    for span in (12, 26):
+        ref = pd.DataFrame(panel).ewm(span=span, adjust=False).mean().to_numpy()
+        np.testing.assert_allclose(ema(panel, span), ref, rtol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(ema(x, span), ref[:, 0], rtol=1e-12, equal_nan=True)
+    # 이전 값에서 이어 계산해도 전체 계산과 같다
+    full = ema(x, 12)
+    np.testing.assert_allclose(ema(x[100:], 12, full[99]), full[100:], rtol=1e-12)
+
+
+def test_streaming_features_match_batch_engine():
+    import json
+
+    from alpha_server.feature_engine import AVAILABLE_FEATURES, compute_features, compute_incremental
+    from alpha_server.streaming_features import StreamingFeatures, tail_bars
+
+    df = _ohlcv(600, seed=6)
+    df.iloc[300, df.columns.get_loc("Volume")] = 0.0
+    # 결측 종가: 단독, 연속, 그리고 상태를 넘겨받는 직전 봉(399). EMA는 NaN으로 굳지 않아야 한다
+    df.iloc[[150, 350, 351, 399], df.columns.get_loc("Close")] = np.nan
+    features = AVAILABLE_FEATURES
+    expected = compute_features(df, features).to_numpy(np.float64)
+    assert np.isfinite(expected[-1, [features.index("EMA_12"), features.index("MACD")]]).all()
+
+    # 처음부터 봉 하나씩
+    stream = StreamingFeatures(features)
+    got = stream.update_frame(df).astype(np.float64)
+    np.testing.assert_allclose(got, expected, rtol=1e-5, atol=1e-6, equal_nan=True)
+
+    # 배치 계산 뒤 상태를 이어받아 (JSON 왕복 포함) 새 봉만 갱신
+    cut = 400
+    _, state = compute_incremental(df.iloc[:cut], features)
+    stream = StreamingFeatures.from_history(df.iloc[cut - tail_bars(features):cut], state, features)
+    stream = StreamingFeatures.from_dict(json.loads(json.dumps(stream.to_dict())))
+    for i in range(cut, len(df)):
+        row = df.iloc[i]
+        vec = stream.update(df.index[i], row["Open"], row["High"], row["Low"], row["Close"], row["Volume"])
+        np.testing.assert_allclose(vec, expected[i], rtol=1e-5, atol=1e-6, equal_nan=True)
+
+
+def _bars_panel(frames, tickers):
+    """티커별 OHLCV DataFrame을 load_panel(layout="bars")과 같은 (봉 × 티커) 패널로 만든다."""
+    from alpha_server.data_handler import OHLCVPanel
+
+    n = max([len(frames[t]) for t in tickers], default=0)
+    dates = np.full((n, len(tickers)), np.datetime64("NaT"), dtype="datetime64[ns]")
+    values = {c: np.full((n, len(tickers)), np.nan) for c in ("Open", "High", "Low", "Close", "Volume")}
+    for j, t in enumerate(tickers):
+        f = frames[t]
+        dates[:len(f), j] = f.index.to_numpy()
+        for c in values:
+            values[c][:len(f), j] = f[c].to_numpy()
+    return OHLCVPanel(dates=dates, tickers=list(tickers), values=values)
+
+
+def test_panel_dataset_matches_per_ticker_features(monkeypatch):
+    from alpha_server import feature_store
+    from alpha_server.global_dataset import FEATURE_COLUMNS, build_panel_dataset
+    from alpha_server.global_model_handler import GLOBAL_FEATURE_COLUMNS, create_global_features_and_target
+
+    monkeypatch.setattr(feature_store, "FEATURE_STORE_ENABLED", False)
+    # 시장별 휴장일이 달라 날짜가 어긋나고, 길이도 다른 티커들 (CCC는 봉이 모자라 제외)
+    frames = {"AAA": _ohlcv(200, seed=1), "BBB": _ohlcv(260, seed=2).iloc[::2], "CCC": _ohlcv(30, seed=3)}
+    metadata = {
+        "AAA": {"sector": "Tech", "industry": "Chips", "marketCap": 1e9, "beta": 1.2},
+        "BBB": {"sector": "Energy", "industry": "Oil"},
+    }
+    ds = build_panel_dataset(_bars_panel(frames, list(frames)), metadata, target_days=[5, 20])
+    assert ds.X.dtype == np.float32 and ds.X.flags.c_contiguous and ds.horizons == [5, 20]
+    assert ds.targets[5].dtype == np.int8 and ds.ticker_codes.dtype == np.int16
+    assert (np.diff(ds.dates.astype(np.int64)) >= 0).all()
+
+    parts = [create_global_features_and_target(t, frames[t], metadata, target_days=5) for t in ("AAA", "BBB")]
+    expected_X = pd.concat([p[0] for p in parts])
+    expected_y = pd.concat([p[1] for p in parts])
+    order = np.argsort(expected_X.index.to_numpy(), kind="stable")
+    expected_X, expected_y = expected_X.iloc[order], expected_y.iloc[order]
+
+    X = ds.to_frame()
+    assert list(X.columns) == GLOBAL_FEATURE_COLUMNS == ["Ticker"] + FEATURE_COLUMNS
+    assert list(X["Sector"].cat.categories) == ["Energy", "Tech", "Unknown"]
+    for col in ("Ticker", "Sector", "Industry"):
+        assert X[col].astype(str).tolist() == expected_X[col].tolist()
+    np.testing.assert_array_equal(X.index.to_numpy(), expected_X.index.to_numpy())
+    np.testing.assert_allclose(
+        X[GLOBAL_FEATURE_COLUMNS[3:]].to_numpy(np.float64),
+        expected_X[GLOBAL_FEATURE_COLUMNS[3:]].to_numpy(np.float64),
+        rtol=1e-5, atol=1e-6,
+    )
+    np.testing.assert_array_equal(ds.targets[5], expected_y.to_numpy())
+
+    # 긴 호라이즌은 같은 피처 행렬에서 라벨이 있는 행만 쓴다 (티커별로 따로 만든 것과 같은 결과)
+    long_X, long_y = zip(*(create_global_features_and_target(t, frames[t], metadata, target_days=20)
+                           for t in ("AAA", "BBB")))
+    long_y = pd.concat(long_y)
+    long_y = long_y.iloc[np.argsort(pd.concat(long_X).index.to_numpy(), kind="stable")]
+    rows = ds.labeled_rows(20)
+    np.testing.assert_array_equal(ds.targets[20][rows], long_y.to_numpy())
+    assert (ds.targets[20] == -1).sum() == len(ds) - len(long_y)
+
+    # 분할은 복사 없는 뷰이고, 인코더는 X 안의 코드와 같은 값을 낸다
+    X_train, X_test, y_train, y_test = ds.split(5, 0.2)
+    assert len(X_test) == int(np.ceil(len(ds) * 0.2)) and len(X_train) + len(X_test) == len(ds)
+    assert np.shares_memory(X_train.to_numpy(), ds.X) and np.shares_memory(y_test, ds.targets[5])
+    X_train, X_test, y_train, y_test = ds.split(20, 0.2)
+    assert len(y_train) + len(y_test) == len(long_y) and (y_test >= 0).all()
+    encoded = ds.encoder().transform(expected_X[["Sector", "Industry"]])
+    np.testing.assert_array_equal(encoded, ds.X[:, :2])
+
+
+def test_cached_dataset_matches_in_memory_build(tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+
+    from alpha_server.global_dataset import build_cached_dataset, build_panel_dataset
+
+    # 상장 폐지로 일찍 끝나는 DDD 때문에 긴 호라이즌의 라벨 없는 행이 중간에 섞인다
+    frames = {
+        "AAA": _ohlcv(200, seed=1), "BBB": _ohlcv(260, seed=2).iloc[::2],
+        "CCC": _ohlcv(30, seed=3), "DDD": _ohlcv(120, seed=4),
+    }
+    metadata = {t: {"sector": "Tech" if t < "C" else "Energy", "industry": t, "beta": 1.0} for t in frames}
+    tickers = list(frames)
+    expected = build_panel_dataset(_bars_panel(frames, tickers), metadata, target_days=[5, 20])
+
+    loads = []
+    def load_chunk(chunk):
+        loads.append(list(chunk))
+        return _bars_panel(frames, chunk)
+
+    watermarks = {t: f.index[-1] for t, f in frames.items()}
+    ds = build_cached_dataset(tickers, metadata, load_chunk, target_days=[5, 20],
+                              watermarks=watermarks, cache_dir=str(tmp_path), ticker_chunk=3)
+    assert loads == [["AAA", "BBB", "CCC"], ["DDD"]]
+    assert isinstance(ds.X, np.memmap) and ds.path is not None
+    np.testing.assert_array_equal(ds.X, expected.X)
+    np.testing.assert_array_equal(ds.dates, expected.dates)
+    np.testing.assert_array_equal(ds.ticker_codes, expected.ticker_codes)
+    for h in (5, 20):
+        np.testing.assert_array_equal(ds.targets[h], expected.targets[h])
+        np.testing.assert_array_equal(ds.label_ends[h], expected.label_ends[h])
+    assert ds.categories == expected.categories
+
+    # 입력이 같으면 다시 읽지 않고, 워터마크가 바뀌면 새로 만든다
+    again = build_cached_dataset(tickers, metadata, load_chunk, target_days=[5, 20],
+                                 watermarks=watermarks, cache_dir=str(tmp_path), ticker_chunk=3)
+    assert len(loads) == 2 and again.path == ds.path
+
+    # 라벨 없는 행이 중간에 있는 호라이즌은 라벨 있는 행만 디스크에 모아 분할한다
+    assert not isinstance(ds.labeled_rows(20), slice)
+    for target_days in (5, 20):
+        split, ref = ds.split(target_days), expected.split(target_days)
+        for a, b in zip(split, ref):
+            np.testing.assert_array_equal(np.asarray(a), np.asarray(b))
+    assert np.shares_memory(ds.split(5)[0].to_numpy(), ds.X)
+    X_train, _, y_train, _ = ds.split(20)
+    assert os.path.exists(os.path.join(ds.path, "X_labeled_20.npy")) and not X_train.to_numpy().flags.owndata
+    RandomForestClassifier(n_estimators=5, max_depth=3, random_state=0).fit(X_train, y_train)
+
+    changed = dict(watermarks, AAA=watermarks["AAA"] + pd.Timedelta(days=1))
+    build_cached_dataset(tickers, metadata, load_chunk, target_days=[5, 20],
+                         watermarks=changed, cache_dir=str(tmp_path), ticker_chunk=3)
+    assert len(loads) == 4
+
+
+def test_fit_global_ensemble_bounds_rows_on_disk_dataset(monkeypatch, tmp_path):
+    from alpha_server import global_model_handler
+    from alpha_server.global_dataset import build_cached_dataset
+
+    frames = {t: _ohlcv(260, seed=i) for i, t in enumerate(("AAA", "BBB", "CCC"))}
+    metadata = {t: {"sector": "Tech", "industry": t, "beta": 1.0} for t in frames}
+    ds = build_cached_dataset(list(frames), metadata, lambda c: _bars_panel(frames, c), target_days=[5],
+                              cache_dir=str(tmp_path))
+    monkeypatch.setattr(global_model_handler, "GLOBAL_RF_PARAMS",
+                        {"n_estimators": 3, "max_depth": 3, "random_state": 0})
+    monkeypatch.setattr(global_model_handler, "_boosters", lambda: (None, None))
+
+    ensemble, X_test, y_test = global_model_handler.fit_global_ensemble(ds, 5, 0.2, n_jobs=1, max_rows=100)
+    rf = ensemble.named_estimators_["rf"]
+    # 부트스트랩 가중치 합 = 학습에 올린 행 수
+    assert all(tree.tree_.weighted_n_node_samples[0] == 100 for tree in rf.estimators_)
+    _, ref_X_test, _, ref_y_test = ds.split(5, 0.2)
+    pd.testing.assert_frame_equal(X_test, ref_X_test)
+    np.testing.assert_array_equal(y_test, ref_y_test)
+
+    # 표본 상한보다 학습 행이 적으면 전부 쓴다
+    ensemble, _, _ = global_model_handler.fit_global_ensemble(ds, 5, 0.2, n_jobs=1, max_rows=10**9)
+    n_train = len(ds.split(5, 0.2)[2])
+    assert ensemble.named_estimators_["rf"].estimators_[0].tree_.weighted_n_node_samples[0] == n_train
+
+
+def test_walk_forward_folds_and_results(monkeypatch, tmp_path):
+    import json
+
+    from alpha_server import feature_store, walk_forward
+    from alpha_server.global_dataset import build_cached_dataset
+
+    # 폴드: 학습은 검증 구간 첫 날짜보다 gap개 날짜 앞에서 끝나고, 같은 날짜는 나뉘지 않으며, 학습 구간은 늘어난다
+    dates = np.repeat(pd.date_range("2024-01-01", periods=100, freq="B").to_numpy(), 3)
+    folds = walk_forward.expanding_folds(dates, n_folds=4, gap=5, min_train=0.5)
+    assert len(folds) == 4 and folds[-1].test_end == len(dates)
+    for prev, fold in zip(folds, folds[1:]):
+        assert fold.train_end > prev.train_end and fold.test_start == prev.test_end
+    for fold in folds:
+        assert len(np.unique(dates[fold.train_end:fold.test_start])) == 5
+        assert fold.test_start % 3 == 0 and fold.train_end % 3 == 0
+
+    monkeypatch.setattr(feature_store, "FEATURE_STORE_ENABLED", False)
+    frames = {"AAA": _ohlcv(300, seed=1), "BBB": _ohlcv(300, seed=2)}
+    monkeypatch.setattr(walk_forward, "load_data", lambda t: frames.get(t))
+    path = str(tmp_path / "ticker.jsonl")
+    summary = walk_forward.run_ticker_validation(["AAA", "BBB", "ZZZ"], n_folds=3, results_path=path, workers=1)
+    records = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert len(records) == summary["folds"] == 6 and summary["tickers"] == 2
+    assert {r["fold"] for r in records} == {0, 1, 2} and all(0 <= r["accuracy"] <= 1 for r in records)
+
+    # 글로벌: 디스크 데이터셋 폴드를 작업 프로세스 2개가 memmap으로 열어 병렬 실행
+    from alpha_server import training_scheduler
+    monkeypatch.setattr(training_scheduler, "CPU_BUDGET", 2)
+    metadata = {t: {"sector": "Tech", "industry": "Chips", "beta": 1.0} for t in frames}
+    ds = build_cached_dataset(list(frames), metadata, lambda c: _bars_panel(frames, c), target_days=[5],
+                              cache_dir=str(tmp_path / "ds"))
+    path = str(tmp_path / "global.jsonl")
+    summary = walk_forward.run_global_validation(ds, horizons={"short": 5}, n_folds=2, results_path=path, workers=2)
+    records = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert summary["global_short"]["folds"] == len(records) == 2
+    assert sorted(r["fold"] for r in records) == [0, 1] and records[0]["model"] == "global_short"
+
+
+def test_walk_forward_purges_by_label_end_on_mixed_calendars():
+    from alpha_server import walk_forward
+    from alpha_server.global_dataset import build_panel_dataset
+
+    # 암호화폐(매일)와 주식(영업일)이 섞이면 고유 날짜 5개는 주식의 5봉보다 짧다
+    crypto = _ohlcv(400, seed=1)
+    crypto.index = pd.date_range("2020-01-01", periods=400, freq="D", name="Date")
+    frames = {"BTC-USD": crypto, "AAA": _ohlcv(300, seed=2), "BBB": _ohlcv(280, seed=3)}
+    metadata = {t: {"sector": "Tech", "industry": t, "beta": 1.0} for t in frames}
+    ds = build_panel_dataset(_bars_panel(frames, list(frames)), metadata, target_days=[5])
+    X, y, dates = ds.labeled(5)
+    ends = ds.labeled_ends(5)
+
+    # 라벨 종료 날짜는 그 티커의 5번째 다음 봉 날짜
+    codes = ds.ticker_codes[ds.labeled_rows(5)]
+    for t, frame in frames.items():
+        mine = codes == ds.tickers.index(t)
+        pos = frame.index.get_indexer(dates[mine])
+        np.testing.assert_array_equal(ends[mine], frame.index.to_numpy()[pos + 5])
+
+    folds = walk_forward.expanding_folds(dates, n_folds=4, min_train=0.5, label_ends=ends)
+    assert len(folds) == 4
+    for fold in folds:
+        test_from = dates[fold.test_start]
+        assert (ends[fold.train] < test_from).all() and (dates[fold.train] < test_from).all()
+        assert fold.n_train == len(fold.train_rows) and fold.train_rows[-1] == fold.train_end - 1
+
+    # 날짜 수 기준 gap은 주식 행의 라벨 구간이 검증 구간으로 넘어간다
+    legacy = walk_forward.expanding_folds(dates, n_folds=4, gap=5, min_train=0.5)
+    assert any((ends[:f.train_end] >= dates[f.test_start]).any() for f in legacy)
+
+
+def test_global_batch_prediction_matches_per_ticker(monkeypatch, tmp_path):
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    from alpha_server import feature_store, global_model_predictor
+    from alpha_server.feature_engine import FEATURE_SET_VERSION
+    from alpha_server.global_dataset import build_panel_dataset
+
+    monkeypatch.setattr(feature_store, "FEATURE_STORE_ENABLED", False)
+    frames = {"AAA": _ohlcv(200, seed=1), "BBB": _ohlcv(180, seed=2), "CCC": _ohlcv(120, seed=3), "DDD": _ohlcv(30, seed=4)}
+    metadata = {
+        "AAA": {"sector": "Tech", "industry": "Chips", "marketCap": 1e9, "beta": 1.2},
+        "BBB": {"sector": "Energy", "industry": "Oil"},
+        "CCC": {"sector": "Retail", "industry": "Stores"},  # 학습에 없던 범주
+    }
+    ds = build_panel_dataset(_bars_panel(frames, ["AAA", "BBB"]), metadata, target_days=5)
+    X_train, _, y_train, _ = ds.split(5, 0.2)
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0).fit(X_train, y_train)
+    joblib.dump({
+        "model": model, "features": list(ds.feature_names), "encoder": ds.encoder(),
+        "cat_cols": ["Sector", "Industry"], "target_days": 5, "feature_set_version": FEATURE_SET_VERSION,
+    }, tmp_path / "global_short_model.joblib")
+
+    monkeypatch.setattr(global_model_predictor, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(global_model_predictor, "load_recent", lambda t: frames[t])
+    monkeypatch.setattr(global_model_predictor, "get_ticker_metadata", lambda ts: metadata)
+    calls = []
+    monkeypatch.setattr(model, "predict_proba", lambda X, _orig=model.predict_proba: calls.append(len(X)) or _orig(X))
+    monkeypatch.setattr(global_model_predictor, "load_predictor", lambda path: (
+        {**joblib.load(path), "model": model} if os.path.exists(path) else None
+    ))
+
+    tickers = list(frames)
+    probs = global_model_predictor.predict_global_batch(
+        tickers, horizons=("short", "mid"), panel=_bars_panel(frames, tickers), metadata=metadata,
+    )
+    assert calls == [3]  # DDD는 봉이 모자라 빠지고, 나머지 세 종목은 한 번의 호출로 예측
+    assert set(probs) == set(tickers) and probs["DDD"] == {"short": None, "mid": None}
+    assert all(probs[t]["mid"] is None for t in tickers)  # 모델 없는 호라이즌
+    for t in ("AAA", "BBB", "CCC"):
+        expected = global_model_predictor.predict_with_global_model(t, "short")
+        assert ("UP" if probs[t]["short"] > 0.5 else "DOWN") == expected
+
+
+def test_multi_horizon_model_serves_all_horizons_in_one_call(monkeypatch, tmp_path):
+    import json
+
+    from alpha_server import feature_store, global_model_handler, global_model_predictor, walk_forward
+    from alpha_server.global_dataset import build_panel_dataset
+    from alpha_server.horizon_comparison import compare_global_setups
+    from alpha_server.tree_compiler import CompiledModel, compile_model
+
+    monkeypatch.setattr(feature_store, "FEATURE_STORE_ENABLED", False)
+    frames = {t: _ohlcv(260, seed=i) for i, t in enumerate(["AAA", "BBB", "CCC"])}
+    metadata = {t: {"sector": "Tech", "industry": "Chips", "marketCap": 1e9, "beta": 1.0} for t in frames}
+    horizons = {"short": 3, "long": 10}
+    panel = _bars_panel(frames, list(frames))
+    ds = build_panel_dataset(panel, metadata, target_days=list(horizons.values()))
+    X, Y, _ = ds.labeled_multi([3, 10])
+    # 짧은 호라이즌 라벨 행을 모두 쓰고, 긴 호라이즌 라벨이 없는 최근 행은 -1 (무시 마스크)
+    assert Y.shape == (len(ds.labeled(3)[1]), 2) and (Y[:, 0] >= 0).all() and len(X) == len(Y)
+    assert (Y[:, 1] >= 0).sum() == len(ds.labeled(10)[1]) and (Y[:, 1] < 0).any()
+
+    # 모든 호라이즌 라벨이 있는 행만으로 학습: 분할 없는 포레스트의 확률 = 그 행들의 상승 비율
+    with monkeypatch.context() as m:
+        m.setattr(global_model_handler, "GLOBAL_RF_PARAMS", {"n_estimators": 3, "min_samples_split": 10**9, "bootstrap": False})
+        stump = global_model_handler.fit_multi_horizon_forest(X, Y, n_jobs=1)
+    assert [list(c) for c in stump.classes_] == [[0, 1], [0, 1]]
+    up = [p[:, 1] for p in stump.predict_proba(X[:2])]
+    known = (Y >= 0).all(axis=1)
+    np.testing.assert_allclose(up[0], Y[known, 0].mean())
+    np.testing.assert_allclose(up[1], Y[known, 1].mean())
+    np.testing.assert_allclose(compile_model(stump).predict_proba(X[:2])[1][:, 1], up[1])
+
+    # 학습 행 중 라벨이 검증 구간의 봉을 보는 호라이즌은 퍼지된다
+    X_train, X_test, Y_train, Y_test = ds.split_multi([3, 10])
+    test_start = ds.labeled(3)[2][len(Y_train)]
+    for k, h in enumerate([3, 10]):
+        ends = ds.label_ends[h][ds.labeled_rows(3)][:len(Y_train)]
+        assert (ends[Y_train[:, k] >= 0] < test_start).all() and (Y_train[:, k] < Y[:len(Y_train), k]).any()
+
+    monkeypatch.setattr(global_model_handler, "MODELS_DIR", str(tmp_path))
+    accuracy = global_model_handler.train_multi_horizon_model(horizons, dataset=ds)
+    assert set(accuracy) == {"short", "long"}
+
+    monkeypatch.setattr(global_model_predictor, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(global_model_predictor, "GLOBAL_MULTI_HORIZON", True)
+    saved = global_model_predictor._load_global_model("long")
+    assert isinstance(saved["model"], CompiledModel) and saved["horizons"] == ["short", "long"]
+    calls = []
+    predict_proba = saved["model"].predict_proba
+    monkeypatch.setattr(saved["model"], "predict_proba", lambda X: calls.append(len(X)) or predict_proba(X))
+    probs = global_model_predictor.predict_global_batch(list(frames), horizons=("short", "long"), panel=panel, metadata=metadata)
+    assert calls == [3]  # 두 호라이즌, 세 종목을 호출 한 번으로
+    rows = global_model_predictor._encode_categories(global_model_predictor.latest_global_rows(list(frames), panel, metadata), saved)
+    expected = predict_proba(rows[saved["features"]])
+    for k, h in enumerate(["short", "long"]):
+        np.testing.assert_allclose([probs[t][h] for t in rows.index], expected[k][:, 1])
+
+    # 비교 보고서: 같은 검증 행에서 두 구성의 지표/크기/지연
+    monkeypatch.setattr(walk_forward, "VALIDATION_DIR", str(tmp_path / "validation"))
+    monkeypatch.setattr("alpha_server.horizon_comparison.VALIDATION_DIR", str(tmp_path / "validation"))
+    report = compare_global_setups(ds, horizons, n_jobs=1, latency_rows=50, repeat=1)
+    separate, multi = report["setups"]["separate"], report["setups"]["multi"]
+    assert (separate["model_calls"], multi["model_calls"]) == (2, 1)
+    assert set(multi["metrics"]) == {"short", "long"} and 0 <= multi["metrics"]["long"]["accuracy"] <= 1
+    # 두 구성은 호라이즌마다 같은 검증 행에서 평가하고, 긴 호라이즌은 라벨 있는 행만 쓴다
+    per_horizon = report["rows"]["horizons"]
+    for h in horizons:
+        assert separate["metrics"][h]["n_test"] == multi["metrics"][h]["n_test"] == per_horizon[h]["test"]
+    assert per_horizon["long"]["train"] < per_horizon["short"]["train"]
+    assert multi["model_bytes"] > 0 and set(multi["latency_ms"]) == set(separate["latency_ms"])
+    with open(report["path"], encoding="utf-8") as f:
+        assert json.load(f)["rows"]["test"] == report["rows"]["test"]
@@ -48,7 +48,7 @@ def test_data_handler():
     
     try:
         from alpha_server import data_handler
-        print(f"  - 데이터 저장 모드: {'QuestDB' if data_handler.USE_QUESTDB else 'CSV'}")
+        print(f"  - 데이터 저장 모드: {'QuestDB' if data_handler.questdb_enabled(wait=5) else 'CSV'}")
         print("    ✅ 데이터 핸들러 정상")
         return True
     except Exception as e:
@@ -312,3 +312,353 @@ def test_server_launcher_prefers_embedded_path(monkeypatch, tmp_path):
     assert paths, "임베드된 AlphaServer 경로를 하나 이상 발견해야 한다"
     # 첫 번째 후보가 임베드된 위치여야 한다 (시스템 경로보다 우선)
     assert paths[0] == embedded_server.resolve()
+
+
+# ---------- training_scheduler ----------
+def _fake_fit(ticker, n_jobs=-1, scale=1.0):
+    """스케줄러 테스트용 학습 함수 (작업 프로세스에서 import되도록 모듈 최상위에 둔다)."""
+    if ticker == "BAD":
+        raise ValueError("학습 데이터 오류")
+    if ticker == "EMPTY":
+        return None
+    if ticker == "CRASH":
+        os._exit(1)  # 네이티브 라이브러리 충돌처럼 작업 프로세스가 바로 죽는 경우
+    return n_jobs * scale
+
+
+def test_training_plan_respects_cpu_budget():
+    from alpha_server.training_scheduler import plan
+
+    assert plan(100, threads_per_fit=2, cpu_budget=8) == (4, 2)
+    assert plan(100, workers=16, threads_per_fit=1, cpu_budget=4) == (4, 1)
+    assert plan(3, threads_per_fit=1, cpu_budget=8) == (3, 1)
+    assert plan(10, threads_per_fit=8, cpu_budget=4) == (1, 4)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_training_isolates_failures_and_reports_progress(workers):
+    from alpha_server.training_scheduler import run_training, summarize
+
+    seen = []
+    results = run_training(
+        _fake_fit, ["AAA", "BAD", "EMPTY", "BBB"], kwargs={"scale": 0.5},
+        workers=workers, threads_per_fit=1, cpu_budget=2,
+        progress=lambda done, total, r: seen.append((done, total, r.ticker)),
+    )
+
+    assert [r.ticker for r in results] == ["AAA", "BAD", "EMPTY", "BBB"]
+    assert [d for d, _, _ in seen] == [1, 2, 3, 4] and {t for _, t, _ in seen} == {4}
+    assert results[0].value == 0.5  # n_jobs=학습당 스레드 1
+    assert "ValueError" in results[1].error
+    summary = summarize(results)
+    assert (summary["trained"], summary["skipped"], summary["failed"]) == (2, 1, ["BAD"])
+
+
+def test_training_survives_worker_crash():
+    from alpha_server.training_scheduler import run_training
+
+    tickers = ["AAA", "CRASH", "BBB", "CCC", "DDD"]
+    results = run_training(_fake_fit, tickers, workers=2, threads_per_fit=1, cpu_budget=2)
+
+    assert [r.ticker for r in results] == tickers
+    assert results[1].error == "학습 프로세스 비정상 종료"
+    assert all(r.ok and r.value == 1 for r in results if r.ticker != "CRASH")
+
+
+# ---------- training_manifest ----------
+def test_training_manifest_detects_changed_inputs(tmp_path):
+    import numpy as np
+    import pandas as pd
+
+    from alpha_server.training_manifest import data_fingerprint, needs_training, write_manifest
+
+    index = pd.date_range("2024-01-01", periods=50, freq="B")
+    data = pd.DataFrame({c: np.arange(50.0) + 1 for c in ["Open", "High", "Low", "Close", "Volume"]}, index=index)
+    model_path = str(tmp_path / "AAA_model.joblib")
+    params = {"trainer": "random_forest", "n_estimators": 200}
+    fingerprint = data_fingerprint(data)
+
+    assert needs_training(model_path, fingerprint, params) == (True, "모델 없음")
+    open(model_path, "wb").close()
+    write_manifest(model_path, fingerprint, params, accuracy=0.5)
+    assert needs_training(model_path, data_fingerprint(data.copy()), params) == (False, "변경 없음")
+
+    revised = data.copy()
+    revised.iloc[10, 3] += 0.01  # 과거 종가 수정 (행 수/마지막 봉은 그대로)
+    assert needs_training(model_path, data_fingerprint(revised), params)[0]
+    assert needs_training(model_path, fingerprint, {**params, "n_estimators": 300})[0]
+    assert needs_training(model_path, fingerprint, params, max_age_days=-1)[0] is False  # 0 이하면 나이 무시
+    assert needs_training(model_path, fingerprint, params, max_age_days=1e-9)[0]
+
+
+def test_model_registry_caches_and_hot_reloads(tmp_path):
+    import joblib
+
+    from alpha_server.model_registry import ModelRegistry
+
+    registry = ModelRegistry(max_entries=2, max_bytes=1 << 20, check_interval=0)
+    paths = [str(tmp_path / f"m{i}.joblib") for i in range(3)]
+    for i, path in enumerate(paths):
+        joblib.dump({"version": i}, path)
+
+    assert registry.get(str(tmp_path / "missing.joblib")) is None
+    first = registry.get(paths[0])
+    assert registry.get(paths[0]) is first
+    assert registry.stats()["loads"] == 1 and registry.stats()["hits"] == 1
+
+    # 재학습으로 파일이 교체되면 다음 조회에서 새 객체로 다시 로드
+    joblib.dump({"version": 10, "pad": "x" * 100}, paths[0])
+    assert registry.get(paths[0])["version"] == 10
+    assert registry.stats()["reloads"] == 1
+
+    registry.get(paths[1])
+    registry.get(paths[2])  # 최대 2개이므로 가장 오래 쓰지 않은 paths[0] 제거
+    stats = registry.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    registry.get(paths[0])
+    assert registry.stats()["loads"] == 5 and registry.stats()["load_seconds_total"] > 0
+
+    # 경로별 로드 잠금은 쓰는 스레드가 없으면 남지 않는다 (제거된 항목/없는 파일 포함)
+    for i in range(50):
+        registry.get(str(tmp_path / f"missing{i}.joblib"))
+    assert len(registry._path_locks) == 0
+
+
+def _tree_data(n=2000, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, 8)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.standard_normal(n) * 0.5 > 0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("family", ["random_forest", "voting", "xgboost", "lightgbm", "lightgbm_disk"])
+def test_compiled_trees_match_original_model(family, tmp_path):
+    import numpy as np
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier, VotingClassifier
+
+    from alpha_server.tree_compiler import compile_model, load_compiled, save_compiled
+
+    X, y = _tree_data()
+    if family == "random_forest":
+        X[::17, 3] = np.nan  # 결측치 방향(missing_left)까지 확인
+        model = RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0).fit(X, y)
+    elif family == "voting":
+        model = VotingClassifier(
+            [("rf", RandomForestClassifier(n_estimators=20, random_state=1)),
+             ("et", ExtraTreesClassifier(n_estimators=10, max_depth=6, random_state=2))],
+            voting="soft", weights=[2, 1],
+        ).fit(X, np.where(y == 1, "UP", "DOWN"))
+    elif family == "xgboost":
+        xgb = pytest.importorskip("xgboost")
+        model = xgb.XGBClassifier(n_estimators=30, max_depth=4, learning_rate=0.1, random_state=0).fit(X, y)
+    elif family == "lightgbm":
+        lgb = pytest.importorskip("lightgbm")
+        model = lgb.LGBMClassifier(n_estimators=30, max_depth=4, random_state=0, verbose=-1).fit(X, y)
+    else:
+        pytest.importorskip("lightgbm")
+        from alpha_server.disk_training import LGBMBoosterClassifier, lgb_dataset_file
+
+        # memmap을 묶음 단위로 읽어 만든 바이너리 Dataset으로 학습해도 메모리 배열로 학습한 것과 같다
+        np.save(tmp_path / "X.npy", X)
+        file = lgb_dataset_file(str(tmp_path), 5, np.load(tmp_path / "X.npy", mmap_mode="r"), y,
+                                [f"f{i}" for i in range(X.shape[1])])
+        assert lgb_dataset_file(str(tmp_path), 5, None, y, []) == file  # 두 번째부터는 저장본 재사용
+        model = LGBMBoosterClassifier(dataset_file=file, n_estimators=30, max_depth=4, random_state=0).fit(None, None)
+        in_memory = LGBMBoosterClassifier(n_estimators=30, max_depth=4, random_state=0).fit(X, y)
+        np.testing.assert_allclose(model.predict_proba(X), in_memory.predict_proba(X), rtol=1e-6)
+
+    X_test, _ = _tree_data(300, seed=1)
+    if family == "random_forest":
+        X_test[::11, 3] = np.nan
+    save_compiled(compile_model(model), str(tmp_path / "m.trees.npz"))
+    compiled = load_compiled(str(tmp_path / "m.trees.npz"))
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test), rtol=1e-6, atol=1e-6)
+    assert (compiled.predict(X_test) == model.predict(X_test)).all()
+
+
+# 고정된 부스터 덤프: xgboost/lightgbm 없이도 컴파일 규칙(비교 방향, 결측 방향, base_score)을 확인한다
+_BOOSTER_ROWS = [[0.0, -2.0], [0.5, 1.0], [float("nan"), float("nan")], [0.2, -1.0]]
+
+
+class XGBClassifier:
+    """XGBoost 2.1+ 형식의 save_config/get_dump를 돌려주는 고정 모델."""
+
+    n_classes_ = 2
+    feature_names = None
+
+    def __init__(self, base_score, objective="binary:logistic"):
+        import numpy as np
+        self.classes_ = np.array([0, 1])
+        self.config = {"learner": {"objective": {"name": objective},
+                                   "learner_model_param": {"base_score": base_score}}}
+
+    def get_booster(self):
+        return self
+
+    def save_config(self):
+        import json
+        return json.dumps(self.config)
+
+    def get_dump(self, dump_format="json"):
+        import json
+        trees = [
+            {"nodeid": 0, "split": "f0", "split_condition": 0.5, "yes": 1, "no": 2, "missing": 2, "children": [
+                {"nodeid": 1, "split": "f1", "split_condition": -1.0, "yes": 3, "no": 4, "missing": 3, "children": [
+                    {"nodeid": 3, "leaf": -0.4}, {"nodeid": 4, "leaf": 0.1}]},
+                {"nodeid": 2, "leaf": 0.6}]},
+            {"nodeid": 0, "split": "f1", "split_condition": 0.0, "yes": 1, "no": 2, "missing": 1, "children": [
+                {"nodeid": 1, "leaf": -0.2}, {"nodeid": 2, "leaf": 0.2}]},
+        ]
+        return [json.dumps(t) for t in trees]
+
+
+class LGBMClassifier:
+    """booster_.dump_model()을 돌려주는 고정 모델."""
+
+    def __init__(self, objective="binary sigmoid:1"):
+        import numpy as np
+        self.classes_ = np.array([0, 1])
+        self.objective = objective
+        self.booster_ = self
+
+    def dump_model(self):
+        def split(feature, threshold, default_left, left, right):
+            return {"split_feature": feature, "threshold": threshold, "decision_type": "<=",
+                    "default_left": default_left, "left_child": left, "right_child": right}
+
+        leaf = lambda v: {"leaf_value": v}
+        return {"num_class": 1, "objective": self.objective, "tree_info": [
+            {"tree_structure": split(0, 0.5, False, split(1, -1.0, True, leaf(-0.4), leaf(0.1)), leaf(0.6))},
+            {"tree_structure": split(1, 0.0, True, leaf(-0.2), leaf(0.2))},
+        ]}
+
+
+@pytest.mark.parametrize("raw, base", [("[3E-1]", 0.3), ("3E-1", 0.3), ("[5E-1]", 0.5)])
+def test_compiled_xgboost_dump_applies_base_score_margin(raw, base, tmp_path):
+    import numpy as np
+
+    from alpha_server.tree_compiler import compile_model, load_compiled, save_compiled
+
+    save_compiled(compile_model(XGBClassifier(raw)), str(tmp_path / "m.trees.npz"))
+    compiled = load_compiled(str(tmp_path / "m.trees.npz"))
+    # x < 분할값이면 yes, 경계값(0.5, -1.0)은 no, NaN은 missing 방향
+    margin = np.log(base / (1 - base)) + np.array([-0.6, 0.8, 0.4, -0.1])
+    proba = compiled.predict_proba(np.array(_BOOSTER_ROWS))
+    np.testing.assert_allclose(proba[:, 1], 1 / (1 + np.exp(-margin)), rtol=1e-6)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+    with pytest.raises(ValueError):
+        compile_model(XGBClassifier(raw, objective="reg:squarederror"))
+
+
+@pytest.mark.parametrize("sigmoid", [1.0, 2.0])
+def test_compiled_lightgbm_dump_matches_hand_computed(sigmoid):
+    import numpy as np
+
+    from alpha_server.tree_compiler import compile_model
+
+    compiled = compile_model(LGBMClassifier(f"binary sigmoid:{sigmoid:g}"))
+    # x <= 분할값이면 왼쪽, NaN은 default_left 방향
+    margin = np.array([-0.6, 0.3, 0.4, -0.6])
+    proba = compiled.predict_proba(np.array(_BOOSTER_ROWS))
+    np.testing.assert_allclose(proba[:, 1], 1 / (1 + np.exp(-sigmoid * margin)), rtol=1e-6)
+
+    with pytest.raises(ValueError):
+        compile_model(LGBMClassifier("regression"))
+
+
+def test_load_predictor_prefers_current_compiled_model(monkeypatch, tmp_path):
+    import time
+
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    from alpha_server import model_registry
+    from alpha_server.tree_compiler import CompiledModel, compiled_path, write_compiled
+
+    monkeypatch.setattr(model_registry, "registry", model_registry.ModelRegistry(check_interval=0))
+    X, y = _tree_data(200)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    path = str(tmp_path / "AAA_model.joblib")
+    joblib.dump({"model": model, "features": ["a"]}, path)
+    assert write_compiled(path, model, ["a"], {"feature_set_version": "v"})
+
+    saved = model_registry.load_predictor(path)
+    assert isinstance(saved["model"], CompiledModel) and saved["feature_set_version"] == "v"
+
+    # 원본만 다시 저장되면 컴파일본은 낡은 것으로 보고 원본을 쓴다
+    time.sleep(0.01)
+    joblib.dump({"model": model, "features": ["a"], "extra": 1}, path)
+    assert isinstance(model_registry.load_predictor(path)["model"], RandomForestClassifier)
+    write_compiled(path, object(), ["a"])  # 지원하지 않는 모델이면 낡은 컴파일본 삭제
+    assert not os.path.exists(compiled_path(path))
+
+
+def test_global_predictor_import_skips_training_libraries():
+    import subprocess
+    import sys
+
+    # 서빙은 컴파일본으로 추론하므로 predictor를 불러와도 학습 라이브러리는 로드되지 않아야 한다
+    code = (
+        "import sys, alpha_server.global_model_predictor; "
+        "print(','.join(sorted({m.split('.')[0] for m in sys.modules} & {'sklearn', 'xgboost', 'lightgbm'})))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert out.stdout.strip().splitlines()[-1:] in ([], [""])
+
+
+def test_model_pack_serves_memmapped_models(monkeypatch, tmp_path):
+    import time
+
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import MinMaxScaler
+
+    from alpha_server import model_pack
+    from alpha_server.tree_compiler import from_arrays, to_arrays, write_compiled
+
+    models_dir, pack_dir = tmp_path / "models", tmp_path / "packs"
+    models_dir.mkdir()
+    monkeypatch.setattr(model_pack, "MODELS_DIR", str(models_dir))
+    monkeypatch.setattr(model_pack, "MODEL_PACK_DIR", str(pack_dir))
+
+    X, y = _tree_data(300)
+    models = {t: RandomForestClassifier(n_estimators=5, random_state=i).fit(X, y) for i, t in enumerate(["AAA", "BBB"])}
+    for t, m in models.items():
+        joblib.dump({"model": m, "features": [], "feature_set_version": "v"}, models_dir / f"{t}_model.joblib")
+    write_compiled(str(models_dir / "AAA_model.joblib"), models["AAA"], [], {"feature_set_version": "v"})
+    joblib.dump({"model": models["AAA"], "features": []}, models_dir / "AAA_news_model.joblib")
+    joblib.dump({"scaler": MinMaxScaler().fit(X), "lookback": 60}, models_dir / "AAA_scaler.joblib")
+    joblib.dump({"model": models["AAA"]}, models_dir / "global_short_model.joblib")  # 글로벌 모델은 제외
+
+    stats = model_pack.build_pack("model")
+    assert stats["entries"] == 2 and stats["compiled"] == 2
+    assert model_pack.build_pack("scaler")["blobs"] == 1
+
+    for t, m in models.items():
+        saved = model_pack.load_packed(str(models_dir / f"{t}_model.joblib"))
+        assert saved["feature_set_version"] == "v"
+        np.testing.assert_allclose(saved["model"].predict_proba(X[:50]), m.predict_proba(X[:50]))
+    pack = model_pack.get_pack("model")
+    part = saved["model"].parts[0]
+    # 복사 없는 memmap 뷰 (순회용 children도 저장본 그대로), 같은 묶음에서는 조회 결과를 재사용
+    assert np.shares_memory(part.threshold, pack._mm) and np.shares_memory(part.children, pack._mm)
+    assert pack.get("BBB") is pack.get("BBB") is saved
+    # 형식 1 (children 없음) 저장본도 읽는다
+    header, arrays = to_arrays(saved["model"])
+    old = from_arrays({**header, "format": 1}, {k: v for k, v in arrays.items() if not k.endswith("_children")})
+    np.testing.assert_array_equal(old.parts[0].children, part.children)
+    scaler = model_pack.load_packed(str(models_dir / "AAA_scaler.joblib"))
+    assert scaler["lookback"] == 60 and model_pack.load_packed(str(models_dir / "AAA_news_model.joblib")) is None
+
+    # 묶은 뒤 재학습된 원본은 묶음 대신 원본을 쓰도록 None, 원본을 지워도 묶음으로 예측 가능
+    time.sleep(0.01)
+    joblib.dump({"model": models["BBB"], "features": []}, models_dir / "AAA_model.joblib")
+    assert model_pack.load_packed(str(models_dir / "AAA_model.joblib")) is None
+    os.remove(models_dir / "BBB_model.joblib")
+    assert model_pack.load_packed(str(models_dir / "BBB_model.joblib")) is not None
+    assert model_pack.stats()["stale"] >= 1